@@ -0,0 +1,162 @@
+"""
+Parsers de cambios de antes de backend/engine/patch_parser.py (uno de regex por área más
+_CHANGE_PAT para metodología). Ya no se usan en el flujo; viven aquí sólo como oráculo de los
+tests de paridad (test_patch_parser.py) y para scripts/bench_patch_parser.py.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.engine.brain import _canonical_role, _norm, normalize_method_name
+
+_CHANGE_PAT = re.compile(
+    r"(?:cambia(?:r)?\s+a|usar|quiero|prefiero|pasar\s+a)\s+(scrum|kanban|scrumban|xp|lean|crystal|fdd|dsdm|safe|devops)"
+    r"(?:\s+(?:en\s+vez\s+de|en\s+lugar\s+de)\s+(scrum|kanban|scrumban|xp|lean|crystal|fdd|dsdm|safe|devops))?",
+    re.I
+)
+
+
+def _parse_change_request_regex(text: str) -> Optional[Tuple[str, Optional[str]]]:
+    t = _norm(text)
+    m = _CHANGE_PAT.search(t)
+    if m:
+        tgt = normalize_method_name(m.group(1))
+        alt = normalize_method_name(m.group(2)) if m.group(2) else None
+        return tgt, alt
+    m2 = re.search(
+        r"(scrum|kanban|scrumban|xp|lean|crystal|fdd|dsdm|safe|devops)\s+(?:en\s+vez\s+de|en\s+lugar\s+de)\s+"
+        r"(scrum|kanban|scrumban|xp|lean|crystal|fdd|dsdm|safe|devops)", t)
+    if m2:
+        a = normalize_method_name(m2.group(1))
+        b = normalize_method_name(m2.group(2))
+        return a, b
+    return None
+
+
+def _parse_team_patch(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Interpreta órdenes de cambio de equipo en lenguaje natural y devuelve un patch.
+    Soporta:
+      - 'añade 0.5 qa', 'agrega 1 backend'
+      - 'pon 2 backend', 'pon pm a 1', 'sube qa a 0,5', 'baja frontend a 1'
+      - 'quita ux', 'elimina qa'
+    Devuelve: {"type":"team","ops":[{"op":"add|set|remove","role":"QA","count":0.5}, ...]}
+    """
+    t = _norm(text)
+
+    # Verbos comunes (simplificados)
+    add_verbs = r"(?:anade|añade|agrega|suma|incluye|mete|añadir|agregar)"
+    set_verbs = r"(?:deja|ajusta|pon|pone|establece|setea|sube|baja|pasa|cambia|poner|poner a)"
+    rem_verbs = r"(?:quita|elimina|borra|saca|quitar|eliminar)"
+
+    # Helper para convertir tokens numericos y palabras como 'medio'->0.5
+    def _to_float(num: str) -> float:
+        if not num:
+            return 1.0
+        s = num.strip().lower()
+        if s in ("medio", "0.5", "0,5", "media"):
+            return 0.5
+        # manejar 'uno'/'dos' simples opcionalmente
+        words = {"uno": 1.0, "dos": 2.0, "tres": 3.0, "cuatro": 4.0}
+        if s in words:
+            return float(words[s])
+        try:
+            return float(s.replace(",", "."))
+        except Exception:
+            return 1.0
+
+    ops: List[Dict[str, Any]] = []
+
+    # Formato directo: "Backend Dev x2" o "PM x0.5"
+    for m in re.finditer(r"([a-zA-Z][a-zA-Z\s/]*?)\s+x\s*(\d+(?:[.,]\d+)?)", t):
+        role, num = m.groups()
+        ops.append({"op": "set", "role": role.strip(), "count": _to_float(num)})
+
+    # Buscar patrones 'añade 0.5 qa' o 'añade qa' (sin número -> 1)
+    for m in re.finditer(fr"{add_verbs}\s+(?:(\d+[.,]?\d*)\s+)?([a-zA-Z\s/]+)", t):
+        num, role = m.groups()
+        ops.append({"op": "add", "role": role.strip(), "count": _to_float(num)})
+
+    # Patrones de set tipo 'pon 2 backend' o 'pon backend a 2'
+    for m in re.finditer(fr"{set_verbs}\s+(?:(\d+[.,]?\d*)\s+)?([a-zA-Z\s/]+)", t):
+        num, role = m.groups()
+    # si el match capturó el rol y el num está en la otra forma, intentar otro regex
+        if role and re.search(r"\d", role) and not num:
+            # intentar invertir grupos
+            inv = re.search(fr"{set_verbs}\s+([a-zA-Z\s/]+)\s+(?:a|en)\s+(\d+[.,]?\d*)", t)
+            if inv:
+                role = inv.group(1); num = inv.group(2)
+        ops.append({"op": "set", "role": role.strip(), "count": _to_float(num)})
+
+    # Patrones 'pon pm a 1' / 'baja backend a 2'
+    for m in re.finditer(fr"{set_verbs}\s+([a-zA-Z\s/]+)\s+(?:a|en)\s+(\d+[.,]?\d*)", t):
+        role, num = m.groups()
+        ops.append({"op": "set", "role": role.strip(), "count": _to_float(num)})
+
+    # Remover roles: 'quita ux' etc.
+    for m in re.finditer(fr"{rem_verbs}\s+([a-zA-Z\s/]+)", t):
+        role = m.group(1)
+        ops.append({"op": "remove", "role": role.strip()})
+
+    # Filtrar ops vacas o mal formadas
+    cleaned: List[Dict[str, Any]] = []
+    for op in ops:
+        r = op.get("role") or ""
+        if not r:
+            continue
+        # normalizar espacios
+        op["role"] = re.sub(r"\s+", " ", r).strip()
+        if op.get("op") in ("add", "set"):
+            try:
+                op["count"] = float(op.get("count", 1.0))
+            except Exception:
+                op["count"] = 1.0
+        cleaned.append(op)
+
+    return {"type": "team", "ops": cleaned} if cleaned else None
+
+
+def _parse_phases_patch(text: str) -> Optional[Dict[str, Any]]:
+    t = _norm(text)
+    ops = []
+    # set weeks: fase X a 8 semanas / cambia 'Sprints de Desarrollo (2w)' a 10 semanas
+    for name, weeks in re.findall(r"(?:fase\s+)?'([^']+?)'\s+a\s+(\d+)\s*sem", t):
+        ops.append({"op": "set_weeks", "name": name.strip(), "weeks": int(weeks)})
+    for weeks, name in re.findall(r"(?:cambia|ajusta|pon)\s+(\d+)\s*sem(?:anas|ana|s)?\s+a\s+'([^']+)'", t):
+        ops.append({"op": "set_weeks", "name": name.strip(), "weeks": int(weeks)})
+
+    # add phase: añade fase 'Pilotaje' 2 semanas
+    for name, weeks in re.findall(r"(?:añade|agrega)\s+fase\s+'([^']+?)'\s+(\d+)\s*sem", t):
+        ops.append({"op": "add", "name": name.strip(), "weeks": int(weeks)})
+
+    # remove phase: quita/elimina fase 'QA'
+    for name in re.findall(r"(?:quita|elimina)\s+fase\s+'([^']+?)'", t):
+        ops.append({"op": "remove", "name": name.strip()})
+
+    if ops:
+        return {"type": "phases", "ops": ops}
+    return None
+
+def _parse_budget_patch(text: str) -> Optional[Dict[str, Any]]:
+    t = _norm(text)
+    role_rates = {}
+    # tarifa de backend a 1200 / rate pm 1300
+    for role, rate in re.findall(r"(?:tarifa|rate)\s+de?\s+([a-zA-Z\s/]+?)\s+a\s+(\d+)", t):
+        role_rates[_canonical_role(role.strip())] = float(rate)
+    # contingencia a 15%
+    cont = re.search(r"contingencia\s+(?:a\s+)?(\d+)\s*%+", t)
+    patch: Dict[str, Any] = {"type": "budget"}
+    if role_rates:
+        patch["role_rates"] = role_rates
+    if cont:
+        patch["contingency_pct"] = float(cont.group(1))
+    if len(patch.keys()) > 1:
+        return patch
+    return None
+
+def _parse_risks_patch(text: str) -> Optional[Dict[str, Any]]:
+    t = _norm(text)
+    add = [s.strip() for s in re.findall(r"(?:añade|agrega)\s+r(?:iesgo|isk)o?:?\s+(.+)", t)]
+    remove = [s.strip() for s in re.findall(r"(?:quita|elimina)\s+r(?:iesgo|isk)o?:?\s+(.+)", t)]
+    if add or remove:
+        return {"type": "risks", "add": add, "remove": remove}
+    return None
@@ -0,0 +1,84 @@
+import random
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.engine import capacity as cap
+from backend.engine.brain import _ROLE_KEYWORDS, _build_timeline
+from backend.engine.planner import generate_proposal
+from backend.memory import state_store
+from backend.routers.user import get_current_user
+
+REQ = "app de reservas con pagos y chat en tiempo real"
+START = date(2026, 3, 2)
+
+
+def _people(n, seed=42):
+    rnd = random.Random(seed)
+    roles = ["Backend", "Frontend", "QA", "PM", "Tech Lead", "UX/UI", "DevOps"]
+    out = []
+    for i in range(n):
+        role = roles[i % len(roles)]
+        kws = _ROLE_KEYWORDS.get(role, _ROLE_KEYWORDS["Backend Dev"])
+        out.append({"id": i, "name": f"P{i}", "role": role, "skills": rnd.sample(kws, 3),
+                    "seniority": "Senior", "availability_pct": rnd.choice([50, 100])})
+    return out
+
+
+def test_demand_follows_timeline_and_phase_roles():
+    p = generate_proposal(REQ)
+    dem = cap.build_demand([{"id": 1, "proposal": p, "start": START.isoformat()}])
+    ev = _build_timeline(p, START)["events"]
+    assert dem["weeks"][0] == START.isoformat()
+    assert len(dem["weeks"]) == (date.fromisoformat(ev[-1]["end"]) - START).days // 7 + 1
+    pm = next(k for k, s in enumerate(dem["slots"]) if s["role"] == "PM")
+    assert dem["mask"][pm, 0]   # PM trabaja en discovery
+
+
+def test_concurrent_projects_overallocate_in_isolation_and_leveling_fixes_it():
+    p = generate_proposal(REQ)
+    projects = [{"id": i, "proposal": p, "start": (START + timedelta(weeks=i)).isoformat()} for i in range(5)]
+    people = _people(70)
+    for solver in ("lp", "greedy"):
+        res = cap.plan_capacity(projects, people, solver=solver, include_matrix=True)
+        assert res["baseline"]["overallocated_people"] > 0
+        assert res["baseline"]["max_load_pct"] > 100
+        lev = res["leveled"]
+        assert lev["overallocated_people"] == 0 and lev["max_load_pct"] <= 100
+        avail = np.array([q["availability_pct"] / 100 for q in people])
+        assert (np.array(res["load"]["leveled"]) <= avail[:, None] + 1e-9).all()
+        assert lev["coverage_pct"] > 90
+
+
+def test_shortfall_when_roster_too_small():
+    p = generate_proposal(REQ)
+    res = cap.plan_capacity([{"id": 1, "proposal": p, "start": START.isoformat()}], _people(3))
+    assert res["leveled"]["coverage_pct"] < 100
+    assert res["leveled"]["shortfall"] and res["leveled"]["overallocated_people"] == 0
+
+
+def test_capacity_endpoint_uses_user_employees():
+    state_store.init_db()
+    uid = int(uuid.uuid4().int % 10**8) + 2 * 10**8
+    for q in _people(14):
+        state_store.create_employee(uid, q["name"], q["role"], ", ".join(q["skills"]), q["seniority"], q["availability_pct"])
+    pids = [state_store.save_proposal(f"cap-{uid}", REQ, generate_proposal(REQ)) for _ in range(3)]
+    for pid in pids:
+        state_store.log_proposal_view(uid, pid)
+    assert state_store.list_user_proposal_ids(uid) == pids[::-1]
+
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": uid})()
+    try:
+        client = TestClient(app)
+        r = client.post("/user/capacity", json={"start_dates": {str(pid): START.isoformat() for pid in pids}})
+        assert r.status_code == 200
+        body = r.json()
+        assert body["projects"] == 3 and body["people"] == 14
+        assert body["leveled"]["overallocated_people"] == 0
+        assert body["baseline"]["overallocated_people"] > 0
+        assert client.post("/user/capacity", json={"proposal_ids": [99999999]}).status_code == 404
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from backend.engine import brain, whatif
+from backend.engine.brain import _collect_sources_for_area
+from backend.engine.planner import BASE_ROLE_RATES, generate_proposal
+from backend.knowledge import citations
+from backend.knowledge.citations import SOURCES, compact_proposal, expand_proposal, register_source
+from backend.memory import state_store
+
+REQ = "plataforma fintech con pagos y app móvil"
+
+
+def test_proposal_carries_references():
+    p = generate_proposal(REQ)
+    team = next(d for d in p["decision_log"] if d["area"] == "team")
+    assert all(isinstance(s, str) and s in SOURCES for s in team["sources"])
+    assert isinstance(p["budget"]["assumptions"]["base_role_rates_eur_pw"], str)
+    full = expand_proposal(p)
+    team_full = next(d for d in full["decision_log"] if d["area"] == "team")
+    assert team_full["sources"][0]["titulo"] == "Accelerate"
+    assert full["budget"]["assumptions"]["base_role_rates_eur_pw"] == BASE_ROLE_RATES
+    # expandir no toca la propuesta original
+    assert isinstance(p["budget"]["assumptions"]["base_role_rates_eur_pw"], str)
+
+
+def test_compact_is_inverse_of_expand_and_smaller():
+    p = generate_proposal(REQ)
+    full = expand_proposal(p)
+    assert compact_proposal(full) == p
+    assert len(json.dumps(p)) < len(json.dumps(full))
+
+
+def test_ids_are_stable_by_content():
+    src = {"autor": "X", "titulo": "Libro de prueba", "anio": 2001, "url": "u"}
+    a = register_source(src)
+    assert register_source(dict(src)) == a and a.startswith("src:libro-de-prueba-2001-")
+    assert register_source({**src, "url": "otra"}) != a
+
+
+def test_consumers_resolve_references():
+    p = generate_proposal(REQ)
+    base = whatif.baseline_from_proposal(p)
+    mult = p["budget"]["assumptions"]["industry_rate_multiplier"]
+    assert base["rates"]["PM"] == BASE_ROLE_RATES["PM"] * mult
+    assert all(isinstance(s, dict) for s in _collect_sources_for_area(p, "team"))
+
+
+def test_stored_table_id_survives_rate_change(monkeypatch):
+    state_store.init_db()
+    p = generate_proposal(REQ)
+    tid = p["budget"]["assumptions"]["base_role_rates_eur_pw"]
+    state_store.save_proposal("citas-tabla", REQ, p)
+    # las tarifas cambian en código: el registro en memoria ya no conoce el ID guardado
+    monkeypatch.setattr(citations, "TABLES", {})
+    monkeypatch.setattr(citations, "_STORED_TABLES", {})
+    assert citations.resolve_table(tid) == BASE_ROLE_RATES
+    assert whatif.baseline_from_proposal(p)["rates"]["PM"] > 0
+    with pytest.raises(citations.UnknownTableError):
+        citations.resolve_table("table:base-role-rates-0000000000")
+
+
+def test_methodology_sources_stay_references(monkeypatch):
+    src = {"autor": "D. Anderson", "titulo": "Kanban", "anio": 2010, "url": "u"}
+    sid = register_source(src)
+    monkeypatch.setitem(brain.METHODOLOGIES["Kanban"], "sources", [dict(src)])
+    p = generate_proposal(REQ)
+    p2 = brain._retune_plan_for_method(p, "Kanban")
+    assert p2["methodology_sources"] == [sid]
+
+
+def test_stored_source_ids_survive_source_edits(monkeypatch):
+    state_store.init_db()
+    p = generate_proposal(REQ)
+    sid = p["decision_log"][1]["sources"][0]
+    expected = dict(SOURCES[sid])
+    state_store.save_proposal("citas-fuente", REQ, p)
+    # la fuente se edita en código: el ID guardado se resuelve desde BD
+    monkeypatch.setattr(citations, "SOURCES", {})
+    monkeypatch.setattr(citations, "_STORED_SOURCES", {})
+    assert citations.expand_sources([sid]) == [expected]
+    gone = "src:fuente-borrada-2001-000000"
+    assert citations.expand_sources([gone]) == [{"id": gone, "missing": True}]
+    assert "fuente no disponible" in brain._format_sources(citations.expand_sources([gone]))
+
+
+def test_planner_source_lists_are_not_shared():
+    a, b = generate_proposal(REQ), generate_proposal("app de reservas")
+    a["decision_log"][1]["sources"].append("src:otra")
+    assert "src:otra" not in b["decision_log"][1]["sources"]
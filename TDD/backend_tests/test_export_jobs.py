@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from backend.engine import export_jobs
+
+MSGS = [{"role": "user", "content": "Quiero una app de reservas"},
+        {"role": "assistant", "content": "Metodología: Scrum. Equipo: 2 devs."}]
+
+
+@pytest.fixture
+def in_thread(monkeypatch, tmp_path):
+    # pool de un hilo: sin arrancar procesos; estado compartido en un directorio temporal
+    monkeypatch.setenv("EXPORT_WORKERS", "0")
+    monkeypatch.setenv("EXPORT_DIR", str(tmp_path))
+    export_jobs.shutdown_pool()
+    export_jobs.clear()
+    yield
+    export_jobs.shutdown_pool()
+    export_jobs.clear()
+
+
+def _payload(title="Informe A"):
+    return {"title": title, "messages": MSGS, "report_options": {"include_transcript": True}}
+
+
+def _wait_done(client, job_id, timeout=60):
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        info = client.get(f"/export/jobs/{job_id}").json()
+        if info["status"] in ("done", "error"):
+            return info
+        time.sleep(0.05)
+    raise AssertionError("el trabajo no terminó")
+
+
+def test_key_is_content_addressed():
+    k = export_jobs.job_key(MSGS, "t", {"a": 1, "b": 2}, None)
+    assert k == export_jobs.job_key([dict(m) for m in MSGS], "t", {"b": 2, "a": 1}, {})
+    assert k != export_jobs.job_key(MSGS, "t", {"a": 1, "b": 2}, {"analysis_depth": "deep"})
+    assert k != export_jobs.job_key(MSGS, "t", {"a": 1, "b": 2}, None, [{"seq": 0}])
+
+
+def test_result_cache_is_bounded_lru():
+    c = export_jobs._ResultCache(10)
+    c.put("a", b"1234")
+    c.put("b", b"1234")
+    c.get("a")
+    c.put("c", b"1234")             # expulsa "b" (la menos usada)
+    assert "a" in c and "c" in c and "b" not in c and c.size == 8
+    c.put("big", b"x" * 11)         # más grande que la caché: no se guarda
+    assert "big" not in c
+
+
+def test_submit_poll_download_and_cache(client, in_thread):
+    r = client.post("/export/jobs", json=_payload())
+    assert r.status_code == 202 and r.headers["location"] == f"/export/jobs/{r.json()['job_id']}"
+    job_id = r.json()["job_id"]
+    info = _wait_done(client, job_id)
+    assert info["status"] == "done" and info["size"] > 0
+    pdf = client.get(info["download"])
+    assert pdf.status_code == 200 and pdf.content.startswith(b"%PDF")
+    assert client.get(info["download"], headers={"If-None-Match": pdf.headers["etag"]}).status_code == 304
+
+    again = client.post("/export/jobs", json=_payload()).json()      # mismo contenido → mismo trabajo
+    assert again["job_id"] == job_id and again["status"] == "done"
+    export_jobs._JOBS.clear()                                        # trabajo olvidado, PDF en caché
+    os.remove(os.path.join(os.environ["EXPORT_DIR"], f"{job_id}.json"))
+    cached = client.post("/export/jobs", json=_payload()).json()
+    assert cached["status"] == "done" and cached["cached"] is True
+    sync = client.post("/export/chat.pdf", json=_payload())
+    assert sync.status_code == 200 and sync.content == pdf.content
+
+
+def test_events_stream_until_done(client, in_thread):
+    job_id = client.post("/export/jobs", json=_payload("Informe SSE")).json()["job_id"]
+    body = client.get(f"/export/jobs/{job_id}/events").text
+    events = [line for line in body.splitlines() if line.startswith("event: ")]
+    assert events and '"status": "done"' in body.strip().splitlines()[-1]
+
+
+def test_pending_limit_returns_429(client, in_thread, monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setenv("EXPORT_MAX_PENDING", "1")
+    monkeypatch.setattr(export_jobs, "render_report", lambda *a: gate.wait(10) and b"%PDF-fake")
+    first = client.post("/export/jobs", json=_payload("uno"))
+    busy = client.post("/export/jobs", json=_payload("dos"))
+    assert first.status_code == 202 and busy.status_code == 429 and busy.headers["retry-after"]
+    assert client.get(f"/export/jobs/{first.json()['job_id']}/pdf").status_code == 409
+    gate.set()
+    assert _wait_done(client, first.json()["job_id"])["status"] == "done"
+    assert client.post("/export/jobs", json=_payload("dos")).status_code == 202
+
+
+def test_unknown_job_and_empty_payload(client):
+    assert client.get("/export/jobs/nope").status_code == 404
+    assert client.post("/export/jobs", json={"messages": []}).status_code == 400
+
+
+def _other_worker(job_id, **rec):
+    # lo que vería este proceso si el trabajo lo hubiera encolado otro worker
+    export_jobs._JOBS.clear()
+    export_jobs._CACHE.clear()
+    if rec:
+        path = os.path.join(os.environ["EXPORT_DIR"], f"{job_id}.json")
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**data, **rec}, f)
+
+
+def test_jobs_are_visible_from_other_workers(client, in_thread):
+    job_id = client.post("/export/jobs", json=_payload("Informe compartido")).json()["job_id"]
+    assert _wait_done(client, job_id)["status"] == "done"
+    _other_worker(job_id)
+    assert client.get(f"/export/jobs/{job_id}").json()["status"] == "done"
+    assert client.get(f"/export/jobs/{job_id}/pdf").content.startswith(b"%PDF")
+
+
+def test_foreign_jobs_count_time_out_and_die_with_their_worker(client, in_thread, monkeypatch):
+    job_id = client.post("/export/jobs", json=_payload("Informe ajeno")).json()["job_id"]
+    _wait_done(client, job_id)
+    _other_worker(job_id, status="queued", owner=f"{export_jobs._OWNER.rpartition(':')[0]}:{os.getppid()}")
+    monkeypatch.setenv("EXPORT_MAX_PENDING", "1")
+    # la cola es global: el trabajo del otro worker ocupa el único hueco
+    assert client.post("/export/jobs", json=_payload("otro")).status_code == 429
+    with pytest.raises(TimeoutError):
+        export_jobs.wait(export_jobs.get_job(job_id), timeout=0.2)
+    monkeypatch.setenv("EXPORT_TIMEOUT", "1")
+    body = client.get(f"/export/jobs/{job_id}/events").text
+    assert "event: timeout" in body or '"status": "error"' in body
+    # su worker ya no existe: fallido, y deja de contar para el límite
+    _other_worker(job_id, status="running", owner=f"{export_jobs._OWNER.rpartition(':')[0]}:{2 ** 22 + 12345}")
+    assert client.get(f"/export/jobs/{job_id}").json()["status"] == "error"
+    assert client.post("/export/jobs", json=_payload("otro")).status_code == 202
+
+
+def test_process_pool_renders(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("EXPORT_WORKERS", "1")
+    monkeypatch.setenv("EXPORT_DIR", str(tmp_path))
+    export_jobs.shutdown_pool()
+    export_jobs.clear()
+    try:
+        r = client.post("/export/chat.pdf", json=_payload("Informe en proceso aparte"))
+        assert r.status_code == 200 and r.content.startswith(b"%PDF")
+    finally:
+        export_jobs.shutdown_pool()
+        export_jobs.clear()
+
+
+def test_session_proposal_travels_with_the_job_and_its_key(in_thread, monkeypatch):
+    from backend.engine.context import set_last_proposal
+    from backend.engine.planner import generate_proposal
+    seen = []
+    monkeypatch.setattr(export_jobs, "render_report", lambda m, t, meta, *a: seen.append(meta) or b"%PDF-fake")
+    req = "app de reservas con pagos"
+    set_last_proposal("exp-mc", generate_proposal(req), req)
+    first = export_jobs.submit(MSGS, "Informe", {"session_id": "exp-mc"})
+    export_jobs.wait(first)
+    # el pool no tiene sesiones: la propuesta y los requisitos van en report_meta
+    assert seen[0]["proposal"]["phases"] and seen[0]["requirements"] == req
+    set_last_proposal("exp-mc", generate_proposal("erp para gran empresa"), "erp para gran empresa")
+    second = export_jobs.submit(MSGS, "Informe", {"session_id": "exp-mc"})
+    assert second.id != first.id
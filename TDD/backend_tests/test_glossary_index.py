@@ -0,0 +1,75 @@
+import random
+
+from backend.knowledge import methodologies as m
+from backend.knowledge.glossary_index import GlossaryIndex, edit_distance
+
+
+def _linear_substring(glossary, t):
+    # lo que hacía get_definition al final: primera clave con t in k or k in t
+    return next((k for k in glossary if t in k or k in t), None)
+
+
+def test_substring_search_matches_linear_scan():
+    rnd = random.Random(45)
+    idx = m.glossary_index()
+    keys = list(m.GLOSSARY)
+    queries = set()
+    for k in keys:
+        queries |= {k, "el " + k + " del equipo", k[:2], k[-4:]}
+        a = rnd.randrange(len(k))
+        queries.add(k[a:a + rnd.randint(1, 8)])
+    for q in queries:
+        assert idx.first_substring_match(q) == _linear_substring(m.GLOSSARY, q), q
+        assert m.search_glossary(q) == [k for k in keys if q in k or k in q], q
+
+
+def test_get_definition_rewrites_accents_and_typos():
+    assert m.get_definition("Workshops con stakeholders") == m.GLOSSARY["workshop con stakeholders"]
+    assert m.get_definition("blue_green deployment") == m.GLOSSARY["blue-green deployment"]
+    assert m.get_definition("incepcion") == m.GLOSSARY["incepción"]          # sin tilde
+    assert m.get_definition("retrospectvia") == m.GLOSSARY["retrospectiva"]  # transposición
+    assert m.get_definition("obserbabilidad") == m.GLOSSARY["observabilidad"]
+    assert m.get_definition("xyzzy") is None and m.get_definition("  ") is None
+    assert m.get_definition("retrospectvia", fuzzy=False) is None
+
+
+def test_suggestions_are_ranked():
+    s = m.suggest_glossary_terms("canary deploy", limit=3)
+    assert s[0]["term"] == "canary deployment" and s[0]["match"] == "partial"
+    s = m.suggest_glossary_terms("definiton of done")
+    assert s and s[0]["term"] == "definition of done inicial"
+    assert m.suggest_glossary_terms("sprint")[0] == {"term": "sprint", "score": 1.0, "match": "exact"}
+    scores = [x["score"] for x in m.suggest_glossary_terms("plan", limit=5)]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_index_follows_glossary_updates():
+    m.GLOSSARY["término de prueba glosario"] = "Definición de prueba."
+    try:
+        assert m.get_definition("termino de prueba glosario") == "Definición de prueba."
+    finally:
+        del m.GLOSSARY["término de prueba glosario"]
+    assert m.get_definition("termino de prueba glosario") is None
+
+
+def test_large_glossary_lookups():
+    # el tiempo se mide en scripts/bench_glossary.py
+    rnd = random.Random(7)
+    syll = ["ka", "lo", "mi", "ne", "ta", "ro", "su", "vi", "pe", "da", "gu", "fo"]
+    words = list({"".join(rnd.choice(syll) for _ in range(rnd.randint(2, 4))) for _ in range(3000)})
+    big = {}
+    while len(big) < 20000:
+        big[" ".join(rnd.sample(words, rnd.randint(1, 3)))] = "def"
+    idx = GlossaryIndex(big)
+    keys = list(big)
+    for k in rnd.sample(keys, 200):
+        typo = k[:2] + k[3:] if len(k) > 6 else k
+        assert idx.lookup(k) == k
+        assert idx.first_substring_match(k[1:-1]) is not None
+        assert idx.suggest(typo, limit=3)
+
+
+def test_edit_distance():
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("ab", "ba") == 1
+    assert edit_distance("abcdef", "x", limit=2) == 3
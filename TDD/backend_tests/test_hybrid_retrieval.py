@@ -0,0 +1,108 @@
+from backend.retrieval.bm25 import InvertedIndex, rrf_fuse, tokenize
+from backend.retrieval.similarity import SimilarityRetriever
+
+DOCS = [
+    "app móvil de reservas para gimnasio con pagos",
+    "marketplace de segunda mano con pagos y chat",
+    "plataforma de telemedicina con citas y videollamada",
+    "ecommerce de moda con carrito y pagos",
+    "app de reservas de restaurante",
+    "sistema de inventario para almacén",
+]
+
+
+def _retriever():
+    r = SimilarityRetriever()
+    r.load(DOCS, [{"id": i + 1, "requirements": d} for i, d in enumerate(DOCS)])
+    return r
+
+
+def test_tokenize_strips_accents_and_stopwords():
+    assert tokenize("App móvil de Reservas") == ["app", "movil", "reservas"]
+
+
+def test_bm25_prefers_docs_with_all_terms():
+    idx = InvertedIndex()
+    idx.build(DOCS)
+    assert list(idx.conjunctive(["reservas", "pagos"])) == [0]
+    hits = idx.search("reservas pagos", top_k=3)
+    assert hits[0][0] == 0
+    # la intersección se queda corta → se puntúa la unión
+    assert {i for i, _ in hits} >= {4}
+
+
+def test_rrf_fuse():
+    fused = rrf_fuse([[1, 2, 3], [2, 3, 1]], k=60)
+    assert fused[0][0] == 2
+
+
+def test_hybrid_retrieve_modes():
+    r = _retriever()
+    hits = r.retrieve("reservas con pagos", top_k=3)
+    assert hits[0]["id"] == 1
+    assert all({"similarity", "bm25", "score"} <= set(h) for h in hits)
+    assert r.retrieve("reservas con pagos", top_k=3, mode="bm25")[0]["id"] == 1
+    assert len(r.retrieve("reservas con pagos", top_k=3, rerank=True)) == 3
+    assert r.retrieve("zzz qqq") == []
+
+
+def _filtered_retriever():
+    meta = [
+        {"id": 1, "methodology": "Scrum", "budget": {"total_eur": 50000.0, "assumptions": {"industry_note": "Fintech (regulación PCI-DSS)"}}, "team": [{"role": "PM", "count": 1}]},
+        {"id": 2, "methodology": "Kanban", "budget": {"total_eur": 120000.0, "assumptions": {"industry_note": "Industria estándar"}}},
+        {"id": 3, "methodology": "Scrum", "budget": {"total_eur": 90000.0, "assumptions": {"industry_note": "Logistics/Retail/Travel (mercado competitivo)"}}},
+        {"id": 4, "methodology": "XP", "budget": {"total_eur": 30000.0}},
+    ]
+    docs = ["app de pagos con reservas", "app de reservas y pagos", "tienda de reservas", "web de reservas"]
+    r = SimilarityRetriever()
+    r.load(docs, meta)
+    return r
+
+
+def test_prefilters_on_columns():
+    r = _filtered_retriever()
+    assert {h["id"] for h in r.retrieve("reservas pagos", top_k=5, methodology="scrum")} == {1, 3}
+    assert {h["id"] for h in r.retrieve("reservas", top_k=5, budget_between=(40000, 100000))} == {1, 3}
+    assert [h["id"] for h in r.retrieve("reservas", top_k=5, industry="retail")] == [3]
+    assert r.retrieve("reservas", top_k=5, methodology="SAFe") == []
+
+
+def test_hits_are_lazily_hydrated():
+    r = _filtered_retriever()
+    calls = []
+    loader = r._loader
+    r._loader = lambda ids: calls.append(ids) or loader(ids)
+    hits = r.retrieve("pagos", top_k=2, methodology="scrum")
+    assert hits[0]["total_eur"] == 50000.0 and not calls
+    assert hits[0]["team"] == [{"role": "PM", "count": 1}]
+    assert hits[1].get("team") == []
+    assert len(calls) == 1
+    assert r.memory_footprint() < 200
+
+
+def test_refresh_publishes_whole_index_while_querying():
+    import threading
+    r = _retriever()
+    other = [f"sistema de facturación número {i} con informes" for i in range(40)]
+    errors = []
+
+    def _swap():
+        for k in range(30):
+            docs = DOCS if k % 2 else other
+            r.load(docs, [{"id": i + 1} for i in range(len(docs))])
+
+    def _query():
+        try:
+            for _ in range(200):
+                for h in r.retrieve("reservas con pagos", top_k=3, rerank=True):
+                    assert h["requirements"] in DOCS or h["requirements"] in other
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=_swap), threading.Thread(target=_query), threading.Thread(target=_query)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+
@@ -0,0 +1,49 @@
+from backend.engine import brain
+from backend.engine.context import set_last_proposal, set_pending_change, set_context_value
+from backend.engine.planner import generate_proposal
+
+
+def test_fast_replies_match_full_pipeline():
+    p = generate_proposal("app de reservas con pagos")
+    for key in brain._FAST_REPLIES:
+        sid_a, sid_b = f"cascade-a-{key}", f"cascade-b-{key}"
+        assert brain._generate_reply_full(sid_a, key) == brain._FAST_REPLIES[key]
+        set_last_proposal(sid_b, p, "app de reservas con pagos")
+        assert brain._generate_reply_full(sid_b, key) == brain._FAST_REPLIES[key]
+
+
+def test_fast_key_gates():
+    assert brain._fast_key("¡Hola!") == "hola"
+    assert brain._fast_key("  Muchas   gracias. ") == "muchas gracias"
+    assert brain._fast_key("hola quiero una app de reservas") is None
+
+
+def test_cascade_stats_and_state_gate():
+    brain.reset_cascade_stats()
+    assert brain.generate_reply("cascade-s", "hola")[1] == "Saludo."
+    stats = brain.cascade_stats()
+    assert stats["stage0"]["count"] == 1 and stats["full"]["count"] == 0
+
+    # con un cambio pendiente o esperando datos, no se usa la etapa 0
+    set_pending_change("cascade-p", "Kanban")
+    brain.generate_reply("cascade-p", "gracias")
+    set_context_value("cascade-w", "awaiting_start_confirmation", True)
+    brain.generate_reply("cascade-w", "hola")
+    stats = brain.cascade_stats()
+    assert stats["full"]["count"] == 2
+    assert stats["stage0"]["exit_rate"] == round(1 / 3, 4)
+
+
+def test_short_confirmation_resolves_in_confirm_stage():
+    p = generate_proposal("app de reservas con pagos")
+    brain.reset_cascade_stats()
+    for sid, msg, summary in (("cascade-yes", "¡Sí!", "Cambio confirmado a Kanban."),
+                              ("cascade-no", "no", "Cambio cancelado por el usuario.")):
+        set_last_proposal(sid, p, "app de reservas con pagos")
+        set_pending_change(sid, "Kanban")
+        assert brain.generate_reply(sid, msg)[1] == summary
+    # sin palabra de sí/no sigue al pipeline completo (que vuelve a preguntar)
+    set_pending_change("cascade-yes", "Kanban")
+    assert brain.generate_reply("cascade-yes", "y eso cuánto cuesta")[1] == "Esperando confirmación de cambio."
+    stats = brain.cascade_stats()
+    assert stats["confirm"]["count"] == 2 and stats["full"]["count"] == 1
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+
+from backend.knowledge import kb
+from backend.knowledge import methodologies as m
+
+
+def _sources():
+    out = {}
+    for f in sorted(os.listdir(kb.DEFAULT_DIR)):
+        if f.endswith(".json"):
+            with open(os.path.join(kb.DEFAULT_DIR, f), encoding="utf-8") as fh:
+                out.update(json.load(fh)["sections"])
+    return out
+
+
+def test_compiled_blob_roundtrips_every_section(tmp_path):
+    for f in os.listdir(kb.DEFAULT_DIR):
+        if f.endswith(".json"):
+            shutil.copy(os.path.join(kb.DEFAULT_DIR, f), tmp_path / f)
+    kb.write_compiled(str(tmp_path))
+    store = kb._Store(str(tmp_path))
+    try:
+        assert store.origin == "compiled"
+        for name, data in _sources().items():
+            assert store.section(name) == data, name
+    finally:
+        store.close()
+
+
+def test_sections_load_lazily():
+    kb.reload()
+    try:
+        assert "glossary" not in kb.info()["loaded"]
+        assert m.get_definition("sprint")
+        assert "glossary" in kb.info()["loaded"]
+        assert "train_method" not in kb.info()["loaded"]
+        assert m.METHODOLOGIES["Scrum"] and "Scrum" in m.METHODOLOGY_PHASES
+    finally:
+        kb.reload()
+
+
+def test_knowledge_update_without_code_changes(tmp_path, monkeypatch):
+    for f in os.listdir(kb.DEFAULT_DIR):
+        if f.endswith(".json"):
+            shutil.copy(os.path.join(kb.DEFAULT_DIR, f), tmp_path / f)
+    kb.write_compiled(str(tmp_path))
+    path = tmp_path / "methodologies.json"
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    doc["version"] = "2099.1"
+    doc["sections"]["glossary"]["sprint"] = "Definición actualizada."
+    path.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+
+    monkeypatch.setenv("KNOWLEDGE_DIR", str(tmp_path))
+    kb.reload()
+    try:
+        assert kb.info()["origin"] == "sources"       # el .kb ya no corresponde a los JSON
+        assert "methodologies.json@2099.1" in kb.version()
+        assert m.get_definition("sprint") == "Definición actualizada."
+    finally:
+        monkeypatch.delenv("KNOWLEDGE_DIR")
+        kb.reload()
+    assert m.get_definition("sprint") != "Definición actualizada."
+
+
+def test_reload_recompiles_rules_and_derived_tables(tmp_path, monkeypatch):
+    from backend.engine import knowledge_cards
+    for f in os.listdir(kb.DEFAULT_DIR):
+        if f.endswith(".json"):
+            shutil.copy(os.path.join(kb.DEFAULT_DIR, f), tmp_path / f)
+    path = tmp_path / "methodologies.json"
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    doc["sections"]["method_rules"]["Scrum"].append(["1", 150.0, "Regla editada"])
+    doc["sections"]["synonyms"]["metodo x"] = "Scrum"
+    path.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    before = dict((n, s) for n, s, _ in m.score_methodologies("app de reservas"))
+    table = knowledge_cards.cards()
+
+    monkeypatch.setenv("KNOWLEDGE_DIR", str(tmp_path))
+    kb.reload()
+    try:
+        after = dict((n, s) for n, s, _ in m.score_methodologies("app de reservas"))
+        assert after["Scrum"] == before["Scrum"] + 150.0
+        assert m.score_methodologies_batch(["app de reservas"])[0][0][0] == "Scrum"
+        assert m.normalize_method_name("metodo x") == "Scrum"
+        assert knowledge_cards.cards() is not table
+    finally:
+        monkeypatch.delenv("KNOWLEDGE_DIR")
+        kb.reload()
+    assert dict((n, s) for n, s, _ in m.score_methodologies("app de reservas")) == before
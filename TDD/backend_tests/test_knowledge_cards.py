@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.engine import brain, knowledge_cards as kc
+
+
+def test_table_matches_live_builders():
+    table = kc.cards()
+    for lv in kc.LEVELS:
+        for m in ("Scrum", "Kanban", "DevOps"):
+            assert table[kc.card_key("method", lv, m)]["text"] == brain._training_method_card(m, lv)
+            assert table[kc.card_key("benefits", lv, m)]["text"] == brain._training_benefits_card(lv, m)
+        assert table[kc.card_key("phases", lv)]["text"] == brain._training_phases_card(lv)
+    assert table["catalog::"]["text"] == brain._catalog_text()
+    assert table["overview::XP"]["text"] == brain._method_overview_text("XP")
+    # lo que brain sirve: por clave (normaliza "scrum" igual que el builder) o al vuelo
+    assert kc.get_card("method", "beginner", "scrum") == brain._training_method_card("scrum", "beginner")
+    assert kc.get_card("roles", None, "XP") == brain._training_roles_card(None, "XP")
+    assert kc.get_card("overview", method="scrum") == brain._method_overview_text("scrum")
+
+
+def test_cards_endpoint_uses_etags():
+    client = TestClient(app)
+    r = client.get("/projects/cards")
+    assert r.status_code == 200 and r.headers["etag"]
+    body = r.json()
+    assert "phases:expert:Scrum" in body["cards"] and body["levels"] == list(kc.LEVELS)
+    assert client.get("/projects/cards", headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+
+    one = client.get("/projects/cards/metrics:beginner:Kanban")
+    assert one.status_code == 200 and one.json()["text"].startswith("Métricas en Kanban")
+    assert one.headers["etag"] == one.json()["etag"]
+    assert client.get("/projects/cards/metrics:beginner:Kanban",
+                      headers={"If-None-Match": "W/" + one.headers["etag"]}).status_code == 304
+    assert client.get("/projects/cards/nope::").status_code == 404
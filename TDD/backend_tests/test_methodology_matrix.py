@@ -0,0 +1,39 @@
+import json
+import os
+import random
+
+from backend.knowledge.methodologies import score_methodologies, score_methodologies_batch
+
+# salidas fijadas de la implementación anterior (regla a regla) con el method_rules.json actual;
+# si se cambian pesos o textos en el JSON hay que regenerarlas a propósito
+_GOLDEN = os.path.join(os.path.dirname(__file__), "golden", "methodology_scores.json")
+
+_PHRASES = [
+    "incertidumbre mvp", "soporte 24/7", "deadline", "presupuesto fijo", "pci", "tiempo real",
+    "pagos", "app", "enterprise", "seguridad", "marketplace", "reservas", "b2b", "saas",
+    "startup", "banco", "salud", "logística", "hotel", "videojuego", "streaming", "iot", "erp",
+]
+
+
+def test_matrix_scoring_matches_golden_outputs():
+    with open(_GOLDEN, encoding="utf-8") as fh:
+        golden = json.load(fh)
+    texts = list(golden)
+    batch = score_methodologies_batch(texts)
+    for t, b in zip(texts, batch):
+        expected = [(n, s, why) for n, s, why in golden[t]]
+        assert score_methodologies(t) == expected
+        assert b == expected
+
+
+def test_batch_matches_single_calls():
+    rnd = random.Random(7)
+    texts = [" ".join(rnd.sample(_PHRASES, rnd.randint(0, 6))) for _ in range(300)]
+    assert score_methodologies_batch(texts) == [score_methodologies(t) for t in texts]
+
+
+def test_conjunction_features():
+    ranked = dict((n, (s, why)) for n, s, why in score_methodologies("mvp con soporte 24/7"))
+    assert "Mix desarrollo+operación" in ranked["Scrumban"][1]
+    assert ranked["DevOps"][0] >= 0.3
+    assert score_methodologies_batch([]) == []
@@ -0,0 +1,106 @@
+from backend.engine import brain
+from backend.engine.brain import _apply_patch
+from backend.engine.context import get_negotiation_log, get_last_proposal, get_pending_change, set_last_proposal
+from backend.engine.negotiation_log import NegotiationLog
+from backend.engine.planner import generate_proposal
+
+REQ = "app de reservas con pagos y chat en tiempo real"
+
+PATCHES = [
+    {"type": "team", "ops": [{"op": "set", "role": "QA", "count": 2}]},
+    {"type": "contingency", "pct": 15},
+    {"type": "risks", "add": ["Rotación de personal clave"]},
+    {"type": "budget", "role_rates": {"Backend Dev": 1200}},
+]
+
+
+def test_time_travel_replays_from_nearest_snapshot():
+    log = NegotiationLog(snapshot_every=4)
+    cur = generate_proposal(REQ)
+    log.record("proposal", cur)
+    states = [cur]
+    for i in range(10):
+        patch = PATCHES[i % len(PATCHES)]
+        cur = _apply_patch(cur, patch)
+        log.record("patch", cur, patch=patch)
+        states.append(cur)
+    assert log.current() == cur
+    for seq, expected in enumerate(states):
+        assert log.state_at(seq) == expected
+    # desde un snapshot nunca se re-aplican más de snapshot_every-1 eventos
+    log.replays = 0
+    log.state_at(7)
+    assert log.replays < 4
+
+
+def test_chat_flow_records_proposed_accepted_and_rejected():
+    sid = "neg-flow"
+    set_last_proposal(sid, generate_proposal(REQ), REQ)
+    brain.generate_reply(sid, "añade 1 QA")
+    pending = get_pending_change(sid)
+    assert pending and pending["patch"]["type"] == "team" and isinstance(pending["ref"], int)
+    brain.generate_reply(sid, "sí")
+    brain.generate_reply(sid, "cambiar a kanban")
+    brain.generate_reply(sid, "no")
+
+    log = get_negotiation_log(sid)
+    assert [e["kind"] for e in log.events] == ["proposal", "proposed", "patch", "proposed", "rejected"]
+    assert log.current() == get_last_proposal(sid)[0]
+    decisions = log.decision_events()
+    assert [d["kind"] for d in decisions] == ["team", "methodology"]
+    team, meth = decisions
+    assert team["accepted"] and team["accepted_at"] >= team["proposed_at"]
+    assert team["details"]["metrics"]["total_after"] > team["details"]["metrics"]["total_before"]
+    assert team["after"]["budget"] == log.current()["budget"]
+    assert not meth["accepted"] and meth["details"]["to"] == "Kanban" and meth["after"] is None
+
+
+def test_pdf_analysis_uses_log_events():
+    from backend.app import render_chat_report_inline
+    sid = "neg-pdf"
+    set_last_proposal(sid, generate_proposal(REQ), REQ)
+    brain.generate_reply(sid, "/cambiar: contingencia a 20%")
+    pdf = render_chat_report_inline([{"role": "user", "content": "hola"}], report_meta={"session_id": sid},
+                                    report_options={"include_transcript": False})
+    assert pdf.startswith(b"%PDF")
+    from backend.engine.negotiation_log import decision_events_for
+    (d,) = decision_events_for(sid)
+    assert d["accepted"] and d["kind"] == "budget" and d["details"]["contingencia_pct"] == 20.0
+
+
+def test_recorded_states_are_independent_of_the_caller():
+    log = NegotiationLog()
+    p = generate_proposal(REQ)
+    method = p["methodology"]
+    log.record("proposal", p)
+    p["methodology"] = "Kanban"              # el dict de sesión se toca in situ
+    p["team"].append({"role": "QA", "count": 9})
+    assert log.current()["methodology"] == method and log.state_at(0)["team"] != p["team"]
+    assert log.events[0]["proposal"]["methodology"] == method
+
+
+def test_methodology_event_replays_to_the_recorded_state():
+    # lo que graba la acción guiada al forzar una metodología
+    log = NegotiationLog()
+    p = generate_proposal(REQ)
+    log.record("proposal", p)
+    forced = brain._retune_plan_for_method(p, "Kanban")
+    log.record("methodology", forced, method="Kanban")
+    assert log.state_at(1) == forced == log.current()      # state_at lo re-aplica desde el snapshot
+
+
+def test_only_snapshots_are_copied_and_the_log_is_capped():
+    log = NegotiationLog(snapshot_every=4, max_events=16)
+    cur = generate_proposal(REQ)
+    log.record("proposal", cur)
+    states = [log.current()]
+    for i in range(39):
+        cur = _apply_patch(cur, PATCHES[i % len(PATCHES)])
+        log.record("patch", cur, patch=PATCHES[i % len(PATCHES)])
+        states.append(cur)
+    assert log.current() is cur                     # entre snapshots el estado no se copia
+    assert len(log.events) <= 16 and len(log._snap_states) <= 5
+    first = log.events[0]["seq"]
+    assert log.state_at(first - 1) is None          # historial descartado
+    for seq in range(first, 40):
+        assert log.state_at(seq) == states[seq]
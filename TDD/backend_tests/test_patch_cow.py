@@ -0,0 +1,36 @@
+import copy
+
+from backend.engine.brain import _apply_patch, _evaluate_patch, _retune_plan_for_method
+from backend.engine.planner import generate_proposal
+
+PATCHES = [
+    {"type": "team", "ops": [{"op": "set", "role": "QA", "count": 2}, {"op": "add", "role": "DevOps", "count": 0.5}]},
+    {"type": "phases", "ops": [{"op": "set_weeks", "name": "Sprints de Desarrollo (2w)", "weeks": 8}]},
+    {"type": "budget", "role_rates": {"Backend Dev": 1200}, "contingency_pct": 20},
+    {"type": "risks", "add": ["Rotación de personal clave"]},
+]
+
+
+def test_patches_never_mutate_the_source():
+    p = generate_proposal("app de reservas con pagos y chat en tiempo real")
+    snapshot = copy.deepcopy(p)
+    cur = p
+    versions = [p]
+    for patch in PATCHES:
+        cur = _apply_patch(cur, patch)
+        versions.append(cur)
+    _evaluate_patch(cur, PATCHES[0], "app de reservas")
+    _retune_plan_for_method(cur, "Kanban")
+    assert p == snapshot
+    # cada versión conserva su propio presupuesto
+    assert versions[2]["budget"]["assumptions"].get("role_rates_eur_pw", {}).get("Backend Dev") != 1200
+    assert versions[3]["budget"]["assumptions"]["role_rates_eur_pw"]["Backend Dev"] == 1200.0
+
+
+def test_untouched_branches_are_shared():
+    p = generate_proposal("app de reservas con pagos")
+    after = _apply_patch(p, PATCHES[0])
+    assert after is not p and after["team"] is not p["team"]
+    assert after["decision_log"] is p["decision_log"]
+    assert after["phases"] is p["phases"]
+    assert after["budget"]["total_eur"] > p["budget"]["total_eur"]
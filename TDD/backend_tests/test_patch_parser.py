@@ -0,0 +1,120 @@
+import random
+
+from backend.engine import brain
+from backend.engine.brain import _apply_patch, _canonical_role, _parse_change_request
+from backend.engine.context import get_last_proposal, get_negotiation_log, set_last_proposal
+from backend.engine.patch_parser import first_patch, parse_command, tokenize
+from backend.engine.planner import generate_proposal
+from TDD.backend_tests.legacy_patch_parsers import (_parse_budget_patch, _parse_change_request_regex,
+                                                    _parse_phases_patch, _parse_risks_patch, _parse_team_patch)
+
+REQ = "app de reservas con pagos y chat en tiempo real"
+BASE = generate_proposal(REQ)
+
+ROLES = ["qa", "backend", "frontend", "pm", "ux", "devops", "tech lead", "backend dev", "ml engineer"]
+COUNTS = ["1", "2", "0.5", "0,5", "3"]
+PHASES = [ph["name"] for ph in BASE["phases"]]
+# sin scrumban: la regex antigua lo cortaba en "scrum" (ver test de abajo)
+METHODS = ["scrum", "kanban", "xp", "lean", "safe", "devops"]
+
+
+def _team(r):
+    role, n = r.choice(ROLES), r.choice(COUNTS)
+    return r.choice([f"añade {n} {role}", f"agrega {n} {role}", f"pon {n} {role}", f"pon {role} a {n}",
+                     f"sube {role} a {n}", f"baja {role} a {n}", f"quita {role}", f"elimina {role}"])
+
+
+def _phases(r):
+    name, w = r.choice(PHASES), r.randint(1, 9)
+    return r.choice([f"'{name}' a {w} semanas", f"fase '{name}' a {w} sem", f"quita fase '{name}'",
+                     f"agrega fase 'Piloto {w}' {w} semanas"])
+
+
+def _budget(r):
+    return r.choice([f"contingencia a {r.randint(5, 30)}%", f"contingencia {r.randint(5, 30)} %",
+                     f"tarifa de {r.choice(ROLES)} a {r.randint(800, 2000)}"])
+
+
+def _risks(r):
+    # "añade" no: el parser antiguo buscaba "añade" sobre texto ya sin tildes y nunca casaba
+    return r.choice([f"agrega riesgo: {r.choice(['fraude en pagos', 'rotación del equipo'])}",
+                     f"quita riesgo: {r.choice(BASE['risks']).lower()}"])
+
+
+AREAS = {"team": (_team, _parse_team_patch), "phases": (_phases, _parse_phases_patch),
+         "budget": (_budget, _parse_budget_patch), "risks": (_risks, _parse_risks_patch)}
+
+
+def _drop_dup_ops(patch):
+    # el parser antiguo emitía además un op basura "pon X a N" → rol "x a" (count 1) junto al bueno
+    if patch and patch["type"] == "team":
+        roles = {o["role"] for o in patch["ops"]}
+        ops = [o for o in patch["ops"] if not (o["role"].endswith(" a") and o["role"][:-2] in roles)]
+        return {**patch, "ops": ops}
+    return patch
+
+
+def _outcome(patch):
+    p = _apply_patch(BASE, patch)
+    return {k: p.get(k) for k in ("team", "phases", "budget", "risks")}
+
+
+def test_fuzz_parity_with_area_parsers():
+    r = random.Random(39)
+    for _ in range(400):
+        area = r.choice(list(AREAS))
+        gen, old_parser = AREAS[area]
+        text = gen(r)
+        old = _drop_dup_ops(old_parser(text))
+        new = {pt["type"]: pt for pt in parse_command(text, _canonical_role)["patches"]}.get(area)
+        assert old is not None and new is not None, text
+        assert _outcome(new) == _outcome(old), text
+
+
+def test_fuzz_methodology_parity():
+    r = random.Random(7)
+    for _ in range(200):
+        a, b = r.sample(METHODS, 2)
+        text = r.choice([f"cambiar a {a}", f"quiero {a}", f"prefiero {a} en vez de {b}",
+                         f"pasar a {a} en lugar de {b}", f"{a} en vez de {b}", f"usar {a}"])
+        assert _parse_change_request(text) == _parse_change_request_regex(text), text
+
+
+def test_multi_change_message_yields_one_patch_per_area():
+    text = "añade 1 qa, pon 2 backend y quita ux; contingencia al 15% y tarifa de pm a 1300\nagrega riesgo: fraude"
+    patches = parse_command(text, _canonical_role)["patches"]
+    assert [pt["type"] for pt in patches] == ["team", "budget", "risks"]
+    team, budget, risks = patches
+    assert [(o["op"], o["role"]) for o in team["ops"]] == [("add", "qa"), ("set", "backend"), ("remove", "ux")]
+    assert budget == {"type": "budget", "role_rates": {"PM": 1300.0}, "contingency_pct": 15.0}
+    assert risks["add"] == ["fraude"]
+    # la prioridad de un único parche se mantiene
+    assert first_patch(patches)["type"] == "team"
+
+
+def test_misrouted_inputs_now_go_to_their_area():
+    def types(t):
+        return [pt["type"] for pt in parse_command(t, _canonical_role)["patches"]]
+    assert types("sube la contingencia al 20%") == ["budget"]
+    assert types("añade riesgo: dependencia de terceros") == ["risks"]
+    assert types("quita fase 'QA'") == ["phases"]
+    assert types("cambia la metodología a Kanban") == []
+    assert parse_command("cambia la metodología a Kanban")["methodology"] == ("kanban", None)
+    assert _parse_change_request("prefiero scrumban en vez de scrum") == ("Scrumban", "Scrum")
+
+
+def test_tokenizer_keeps_quoted_names_and_numbers():
+    norm, toks = tokenize("Pon 'Diseño UX' a 3,5 semanas")
+    kinds = [k for k, *_ in toks]
+    assert kinds[:4] == ["word", "quoted", "word", "num"]
+    assert toks[1][1] == "diseno ux" and toks[3][1] == 3.5
+
+
+def test_cambiar_applies_every_change_in_message():
+    sid = "patch-parser-multi"
+    set_last_proposal(sid, generate_proposal(REQ), REQ)
+    _, summary = brain.generate_reply(sid, "/cambiar: añade 1 qa, contingencia a 25%")
+    assert summary == "Cambio aplicado (team, budget)."
+    p, _ = get_last_proposal(sid)
+    assert p["budget"]["assumptions"]["contingency_pct"] == 25.0
+    assert [e["kind"] for e in get_negotiation_log(sid).events][-2:] == ["patch", "patch"]
@@ -0,0 +1,49 @@
+import copy
+
+from backend.engine import brain
+from backend.engine.planner import generate_proposal
+
+
+def _proposal():
+    return generate_proposal("plataforma fintech con pagos en aws y app react")
+
+
+def test_index_is_reused_per_proposal_version():
+    p = _proposal()
+    idx = brain._phase_index_for(p)
+    assert brain._phase_index_for(copy.deepcopy(p)) is idx      # mismos nombres → mismo índice
+    p2 = copy.deepcopy(p)
+    p2["phases"][0]["name"] = "Discovery ampliado"
+    assert brain._phase_index_for(p2) is not idx                 # parche de nombres → otro índice
+    assert brain._phase_index_for(p, "Kanban") is not idx
+
+
+def test_match_phase_name_uses_proposal_phases_and_canon():
+    p = _proposal()
+    names = [ph["name"] for ph in p["phases"]]
+    assert brain._match_phase_name(f"Fase seleccionada: {names[2]}. ¿qué kpis?", p) == names[2]
+    assert brain._match_phase_name("hablemos del discovery", p) == next(n for n in names if "Discovery" in n)
+    assert brain._match_phase_name("qué tal el go-live", None) == "Despliegue & Transferencia"
+    assert brain._match_phase_name("nada que ver", p) is None
+
+
+def test_merge_reads_current_phase_content():
+    p = _proposal()
+    name = p["phases"][2]["name"]                                # Hardening & Pruebas de Aceptación
+    merged = brain._merge_proposal_and_catalog_phase(p, name, "Scrum")
+    assert merged["name"] == name and merged["kpis"]            # kpis del catálogo Scrum
+    assert brain._merge_proposal_and_catalog_phase(p, "2", "Scrum")["name"] == name
+    p["phases"][2]["weeks"] = 99                                 # parche in-place, mismos nombres
+    assert brain._merge_proposal_and_catalog_phase(p, name, "Scrum")["weeks"] == 99
+    assert brain._merge_proposal_and_catalog_phase(None, "zzz", "Scrum")["name"] == "zzz"
+
+
+def test_intent_matching_with_precomputed_items():
+    idx = brain._phase_index_for(None, "Scrum")
+    ci = idx.catalog_by_name("Sprints / Desarrollo iterativo")
+    info = idx.catalog[ci]
+    kpi = info["kpis"][0]
+    for text in (f"qué tal va el kpi {kpi.lower()}", "entregables de la fase", "riesgos?", "quien es el owner"):
+        nt = brain._norm(text)
+        assert brain._match_phase_user_intent(nt, info, idx.items(ci)) == brain._match_phase_user_intent(nt, info)
+    assert brain._match_phase_user_intent(brain._norm(f"kpi {kpi}"), info, idx.items(ci)) == ("kpis", kpi)
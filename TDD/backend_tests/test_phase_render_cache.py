@@ -0,0 +1,54 @@
+import pytest
+
+from backend.engine import brain
+from backend.engine.planner import generate_proposal
+
+STAFF = [
+    {"name": "Ana", "role": "Backend", "skills": ["python", "django"], "seniority": "Senior", "availability_pct": 50},
+    {"name": "Luis", "role": "QA", "skills": ["pytest"], "availability_pct": 100},
+    {"name": "Eva", "role": "Frontend", "skills": ["react"], "availability_pct": 80},
+]
+
+
+def test_phase_tasks_precomputed_per_methodology_flavor():
+    for meth in ("Scrum", "Scrumban", "Kanban", "XP", ""):
+        for arche in brain._PHASE_ARCHETYPES:
+            built = brain._build_phase_tasks(arche, brain._norm(meth))
+            got = brain._phase_tasks_for_archetype(arche, meth)
+            assert [dict(t, roles=list(t["roles"])) for t in got] == built
+    assert brain._phase_tasks_for_archetype("nope", "Scrum") == []
+    t = brain._phase_tasks_for_archetype("qa", "Scrum")[0]
+    with pytest.raises(TypeError):
+        t["name"] = "otra"   # compartidas entre llamadas: solo lectura
+
+
+def test_breakdown_and_training_are_cached_by_staff_content():
+    brain._clear_render_cache()
+    p = generate_proposal("plataforma fintech con pagos en aws y app react")
+    first = brain._render_phase_task_breakdown(p, STAFF)
+    first.append("mutado por el que llama")
+    again = brain._render_phase_task_breakdown(p, [dict(x) for x in STAFF])   # misma plantilla, otros objetos
+    assert again == first[:-1]
+    assert len(brain._RENDER_CACHE) == 1
+
+    # cambia la plantilla → otra entrada; cambia la metodología → otra entrada
+    brain._render_phase_task_breakdown(p, STAFF[:2])
+    brain._render_phase_task_breakdown({**p, "methodology": "Kanban"}, STAFF)
+    assert len(brain._RENDER_CACHE) == 3
+
+    report = brain._analyze_skill_gaps(p, STAFF)
+    report["gaps"].clear()
+    assert brain._analyze_skill_gaps(p, STAFF)["gaps"]
+    plan = brain._render_training_plan(p, STAFF)
+    assert plan[0] == "Gaps detectados & plan de formación"
+    assert brain._render_training_plan(p, STAFF) == plan
+
+
+def test_staffing_plan_is_reused_for_the_same_team_and_staff(monkeypatch):
+    brain._clear_render_cache()
+    p = generate_proposal("app de reservas")
+    first = brain._suggest_staffing(p, STAFF)
+    calls = []
+    monkeypatch.setattr(brain, "solve_staffing", lambda *a, **k: calls.append(1))
+    assert brain._suggest_staffing(p, [dict(x) for x in STAFF]) == first
+    assert not calls
@@ -0,0 +1,63 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from backend import preload
+from backend.knowledge import kb
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+needs_proc = pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="sin /proc (no Linux)")
+
+
+@needs_proc
+def test_memory_kb_reads_uss_pss_rss():
+    mem = preload.memory_kb(os.getpid())
+    assert 0 < mem["uss"] <= mem["rss"] and mem["pss"] <= mem["rss"]
+    assert preload.memory_kb(2 ** 22 + 12345) == {}
+
+
+def test_warm_loads_everything_lazy():
+    info = preload.warm()
+    assert info["kb_sections"] == len(kb.info()["sections"])
+    assert info["cards"] > 0 and info["glossary_terms"] > 0
+    assert info["app"] is sys.modules["backend.app"].app
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@needs_proc
+def test_launcher_forks_workers_and_stops_on_sigterm(tmp_path):
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL=f"sqlite:///{tmp_path}/preload.db")
+    proc = subprocess.Popen([sys.executable, "-m", "backend.preload", "--port", str(port), "--workers", "2",
+                             "--log-level", "warning"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 60
+        while True:
+            assert proc.poll() is None, "el launcher terminó antes de servir"
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as r:
+                    assert r.status == 200
+                break
+            except OSError:
+                assert time.time() < deadline
+                time.sleep(0.2)
+        workers = preload.children(proc.pid)
+        assert len(workers) == 2
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=40) == 0
+        assert not any(os.path.exists(f"/proc/{pid}") for pid in workers)     # el master los recogió
+    finally:
+        if proc.poll() is None:
+            proc.kill()
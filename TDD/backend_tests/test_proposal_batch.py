@@ -0,0 +1,61 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.engine import batch
+from backend.engine.planner import generate_proposal, generate_proposals_batch
+from backend.memory import state_store
+from backend.memory.state_store import SessionLocal, ProposalLog
+
+TEXTS = [
+    "app móvil de reservas con pagos",
+    "plataforma fintech regulada para préstamos",
+    "mvp de startup con requisitos cambiantes",
+    "erp para gran empresa con integraciones",
+    "marketplace con chat en tiempo real",
+]
+
+
+def test_batch_matches_single_proposals():
+    assert generate_proposals_batch(TEXTS) == [generate_proposal(t) for t in TEXTS]
+
+
+def test_chunks_through_process_pool(monkeypatch):
+    monkeypatch.setenv("BATCH_WORKERS", "2")
+    try:
+        got = {}
+        for start, chunk, props, err in batch.iter_proposal_chunks(TEXTS, chunk_size=2):
+            assert err is None
+            for j, p in enumerate(props):
+                got[start + j] = p
+    finally:
+        batch.shutdown_pool()
+    assert [got[i] for i in range(len(TEXTS))] == [generate_proposal(t) for t in TEXTS]
+
+
+def test_batch_endpoint_streams_ndjson_and_bulk_inserts(monkeypatch):
+    state_store.init_db()
+    monkeypatch.setenv("BATCH_WORKERS", "1")
+    monkeypatch.setenv("BATCH_CHUNK_SIZE", "2")
+    client = TestClient(app)
+
+    body = "\n".join(json.dumps(x) for x in [TEXTS[0], {"requirements": TEXTS[1]}, "no", TEXTS[2]])
+    r = client.post("/projects/proposal/batch?session_id=batch-test", content=body,
+                    headers={"Content-Type": "application/x-ndjson"})
+    assert r.status_code == 200
+    lines = [json.loads(l) for l in r.text.splitlines()]
+    by_index = {l["index"]: l for l in lines}
+    assert set(by_index) == {0, 1, 2, 3}
+    assert "error" in by_index[2]
+    assert by_index[1]["proposal"] == generate_proposal(TEXTS[1])
+
+    with SessionLocal() as db:
+        rows = {r.id: r for r in db.query(ProposalLog).filter(ProposalLog.session_id == "batch-test")}
+    for i in (0, 1, 3):
+        assert rows[by_index[i]["id"]].requirements == by_index[i]["requirements"]
+
+    # array JSON también vale; errores de forma → 400
+    r = client.post("/projects/proposal/batch", json=[TEXTS[3]])
+    assert [json.loads(l)["methodology"] for l in r.text.splitlines()] == [generate_proposal(TEXTS[3])["methodology"]]
+    assert client.post("/projects/proposal/batch", json=[]).status_code == 400
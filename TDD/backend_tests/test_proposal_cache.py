@@ -0,0 +1,56 @@
+from backend.engine import planner, proposal_cache as pc
+from backend.memory import state_store
+
+
+def _fresh(monkeypatch, db="0"):
+    monkeypatch.setenv("PROPOSAL_CACHE_DB", db)
+    pc.invalidate()
+    pc.reset_cache_stats()
+
+
+def test_hit_equals_recompute_and_is_a_copy(monkeypatch):
+    _fresh(monkeypatch)
+    text = "App de Reservas con PAGOS y chat en tiempo real"
+    a = pc.cached_generate_proposal(text)
+    b = pc.cached_generate_proposal("  app de reservas con pagos y chat en tiempo real ")
+    assert a == b == planner.generate_proposal(text)
+    b["team"].clear()
+    assert pc.cached_generate_proposal(text) == a
+    stats = pc.cache_stats()
+    assert stats["misses"] == 1 and stats["hits_memory"] == 2
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_rate_table_change_invalidates(monkeypatch):
+    _fresh(monkeypatch)
+    text = "plataforma fintech con pagos"
+    before = pc.cached_generate_proposal(text)
+    v1 = pc.current_version()
+    monkeypatch.setitem(planner.INDUSTRY_RATE_MULTIPLIERS, "fintech", 2.0)
+    assert pc.current_version(force=True) != v1
+    after = pc.cached_generate_proposal(text)
+    assert after["budget"]["total_eur"] > before["budget"]["total_eur"]
+    assert pc.cache_stats()["misses"] == 2
+
+
+def test_db_level_survives_lru_clear(monkeypatch):
+    state_store.init_db()
+    _fresh(monkeypatch, db="1")
+    text = "erp para gran empresa con integraciones y cache-db"
+    p = pc.cached_generate_proposal(text)
+    with pc._LOCK:
+        pc._LRU.clear()
+    assert pc.cached_generate_proposal(text) == p
+    assert pc.cache_stats()["hits_db"] == 1
+
+
+def test_startup_purges_rows_of_other_versions(monkeypatch, client):
+    state_store.init_db()
+    _fresh(monkeypatch, db="1")
+    state_store.save_proposal_memo("0" * 64, "version-antigua", {"methodology": "Scrum"})
+    text = "app de reservas con pagos y purga"
+    pc.cached_generate_proposal(text)
+    with client:                                     # lanza el startup de la app
+        pass
+    assert state_store.get_proposal_memo("0" * 64, "version-antigua") is None
+    assert state_store.get_proposal_memo(pc.text_hash(text), pc.current_version()) is not None
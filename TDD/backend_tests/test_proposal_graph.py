@@ -0,0 +1,102 @@
+from backend.engine import brain
+from backend.engine.brain import _apply_patch, _build_timeline, _pretty_proposal
+from backend.engine.context import get_proposal_graph, set_last_proposal
+from backend.engine.planner import generate_proposal
+from backend.engine.proposal_graph import ProposalGraph
+
+REQ = "app de reservas con pagos y chat en tiempo real"
+
+
+def test_budget_matches_full_recompute():
+    p = generate_proposal(REQ)
+    g = ProposalGraph(p)
+    p2 = _apply_patch(p, {"type": "team", "ops": [{"op": "set", "role": "QA", "count": 2}]})
+    g.update(p2)
+    assert g.get("total") == p2["budget"]["total_eur"]
+    assert g.budget()["by_role"] == p2["budget"]["by_role"]
+
+
+def test_only_dirty_nodes_are_recomputed():
+    p = generate_proposal(REQ)
+    g = ProposalGraph(p)
+    g.get("total"); g.get("timeline")
+    before = dict(g.recomputes)
+    # riesgos no toca ninguna entrada: nada se recalcula
+    assert g.update(_apply_patch(p, {"type": "risks", "add": ["Rotación"]})) == []
+    g.get("total")
+    assert g.recomputes == before
+    # contingencia: project_weeks y by_role se reutilizan
+    p3 = _apply_patch(p, {"type": "contingency", "pct": 25})
+    assert "contingency_pct" in g.update(p3)
+    assert g.get("total") == p3["budget"]["total_eur"]
+    assert g.recomputes["by_role"] == before["by_role"]
+    assert g.recomputes["project_weeks"] == before["project_weeks"]
+    assert g.recomputes["contingency"] == before["contingency"] + 1
+
+
+def test_pretty_is_memoized_by_version():
+    p = generate_proposal(REQ)
+    g = ProposalGraph(p)
+    calls = []
+    render = lambda x: calls.append(1) or _pretty_proposal(x)
+    a = g.memo("pretty", render)
+    assert g.memo("pretty", render) is a and len(calls) == 1
+    v = g.version
+    g.update(_apply_patch(p, {"type": "risks", "add": ["Rotación"]}))
+    assert g.version == v + 1
+    assert "Rotación" in g.memo("pretty", render) and len(calls) == 2
+    # memo sólo por las fases: otros cambios no invalidan
+    g.memo("weeks", lambda x: g.get("project_weeks"), deps=("phases",))
+    g.update(_apply_patch(g.proposal, {"type": "contingency", "pct": 30}))
+    assert g.memo("weeks", lambda x: 1 / 0, deps=("phases",)) == g.get("project_weeks")
+
+
+def test_phase_patch_refreshes_timeline_events():
+    from datetime import date
+    p = generate_proposal(REQ)
+    p = {**p, "timeline": _build_timeline(p, date(2026, 1, 5))}
+    name = p["phases"][1]["name"]
+    p2 = _apply_patch(p, {"type": "phases", "ops": [{"op": "set_weeks", "name": name, "weeks": 10}]})
+    assert p2["timeline"] == _build_timeline(p2, date(2026, 1, 5))
+    assert p["timeline"]["events"] != p2["timeline"]["events"]
+    assert p["timeline"]["end_date"] != p2["timeline"]["end_date"]
+
+
+def test_timeline_node_keeps_methodology_and_calendar():
+    from datetime import date
+    p = generate_proposal(REQ)
+    start, hol = date(2026, 1, 5), [date(2026, 1, 6), date(2026, 2, 2)]
+    p = {**p, "timeline": _build_timeline(p, start, holidays=hol, country="es")}
+    assert p["timeline"]["holidays"] == ["2026-01-06", "2026-02-02"] and p["timeline"]["country"] == "es"
+    name = p["phases"][0]["name"]
+    p2 = _apply_patch(p, {"type": "phases", "ops": [{"op": "set_weeks", "name": name, "weeks": 6}]})
+    assert p2["timeline"] == _build_timeline(p2, start, holidays=hol, country="es")
+    assert p2["timeline"] != _build_timeline(p2, start)
+
+
+def test_session_render_uses_graph():
+    p = generate_proposal(REQ)
+    set_last_proposal("pg-s", p, REQ)
+    txt = brain._render_proposal("pg-s", p)
+    assert txt == _pretty_proposal(p)
+    assert brain._render_proposal("pg-s", p) is txt
+    assert get_proposal_graph("pg-s").proposal is p
+
+
+def test_session_patches_reuse_the_session_graph():
+    from datetime import date
+    p = generate_proposal(REQ)
+    p = {**p, "timeline": _build_timeline(p, date(2026, 1, 5))}
+    g = get_proposal_graph("pg-patch")
+    g.update(p)
+    g.get("budget"); g.get("timeline")
+    before = dict(g.recomputes)
+    patch = {"type": "contingency", "pct": 25}
+    p2 = _apply_patch(p, patch, "pg-patch")
+    assert p2["budget"] == _apply_patch(p, patch)["budget"]
+    # la contingencia no toca fases ni equipo: ni by_role ni el calendario se recalculan
+    assert g.recomputes["by_role"] == before["by_role"] and g.recomputes["timeline"] == before["timeline"]
+    p3 = _apply_patch(p2, {"type": "phases", "ops": [{"op": "add", "name": "Piloto", "weeks": 2}]}, "pg-patch")
+    assert p3["timeline"]["events"] == _apply_patch(p2, {"type": "phases", "ops": [
+        {"op": "add", "name": "Piloto", "weeks": 2}]})["timeline"]["events"]
+    assert g.proposal is not p and g.recomputes["timeline"] == before["timeline"] + 1
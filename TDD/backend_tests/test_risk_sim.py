@@ -0,0 +1,65 @@
+from backend.engine import brain
+from backend.engine import risk_sim as rs
+from backend.engine.context import set_last_proposal
+from backend.engine.planner import generate_proposal
+
+REQ = "plataforma de un sector regulado con pagos, integraciones con bancos y mvp"
+
+
+def test_percentiles_are_ordered_and_reproducible():
+    p = generate_proposal(REQ)
+    a = rs.simulate(p, REQ, seed=7)
+    assert a["cost_eur"]["p50"] <= a["cost_eur"]["p80"] <= a["cost_eur"]["p95"]
+    assert a["weeks"]["p50"] <= a["weeks"]["p80"] <= a["weeks"]["p95"]
+    assert a["finish_date"]["p50"] <= a["finish_date"]["p95"]
+    assert set(a["risk_factors"]) == {"regulated", "payments", "integrations", "uncertainty"}
+    b = rs.simulate(p, REQ, seed=7)
+    assert a["cost_eur"] == b["cost_eur"] and a["weeks"] == b["weeks"]
+
+
+def test_risk_factors_push_cost_up():
+    p = generate_proposal(REQ)
+    calm = rs.simulate(p, signals={})
+    risky = rs.simulate(p, REQ)
+    assert risky["cost_eur"]["p80"] > calm["cost_eur"]["p80"]
+    assert risky["weeks"]["p80"] > calm["weeks"]["p80"]
+    assert rs.simulate(p, REQ, dist="lognormal")["cost_eur"]["p50"] > 0
+
+
+def test_100k_samples():
+    # el tiempo se mide en scripts/bench_risk_sim.py
+    sim = rs.simulate(generate_proposal(REQ), REQ, n=100_000)
+    assert sim["samples"] == 100_000 and sim["elapsed_ms"] > 0
+
+
+def test_planned_matches_whatif_baseline():
+    from backend.engine.brain import _apply_patch
+    from backend.engine.whatif import baseline_from_proposal
+    p = _apply_patch(generate_proposal(REQ), {"type": "contingency", "pct": 15})
+    sim = rs.simulate(p, signals={}, n=1000)
+    assert sim["planned"]["contingency_pct"] == baseline_from_proposal(p)["contingency_pct"] == 15.0
+
+
+def test_brain_cites_percentiles():
+    set_last_proposal("mc-s", generate_proposal(REQ), REQ)
+    reply, label = brain.generate_reply("mc-s", "¿Qué probabilidad de cumplir el presupuesto tenemos? dame el P80")
+    assert label == "Monte Carlo coste/plazo."
+    assert "P80" in reply and "Probabilidad de no pasarse" in reply
+
+
+def test_pdf_block_uses_session_proposal():
+    from backend.app import _risk_simulation_story, _mk_styles
+    set_last_proposal("mc-pdf", generate_proposal(REQ), REQ)
+    assert len(_risk_simulation_story({"session_id": "mc-pdf"}, _mk_styles())) == 4
+    assert _risk_simulation_story({}, _mk_styles()) == []
+
+
+def test_lognormal_applies_to_rates_too(monkeypatch):
+    # fases fijas y sin riesgos: toda la dispersión del coste viene de las tarifas
+    p = generate_proposal(REQ)
+    monkeypatch.setattr(rs, "PHASE_LOG_SIGMA", 0.0)
+    spread = rs.simulate(p, signals={}, dist="lognormal", n=20_000)["cost_eur"]
+    assert spread["p95"] > spread["p50"]
+    monkeypatch.setattr(rs, "RATE_LOG_SIGMA", 0.0)
+    flat = rs.simulate(p, signals={}, dist="lognormal", n=20_000)["cost_eur"]
+    assert flat["p50"] == flat["p95"]
@@ -0,0 +1,100 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.engine import scheduler as sc
+from backend.engine.brain import _build_timeline
+from backend.engine.planner import generate_proposal
+from backend.memory import state_store
+
+START = date(2026, 1, 5)   # lunes
+P = {"methodology": "Scrum", "team": [{"role": "Backend Dev", "count": 1}, {"role": "QA", "count": 1}],
+     "phases": [{"name": "Discovery", "weeks": 2}, {"name": "Desarrollo", "weeks": 4},
+                {"name": "QA", "weeks": 2}, {"name": "Release", "weeks": 1}]}
+
+
+def test_default_schedule_is_sequential_in_working_days():
+    r = sc.schedule(P, START)
+    ev = r["events"]
+    assert [e["start"] for e in ev] == ["2026-01-05", "2026-01-19", "2026-02-16", "2026-03-02"]
+    assert [e["end"] for e in ev] == ["2026-01-16", "2026-02-13", "2026-02-27", "2026-03-06"]
+    assert r["working_days"] == 45 and r["end_date"] == "2026-03-06"
+    assert all(e["critical"] for e in ev)
+    # dentro de desarrollo CI/CD tiene holgura; la integración no
+    tasks = {t["name"]: t for t in r["tasks"]}
+    assert tasks["Pipelines CI/CD"]["total_float"] > 0 and not tasks["Pipelines CI/CD"]["critical"]
+    assert tasks["Integración y contratos API"]["critical"]
+    assert _build_timeline(P, START)["events"] == ev
+
+
+def test_cpm_matches_reference_on_random_dags():
+    rng = np.random.default_rng(3)
+    for _ in range(30):
+        n = 25
+        dur = rng.integers(0, 10, n)
+        pairs = {(int(a), int(b)) for a, b in rng.integers(0, n, (60, 2)) if a < b}
+        src = np.array([a for a, _ in pairs], dtype=np.int64)
+        dst = np.array([b for _, b in pairs], dtype=np.int64)
+        lag = rng.integers(-2, 3, src.size)
+        res = sc.cpm(dur, src, dst, lag)
+        es = np.zeros(n, dtype=np.int64)
+        for v in range(n):   # referencia: orden natural ya es topológico (a < b)
+            for s, d, lg in zip(src, dst, lag):
+                if d == v:
+                    es[v] = max(es[v], es[s] + dur[s] + lg)
+        assert (res["es"] == es).all()
+        assert (res["total_float"] >= 0).all() and (res["free_float"] <= res["total_float"]).all()
+
+
+def test_holidays_overlap_and_dependencies():
+    r = sc.schedule(P, START, country="es")   # 6 de enero festivo
+    assert r["events"][0]["end"] == "2026-01-19"
+    assert sc.schedule(P, date(2026, 1, 1), holidays=["2026-01-02"], country="es")["start_date"] == "2026-01-05"
+
+    p = {**P, "phases": [dict(ph) for ph in P["phases"]]}
+    p["phases"][2]["overlap_pct"] = 50     # QA empieza a mitad de desarrollo
+    assert sc.schedule(p, START)["working_days"] == 35
+    p["phases"][3]["depends_on"] = ["Desarrollo"]   # release sólo espera a desarrollo
+    r = sc.schedule(p, START)
+    assert r["events"][3]["start"] == "2026-02-16" and r["events"][3]["critical"]
+    assert not r["events"][2]["critical"]   # QA acaba antes que release: tiene holgura
+
+    with pytest.raises(ValueError):
+        sc.cpm(np.array([1, 1]), np.array([0, 1]), np.array([1, 0]), np.array([0, 0]))
+
+
+def test_leveling_respects_role_capacity():
+    r = sc.schedule(P, START, level=True)
+    assert r["working_days"] >= r["cpm_working_days"]
+    by_role = {}
+    for t in r["tasks"]:
+        role = next((x for x in t["roles"] if x in ("Backend Dev", "QA")), None)
+        if role and t["duration_days"]:
+            s = t["es"] + t["delay_days"]
+            by_role.setdefault(role, []).append((s, s + t["duration_days"]))
+    for spans in by_role.values():
+        load = np.zeros(max(e for _, e in spans) + 1)
+        for s, e in spans:
+            load[s:e] += 1
+        assert load.max() <= 1
+
+
+def test_schedule_many_matches_schedule_for_the_portfolio():
+    # el tiempo se mide en scripts/bench_scheduler.py
+    props = [generate_proposal(f"app {i} con pagos y panel") for i in range(20)] * 10
+    res = sc.schedule_many(props, [START] * len(props))
+    assert len(res) == len(props)
+    assert res[0]["events"] == sc.schedule(props[0], START)["events"]
+
+
+def test_schedule_endpoint():
+    state_store.init_db()
+    pid = state_store.save_proposal("s-sched", "app de reservas", P)
+    c = TestClient(app)
+    r = c.post(f"/projects/{pid}/schedule", json={"start_date": "2026-01-05", "calendar": "es", "level": True})
+    assert r.status_code == 200, r.text
+    assert r.json()["leveled"] and r.json()["events"][0]["start"] == "2026-01-05"
+    assert c.post("/projects/999999/schedule", json={}).status_code == 404
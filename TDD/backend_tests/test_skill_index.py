@@ -0,0 +1,124 @@
+import random
+import threading
+import uuid
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.engine import skill_index as si
+from backend.engine.brain import (_ROLE_KEYWORDS, _TRAINING_CATALOG, _analyze_skill_gaps, _norm, _person_has_topic,
+                                  _score_staff_for_role)
+from backend.engine.planner import generate_proposal
+from backend.engine.staffing import score_matrix
+from backend.memory import state_store
+from backend.routers.user import get_current_user
+
+VOCAB = sorted({kw for kws in _ROLE_KEYWORDS.values() for kw in kws} | set(_TRAINING_CATALOG) | {"Diseño", "Automatización"})
+
+
+def _staff(n, seed=41):
+    rnd = random.Random(seed)
+    return [{"name": f"P{i}", "role": rnd.choice(list(_ROLE_KEYWORDS) + ["Backend", "QA Engineer"]),
+             "skills": rnd.sample(VOCAB, rnd.randint(0, 5)), "seniority": rnd.choice(["Junior", "Senior", "Lead", None]),
+             "availability_pct": rnd.choice([30, 100])} for i in range(n)]
+
+
+def test_index_lookups_match_substring_scans():
+    staff = _staff(200)
+    idx = si.SkillIndex.from_staff(staff)
+    for term in ["automat", "dise", "react", "ci/cd", "kubernetes", "qa", "senior"]:
+        assert idx.ids_with(term) == {i for i, p in enumerate(staff) if term in _skills_hay(p)}
+        assert idx.ids_with_topic(term) == {i for i, p in enumerate(staff) if _person_has_topic(p, term)}
+    roles = list(_ROLE_KEYWORDS)
+    ref = np.array([[_score_staff_for_role(r, p) for p in staff] for r in roles])
+    assert np.allclose(score_matrix(roles, staff, index=idx), ref)
+
+
+def _skills_hay(p):
+    # el mismo texto que recorren _score_staff_for_role/_matched_keywords
+    return _norm(" ".join(p.get("skills", [])) + " " + (p.get("seniority") or ""))
+
+
+def test_incremental_upsert_and_remove_keep_term_postings():
+    idx = si.SkillIndex.from_staff(_staff(50))
+    before = set(idx.ids_with("react"))
+    scans = idx.term_scans
+    idx.upsert(999, {"name": "Nueva", "role": "Frontend", "skills": "React, TypeScript"})
+    assert idx.ids_with("react") == before | {999} and 999 in idx.ids_with_token("typescript")
+    idx.upsert(999, {"name": "Nueva", "role": "Frontend", "skills": "Vue"})
+    assert 999 not in idx.ids_with("react") and 999 in idx.ids_with("vue")
+    idx.remove(999)
+    assert 999 not in idx.ids_with("vue") and 999 not in idx.ids_with_token("typescript")
+    assert idx.term_scans == scans + 1   # sólo "vue" era nuevo
+
+
+def test_gap_analysis_unchanged():
+    p = generate_proposal("plataforma fintech con pagos en aws y app react")
+    staff = _staff(30, seed=2)
+    for team in (staff, staff[:3], []):
+        report = _analyze_skill_gaps(p, team)
+        expected = [t for t in report["topics"] if not any(_person_has_topic(x, t) for x in team)]
+        assert [f["topic"] for f in report["gaps"]] == expected
+
+
+def test_user_index_follows_employee_crud():
+    state_store.init_db()
+    uid = int(uuid.uuid4().int % 10**8) + 10**8
+    si.reset_user_indexes()
+    a = state_store.create_employee(uid, "Ana", "Backend", "Python, Django, PostgreSQL", "Senior")
+    idx = si.get_user_skill_index(uid)
+    assert idx.search("python") == [a.id]
+    b = state_store.create_employee(uid, "Luis", "QA", "Cypress, Python", "Mid", 50)
+    assert set(idx.search("python")) == {a.id, b.id} and idx.search("python", "cypress") == [b.id]
+    state_store.update_employee(uid, a.id, skills="Java, Spring")
+    assert idx.search("python") == [b.id] and idx.search("spring") == [a.id]
+    state_store.delete_employee(uid, b.id)
+    assert idx.search("python") == [] and list(idx.docs) == [a.id]
+    assert si.get_user_skill_index(uid) is idx          # cambios propios: no se reconstruye
+
+    # alta hecha por otro worker (sin pasar por el índice de este proceso)
+    with state_store.SessionLocal() as db:
+        db.add(state_store.Employee(user_id=uid, name="Eva", role="Backend", skills="Spring", seniority="Mid"))
+        db.commit()
+    fresh = si.get_user_skill_index(uid)
+    assert fresh is not idx and [p["name"] for p in fresh.people(fresh.search("spring"))] == ["Ana", "Eva"]
+
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": uid})()
+    try:
+        client = TestClient(app)
+        r = client.get("/user/employees/search", params={"skill": "spring", "role": "backend"})
+        assert r.status_code == 200
+        hits = {h["name"]: h for h in r.json()}
+        assert set(hits) == {"Ana", "Eva"} and hits["Ana"]["score"] > 5
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_queries_and_updates_from_several_threads():
+    idx = si.SkillIndex.from_staff(_staff(200))
+    errors = []
+
+    def _writer():
+        try:
+            for i in range(300):
+                idx.upsert(1000 + i % 20, {"name": "X", "role": "QA", "skills": [f"skill{i}"]})
+                idx.remove(1000 + (i + 7) % 20)
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    def _reader():
+        try:
+            for i in range(300):
+                idx.ids_with(f"term{i}")            # término nuevo: escribe en el índice
+                idx.matrix([f"skill{i}", "react"])
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=f) for f in (_writer, _reader, _reader)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert idx.ids_with("react") == {k for k, d in idx.docs.items() if "react" in d["skills_hay"]}
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.engine import staffing as st
+from backend.engine.brain import _ROLE_KEYWORDS, _score_staff_for_role, _suggest_staffing
+from backend.engine.planner import generate_proposal
+from backend.memory import state_store
+
+PROPOSAL = {"team": [{"role": "Backend Dev", "count": 2}, {"role": "QA", "count": 1}, {"role": "PM", "count": 0.5}]}
+STAFF = [
+    {"name": "Ana", "role": "Backend", "skills": ["python", "django", "cypress"], "seniority": "Senior", "availability_pct": 50},
+    {"name": "Luis", "role": "QA", "skills": ["cypress", "pytest"], "availability_pct": 100},
+    {"name": "Teo", "role": "Backend", "skills": ["java"], "availability_pct": 100},
+    {"name": "Eva", "role": "PM", "skills": ["roadmap"], "availability_pct": 20},
+]
+
+
+def _synthetic(n_staff, seed=1):
+    rnd = random.Random(seed)
+    roles = list(_ROLE_KEYWORDS)
+    staff = [{"name": f"P{i}", "role": rnd.choice(roles), "skills": rnd.sample(_ROLE_KEYWORDS[roles[i % len(roles)]], 2),
+              "seniority": rnd.choice(["Junior", "Senior", "Lead", None]),
+              "availability_pct": rnd.choice([20, 40, 50, 100])} for i in range(n_staff)]
+    return {"team": [{"role": r, "count": rnd.choice([0.5, 1, 2])} for r in roles]}, staff
+
+
+def test_score_matrix_matches_heuristic():
+    proposal, staff = _synthetic(120)
+    roles = list(st.role_demand(proposal))
+    m = st.score_matrix(roles, staff)
+    ref = np.array([[_score_staff_for_role(r, p) for p in staff] for r in roles])
+    assert np.allclose(m, ref)
+
+
+def test_assignment_respects_availability_and_demand():
+    for solver in ("ilp", "hungarian"):
+        res = st.solve_staffing(PROPOSAL, STAFF, solver=solver)
+        load = {}
+        for r in res["roles"]:
+            assert r["assigned_fte"] <= r["demand"] + 1e-9
+            for p in r["people"]:
+                load[p["name"]] = load.get(p["name"], 0) + p["fte"]
+        caps = {p["name"]: p["availability_pct"] / 100 for p in STAFF}
+        assert all(v <= caps[k] + 1e-9 for k, v in load.items()), solver
+        roles = {r["role"]: [p["name"] for p in r["people"]] for r in res["roles"]}
+        assert roles["QA"] == ["Luis"] and set(roles["Backend Dev"]) == {"Ana", "Teo"}
+        assert next(r for r in res["roles"] if r["role"] == "PM")["unfilled_fte"] == 0.3
+
+
+def test_ilp_never_worse_than_hungarian():
+    proposal, staff = _synthetic(300, seed=3)
+    ilp = st.solve_staffing(proposal, staff, solver="ilp")
+    hun = st.solve_staffing(proposal, staff, solver="hungarian")
+    assert ilp["solver"] == "ilp" and hun["solver"] == "hungarian"
+    assert ilp["coverage_pct"] >= hun["coverage_pct"]
+
+
+def test_covers_5000_staff():
+    # el tiempo se mide en scripts/bench_staffing.py
+    proposal, staff = _synthetic(5000, seed=5)
+    res = st.solve_staffing(proposal, staff)
+    assert res["coverage_pct"] == 100.0
+
+
+def test_brain_no_longer_reuses_same_person():
+    lines = _suggest_staffing(PROPOSAL, STAFF)
+    qa = next(l for l in lines if l.startswith("- QA:"))
+    assert "Luis" in qa
+    assert sum(l.startswith(("- ", "  +")) and "Ana" in l for l in lines[:lines.index("")]) == 1
+
+
+def test_staffing_endpoint():
+    state_store.init_db()
+    pid = state_store.save_proposal("staffing-test", "app de reservas", generate_proposal("app de reservas"))
+    client = TestClient(app)
+    body = {"staff": [{"name": "Ana", "role": "Backend", "skills": "python, django", "availability_pct": 100}]}
+    r = client.post(f"/projects/{pid}/staffing", json=body)
+    assert r.status_code == 200
+    roles = {x["role"]: x for x in r.json()["roles"]}
+    assert roles["Backend Dev"]["people"][0]["name"] == "Ana"
+    assert client.post(f"/projects/{pid}/staffing", json={**body, "solver": "magic"}).status_code == 422
+    assert client.post("/projects/999999/staffing", json=body).status_code == 404
@@ -0,0 +1,71 @@
+from backend.memory import state_store
+from backend.memory.state_store import SessionLocal, ProposalLog, ProposalFeedback
+from training import training_effort as te
+
+
+def _proposal(heads, weeks):
+    return {"budget": {"assumptions": {"heads_equivalent": heads, "project_weeks": weeks}}}
+
+
+def test_single_query_groups_feedbacks():
+    state_store.init_db()
+    with SessionLocal() as db:
+        a = ProposalLog(session_id="te-a", requirements="app con pagos", proposal_json=_proposal(3, 10))
+        b = ProposalLog(session_id="te-b", requirements="web sencilla", proposal_json=_proposal(2, 4))
+        db.add_all([a, b])
+        db.flush()
+        db.add_all([
+            ProposalFeedback(proposal_id=a.id, session_id="te-a", accepted=True, score=5),
+            ProposalFeedback(proposal_id=a.id, session_id="te-a", accepted=False, score=2),
+        ])
+        db.commit()
+        ids = {a.id, b.id}
+
+        grouped = {r.id: fbs for r, fbs in te._iter_rows_with_feedback(db) if r.id in ids}
+    assert len(grouped[a.id]) == 2
+    assert grouped[b.id] == []
+
+
+def test_features_cache_by_requirements_hash():
+    cache = {}
+    f1 = te._features_for("App con  Pagos", cache)
+    f2 = te._features_for("app con pagos", cache)
+    assert len(cache) == 1
+    assert f1 is f2
+
+
+def test_select_model_picks_a_candidate():
+    X = [{"x": float(i)} for i in range(12)]
+    y = [2.0 * i + 1 for i in range(12)]
+    w = [1.0] * 12
+    best, scores = te.select_model(X, y, w, n_splits=3, n_jobs=1)
+    assert best in te._candidates()
+    assert set(scores) == set(te._candidates())
+
+
+def test_features_key_depends_on_features_version(monkeypatch):
+    k = te._requirements_key("app con pagos")
+    monkeypatch.setattr(te, "_FEATURES_VERSION", "2:otro")
+    assert te._requirements_key("app con pagos") != k
+
+
+def test_folds_get_the_sparse_matrix(monkeypatch):
+    seen = []
+    fit_fold = te._fit_fold
+    monkeypatch.setattr(te, "_fit_fold", lambda name, model, X, *a: seen.append(X) or fit_fold(name, model, X, *a))
+    X = [{"x": float(i), "y": float(i % 3)} for i in range(12)]
+    te.select_model(X, [2.0 * i for i in range(12)], [1.0] * 12, n_splits=3, n_jobs=1)
+    assert seen and all(m is seen[0] for m in seen) and seen[0].shape == (12, 2) and hasattr(seen[0], "tocsr")
+
+
+def test_features_cache_drops_keys_not_seen_in_the_run(monkeypatch):
+    state_store.init_db()
+    with SessionLocal() as db:
+        db.add(ProposalLog(session_id="te-c", requirements="crm con integraciones", proposal_json=_proposal(2, 6)))
+        db.commit()
+    saved = []
+    monkeypatch.setattr(te, "_load_features_cache", lambda: {"clave-vieja": {"x": 1.0}})
+    monkeypatch.setattr(te, "_save_features_cache", lambda cache: saved.append(dict(cache)))
+    X, _, _ = te.load_training_data()
+    assert saved and "clave-vieja" not in saved[-1]
+    assert te._requirements_key("crm con integraciones") in saved[-1]
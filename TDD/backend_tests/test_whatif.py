@@ -0,0 +1,76 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.engine import whatif as wi
+from backend.engine.brain import _apply_patch
+from backend.engine.planner import generate_proposal
+from backend.memory import state_store
+
+
+def test_baseline_scenario_reproduces_proposal_total():
+    p = generate_proposal("plataforma fintech con pagos y app móvil")
+    assert wi.whatif(p)["baseline"]["total_eur"] == p["budget"]["total_eur"]
+
+
+def test_single_scenarios_match_apply_patch():
+    p = _apply_patch(generate_proposal("app de reservas con pagos"), {"type": "contingency", "pct": 15})
+    base = wi.baseline_from_proposal(p)
+    res = wi.sweep(base, fte={"QA": [2.0, 3.0]}, contingency_pct=[20.0], elasticity=0.0)
+    for i, qa in enumerate([2.0, 3.0]):
+        ref = _apply_patch(p, {"type": "team", "ops": [{"op": "set", "role": "QA", "count": qa}]})
+        ref = _apply_patch(ref, {"type": "contingency", "pct": 20})
+        assert round(float(res["cost"][i]), 2) == ref["budget"]["total_eur"]
+
+
+def test_pareto_frontier_is_non_dominated():
+    cost = np.array([10.0, 8.0, 12.0, 8.0, 9.0])
+    dur = np.array([5.0, 6.0, 4.0, 7.0, 6.0])
+    assert list(wi.pareto_frontier(cost, dur)) == [2, 0, 1]
+
+
+def test_large_grid():
+    # el tiempo se mide en scripts/bench_whatif.py
+    p = generate_proposal("erp para gran empresa con integraciones")
+    r = wi.whatif(
+        p,
+        fte={"Backend Dev": list(np.linspace(1, 6, 20)), "QA": list(np.linspace(0.5, 3, 10)), "PM": [0.5, 1, 1.5]},
+        contingency_pct=[5, 10, 15, 20, 25], phase_week_multipliers=list(np.linspace(0.7, 1.3, 13)),
+        rate_multipliers=[0.9, 1.0, 1.1, 1.2],
+    )
+    assert r["scenarios"] == 20 * 10 * 3 * 5 * 13 * 4
+    durs = [s["duration_weeks"] for s in r["frontier"]]
+    costs = [s["total_eur"] for s in r["frontier"]]
+    assert durs == sorted(durs) and costs == sorted(costs, reverse=True)
+
+
+def test_whatif_endpoint():
+    state_store.init_db()
+    pid = state_store.save_proposal("whatif-test", "app de reservas", generate_proposal("app de reservas"))
+    client = TestClient(app)
+    r = client.post(f"/projects/{pid}/whatif", json={
+        "fte": {"Backend Dev": {"min": 1, "max": 4, "steps": 4}},
+        "contingency_pct": [10, 15],
+    })
+    assert r.status_code == 200
+    body = r.json()
+    assert body["scenarios"] == 8 and body["frontier"]
+    assert client.post(f"/projects/{pid}/whatif", json={"phase_multipliers": {"nope": [1.2]}}).status_code == 400
+    assert client.post("/projects/999999/whatif", json={}).status_code == 404
+
+
+def test_small_contingency_keeps_its_unit():
+    p = _apply_patch(generate_proposal("app de reservas con pagos"), {"type": "contingency", "pct": 1})
+    assert wi.baseline_from_proposal(p)["contingency_pct"] == 1.0
+    q = generate_proposal("app de reservas con pagos")
+    q["budget"]["assumptions"]["contingency_pct"] = 0.005
+    assert wi.baseline_from_proposal(q)["contingency_pct"] == 0.5
+
+
+def test_whatif_unknown_rate_table_is_a_bad_request():
+    state_store.init_db()
+    p = generate_proposal("app de reservas")
+    p["budget"]["assumptions"]["base_role_rates_eur_pw"] = "tbl:no-existe"
+    pid = state_store.save_proposal("whatif-test", "app de reservas", p)
+    r = TestClient(app).post(f"/projects/{pid}/whatif", json={})
+    assert r.status_code == 400 and "no-existe" in r.json()["detail"]
@@ -1,5 +1,5 @@
 # backend/app.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
@@ -7,10 +7,15 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from io import BytesIO
+import asyncio
 import importlib
+import json
 import re
 import math
 import os
+import shutil
+import tempfile
+import time
 
 # ---------------- REPORT inline: portada + transcripción + análisis profundo + propuesta final ----------------
 from reportlab.lib.pagesizes import A4
@@ -240,6 +245,28 @@ def extract_decision_events(messages: List[Dict[str, Any]]):
         })
     return events
 
+def snapshot_from_proposal(p: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Mismo formato que parse_snapshot_from_text pero desde la propuesta estructurada
+    (estados materializados del log de negociación)."""
+    if not isinstance(p, dict):
+        return None
+    budget = p.get("budget") or {}
+    team: Dict[str, float] = {}
+    for r in p.get("team") or []:
+        try: team[r.get("role")] = team.get(r.get("role"), 0.0) + float(r.get("count") or 0)
+        except: pass
+    weeks = 0.0
+    for ph in p.get("phases") or []:
+        try: weeks += float(ph.get("weeks") or 0)
+        except: pass
+    return {
+        "metodologia": p.get("methodology"), "equipo": team,
+        "fases": " → ".join(f"{ph.get('name','')} ({ph.get('weeks',0)}s)" for ph in (p.get("phases") or [])),
+        "presupuesto_total": budget.get("total_eur"),
+        "contingencia_pct": (budget.get("assumptions") or {}).get("contingency_pct"),
+        "riesgos": "; ".join(p.get("risks") or []), "weeks_total": weeks, "raw": "",
+    }
+
 def sum_fte(team: Optional[Dict[str, float]]) -> Optional[float]:
     if not team: return None
     try: return round(sum(team.values()), 2)
@@ -572,12 +599,36 @@ def _overall_evaluation(events: List[Dict[str, Any]], final_state: Dict[str, Any
         paras.append("Valoración global: el paquete de cambios no alcanza consenso; proponemos piloto acotado con KPIs antes de escalar.")
     return paras
 
+def _risk_simulation_story(meta: Dict[str, Any], st: Dict[str, Any]) -> List[Any]:
+    """Bloque 'Riesgo de coste y plazo' (Monte Carlo). La propuesta sale de report_meta['proposal']
+    o de la última propuesta de la sesión (report_meta['session_id']); si no hay, nada."""
+    proposal, req = meta.get("proposal"), meta.get("requirements")
+    if not isinstance(proposal, dict) and meta.get("session_id"):
+        from backend.engine.context import get_last_proposal
+        proposal, req = get_last_proposal(str(meta["session_id"]))
+    if not isinstance(proposal, dict) or not proposal.get("phases"):
+        return []
+    from backend.engine.risk_sim import simulate, summary_lines
+    mc = simulate(proposal, req or "")
+    out: List[Any] = [
+        Spacer(1, 3*mm),
+        Paragraph("Riesgo de coste y plazo (Monte Carlo)", st["h3"]),
+        Paragraph(_escape(f"{mc['samples']:,} escenarios simulados; duración de fases y tarifas inciertas "
+                          "y riesgos del proyecto correlacionados.".replace(",", ".")), st["meta"]),
+        ListFlowable([ListItem(Paragraph(_escape(x), st["p"])) for x in summary_lines(mc)],
+                     bulletType="bullet", leftPadding=10),
+    ]
+    return out
+
 def render_chat_report_inline(
     messages: List[Dict[str, Any]],
     title: str = "Informe de la conversación",
     report_meta: Optional[Dict[str, Any]] = None,
-    report_options: Optional[Dict[str, Any]] = None
+    report_options: Optional[Dict[str, Any]] = None,
+    decision_events: Optional[List[Dict[str, Any]]] = None
 ) -> bytes:
+    # decision_events: decisiones ya sacadas del log de negociación (lo pasa export_jobs, porque
+    # el log vive en la memoria del proceso web y el informe se renderiza en otro proceso)
     # opciones (qué incluir, profundidad, tipografía)
     opts = report_options or {}
     include_cover = opts.get("include_cover", True)
@@ -590,6 +641,10 @@ def render_chat_report_inline(
     st = _mk_styles()
     _apply_font_to_styles(st, base_font)
 
+    # gráficos en un directorio propio: con varios informes a la vez (pool de export_jobs) un
+    # PNG fijo en el cwd se lo pisaban entre ellos antes de que reportlab lo leyera
+    chart_dir = tempfile.mkdtemp(prefix="tfg_report_")
+
     buf = BytesIO()
     doc = SimpleDocTemplate(
         buf, pagesize=A4,
@@ -642,7 +697,12 @@ def render_chat_report_inline(
             story.append(Paragraph("Análisis narrativo de decisiones con impactos clave y valoración.", st["meta"]))
         story.append(Spacer(1, 2*mm))
 
-        events = extract_decision_events(messages)
+        # decisiones desde el log de negociación de la sesión (estados exactos antes/después);
+        # si no está en memoria (chat exportado de otra instancia), se re-parsea el texto
+        if decision_events is None:
+            from backend.engine.negotiation_log import decision_events_for
+            decision_events = decision_events_for((report_meta or {}).get("session_id"))
+        events = decision_events or extract_decision_events(messages)
         snaps  = build_snapshots(messages)
         final  = extract_final_state(messages)
 
@@ -679,8 +739,12 @@ def render_chat_report_inline(
 
         # Detalle por decisión en narrativa
         for idx, e in enumerate(events, 1):
-            before = nearest_snapshot(snaps, e.get("proposed_at"), "before")
-            after  = nearest_snapshot(snaps, e.get("accepted_at") or e.get("proposed_at"), "after") if e["accepted"] else None
+            if "before" in e:
+                before = {"snap": snapshot_from_proposal(e["before"])} if e["before"] else None
+                after  = {"snap": snapshot_from_proposal(e["after"])} if e.get("after") else None
+            else:
+                before = nearest_snapshot(snaps, e.get("proposed_at"), "before")
+                after  = nearest_snapshot(snaps, e.get("accepted_at") or e.get("proposed_at"), "after") if e["accepted"] else None
             delta  = compare_snapshots(before and before["snap"], after and after["snap"])
 
             story.append(Paragraph(f"Decisión {idx}: {e['summary']}", st["h3"]))
@@ -744,7 +808,7 @@ def render_chat_report_inline(
                         data["weeks_total"] = (report_meta or {}).get("weeks_total")
                     try:
                         from scripts.methodology_chart import generate_methodology_chart
-                        chart_path = os.path.join(os.getcwd(), "methodology_chart.png")
+                        chart_path = os.path.join(chart_dir, "methodology_chart.png")
                         generate_methodology_chart(meth, chart_path, data=data)
                         from reportlab.platypus import Image as RLImage
                         if os.path.exists(chart_path):
@@ -762,6 +826,14 @@ def render_chat_report_inline(
                 story.append(Paragraph(_escape(para).replace("\n", "<br/>"), st["p"]))
                 story.append(Spacer(1, 1*mm))
 
+            # Riesgo cuantitativo (Monte Carlo) si tenemos la propuesta estructurada
+            if opts.get("include_risk_simulation", True):
+                try:
+                    for flow in _risk_simulation_story(report_meta or {}, st):
+                        story.append(flow)
+                except Exception:
+                    pass
+
     # ---------------- Parte D — DAFO / SWOT ----------------
     # Construimos el DAFO a partir del estado final y mensajes si hay datos
     try:
@@ -855,7 +927,7 @@ def render_chat_report_inline(
                                 data["weeks_total"] = (report_meta or {}).get("weeks_total")
                             # prefer diagram if phase contents provided
                             from scripts.methodology_chart import generate_methodology_chart, generate_methodology_diagram
-                            meth_path = os.path.join(os.getcwd(), "methodology_chart.png")
+                            meth_path = os.path.join(chart_dir, "methodology_chart.png")
                             # detect phase contents
                             phase_contents = None
                             if final.get("phase_contents"):
@@ -865,7 +937,7 @@ def render_chat_report_inline(
                             if phase_contents:
                                 data["phase_contents"] = phase_contents
                                 # generate diagram variant
-                                meth_path = os.path.join(os.getcwd(), "methodology_diagram.png")
+                                meth_path = os.path.join(chart_dir, "methodology_diagram.png")
                                 generate_methodology_diagram(meth, meth_path, data=data)
                             else:
                                 generate_methodology_chart(meth, meth_path, data=data)
@@ -885,7 +957,10 @@ def render_chat_report_inline(
         # si algo falla, no rompemos la generación del informe
         pass
 
-    doc.build(story)
+    try:
+        doc.build(story)
+    finally:
+        shutil.rmtree(chart_dir, ignore_errors=True)
     pdf = buf.getvalue()
     buf.close()
     return pdf
@@ -894,6 +969,7 @@ def render_chat_report_inline(
 
 # Routers principales existentes
 from backend.routers import chat, projects
+from backend.engine import export_jobs
 
 # Router de feedback (puede no existir)
 try:
@@ -946,21 +1022,102 @@ class ChatExportIn(BaseModel):
     report_meta: Optional[Dict[str, Any]] = None      # metadatos portada (project, client, author, session_id, subtitle)
     report_options: Optional[Dict[str, Any]] = None   # opciones de exportación (partes, profundidad, font_name)
 
-@app.post("/export/chat.pdf", tags=["export"])
-def export_chat_pdf(payload: ChatExportIn):
+def _export_args(payload: ChatExportIn) -> Dict[str, Any]:
     msgs: List[Dict[str, Any]] = [m.dict() for m in (payload.messages or [])]
     if not msgs:
         raise HTTPException(status_code=400, detail="No hay mensajes para exportar.")
-    pdf_bytes = render_chat_report_inline(
-        msgs,
-        title=payload.title or "Informe de la conversación",
-        report_meta=payload.report_meta,
-        report_options=payload.report_options
-    )
+    return {"messages": msgs, "title": payload.title or "Informe de la conversación",
+            "report_meta": payload.report_meta, "report_options": payload.report_options}
+
+
+def _submit_export(payload: ChatExportIn):
+    try:
+        return export_jobs.submit(**_export_args(payload))
+    except export_jobs.ExportBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+
+def _pdf_response(pdf_bytes: bytes, etag: Optional[str] = None) -> StreamingResponse:
     fname = f"chat_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pdf"
-    return StreamingResponse(BytesIO(pdf_bytes),
-                             media_type="application/pdf",
-                             headers={"Content-Disposition": f'attachment; filename=\"{fname}\"'})
+    headers = {"Content-Disposition": f'attachment; filename=\"{fname}\"'}
+    if etag:
+        headers["ETag"] = etag
+    return StreamingResponse(BytesIO(pdf_bytes), media_type="application/pdf", headers=headers)
+
+
+@app.post("/export/chat.pdf", tags=["export"])
+def export_chat_pdf(payload: ChatExportIn):
+    # compatibilidad: misma respuesta de siempre, pero el render va al pool de export_jobs
+    # (con su caché y sus límites) y aquí sólo se espera
+    job = _submit_export(payload)
+    try:
+        return _pdf_response(export_jobs.wait(job))
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="El informe tarda demasiado; usa /export/jobs para seguirlo.",
+                            headers={"Location": f"/export/jobs/{job.id}"})
+
+
+# ---------------- Exportación por trabajos: enviar → id → estado / SSE → descargar ----------------
+@app.post("/export/jobs", tags=["export"], status_code=202)
+def export_job_submit(payload: ChatExportIn, response: Response):
+    job = _submit_export(payload)
+    response.headers["Location"] = f"/export/jobs/{job.id}"
+    return job.to_dict()
+
+
+def _job_or_404(job_id: str) -> "export_jobs.ExportJob":
+    job = export_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de exportación no encontrado.")
+    return job
+
+
+@app.get("/export/jobs/{job_id}", tags=["export"])
+def export_job_status(job_id: str):
+    return _job_or_404(job_id).to_dict()
+
+
+@app.get("/export/jobs/{job_id}/events", tags=["export"])
+async def export_job_events(job_id: str):
+    """Progreso por SSE: un evento `status` en cada cambio de estado; se cierra en done/error
+    (o con un evento `timeout` pasado EXPORT_TIMEOUT: el cliente puede volver a consultar)."""
+    job = _job_or_404(job_id)
+    deadline = time.monotonic() + export_jobs.wait_timeout()
+
+    async def _events():
+        last = None
+        while True:
+            info = job.to_dict()
+            state = (info["status"], info.get("position"))
+            if state != last:
+                last = state
+                yield f"event: status\ndata: {json.dumps(info, ensure_ascii=False)}\n\n"
+            if info["status"] in (export_jobs.DONE, export_jobs.ERROR):
+                return
+            if time.monotonic() >= deadline:
+                yield f"event: timeout\ndata: {json.dumps(info, ensure_ascii=False)}\n\n"
+                return
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(_events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/export/jobs/{job_id}/pdf", tags=["export"])
+def export_job_download(job_id: str, request: Request):
+    job = _job_or_404(job_id)
+    status = job.to_dict()["status"]
+    if status == export_jobs.ERROR:
+        raise HTTPException(status_code=500, detail=f"La exportación falló: {job.error}")
+    if status != export_jobs.DONE:
+        raise HTTPException(status_code=409, detail=f"El informe todavía no está listo ({status}).")
+    etag = f'"{job.id}"'       # el id es el hash del contenido: el PDF no cambia
+    if (request.headers.get("if-none-match") or "").strip() in (etag, "W/" + etag, "*"):
+        return Response(status_code=304, headers={"ETag": etag})
+    pdf_bytes = export_jobs.result(job.id)
+    if pdf_bytes is None:
+        raise HTTPException(status_code=410, detail="El informe ya no está en caché; vuelve a enviarlo.")
+    return _pdf_response(pdf_bytes, etag)
 # -----------------------------------------------------------------------------
 
 # --- Startup ---
@@ -976,10 +1133,23 @@ def on_startup():
     except Exception as e:
         print(f"[startup] DB init skipped: {e}")
 
-    # refresca índice si existe
+    # caché de propuestas: fuera las filas de versiones anteriores del planner/conocimiento
+    try:
+        importlib.import_module("backend.engine.proposal_cache").purge_stale()
+    except Exception as e:
+        print(f"[startup] proposal_memo no purgada: {e}")
+
+    # tarjetas de formación / fichas de metodología: se renderizan una vez al arrancar
+    try:
+        importlib.import_module("backend.engine.knowledge_cards").warm()
+    except Exception as e:
+        print(f"[startup] Tarjetas de conocimiento no precalculadas: {e}")
+
+    # refresca índice si existe (con backend/preload.py ya lo montó el master y se comparte
+    # copy-on-write con los workers: reconstruirlo aquí lo duplicaría en cada uno)
     try:
         sim_mod = importlib.import_module("backend.retrieval.similarity")
-        if hasattr(sim_mod, "get_retriever"):
+        if hasattr(sim_mod, "get_retriever") and os.getenv("BACKEND_PRELOADED") != "1":
             sim_mod.get_retriever().refresh()
     except Exception:
         pass
@@ -993,6 +1163,12 @@ def on_startup():
         pass
 
 
+@app.on_event("shutdown")
+def on_shutdown():
+    # procesos del pool de exportación (si se llegó a crear)
+    export_jobs.shutdown_pool()
+
+
 @app.get("/health")
 def health():
     return {
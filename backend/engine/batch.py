@@ -0,0 +1,105 @@
+# backend/engine/batch.py
+"""
+Generación de propuestas en lote (importaciones de portfolio / RFPs con cientos de líneas).
+
+Los textos se parten en chunks; cada chunk se procesa con generate_proposals_batch
+(detect_signals una vez por texto + scoring de metodologías matricial para todo el chunk)
+y los chunks se reparten en un pool de procesos. Los resultados se devuelven según
+van terminando, para poder ir haciendo streaming sin esperar al lote completo.
+
+Config por entorno:
+  BATCH_WORKERS     procesos del pool (por defecto nº de CPUs; 0/1 = en el propio proceso)
+  BATCH_CHUNK_SIZE  textos por chunk (por defecto 64)
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
+import threading
+
+from backend.engine.planner import generate_proposals_batch
+
+DEFAULT_CHUNK_SIZE = 64
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _workers() -> int:
+    try:
+        return int(os.getenv("BATCH_WORKERS", "") or (os.cpu_count() or 1))
+    except ValueError:
+        return 1
+
+
+def _chunk_size() -> int:
+    try:
+        return max(1, int(os.getenv("BATCH_CHUNK_SIZE", "") or DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        return DEFAULT_CHUNK_SIZE
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    # Pool perezoso y compartido entre peticiones. "spawn" para no heredar hilos/conexiones
+    # del servidor (fork con hilos vivos de uvicorn/SQLAlchemy no es seguro).
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=_workers(),
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+
+def _run_chunk(texts: List[str]) -> List[Dict[str, Any]]:
+    # se ejecuta en el worker: tiene que ser una función de módulo (picklable)
+    return generate_proposals_batch(texts)
+
+
+def iter_proposal_chunks(texts: List[str], chunk_size: Optional[int] = None
+                         ) -> Iterator[Tuple[int, List[str], Optional[List[Dict[str, Any]]], Optional[str]]]:
+    """
+    Genera propuestas para `texts` y va devolviendo (inicio, textos_del_chunk, propuestas, error)
+    en orden de FINALIZACIÓN, no de entrada (usa `inicio` para recolocar).
+    Si un chunk falla, propuestas=None y error trae el motivo; el resto sigue.
+    """
+    size = chunk_size or _chunk_size()
+    chunks = [(i, texts[i:i + size]) for i in range(0, len(texts), size)]
+    if not chunks:
+        return
+
+    # pocos datos o sin pool → en el propio proceso (arrancar workers no compensa)
+    if _workers() <= 1 or len(chunks) == 1:
+        for start, chunk in chunks:
+            try:
+                yield start, chunk, generate_proposals_batch(chunk), None
+            except Exception as e:
+                yield start, chunk, None, str(e)
+        return
+
+    pool = _get_pool()
+    futures = {pool.submit(_run_chunk, chunk): (start, chunk) for start, chunk in chunks}
+    try:
+        for fut in as_completed(futures):
+            start, chunk = futures[fut]
+            try:
+                yield start, chunk, fut.result(), None
+            except Exception as e:
+                yield start, chunk, None, str(e)
+    finally:
+        # si el cliente corta el stream, no seguimos gastando CPU en lo pendiente
+        for fut in futures:
+            fut.cancel()
+        try:
+            if getattr(pool, "_broken", False):
+                shutdown_pool()
+        except Exception:
+            pass
@@ -2,10 +2,16 @@
 
 import re
 import json
-import copy
+import time
 import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Tuple, Dict, Any, List, Optional
+import copy
+import hashlib
 import logging
+import threading
 
 # Context helpers for session proposal state
 try:
@@ -13,7 +19,8 @@ try:
         get_last_proposal, set_last_proposal,
         get_pending_change, set_pending_change, clear_pending_change,
         set_last_area, get_last_area,
-        set_context_value, get_context_value, clear_context_value
+        set_context_value, get_context_value, clear_context_value,
+        get_proposal_graph, get_negotiation_log
     )
 except Exception:
     # Fallback stubs if context module isn't available (should not happen in normal env)
@@ -27,6 +34,8 @@ except Exception:
     def set_context_value(*a, **k): return None
     def get_context_value(*a, **k): return None
     def clear_context_value(*a, **k): return None
+    def get_proposal_graph(*a, **k): return None
+    def get_negotiation_log(*a, **k): return None
 
 # Memoria de usuario 
 try:
@@ -92,14 +101,12 @@ def _detect_new_proposal_intent(session_id: str, text: str, llm_client=None):
     flags = {}
 
     # Señal LLM (opcional)
-    try:
-        from backend.engine.intent_llm import classify_intent  # puede no existir
+    classify_intent = _llm_hooks().get("classify_intent")
+    if classify_intent is not None:
         try:
             flags = classify_intent(text, llm_client) or {}
         except Exception:
             flags = {}
-    except Exception:
-        flags = {}
 
     # Heurística local existente
     heuristic = _looks_like_requirements(text)
@@ -127,17 +134,53 @@ def _detect_new_proposal_intent(session_id: str, text: str, llm_client=None):
     wants = bool(heuristic or flags.get("asks_new_proposal", False) or direct)
     return wants, flags
 
+# Hooks LLM opcionales (backend.engine.intent_llm). Se resuelven una sola vez:
+# un import que falla no se cachea y se reintentaría en cada mensaje.
+_LLM_HOOKS: Optional[Dict[str, Any]] = None
+
+def _llm_hooks() -> Dict[str, Any]:
+    global _LLM_HOOKS
+    if _LLM_HOOKS is None:
+        hooks: Dict[str, Any] = {"classify_intent": None, "get_llm_client": None}
+        try:
+            from backend.engine import intent_llm  # puede no existir
+            hooks["classify_intent"] = getattr(intent_llm, "classify_intent", None)
+            hooks["get_llm_client"] = getattr(intent_llm, "get_llm_client", None)
+        except Exception:
+            pass
+        _LLM_HOOKS = hooks
+    return _LLM_HOOKS
+
+def _get_llm_client():
+    fn = _llm_hooks().get("get_llm_client")
+    if fn is None:
+        return None
+    try:
+        return fn()
+    except Exception:
+        return None
+
 # Intents classifier (optional). If no model is available, keep None.
 _INTENTS = None
 
-# Similarity helper (optional). If not available, keep None.
+# Similarity helper (optional). Se crea al primer uso porque lee la BD; si falla, None.
 _SIM = None
 
+def _similar_retriever():
+    global _SIM
+    if _SIM is None:
+        try:
+            from backend.retrieval.similarity import get_retriever
+            _SIM = get_retriever()
+        except Exception:
+            _SIM = None
+    return _SIM
+
 # Importar catálogo de metodologías (datos estructurados sobre fases/prácticas)
 try:
     from backend.knowledge.methodologies import (
         METHODOLOGIES, get_method_phases, normalize_method_name,
-        get_definition, search_glossary,
+        get_definition, search_glossary, suggest_glossary_terms,
         recommend_methodology, explain_methodology_choice
     )
 except Exception:
@@ -151,15 +194,29 @@ except Exception:
         return ("Scrum", [], [])
     def explain_methodology_choice(text: str, method: str):
         return [f"Explicación generada por defecto para {method}."]
+    def suggest_glossary_terms(query: str, limit: int = 5):
+        return []
 
 # Importar generador de propuestas desde el planner (si existe)
 try:
-    from backend.engine.planner import generate_proposal
+    # pasa por la caché de propuestas (mismo resultado que planner.generate_proposal)
+    from backend.engine.proposal_cache import cached_generate_proposal as generate_proposal
 except Exception:
     # Fallback: funcion stub que lanza excepción cuando se usa (mejor que NameError)
     def generate_proposal(*a, **k):
         raise RuntimeError("generate_proposal no está disponible: fallo al importar backend.engine.planner")
 
+# Campos derivados (presupuesto, calendario) y render memoizado por versión de propuesta
+from backend.engine.proposal_graph import ProposalGraph, recompute_budget
+# Fuentes y tablas por referencia (IDs estables): se expanden al renderizar
+from backend.knowledge import kb
+from backend.knowledge.citations import expand_sources, resolve_table, source_refs
+from backend.engine.patch_parser import first_patch, parse_command
+from backend.engine.staffing import solve_staffing
+from backend.engine.skill_index import SkillIndex
+from backend.engine.scheduler import schedule
+from backend.engine.knowledge_cards import get_card
+
 
 # ===================== detectores =====================
 
@@ -222,6 +279,14 @@ def _asks_deliverables(text: str) -> bool:
 def _asks_team(text: str) -> bool:
     return bool(re.search(r"\b(equipo|roles|perfiles|staffing|personal|dimension)\b", text, re.I))
 
+def _asks_risk_simulation(text: str) -> bool:
+    # percentiles / Monte Carlo / probabilidad de cumplir (no cualquier mención a "riesgo")
+    t = _norm(text)
+    keys = ["monte carlo", "montecarlo", "p50", "p80", "p95", "percentil", "simulación de riesgo",
+            "simulacion de riesgo", "probabilidad de cumplir", "probabilidad de acabar",
+            "probabilidad de terminar", "probabilidad de pasarnos", "escenario pesimista"]
+    return any(k in t for k in keys)
+
 def _asks_risks_simple(text: str) -> bool:
     t = _norm(text)
     return ("riesgo" in t or "riesgos" in t)
@@ -435,6 +500,10 @@ def _format_sources(sources) -> str:
         return "No tengo fuentes adjuntas para esta recomendación."
     lines = []
     for s in sources:
+        if s.get("missing"):
+            # ID guardado que ya no está en el registro ni en BD
+            lines.append(f"- (fuente no disponible: {s.get('id', '')})")
+            continue
         autor = s.get("autor", "")
         titulo = s.get("titulo", "")
         anio = s.get("anio", "")
@@ -445,14 +514,14 @@ def _format_sources(sources) -> str:
 def _collect_sources_for_area(proposal: Optional[Dict[str, Any]], area: str) -> List[Dict[str, str]]:
     out: List[Dict[str, str]] = []
     if proposal and proposal.get("methodology_sources"):
-        out.extend(proposal["methodology_sources"])
+        out.extend(expand_sources(proposal["methodology_sources"]))
     # Fases y equipo usan además fuentes genéricas de dinámicas y entrega ágil
     if area in {"phases", "equipo", "team"}:
         out.extend(AGILE_TEAM_SOURCES)
     # eliminamos duplicados (por título)
     uniq, seen = [], set()
     for s in out:
-        key = (s.get("autor"), s.get("titulo"))
+        key = (s.get("autor"), s.get("titulo"), s.get("id"))
         if key not in seen:
             uniq.append(s)
             seen.add(key)
@@ -548,6 +617,16 @@ def _pretty_proposal(p: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
+def _render_proposal(session_id: str, p: Dict[str, Any]) -> str:
+    """_pretty_proposal memoizado en el grafo de la sesión: si la propuesta no ha cambiado
+    de versión (p.ej. se vuelve a pedir tras un parche sin efecto) no se re-renderiza."""
+    g = get_proposal_graph(session_id)
+    if g is None:
+        return _pretty_proposal(p)
+    g.update(p)
+    return g.memo("pretty", _pretty_proposal)
+
+
 def _project_context_summary(p: Optional[Dict[str, Any]]) -> str:
     """Resumen corto (una línea o dos) con metodología, presupuesto y notas rápidas.
     Útil para anteponer contexto a respuestas generadas por acciones.
@@ -691,27 +770,8 @@ def _explain_phases_method_aware(proposal: Dict[str, Any]) -> List[str]:
     return lines
 # === Detección y explicación de fase concreta ===
 
-_PHASE_CANON = {
-    'incepcion': {
-        'incepcion','incepción','inception','discovery','inicio','kickoff',
-        'plan de releases','plan de release','plan de entregas','plan de lanzamientos',
-        'release planning','plan de lanzamiento'
-    },
-    'sprints de desarrollo': {
-        'sprint','sprints','iteraciones','desarrollo','implementation','implementacion'
-    },
-    'qa/hardening': {
-        'qa','quality','calidad','hardening','stabilization','stabilizacion',
-        'aceptacion','aceptación','pruebas de aceptación','testing'
-    },
-    'despliegue & transferencia': {
-        'despliegue','release','go-live','produccion','producción','handover',
-        'transferencia','salida a produccion','salida a producción'
-    },
-    'descubrimiento & diseño': {
-        'descubrimiento','discovery','diseño','diseno','design'
-    }
-}
+# canon → alias (datos: sección "phase_canon" de knowledge/data/assistant.json)
+_PHASE_CANON: Dict[str, set] = kb.lazy("phase_canon", lambda d: {canon: set(aliases) for canon, aliases in d.items()})
 
 def _norm_simple(s: str) -> str:
     t = (s or '').lower().strip()
@@ -720,50 +780,146 @@ def _norm_simple(s: str) -> str:
 def _phase_tokens(s: str) -> List[str]:
     return re.findall(r"[a-z0-9/]+", _norm_simple(s))
 
-def _match_phase_name(query: str, proposal: Optional[Dict[str, Any]]) -> Optional[str]:
-    tq = _norm_simple(query)
+# (canon, alias) en el mismo orden en que los recorría _match_phase_name
+@lru_cache(maxsize=4)
+def _phase_canon_aliases(generation: int) -> Tuple[Tuple[str, str], ...]:
+    return tuple((canon, a) for canon, aliases in _PHASE_CANON.items() for a in aliases)
+_PHASE_INTENT_FIELDS = ("kpis", "deliverables", "practices")
 
-    def score(a: str, b: str) -> float:
-        sa, sb = set(_phase_tokens(a)), set(_phase_tokens(b))
-        return (len(sa & sb) / len(sa | sb)) if (sa and sb) else 0.0
 
-    # 1) intentar casar con fases de la propuesta actual
-    best, best_score = None, 0.0
-    if proposal:
-        for ph in proposal.get('phases', []):
-            name = ph.get('name', '')
-            sc = max(score(tq, name), score(name, tq))
+class _PhaseIndex:
+    """
+    Fases de una versión de la propuesta ya preparadas para los turnos de seguimiento:
+    nombre normalizado, tokens, a qué fase apunta cada alias del canon y qué entrada del
+    catálogo de la metodología le corresponde. Antes cada turno re-tokenizaba las fases de
+    la propuesta y el catálogo varias veces (match, merge, intent...).
+    Se construye por (nombres de fase, metodología): si un parche cambia los nombres o la
+    metodología, sale otro índice; el contenido de cada fase se sigue leyendo de la propuesta.
+    """
+    __slots__ = ("names", "norms", "tokens", "aliases", "catalog", "catalog_norms",
+                 "_items", "_resolved", "_by_name")
+
+    def __init__(self, names: Tuple[str, ...], method: str):
+        self.names = names
+        self.norms = tuple(_norm_simple(n) for n in names)
+        self.tokens = tuple(frozenset(_phase_tokens(n)) for n in names)
+        self.aliases = tuple((a, self._alias_target(canon, a)) for canon, a in _phase_canon_aliases(kb.generation()))
+        try:
+            self.catalog = tuple(get_method_phases(method) or [])
+        except Exception:
+            self.catalog = ()
+        self.catalog_norms = tuple(_norm_simple(c.get('name', '')) for c in self.catalog)
+        self._items: Dict[int, Dict[str, Tuple[Tuple[str, str, str], ...]]] = {}
+        self._resolved: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+        self._by_name: Dict[str, Optional[int]] = {}
+
+    def _alias_target(self, canon: str, alias: str) -> str:
+        # fase de la propuesta que contiene el alias; si no, la que contiene la forma
+        # canónica ('incepcion'); si tampoco, el canon tal cual
+        for name, nn in zip(self.names, self.norms):
+            if alias in nn:
+                return name
+        head = canon.split()[0]
+        for name, nn in zip(self.names, self.norms):
+            if head in nn:
+                return name
+        return canon.title()
+
+    def match(self, tq: str) -> Optional[str]:
+        """_match_phase_name sobre la consulta ya normalizada."""
+        sq = frozenset(_phase_tokens(tq))
+        best, best_score = None, 0.0
+        for name, nn, st in zip(self.names, self.norms, self.tokens):
+            sc = (len(sq & st) / len(sq | st)) if (sq and st) else 0.0
             if sc > best_score:
                 best, best_score = name, sc
-            if _norm_simple(name) in tq or tq in _norm_simple(name):
+            if nn in tq or tq in nn:
                 best, best_score = name, 1.0
                 break
-
-    # 2) si no hay match claro, usar alias/canon
-    for canon, aliases in _PHASE_CANON.items():
-        for a in aliases:
+        for a, target in self.aliases:
             if a in tq:
-                if proposal:
-                    # Preferir una fase de la proposal que contenga exactamente el alias
-                    # (por ejemplo, si el usuario dice 'discovery' y la propuesta tiene
-                    # una fase llamada 'Discovery', devolver esa fase). Si no se encuentra
-                    # una coincidencia exacta con el alias, caer atrás a la búsqueda por
-                    # la forma canónica (p.ej. 'incepcion').
-                    for ph in proposal.get('phases', []):
-                        try:
-                            if a in _norm_simple(ph.get('name', '') or ''):
-                                return ph['name']
-                        except Exception:
-                            continue
-                    for ph in proposal.get('phases', []):
-                        try:
-                            if canon.split()[0] in _norm_simple(ph.get('name', '') or ''):
-                                return ph['name']
-                        except Exception:
-                            continue
-                return canon.title()
+                return target
+        return best
+
+    @staticmethod
+    def _remember(memo: Dict, key: str, val):
+        if len(memo) > 256:   # viene de texto del usuario: acotado
+            memo.clear()
+        memo[key] = val
+        return val
+
+    def resolve(self, phase_name_or_idx: Any) -> Tuple[Optional[int], Optional[int]]:
+        """(posición en la propuesta, posición en el catálogo) para _merge_proposal_and_catalog_phase."""
+        key = str(phase_name_or_idx)
+        hit = self._resolved.get(key)
+        if hit is not None:
+            return hit
+        pi = None
+        try:
+            i = int(phase_name_or_idx)
+            if 0 <= i < len(self.names):
+                pi = i
+        except Exception:
+            n = _norm_simple(phase_name_or_idx)
+            pi = next((i for i, nn in enumerate(self.norms) if nn in n or n in nn), None)
+        ci = None
+        try:
+            n = _norm_simple(phase_name_or_idx)
+            named = pi is not None and bool(self.names[pi])
+            mn = self.norms[pi] if named else ''
+            for j, cn in enumerate(self.catalog_norms):
+                if cn and (cn in n or n in cn or (named and mn in cn) or cn in mn):
+                    ci = j
+                    break
+        except Exception:
+            pass
+        return self._remember(self._resolved, key, (pi, ci))
+
+    def catalog_by_name(self, name: str) -> Optional[int]:
+        """Primera fase del catálogo cuyo nombre contiene / está contenido en `name`."""
+        if name in self._by_name:
+            return self._by_name[name]
+        n = _norm_simple(name)
+        ci = next((j for j, pn in enumerate(self.catalog_norms) if pn and (pn in n or n in pn)), None)
+        return self._remember(self._by_name, name, ci)
+
+    def items(self, ci: int) -> Dict[str, Tuple[Tuple[str, str, str], ...]]:
+        """KPIs / entregables / prácticas de la entrada del catálogo: (original, normalizado, 1ª palabra)."""
+        out = self._items.get(ci)
+        if out is None:
+            ph = self.catalog[ci]
+            out = {}
+            for field in _PHASE_INTENT_FIELDS:
+                vals = ph.get(field) or (ph.get('practicas') if field == 'practices' else None) or []
+                out[field] = tuple(_intent_item(v) for v in vals)
+            self._items[ci] = out
+        return out
+
 
-    return best
+def _intent_item(v: str) -> Tuple[str, str, str]:
+    nv = _norm(v)
+    return (v, nv, nv.split()[0] if nv.split() else nv)
+
+
+@lru_cache(maxsize=256)
+def _phase_index(names: Tuple[str, ...], method: str, generation: int = 0) -> _PhaseIndex:
+    # generation (kb.generation()) en la clave: tras kb.reload() el canon y el catálogo son otros
+    return _PhaseIndex(names, method)
+
+
+def _phase_index_for(proposal: Optional[Dict[str, Any]], method: Optional[str] = None) -> _PhaseIndex:
+    """Índice de la versión actual de la propuesta (sin propuesta: sólo catálogo/canon)."""
+    phases = ((proposal or {}).get('phases') or []) if proposal else []
+    names = tuple(str((ph.get('name') if isinstance(ph, dict) else '') or '') for ph in phases)
+    if method is None:
+        method = (proposal or {}).get('methodology') or 'Scrum'
+    return _phase_index(names, str(method or ''), kb.generation())
+
+
+def _match_phase_name(query: str, proposal: Optional[Dict[str, Any]]) -> Optional[str]:
+    # 1) fases de la propuesta por solapamiento de tokens / inclusión; 2) alias del canon
+    # (prefiriendo la fase de la propuesta que lo contiene). Ver _PhaseIndex.match.
+    return _phase_index_for(proposal).match(_norm_simple(query))
 
 def _explain_specific_phase(asked: str, proposal: Optional[Dict[str, Any]]) -> str:
     method = (proposal or {}).get('methodology', 'Scrum')
@@ -952,19 +1108,7 @@ def _explain_budget_breakdown(proposal: Dict[str, Any]) -> List[str]:
 # ====== staffing: parseo y matching ======
 
 # Palabras clave por rol para puntuar habilidades
-_ROLE_KEYWORDS = {
-    "Backend Dev": ["api", "rest", "graphql", "python", "java", "node", "spring", "django", "fastapi", "sql", "postgres", "aws", "gcp", "azure", "seguridad"],
-    "Frontend Dev": ["react", "vue", "angular", "typescript", "javascript", "css", "accesibilidad", "redux", "next", "vite"],
-    "QA": ["qa", "testing", "pruebas", "e2e", "automat", "cypress", "playwright", "jest", "pytest", "regresion", "performance", "seguridad"],
-    "Tech Lead": ["arquitect", "design", "estandares", "review", "mentoria", "lider", "solucion"],
-    "PM": ["plan", "alcance", "prioridad", "stakeholder", "roadmap", "reporte", "cadencia"],
-    "Product Owner": ["producto", "backlog", "prioridad", "historias", "aceptacion"],
-    "DevOps": ["ci", "cd", "docker", "kubernetes", "k8s", "terraform", "aws", "gcp", "azure", "observabilidad", "prometheus", "grafana", "pipelines", "sre"],
-    "UX/UI": ["ux", "ui", "figma", "research", "prototip", "usabilidad", "wireframe", "dise"],
-    "ML Engineer": ["ml", "modelo", "pytorch", "tensorflow", "sklearn", "serving", "mlo"],
-    "Data": ["etl", "elt", "sql", "warehouse", "dbt", "bigquery", "redshift", "spark"],
-    "Mobile Dev": ["android", "kotlin", "swift", "react native", "flutter"]
-}
+_ROLE_KEYWORDS: Dict[str, List[str]] = kb.lazy("role_keywords")
 
 def _parse_staff_list(text: str) -> List[Dict[str, Any]]:
     """
@@ -1084,11 +1228,20 @@ _PHASE_ROLES = {
     "generic": ["PM", "Tech Lead", "QA", "Backend Dev", "Frontend Dev"]
 }
 
+def _person_label(person: Dict[str, Any]) -> str:
+    s = (person.get("seniority") or "").strip()
+    a = person.get("availability_pct", 100)
+    fte = person.get("fte")
+    bits = [b for b in (s, f"{a}%" if a != 100 else "", f"{fte:g} FTE" if fte is not None else "") if b]
+    return f"{person['name']} ({', '.join(bits)})" if bits else person["name"]
+
 def _suggest_staffing(proposal: Dict[str, Any], staff: List[Dict[str, Any]]) -> List[str]:
     """
     Devuelve asignación recomendada:
-    - Por rol (mejor persona y por qué)
-    - Por fase (mejor persona para cada rol esperado en esa fase) con breve justificación
+    - Por rol (quién cubre cuánto FTE y por qué; huecos sin cubrir; alternativas)
+    - Por fase (las personas asignadas a cada rol esperado en esa fase)
+    La asignación la resuelve backend/engine/staffing.py (matriz de puntuación + ILP/Húngaro)
+    respetando disponibilidad: ya no sale la misma persona para varios roles.
     """
     roles_needed = [r.get("role") for r in proposal.get("team", []) if r.get("role")]
     lines: List[str] = []
@@ -1097,65 +1250,90 @@ def _suggest_staffing(proposal: Dict[str, Any], staff: List[Dict[str, Any]]) ->
     lines.append("Asignación por rol (mejor persona y por qué)")
     if not roles_needed:
         lines.append("- (La propuesta no tiene equipo definido todavía).")
-    for role in roles_needed:
-        if not staff:
+        return lines
+    if not staff:
+        for role in dict.fromkeys(roles_needed):
             lines.append(f"- {role}: (no hay candidatos cargados)")
-            continue
-        cands = sorted(staff, key=lambda p: _score_staff_for_role(role, p), reverse=True)
-        best = cands[0]
-        why = _why_person_for_role(role, best)
-        s = (best.get("seniority") or "").strip()
-        a = best.get("availability_pct", 100)
-        extra = f" ({s}, {a}%)" if s or a != 100 else ""
-        lines.append(f"- {role}: {best['name']}{extra} → {why}")
-        # alternativas rápidas
-        alt = [c["name"] for c in cands[1:3]]
-        if alt:
-            lines.append(f"  · Alternativas: {', '.join(alt)}")
-
-    # — Por fase
+        return lines
+    # la asignación sólo depende del equipo (rol, FTE) y de la plantilla: se cachea por huella
+    team_key = tuple((r.get("role"), r.get("count")) for r in proposal.get("team", []) or [])
+    plan = _render_cached(("staffing", team_key, _staff_key(staff)), lambda: solve_staffing(proposal, staff))
+    by_role = {r["role"]: r for r in plan["roles"]}
+    for r in plan["roles"]:
+        if not r["people"]:
+            lines.append(f"- {r['role']}: (sin candidatos con disponibilidad; faltan {r['demand']:g} FTE)")
+        for i, person in enumerate(r["people"]):
+            head = f"- {r['role']}:" if i == 0 else "  +"
+            lines.append(f"{head} {_person_label(person)} → {person['why']}")
+        if r["people"] and r["unfilled_fte"] > 0:
+            lines.append(f"  · Sin cubrir: {r['unfilled_fte']:g} FTE")
+        if r["alternatives"]:
+            lines.append(f"  · Alternativas: {', '.join(r['alternatives'])}")
+
+    # — Por fase (reutiliza la asignación por rol: nada de reordenar la plantilla otra vez)
     lines.append("")
     lines.append("Asignación sugerida por fase/tareas")
     for ph in proposal.get("phases", []):
         pk = _phase_key(ph.get("name", ""))
-        expected = [r for r in _PHASE_ROLES.get(pk, []) if r in roles_needed]
+        expected = [r for r in _PHASE_ROLES.get(pk, []) if r in by_role]
         if not expected:
             continue
         lines.append(f"- {ph.get('name','')}:")
         for role in expected:
-            cands = sorted(staff, key=lambda p: _score_staff_for_role(role, p), reverse=True)
-            if not cands:
+            people = by_role[role]["people"]
+            if not people:
                 lines.append(f"  • {role}: (sin candidatos)")
                 continue
-            best = cands[0]
-            why = _why_person_for_role(role, best)
-            s = (best.get("seniority") or "").strip()
-            a = best.get("availability_pct", 100)
-            extra = f" ({s}, {a}%)" if s or a != 100 else ""
-            lines.append(f"  • {role} → {best['name']}{extra}: {why}")
+            who = ", ".join(_person_label(p) for p in people)
+            lines.append(f"  • {role} → {who}: {people[0]['why']}")
     return lines
+
+# ---- caché de lo que depende de la plantilla (desglose por personas, gaps/formación) ----
+_RENDER_CACHE: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+_RENDER_CACHE_MAX = 512
+_RENDER_LOCK = threading.Lock()
+
+
+try:
+    import orjson as _orjson  # opcional: serializa la plantilla ~5x más rápido para la huella
+except Exception:
+    _orjson = None
+
+
+def _staff_key(staff: List[Dict[str, Any]]) -> str:
+    """Huella de la plantilla (mismo contenido → misma clave, venga de donde venga)."""
+    if _orjson is not None:
+        try:
+            raw = _orjson.dumps(staff or [], option=_orjson.OPT_SORT_KEYS | _orjson.OPT_NON_STR_KEYS, default=str)
+            return hashlib.blake2b(raw, digest_size=16).hexdigest()
+        except Exception:
+            pass
+    raw = json.dumps(staff or [], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _render_cached(key: Tuple[Any, ...], build):
+    with _RENDER_LOCK:
+        hit = _RENDER_CACHE.get(key)
+        if hit is not None:
+            _RENDER_CACHE.move_to_end(key)
+            return hit
+    val = build()
+    with _RENDER_LOCK:
+        _RENDER_CACHE[key] = val
+        while len(_RENDER_CACHE) > _RENDER_CACHE_MAX:
+            _RENDER_CACHE.popitem(last=False)
+    return val
+
+
+def _clear_render_cache() -> None:
+    with _RENDER_LOCK:
+        _RENDER_CACHE.clear()
+
+
 # ====== GAPS & FORMACIÓN ======
 
-_TRAINING_CATALOG = {
-    "cypress": ["Cypress fundamentals (oficial)", "Curso E2E con Cypress", "Guía de patrones de test E2E"],
-    "playwright": ["Playwright intro (MS)", "Playwright testing cookbook"],
-    "tdd": ["TDD by example (K. Beck)", "Katas TDD (cyber-dojo)"],
-    "owasp": ["OWASP Top 10 (oficial)", "Cheat Sheets OWASP"],
-    "pci": ["PCI-DSS overview", "Stripe Radar & antifraude"],
-    "stripe": ["Stripe Payments (docs)", "Idempotency keys (Stripe)"],
-    "kubernetes": ["Kubernetes fundamentals (CKAD)", "K8s Hands-on Labs"],
-    "terraform": ["Terraform up & running", "Oficial HashiCorp - intro"],
-    "observability": ["Prometheus + Grafana (labs)", "OpenTelemetry 101"],
-    "react": ["React beta docs", "React Testing Library"],
-    "typescript": ["TS handbook", "Tipos avanzados para React"],
-    "django": ["Django tutorial oficial", "DRF guía práctica"],
-    "fastapi": ["FastAPI docs", "Pydantic patterns"],
-    "spring": ["Spring Boot guides", "Spring Security basics"],
-    "node": ["Node + Express docs", "Pruebas con Jest/Supertest"],
-    "postgres": ["PostgreSQL performance", "Migrations & índices"],
-    "ci/cd": ["GitHub Actions (oficial)", "GitLab CI pipelines"],
-    "performance": ["k6/Locust intro", "Rendimiento web (MDN)"]
-}
+_TRAINING_CATALOG: Dict[str, List[str]] = kb.lazy("training_catalog")
 
 # temas "must" inferidos por stack/dominio/fases/metodología
 def _infer_required_topics(proposal: Dict[str, Any]) -> List[str]:
@@ -1192,9 +1370,12 @@ def _person_has_topic(person: Dict[str, Any], topic: str) -> bool:
     blob = _norm(" ".join(person.get("skills", [])) + " " + (person.get("seniority") or "") + " " + (person.get("role") or ""))
     return _norm(topic) in blob
 
-def _closest_upskilling_candidates(staff: List[Dict[str, Any]], topic: str) -> List[Dict[str, Any]]:
+def _closest_upskilling_candidates(staff: List[Dict[str, Any]], topic: str, index: Optional[SkillIndex] = None) -> List[Dict[str, Any]]:
     # heurística: rol más cercano + seniority + disponibilidad
-    def proximity(p: Dict[str, Any]) -> float:
+    has_topic = (index or SkillIndex.from_staff(staff)).ids_with_topic(topic)
+
+    def proximity(item: Tuple[int, Dict[str, Any]]) -> float:
+        i, p = item
         r = _canonical_role(p.get("role", ""))
         s = _norm(p.get("seniority") or "")
         base = 0.0
@@ -1210,36 +1391,46 @@ def _closest_upskilling_candidates(staff: List[Dict[str, Any]], topic: str) -> L
         if "lead" in s or "principal" in s or "senior" in s: base += 0.5
         base *= max(0.3, float(p.get("availability_pct", 100)) / 100.0)
         # bonus si ya aparece el tema de forma parcial en skills
-        if _person_has_topic(p, topic): base += 1.0
+        if i in has_topic: base += 1.0
         return base
-    return sorted(staff, key=proximity, reverse=True)[:3]
+    return [p for _, p in sorted(enumerate(staff), key=proximity, reverse=True)[:3]]
 
-def _analyze_skill_gaps(proposal: Dict[str, Any], staff: List[Dict[str, Any]]) -> Dict[str, Any]:
-    topics = _infer_required_topics(proposal)
-    present = {t: any(_person_has_topic(p, t) for p in staff) for t in topics}
+def _gap_report(topics: List[str], methodology: str, staff: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # la plantilla se normaliza una vez; cada tema es una consulta al índice
+    index = SkillIndex.from_staff(staff)
+    present = {t: bool(index.ids_with_topic(t)) for t in topics}
     gaps = [t for t, ok in present.items() if not ok]
     findings = []
     for g in gaps:
-        cands = _closest_upskilling_candidates(staff, g)
+        cands = _closest_upskilling_candidates(staff, g, index=index)
         resources = _TRAINING_CATALOG.get(g, [])[:2]
         findings.append({
             "topic": g,
-            "why": f"Necesario por stack/dominio/fases (p.ej., {proposal.get('methodology','')}).",
+            "why": f"Necesario por stack/dominio/fases (p.ej., {methodology}).",
             "upskill_candidates": [{"name": c["name"], "role": c.get("role",""), "availability_pct": c.get("availability_pct",100)} for c in cands],
             "resources": resources,
             "external_hint": "Refuerzo externo 0.5 FTE durante 2–4 semanas si no hay disponibilidad interna."
         })
     return {"topics": topics, "gaps": findings}
 
-def _render_training_plan(proposal: Dict[str, Any], staff: List[Dict[str, Any]]) -> List[str]:
-    report = _analyze_skill_gaps(proposal, staff)
+def _gap_key(proposal: Dict[str, Any], staff: List[Dict[str, Any]]) -> Tuple[Any, ...]:
+    # el informe sólo depende de los temas inferidos, la metodología (texto) y la plantilla
+    return (tuple(_infer_required_topics(proposal)), proposal.get("methodology", ""), _staff_key(staff))
+
+def _cached_gap_report(key: Tuple[Any, ...], staff: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return _render_cached(("gaps",) + key, lambda: _gap_report(list(key[0]), key[1], staff))
+
+def _analyze_skill_gaps(proposal: Dict[str, Any], staff: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return copy.deepcopy(_cached_gap_report(_gap_key(proposal, staff), staff))
+
+def _training_plan_lines(report: Dict[str, Any]) -> Tuple[str, ...]:
     lines: List[str] = []
     if not report["topics"]:
-        return ["(No detecto temas críticos a partir del stack/metodología actual.)"]
+        return ("(No detecto temas críticos a partir del stack/metodología actual.)",)
     lines.append("Gaps detectados & plan de formación")
     if not report["gaps"]:
         lines.append("- ✔︎ No hay carencias relevantes respecto al stack/metodología.")
-        return lines
+        return tuple(lines)
     for g in report["gaps"]:
         lines.append(f"- {g['topic']} — {g['why']}")
         if g.get("upskill_candidates"):
@@ -1248,7 +1439,11 @@ def _render_training_plan(proposal: Dict[str, Any], staff: List[Dict[str, Any]])
         if g.get("resources"):
             lines.append(f"  • Recursos: " + " | ".join(g.get("resources", [])))
         lines.append(f"  • Alternativa: {g.get('external_hint','')}")
-    return lines
+    return tuple(lines)
+
+def _render_training_plan(proposal: Dict[str, Any], staff: List[Dict[str, Any]]) -> List[str]:
+    key = _gap_key(proposal, staff)
+    return list(_render_cached(("training",) + key, lambda: _training_plan_lines(_cached_gap_report(key, staff))))
 
     def _pct(x: float, base: float) -> float:
         return (100.0 * x / base) if base else 0.0
@@ -1260,6 +1455,7 @@ from collections import defaultdict
 import re
 from datetime import datetime
 
+@lru_cache(maxsize=4096)
 def _match_phase_archetype(name: str) -> str:
     n = _norm(name)
     if any(k in n for k in ["descubr", "discovery", "kickoff", "visión", "vision", "inicio"]):
@@ -1282,9 +1478,8 @@ def _match_phase_archetype(name: str) -> str:
         return "closure"
     return "development"
 
-def _phase_tasks_for_archetype(archetype: str, methodology: str) -> list:
-    """Devuelve una lista de dicts {name, roles, explain} para esa fase."""
-    m = _norm(methodology)
+def _build_phase_tasks(archetype: str, m: str) -> list:
+    """Lista de dicts {name, roles, explain} para esa fase (m = metodología normalizada)."""
     t = []
 
     if archetype == "discovery":
@@ -1426,14 +1621,46 @@ def _phase_tasks_for_archetype(archetype: str, methodology: str) -> list:
 
     return t
 
-def _render_phase_task_breakdown(proposal: dict, staff: list) -> list:
-    """
-    Devuelve líneas de texto: por cada fase del plan, tareas asignadas a personas concretas.
-    staff: [{'name','role','skills','seniority','availability'}...]
-    """
-    lines = []
-    phases = proposal.get("phases", []) or []
-    meth = proposal.get("methodology", "") or ""
+# Las tareas sólo dependen del arquetipo y de si la metodología es scrum / kanban / otra
+# (cambia el texto de planificación): se precalculan todas al importar, en solo lectura.
+_PHASE_ARCHETYPES = ("discovery", "analysis", "design", "architecture", "development",
+                     "qa", "uat", "release", "closure")
+_METHOD_FLAVORS = ("scrum", "kanban", "")
+
+
+def _methodology_flavor(methodology: str) -> str:
+    m = _norm(methodology)
+    return "scrum" if "scrum" in m else "kanban" if "kanban" in m else ""
+
+
+_PHASE_TASKS: Dict[Tuple[str, str], Tuple[Any, ...]] = {
+    (a, f): tuple(MappingProxyType({**t, "roles": tuple(t["roles"])}) for t in _build_phase_tasks(a, f))
+    for a in _PHASE_ARCHETYPES for f in _METHOD_FLAVORS
+}
+# por tarea: [(clave de rol normalizada, rol canónico)] en orden de preferencia
+_PHASE_TASK_ROLES: Dict[Tuple[str, str], Tuple[Tuple[Tuple[str, str], ...], ...]] = {
+    k: tuple(tuple((_norm(_canonical_role(r)), _canonical_role(r)) for r in t["roles"]) for t in tasks)
+    for k, tasks in _PHASE_TASKS.items()
+}
+
+
+def _phase_tasks_for_archetype(archetype: str, methodology: str) -> list:
+    """Devuelve una lista de dicts {name, roles, explain} para esa fase (precalculados: no mutar)."""
+    return list(_PHASE_TASKS.get((archetype, _methodology_flavor(methodology)), ()))
+
+
+def _availability_label(person: Dict[str, Any]) -> Any:
+    avail = person.get("availability") or person.get("availability_pct") or person.get("pct") or person.get("%") or 100
+    try:
+        if isinstance(avail, str):
+            avail = int(re.sub(r"[^0-9]", "", avail) or "100")
+    except Exception:
+        avail = 100
+    return avail
+
+
+def _phase_task_breakdown_lines(phases: list, flavor: str, staff: list) -> Tuple[str, ...]:
+    lines = ["Plan de trabajo detallado por fases y personas:"]
 
     # Agrupar plantilla por rol canónico
     staff_by_role = defaultdict(list)
@@ -1444,50 +1671,47 @@ def _render_phase_task_breakdown(proposal: dict, staff: list) -> list:
     # Contador por rol para repartir tareas de forma round-robin
     rr_counters = defaultdict(int)
 
-    def _pick_assignee(role_needed: str):
-        key = _norm(_canonical_role(role_needed))
-        pool = staff_by_role.get(key, [])
-        if not pool:
-            return None
-        idx = rr_counters[key] % len(pool)
-        rr_counters[key] += 1
-        return pool[idx], _canonical_role(role_needed)
-
-    if not phases:
-        return ["No tengo fases definidas todavía para repartir tareas."]
-
-    lines.append("Plan de trabajo detallado por fases y personas:")
     for ph in phases:
         pname = ph.get("name", "Fase")
         weeks = ph.get("weeks", 0)
         lines.append(f"")
         lines.append(f"Fase: {pname} ({weeks}s)")
-        arche = _match_phase_archetype(pname)
-        tasks = _phase_tasks_for_archetype(arche, meth)
+        key = (_match_phase_archetype(pname), flavor)
 
-        for t in tasks:
+        for t, roles in zip(_PHASE_TASKS.get(key, ()), _PHASE_TASK_ROLES.get(key, ())):
             assigned = None
             chosen_role = None
-            for r in (t.get("roles") or []):
-                picked = _pick_assignee(r)
-                if picked:
-                    assigned, chosen_role = picked
+            for rkey, canon in roles:
+                pool = staff_by_role.get(rkey)
+                if pool:
+                    assigned = pool[rr_counters[rkey] % len(pool)]
+                    rr_counters[rkey] += 1
+                    chosen_role = canon
                     break
 
             if not assigned:
-                falta = ", ".join(_canonical_role(r) for r in (t.get("roles") or []))
+                falta = ", ".join(canon for _, canon in roles)
                 lines.append(f"- {t['name']}: NO ASIGNADO. Falta perfil ({falta}). Qué es: {t['explain']}")
             else:
                 nm = assigned.get("name", "Sin nombre")
-                avail = assigned.get("availability") or assigned.get("availability_pct") or assigned.get("pct") or assigned.get("%") or 100
-                try:
-                    if isinstance(avail, str):
-                        avail = int(re.sub(r"[^0-9]", "", avail) or "100")
-                except Exception:
-                    avail = 100
-                lines.append(f"- {t['name']} — responsable: {nm} ({chosen_role}, {avail}% disponibilidad). Qué es: {t['explain']}")
+                lines.append(f"- {t['name']} — responsable: {nm} ({chosen_role}, {_availability_label(assigned)}% disponibilidad). Qué es: {t['explain']}")
+    return tuple(lines)
 
-    return lines
+
+def _render_phase_task_breakdown(proposal: dict, staff: list) -> list:
+    """
+    Devuelve líneas de texto: por cada fase del plan, tareas asignadas a personas concretas.
+    staff: [{'name','role','skills','seniority','availability'}...]
+    Cacheado por (sabor de metodología, fases, huella de la plantilla).
+    """
+    phases = proposal.get("phases", []) or []
+    if not phases:
+        return ["No tengo fases definidas todavía para repartir tareas."]
+    flavor = _methodology_flavor(proposal.get("methodology", "") or "")
+    key = ("breakdown", flavor,
+           tuple((str(ph.get("name", "Fase")), str(ph.get("weeks", 0))) for ph in phases),
+           _staff_key(staff))
+    return list(_render_cached(key, lambda: _phase_task_breakdown_lines(phases, flavor, staff)))
 
     # Arquetipos de fase: tareas/recursos
     def phase_key(n: str) -> str:
@@ -1688,13 +1912,6 @@ def _catalog_text() -> str:
     return "Metodologías que manejo:\n" + "\n".join(bullets) + "\n\n¿Quieres que te explique alguna en detalle o que recomiende la mejor para tu caso?"
 
 
-# ====== detección de petición de cambio de metodología ======
-_CHANGE_PAT = re.compile(
-    r"(?:cambia(?:r)?\s+a|usar|quiero|prefiero|pasar\s+a)\s+(scrum|kanban|scrumban|xp|lean|crystal|fdd|dsdm|safe|devops)"
-    r"(?:\s+(?:en\s+vez\s+de|en\s+lugar\s+de)\s+(scrum|kanban|scrumban|xp|lean|crystal|fdd|dsdm|safe|devops))?",
-    re.I
-)
-
 def _handle_suggested_action(text: str, proposal: Dict[str, Any]) -> Optional[str]:
     """
     Maneja las acciones sugeridas y devuelve la respuesta detallada correspondiente.
@@ -1717,19 +1934,10 @@ def _handle_suggested_action(text: str, proposal: Dict[str, Any]) -> Optional[st
     return None
 
 def _parse_change_request(text: str) -> Optional[Tuple[str, Optional[str]]]:
-    t = _norm(text)
-    m = _CHANGE_PAT.search(t)
-    if m:
-        tgt = normalize_method_name(m.group(1))
-        alt = normalize_method_name(m.group(2)) if m.group(2) else None
-        return tgt, alt
-    m2 = re.search(
-        r"(scrum|kanban|scrumban|xp|lean|crystal|fdd|dsdm|safe|devops)\s+(?:en\s+vez\s+de|en\s+lugar\s+de)\s+"
-        r"(scrum|kanban|scrumban|xp|lean|crystal|fdd|dsdm|safe|devops)", t)
-    if m2:
-        a = normalize_method_name(m2.group(1))
-        b = normalize_method_name(m2.group(2))
-        return a, b
+    meth = parse_command(text, _canonical_role)["methodology"]
+    if meth:
+        tgt, alt = meth
+        return normalize_method_name(tgt), (normalize_method_name(alt) if alt else None)
     return None
 
 def _retune_plan_for_method(p: Dict[str, Any], method: str) -> Dict[str, Any]:
@@ -1737,7 +1945,7 @@ def _retune_plan_for_method(p: Dict[str, Any], method: str) -> Dict[str, Any]:
     p = dict(p)
     p["methodology"] = method
     info = METHODOLOGIES.get(method, {})
-    p["methodology_sources"] = info.get("sources", [])
+    p["methodology_sources"] = source_refs(info.get("sources", []))
 
     phases = []
     if method == "Kanban":
@@ -1772,8 +1980,6 @@ def _retune_plan_for_method(p: Dict[str, Any], method: str) -> Dict[str, Any]:
 
 # ===================== Cambios sobre toda la propuesta =====================
 
-_PATCH_PREFIX = "__PATCH__:"
-
 def _total_weeks(p: Dict[str, Any]) -> int:
     return sum(int(ph.get("weeks", 0)) for ph in p.get("phases", []))
 
@@ -1788,8 +1994,8 @@ def _evaluate_patch(proposal: Dict[str, Any], patch: Dict[str, Any], req_text: O
     Devuelve (texto_evaluacion, etiqueta_veredicto)
     etiqueta_veredicto ∈ {'buena', 'neutra', 'mala'}
     """
-    before = copy.deepcopy(proposal)
-    after = _apply_patch(proposal, patch)  # no muta 'proposal'
+    before = proposal
+    after = _apply_patch(proposal, patch)  # no muta 'proposal' (copy-on-write)
 
     def add_line(s: str, buf: List[str]): buf.append(s)
 
@@ -1988,17 +2194,13 @@ def _evaluate_patch(proposal: Dict[str, Any], patch: Dict[str, Any], req_text: O
 
 
 def _make_pending_patch(session_id: str, patch: Dict[str, Any], proposal: Optional[Dict[str, Any]] = None, req_text: Optional[str] = None) -> Tuple[str, str]:
-    """Guarda un parche pendiente con evaluación y confirmación sí/no usando el mismo canal pending_change."""
-    # Guardamos el parche en pending_change
-    try:
-        set_pending_change(session_id, _PATCH_PREFIX + json.dumps(patch, ensure_ascii=False))
-    except Exception:
-        set_pending_change(session_id, _PATCH_PREFIX + json.dumps(patch))
-
+    """Guarda un parche pendiente con evaluación y confirmación sí/no usando el mismo canal pending_change.
+    El parche queda además como evento "proposed" en el log de negociación."""
     area = patch.get("type", "propuesta")
     summary = _summarize_patch(patch)
 
     eval_block = ""
+    eval_text = ""
     if proposal:
         try:
             eval_text, _ = _evaluate_patch(proposal, patch, req_text)
@@ -2007,15 +2209,18 @@ def _make_pending_patch(session_id: str, patch: Dict[str, Any], proposal: Option
             eval_block = "\n\n(Nota: no pude calcular la evaluación automática, pero puedo aplicar el cambio igualmente.)"
 
     msg = f"Propones cambiar **{area}**:\n{summary}{eval_block}\n\n¿Aplico estos cambios? **sí/no**"
+    ref = _log_negotiation(session_id, "proposed", patch=patch, raw=msg,
+                           impact=[ln.strip(" -•■") for ln in eval_text.splitlines() if ln.strip()])
+    set_pending_change(session_id, patch=patch, ref=ref)
     return msg, f"Parche pendiente ({area})."
 
-def _parse_pending_patch(pending_val: str) -> Optional[Dict[str, Any]]:
-    if isinstance(pending_val, str) and pending_val.startswith(_PATCH_PREFIX):
-        try:
-            return json.loads(pending_val[len(_PATCH_PREFIX):])
-        except Exception:
-            return None
-    return None
+def _log_negotiation(session_id: str, kind: str, **payload: Any) -> Optional[int]:
+    """Apunta un evento sin estado (proposed/rejected) en el log de negociación; devuelve su seq."""
+    try:
+        log = get_negotiation_log(session_id)
+        return log.record(kind, **payload)["seq"] if log is not None else None
+    except Exception:
+        return None
 
 def _summarize_patch(patch: Dict[str, Any]) -> str:
     t = patch.get("type")
@@ -2057,51 +2262,31 @@ def _summarize_patch(patch: Dict[str, Any]) -> str:
         return "\n".join(lines) if lines else "- (sin cambios detectados)"
     return "- Cambio genérico a propuesta."
 
-def _recompute_budget(p: Dict[str, Any]) -> Dict[str, Any]:
-    """Recalcula presupuesto en base a team, phases y role_rates/contingencia."""
-    p = copy.deepcopy(p)
-    phases = p.get("phases", [])
-    team = p.get("team", [])
-    budget = p.get("budget", {}) or {}
-    ass = budget.get("assumptions", {}) or {}
-    role_rates = ass.get("role_rates_eur_pw", {}) or {
-        "PM": 1200.0, "Tech Lead": 1400.0,
-        "Backend Dev": 1100.0, "Frontend Dev": 1000.0,
-        "QA": 900.0, "UX/UI": 1000.0, "ML Engineer": 1400.0,
-    }
-    contingency_pct = round(100 * (budget.get("contingency_10pct", 0.0) / budget.get("labor_estimate_eur", 1.0))) if budget.get("labor_estimate_eur") else 10
-    # permitir override si ya vino en ass
-    if isinstance(ass.get("contingency_pct"), (int, float)):
-        contingency_pct = ass["contingency_pct"]
-
-    project_weeks = sum(ph.get("weeks", 0) for ph in phases)
-    by_role: Dict[str, float] = {}
-    for r in team:
-        role = r["role"]; cnt = float(r["count"])
-        rate = float(role_rates.get(role, 1000.0))
-        by_role.setdefault(role, 0.0)
-        by_role[role] += cnt * project_weeks * rate
-
-    labor = round(sum(by_role.values()), 2)
-    contingency = round((contingency_pct / 100.0) * labor, 2)
-    total = round(labor + contingency, 2)
-
-    p["budget"] = {
-        "labor_estimate_eur": labor,
-        "contingency_10pct": contingency,  # mantenemos el nombre original aunque cambie el pct
-        "total_eur": total,
-        "by_role": by_role,
-        "assumptions": {
-            "project_weeks": project_weeks,
-            "role_rates_eur_pw": role_rates,
-            "contingency_pct": contingency_pct
-        }
-    }
+def _patch_graph(p: Dict[str, Any], session_id: Optional[str]) -> ProposalGraph:
+    """Grafo de la sesión puesto al día con `p` (sólo se recalculan los nodos cuyas entradas
+    cambian respecto a la última propuesta vista). Sin sesión, un grafo nuevo desde cero."""
+    if not session_id:
+        return ProposalGraph(p)
+    g = get_proposal_graph(session_id)
+    g.update(p)
+    return g
+
+def _recompute_budget(p: Dict[str, Any], session_id: Optional[str] = None) -> Dict[str, Any]:
+    """Recalcula presupuesto en base a team, phases y role_rates/contingencia.
+    Copy-on-write: sólo se sustituye 'budget' (nuevo); el resto del árbol se comparte.
+    Las fórmulas viven en proposal_graph (nodos by_role → labor → contingency → total);
+    con `session_id` se reutiliza el grafo de la sesión y el recálculo es incremental."""
+    p = dict(p)
+    p["budget"] = _patch_graph(p, session_id).budget() if session_id else recompute_budget(p)
     return p
 
-def _apply_patch(proposal: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
-    """Aplica un parche estructurado a la propuesta y recalcula lo necesario."""
-    p = copy.deepcopy(proposal)
+def _apply_patch(proposal: Dict[str, Any], patch: Dict[str, Any], session_id: Optional[str] = None) -> Dict[str, Any]:
+    """Aplica un parche estructurado a la propuesta y recalcula lo necesario.
+    No muta 'proposal': copy-on-write, se copia la raíz y sólo las ramas que toca el parche
+    (decision_log, fuentes, explicaciones... se comparten con la versión anterior).
+    Con `session_id` los derivados salen del grafo de la sesión (ver _recompute_budget);
+    sin él (previsualizaciones, tests) se calculan desde cero."""
+    p = dict(proposal)
     t = (patch.get("type") or "").lower()
 
     if t == "team":
@@ -2109,7 +2294,8 @@ def _apply_patch(proposal: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, A
         # normalizamos roles
         for op in ops:
             op["role"] = _canonical_role(op["role"])
-        # aplicar
+        # aplicar (sobre copia del equipo: los dicts de rol se modifican in situ)
+        p["team"] = [dict(r) for r in p.get("team", [])]
         role_index = {r["role"].lower(): i for i, r in enumerate(p.get("team", []))}
         for op in ops:
             rkey = op["role"].lower()
@@ -2125,10 +2311,11 @@ def _apply_patch(proposal: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, A
                     p["team"].append({"role": op["role"], "count": float(op["count"])})
             elif op["op"] == "remove":
                 p["team"] = [r for r in p["team"] if _norm(r["role"]) != rkey]
-        p = _recompute_budget(p)
+        p = _recompute_budget(p, session_id)
 
     elif t == "phases":
         ops = patch.get("ops", [])
+        p["phases"] = [dict(ph) for ph in p.get("phases", [])]
         # mapa por nombre (case-insensitive)
         def _find_phase_idx(name: str) -> Optional[int]:
             for i, ph in enumerate(p.get("phases", [])):
@@ -2144,30 +2331,39 @@ def _apply_patch(proposal: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, A
                 p.setdefault("phases", []).append({"name": op["name"], "weeks": int(op["weeks"])})
             elif op["op"] == "remove":
                 p["phases"] = [ph for ph in p.get("phases", []) if _norm(ph["name"]) != _norm(op["name"])]
-        p = _recompute_budget(p)
+        p = _recompute_budget(p, session_id)
+        # el calendario (si ya hay fecha de inicio) depende de las fases: se regenera
+        tl = p.get("timeline") or {}
+        if tl.get("start_date"):
+            sch = _patch_graph(p, session_id).get("timeline")
+            if sch is not None:
+                # fin y camino crítico cambian con los eventos: se actualizan juntos
+                p["timeline"] = {**tl, "end_date": sch["end_date"], "events": sch["events"],
+                                 "critical_path": sch["critical_path"]}
 
     elif t in ("budget", "rates", "contingency"):
         # role_rates + contingency_pct (acepta varias formas)
-        budget = p.get("budget", {}) or {}
-        ass = budget.get("assumptions", {}) or {}
-        role_rates = ass.get("role_rates_eur_pw", {}) or {}
+        budget = dict(p.get("budget", {}) or {})
+        ass = dict(budget.get("assumptions", {}) or {})
+        role_rates = dict(ass.get("role_rates_eur_pw", {}) or {})
 
         # 1) tarifas por rol
         rr = patch.get("role_rates") or patch.get("rates") or {}
         if rr:
             role_rates.update({_canonical_role(k): float(v) for k, v in rr.items()})
 
-        p.setdefault("budget", {})
-        p["budget"].setdefault("assumptions", {})
-        p["budget"]["assumptions"]["role_rates_eur_pw"] = role_rates
+        ass["role_rates_eur_pw"] = role_rates
 
         # 2) contingencia
         if "contingency_pct" in patch:
-            p["budget"]["assumptions"]["contingency_pct"] = float(patch["contingency_pct"])
+            ass["contingency_pct"] = float(patch["contingency_pct"])
         if "pct" in patch and t in ("contingency",):
-            p["budget"]["assumptions"]["contingency_pct"] = float(patch["pct"])
+            ass["contingency_pct"] = float(patch["pct"])
 
-        p = _recompute_budget(p)
+        budget["assumptions"] = ass
+        p["budget"] = budget
+
+        p = _recompute_budget(p, session_id)
 
     elif t == "risks":
         # Soporta dos formatos:
@@ -2266,147 +2462,19 @@ def _apply_patch(proposal: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, A
 
     # mantenemos sources de metodología siempre
     info = METHODOLOGIES.get(p.get("methodology", ""), {})
-    p["methodology_sources"] = info.get("sources", [])
+    p["methodology_sources"] = source_refs(info.get("sources", []))
     return p
 
 # ---------- Parsers de lenguaje natural: Parches ----------
-
-def _parse_team_patch(text: str) -> Optional[Dict[str, Any]]:
-    """
-    Interpreta órdenes de cambio de equipo en lenguaje natural y devuelve un patch.
-    Soporta:
-      - 'añade 0.5 qa', 'agrega 1 backend'
-      - 'pon 2 backend', 'pon pm a 1', 'sube qa a 0,5', 'baja frontend a 1'
-      - 'quita ux', 'elimina qa'
-    Devuelve: {"type":"team","ops":[{"op":"add|set|remove","role":"QA","count":0.5}, ...]}
-    """
-    t = _norm(text)
-
-    # Verbos comunes (simplificados)
-    add_verbs = r"(?:anade|añade|agrega|suma|incluye|mete|añadir|agregar)"
-    set_verbs = r"(?:deja|ajusta|pon|pone|establece|setea|sube|baja|pasa|cambia|poner|poner a)"
-    rem_verbs = r"(?:quita|elimina|borra|saca|quitar|eliminar)"
-
-    # Helper para convertir tokens numericos y palabras como 'medio'->0.5
-    def _to_float(num: str) -> float:
-        if not num:
-            return 1.0
-        s = num.strip().lower()
-        if s in ("medio", "0.5", "0,5", "media"):
-            return 0.5
-        # manejar 'uno'/'dos' simples opcionalmente
-        words = {"uno": 1.0, "dos": 2.0, "tres": 3.0, "cuatro": 4.0}
-        if s in words:
-            return float(words[s])
-        try:
-            return float(s.replace(",", "."))
-        except Exception:
-            return 1.0
-
-    ops: List[Dict[str, Any]] = []
-
-    # Formato directo: "Backend Dev x2" o "PM x0.5"
-    for m in re.finditer(r"([a-zA-Z][a-zA-Z\s/]*?)\s+x\s*(\d+(?:[.,]\d+)?)", t):
-        role, num = m.groups()
-        ops.append({"op": "set", "role": role.strip(), "count": _to_float(num)})
-
-    # Buscar patrones 'añade 0.5 qa' o 'añade qa' (sin número -> 1)
-    for m in re.finditer(fr"{add_verbs}\s+(?:(\d+[.,]?\d*)\s+)?([a-zA-Z\s/]+)", t):
-        num, role = m.groups()
-        ops.append({"op": "add", "role": role.strip(), "count": _to_float(num)})
-
-    # Patrones de set tipo 'pon 2 backend' o 'pon backend a 2'
-    for m in re.finditer(fr"{set_verbs}\s+(?:(\d+[.,]?\d*)\s+)?([a-zA-Z\s/]+)", t):
-        num, role = m.groups()
-    # si el match capturó el rol y el num está en la otra forma, intentar otro regex
-        if role and re.search(r"\d", role) and not num:
-            # intentar invertir grupos
-            inv = re.search(fr"{set_verbs}\s+([a-zA-Z\s/]+)\s+(?:a|en)\s+(\d+[.,]?\d*)", t)
-            if inv:
-                role = inv.group(1); num = inv.group(2)
-        ops.append({"op": "set", "role": role.strip(), "count": _to_float(num)})
-
-    # Patrones 'pon pm a 1' / 'baja backend a 2'
-    for m in re.finditer(fr"{set_verbs}\s+([a-zA-Z\s/]+)\s+(?:a|en)\s+(\d+[.,]?\d*)", t):
-        role, num = m.groups()
-        ops.append({"op": "set", "role": role.strip(), "count": _to_float(num)})
-
-    # Remover roles: 'quita ux' etc.
-    for m in re.finditer(fr"{rem_verbs}\s+([a-zA-Z\s/]+)", t):
-        role = m.group(1)
-        ops.append({"op": "remove", "role": role.strip()})
-
-    # Filtrar ops vacas o mal formadas
-    cleaned: List[Dict[str, Any]] = []
-    for op in ops:
-        r = op.get("role") or ""
-        if not r:
-            continue
-        # normalizar espacios
-        op["role"] = re.sub(r"\s+", " ", r).strip()
-        if op.get("op") in ("add", "set"):
-            try:
-                op["count"] = float(op.get("count", 1.0))
-            except Exception:
-                op["count"] = 1.0
-        cleaned.append(op)
-
-    return {"type": "team", "ops": cleaned} if cleaned else None
-
-
-def _parse_phases_patch(text: str) -> Optional[Dict[str, Any]]:
-    t = _norm(text)
-    ops = []
-    # set weeks: fase X a 8 semanas / cambia 'Sprints de Desarrollo (2w)' a 10 semanas
-    for name, weeks in re.findall(r"(?:fase\s+)?'([^']+?)'\s+a\s+(\d+)\s*sem", t):
-        ops.append({"op": "set_weeks", "name": name.strip(), "weeks": int(weeks)})
-    for weeks, name in re.findall(r"(?:cambia|ajusta|pon)\s+(\d+)\s*sem(?:anas|ana|s)?\s+a\s+'([^']+)'", t):
-        ops.append({"op": "set_weeks", "name": name.strip(), "weeks": int(weeks)})
-
-    # add phase: añade fase 'Pilotaje' 2 semanas
-    for name, weeks in re.findall(r"(?:añade|agrega)\s+fase\s+'([^']+?)'\s+(\d+)\s*sem", t):
-        ops.append({"op": "add", "name": name.strip(), "weeks": int(weeks)})
-
-    # remove phase: quita/elimina fase 'QA'
-    for name in re.findall(r"(?:quita|elimina)\s+fase\s+'([^']+?)'", t):
-        ops.append({"op": "remove", "name": name.strip()})
-
-    if ops:
-        return {"type": "phases", "ops": ops}
-    return None
-
-def _parse_budget_patch(text: str) -> Optional[Dict[str, Any]]:
-    t = _norm(text)
-    role_rates = {}
-    # tarifa de backend a 1200 / rate pm 1300
-    for role, rate in re.findall(r"(?:tarifa|rate)\s+de?\s+([a-zA-Z\s/]+?)\s+a\s+(\d+)", t):
-        role_rates[_canonical_role(role.strip())] = float(rate)
-    # contingencia a 15%
-    cont = re.search(r"contingencia\s+(?:a\s+)?(\d+)\s*%+", t)
-    patch: Dict[str, Any] = {"type": "budget"}
-    if role_rates:
-        patch["role_rates"] = role_rates
-    if cont:
-        patch["contingency_pct"] = float(cont.group(1))
-    if len(patch.keys()) > 1:
-        return patch
-    return None
-
-def _parse_risks_patch(text: str) -> Optional[Dict[str, Any]]:
-    t = _norm(text)
-    add = [s.strip() for s in re.findall(r"(?:añade|agrega)\s+r(?:iesgo|isk)o?:?\s+(.+)", t)]
-    remove = [s.strip() for s in re.findall(r"(?:quita|elimina)\s+r(?:iesgo|isk)o?:?\s+(.+)", t)]
-    if add or remove:
-        return {"type": "risks", "add": add, "remove": remove}
-    return None
+# (la gramática vive en backend/engine/patch_parser.py)
 
 def _parse_any_patch(text: str) -> Optional[Dict[str, Any]]:
-    # prioridad por áreas claras
-    for parser in (_parse_team_patch, _parse_phases_patch, _parse_budget_patch, _parse_risks_patch):
-        patch = parser(text)
-        if patch:
-            return patch
-    return None
+    # un solo parche, con la prioridad de siempre (equipo > fases > presupuesto > riesgos)
+    return first_patch(parse_command(text, _canonical_role)["patches"])
+
+def _parse_all_patches(text: str) -> List[Dict[str, Any]]:
+    """Todos los parches de un mensaje con varios cambios, en orden de aparición."""
+    return parse_command(text, _canonical_role)["patches"]
 
 # ---------- Helpers de riesgos (detalle + plan de prevención) ----------
 
@@ -2735,7 +2803,7 @@ def _render_budget_detail(p: Dict[str, Any]) -> List[str]:
     # Obtener información de industria y ajustes
     industry_note = assumptions.get("industry_note", "")
     rate_multiplier = float(assumptions.get("industry_rate_multiplier", 1.0))
-    base_rates = assumptions.get("base_role_rates_eur_pw", {})
+    base_rates = resolve_table(assumptions.get("base_role_rates_eur_pw"))
 
     cost_by_role, cost_by_activity, activities = _breakdown_by_role_and_activity(p)
 
@@ -2842,7 +2910,6 @@ def _render_budget_detail(p: Dict[str, Any]) -> List[str]:
     return lines
 # ---------- Calendario / plazos: parseo fecha inicio + construcción de timeline ----------
 from datetime import date, datetime, timedelta
-import math
 from typing import Dict, Any, List, Tuple, Optional
 
 _MONTHS_ES = {
@@ -2909,25 +2976,22 @@ def _parse_start_date_es(text: str, today: Optional[date] = None) -> Optional[da
 
     return None
 
-def _build_timeline(proposal: Dict[str, Any], start: date) -> Dict[str, Any]:
-    """Construye events = [{phase,start,end,weeks}] avanzando por semanas."""
-    events: List[Dict[str, Any]] = []
-    current = start
-    for ph in (proposal.get("phases") or []):
-        w = _safe_float(ph.get("weeks", 0.0))
-        days = int(math.ceil(w * 7)) if w > 0 else 0
-        end = current + timedelta(days=days-1) if days > 0 else current
-        events.append({
-            "phase": ph.get("name", "Fase"),
-            "weeks": w,
-            "start": current.isoformat(),
-            "end": end.isoformat()
-        })
-        current = end + timedelta(days=1)
-    return {
+def _build_timeline(proposal: Dict[str, Any], start: date, holidays: Optional[List[Any]] = None,
+                    country: Optional[str] = None) -> Dict[str, Any]:
+    """events = [{phase,start,end,weeks,critical}] en días laborables (CPM de scheduler.schedule)."""
+    sch = schedule(proposal, start, holidays=holidays, country=country)
+    tl = {
         "start_date": start.isoformat(),
-        "events": events
+        "end_date": sch["end_date"],
+        "events": sch["events"],
+        "critical_path": sch["critical_path"],
     }
+    # el calendario se guarda con lo que lo define: al regenerarlo (parches de fases) se reutiliza
+    if holidays:
+        tl["holidays"] = sorted(str(h) for h in holidays)
+    if country:
+        tl["country"] = country
+    return tl
 
 def _render_timeline_text(proposal: Dict[str, Any], start: date) -> List[str]:
     tl = _build_timeline(proposal, start)
@@ -3040,78 +3104,7 @@ def _training_topic_and_method(text: str) -> Tuple[Optional[str], Optional[str]]
     return topic, method
 
 # Contenido por metodología (fases/rituales/roles/métricas/prácticas avanzadas)
-_TRAIN_METHOD = {
-    "Scrum": {
-        "rituales": ["Planning", "Daily", "Review", "Retrospective", "Refinement"],
-        "fases":    ["Incepción/Plan de releases", "Sprints de desarrollo (2 semanas)", "QA/Hardening", "Despliegue y transferencia"],
-        "roles":    ["Product Owner", "Scrum Master", "Equipo de desarrollo (Dev/QA/UX)"],
-        "metrics":  ["Velocidad", "Burndown/Burnup", "Lead time", "Cycle time"],
-        "avanzado": ["Definition of Ready/Done claros", "Descomposición de épicas", "Evitar mini-waterfalls"]
-    },
-    "Kanban": {
-        "rituales": ["Replenishment", "Revisión de flujo", "Retro de flujo"],
-        "fases":    ["Discovery y diseño", "Flujo continuo con WIP", "QA continuo", "Estabilización/operación"],
-        "roles":    ["Product/Project", "Tech Lead", "Equipo (Dev/QA/UX)"],
-        "metrics":  ["Lead time", "Throughput", "WIP", "Cumulative Flow"],
-        "avanzado": ["Políticas explícitas", "Clases de servicio/SLAs", "Gestión de bloqueos"]
-    },
-    "XP": {
-        "rituales": ["Iteraciones cortas", "Planning game", "Retro", "Integración continua"],
-        "fases":    ["Discovery + Historias", "Iteraciones con TDD/Refactor/CI", "Pruebas de aceptación", "Release y traspaso"],
-        "roles":    ["Cliente/PO", "Equipo de desarrollo", "Coach (opcional)"],
-        "metrics":  ["Cobertura de tests", "Frecuencia de despliegue", "Cambios fallidos"],
-        "avanzado": ["TDD/ATDD", "Pair/Mob programming", "Feature toggles"]
-    },
-    "Lean": {
-        "rituales": ["Kaizen", "Gemba", "Revisión del flujo de valor"],
-        "fases":    ["Mapa de valor", "Eliminar desperdicios", "Entregas por demanda"],
-        "roles":    ["Líder de producto", "Equipo multifuncional"],
-        "metrics":  ["Lead time", "Takt time", "WIP"],
-        "avanzado": ["JIT", "Poka-Yoke", "Teoría de colas"]
-    },
-    "Scrumban": {
-        "rituales": ["Daily", "Replenishment", "Retro"],
-        "fases":    ["Backlog a flujo con WIP", "Revisiones periódicas", "Release continuo"],
-        "roles":    ["PO/PM", "Scrum Master o Flow Manager", "Equipo"],
-        "metrics":  ["Velocidad y métricas de flujo"],
-        "avanzado": ["WIP dinámico", "Políticas híbridas sprint/flujo"]
-    },
-    "Crystal": {
-        "rituales": ["Entregas frecuentes", "Retro e inspección", "Revisión de trabajo"],
-        "fases":    ["Inicio ligero", "Iteraciones", "Release"],
-        "roles":    ["Usuarios clave", "Equipo polivalente"],
-        "metrics":  ["Frecuencia de entrega"],
-        "avanzado": ["Ajustar prácticas a tamaño/criticidad"]
-    },
-    "FDD": {
-        "rituales": ["Plan por funcionalidades", "Diseñar por funcionalidad", "Construir por funcionalidad"],
-        "fases":    ["Modelo de dominio", "Lista de funcionalidades", "Diseño y construcción iterativa"],
-        "roles":    ["Chief Programmer", "Class Owners", "Equipo"],
-        "metrics":  ["Progreso por funcionalidad"],
-        "avanzado": ["Feature teams y ownership claro"]
-    },
-    "DSDM": {
-        "rituales": ["Timeboxing", "MoSCoW", "Workshops"],
-        "fases":    ["Preproyecto", "Exploración", "Ingeniería", "Implementación"],
-        "roles":    ["Business Sponsor/Visionary", "Team Leader", "Solution Dev/Tester"],
-        "metrics":  ["Cumplimiento de timebox", "Valor entregado"],
-        "avanzado": ["Facilitación y MoSCoW estricta"]
-    },
-    "SAFe": {
-        "rituales": ["PI Planning", "System demo", "Inspect & Adapt"],
-        "fases":    ["ARTs por PI", "Cadencias sincronizadas", "Release train"],
-        "roles":    ["Product Manager/PO", "RTE", "System Architect"],
-        "metrics":  ["Predictabilidad", "Tiempo de flujo", "Objetivos de PI"],
-        "avanzado": ["Lean Portfolio y guardrails de inversión"]
-    },
-    "DevOps": {
-        "rituales": ["Postmortems sin culpa", "Revisión de pipeline", "Game days"],
-        "fases":    ["Integración continua", "Despliegue continuo", "Operación y observabilidad", "Mejora continua"],
-        "roles":    ["Dev", "Ops/SRE", "Security"],
-        "metrics":  ["DORA: frecuencia despliegue, tiempo de entrega, MTTR, tasa de fallos"],
-        "avanzado": ["Infraestructura como código", "Entrega progresiva", "SLO/SLA y error budgets"]
-    }
-}
+_TRAIN_METHOD: Dict[str, Dict[str, List[str]]] = kb.lazy("train_method")
 
 def _level_label(code: str) -> str:
     return {"beginner": "principiante", "intermediate": "intermedio", "expert": "experto"}.get(code, "?")
@@ -3669,35 +3662,40 @@ def _generate_phase_suggested_questions(phase_info: Dict) -> List[str]:
     return out
 
 
-def _match_phase_user_intent(ntext: str, phase_info: Dict) -> Optional[Tuple[str, Optional[str]]]:
+def _match_phase_user_intent(ntext: str, phase_info: Dict,
+                             items: Optional[Dict[str, Tuple[Tuple[str, str, str], ...]]] = None) -> Optional[Tuple[str, Optional[str]]]:
     """Intent matching simple: devuelve (intent, detail) donde intent ∈ {kpis, deliverables, practices, risks, owners, checklist, roles, timeline}
 
     detail puede contener el nombre concreto (p.ej. nombre del KPI o entregable) si se detecta.
+    `items`: KPIs/entregables/prácticas ya normalizados (_PhaseIndex.items); si no, se normalizan aquí.
     """
     t = _norm(ntext)
+    if items is None:
+        items = {f: tuple(_intent_item(v) for v in ((phase_info.get(f) or (phase_info.get('practicas') if f == 'practices' else None)) or []))
+                 for f in _PHASE_INTENT_FIELDS}
     # palabras clave simples
     if any(k in t for k in ["kpi", "kpis", "indicador", "indicadores", "objetivo", "metrica", "métrica"]):
         # buscar si menciona un KPI concreto
-        for k in (phase_info.get('kpis') or []):
-            if _norm(k) in t or _norm(k).split()[0] in t:
+        for k, nk, first in items['kpis']:
+            if nk in t or first in t:
                 return ("kpis", k)
         return ("kpis", None)
     if any(k in t for k in ["entregable", "entregables", "artefacto", "artefactos", "documentación", "documentacion", "deliverable"]):
-        for d in (phase_info.get('deliverables') or []):
-            if _norm(d) in t or _norm(d).split()[0] in t:
+        for d, nd, first in items['deliverables']:
+            if nd in t or first in t:
                 return ("deliverables", d)
         return ("deliverables", None)
     if any(k in t for k in ["práctica", "practica", "prácticas", "practicas", "pasos", "checklist", "acciones", "cómo hacer", "como hacer", "cómo ejecutar", "como ejecutar"]):
-        for p in (phase_info.get('practices') or phase_info.get('practicas') or []):
-            if _norm(p) in t or _norm(p).split()[0] in t:
+        for p, np_, first in items['practices']:
+            if np_ in t or first in t:
                 return ("practices", p)
         return ("practices", None)
     if any(k in t for k in ["riesgo", "riesgos", "mitig", "mitigar", "riesgo crítico", "blocking"]):
         return ("risks", None)
     if any(k in t for k in ["owner", "propietario", "responsable", "quien", "quién", "a cargo", "encargado"]):
         # si menciona un entregable o rol concreto, devolver detail
-        for d in (phase_info.get('deliverables') or []):
-            if _norm(d) in t:
+        for d, nd, _first in items['deliverables']:
+            if nd in t:
                 return ("owners", d)
         return ("owners", None)
     if any(k in t for k in ["roles", "responsab", "perfil", "perfil requerido", "quién participa", "quién debería"]):
@@ -3823,39 +3821,21 @@ def _merge_proposal_and_catalog_phase(proposal: Optional[Dict[str, Any]], phase_
     phase_name_or_idx: puede ser un nombre parcial de fase o un índice (string de número).
     method: nombre de metodología (normalizado o no).
     """
+    # qué fase de la propuesta y qué entrada del catálogo: resuelto (y memorizado) en el
+    # índice de la versión de la propuesta; el contenido se lee siempre de la propuesta actual
+    idx = _phase_index_for(proposal, method)
+    pi, ci = idx.resolve(phase_name_or_idx)
     merged: Dict = {}
-    # 1) intentar tomar desde proposal si existe
-    if proposal:
-        # si se pasó un número
-        try:
-            idx = int(phase_name_or_idx)
-            phases_prop = proposal.get('phases') or []
-            if 0 <= idx < len(phases_prop):
-                merged.update(phases_prop[idx] or {})
-        except Exception:
-            # intentar match por nombre parcial
-            phases_prop = proposal.get('phases') or []
-            n = _norm_simple(phase_name_or_idx)
-            for ph in phases_prop:
-                if ph and _norm_simple(ph.get('name','')) in n or n in _norm_simple(ph.get('name','')):
-                    merged.update(ph or {})
-                    break
+    # 1) datos de la proposal
+    if pi is not None:
+        ph = ((proposal or {}).get('phases') or [])[pi]
+        merged.update(ph if isinstance(ph, dict) else {})
 
-    # 2) enriquecer con catálogo metodologías
-    try:
-        cat_phases = get_method_phases(method) or []
-        # buscar el mismo por nombre (canon)
-        n = _norm_simple(phase_name_or_idx)
-        for c in cat_phases:
-            cn = _norm_simple(c.get('name',''))
-            if cn and (cn in n or n in cn or (merged.get('name') and _norm_simple(merged.get('name')) in cn or cn in _norm_simple(merged.get('name')))):
-                # añadir solo claves que no estén en merged o que sean vacías
-                for k, v in c.items():
-                    if k not in merged or not merged.get(k):
-                        merged[k] = v
-                break
-    except Exception:
-        pass
+    # 2) enriquecer con catálogo metodologías: solo claves que no estén en merged o vacías
+    if ci is not None:
+        for k, v in idx.catalog[ci].items():
+            if k not in merged or not merged.get(k):
+                merged[k] = v
 
     # 3) asegurarnos de campos clave
     merged.setdefault('name', phase_name_or_idx)
@@ -3914,22 +3894,7 @@ PHASE_SHORT_RESPONSES: Dict[str, Dict[str, Dict[str, str]]] = {
 
 
 # Definiciones cortas para entregables comunes (normalizadas)
-DELIVERABLE_DEFINITIONS: Dict[str, str] = {
-    "backlog priorizado": "Backlog priorizado: lista ordenada de ítems (épicas, historias) priorizados por valor y riesgo; incluye estimaciones, criterios de aceptación y dependencias, y sirve como fuente para planificar sprints/releases.",
-    "backlog": "Backlog priorizado: lista ordenada de ítems (épicas, historias) priorizados por valor y riesgo; incluye estimaciones y criterios de aceptación.",
-    "roadmap de releases": "Roadmap de releases: calendario de alto nivel con hitos y releases previstos, objetivos por release y fechas/marcos temporales aproximados.",
-    "plan de releases": "Roadmap de releases: calendario de alto nivel con hitos y releases previstos y objetivos por release.",
-    "definition of done": "Definition of Done: conjunto de criterios mínimos que debe cumplir una historia para considerarse completa (tests, documentación, revisión de código, despliegue, etc.).",
-    "definition of done inicial": "Definition of Done inicial: versión inicial de los criterios de 'done' acordada en Incepción para validar historias en los primeros sprints.",
-}
-
-# Más definiciones comunes
-DELIVERABLE_DEFINITIONS.update({
-    "runbook operativo": "Runbook operativo: documento paso a paso para operar el servicio en producción (checks, comandos de restauración, responsables y contactos).",
-    "checklist de release": "Checklist de release: lista de verificación previa al despliegue que incluye backups, migrations, variables de entorno, pruebas smoke y pasos de rollback.",
-    "evidencias de pruebas": "Evidencias de pruebas: resultados y artefactos que demuestran la ejecución de pruebas (logs, screenshots, reportes de test).",
-    "acta de aceptación": "Acta de aceptación: documento firmado por stakeholders que valida que los entregables cumplen criterios acordados y acepta el alcance entregado.",
-})
+DELIVERABLE_DEFINITIONS: Dict[str, str] = kb.lazy("deliverable_definitions")
 
 # Mapeo de ejemplos rápidos a respuestas concretas (ejemplos en la ayuda)
 QUICK_EXAMPLES_RESPONSES: Dict[str, str] = {
@@ -3960,17 +3925,32 @@ def _find_deliverable_key(text: str) -> Optional[str]:
     if not text:
         return None
     t = _norm_simple(text)
-    for k in DELIVERABLE_DEFINITIONS.keys():
-        if _norm_simple(k) in t or t in _norm_simple(k):
+    table = _deliverable_table()
+    for k, nk, _tokens in table:
+        if nk in t or t in nk:
             return k
     # intento por tokens: buscar palabras clave por entregable
-    for k in DELIVERABLE_DEFINITIONS.keys():
-        tokens = _phase_tokens(k)
+    for k, _nk, tokens in table:
         if all(tok in t for tok in tokens):
             return k
     return None
 
 
+_DELIVERABLE_TABLE: Tuple[Tuple[int, int], Tuple[Tuple[str, str, Tuple[str, ...]], ...]] = ((-1, -1), ())
+
+
+def _deliverable_table() -> Tuple[Tuple[str, str, Tuple[str, ...]], ...]:
+    """(clave, clave normalizada, tokens) de DELIVERABLE_DEFINITIONS; se rehace si cambia el dict
+    o se recarga el conocimiento."""
+    global _DELIVERABLE_TABLE
+    stamp, table = _DELIVERABLE_TABLE
+    now = (kb.generation(), len(DELIVERABLE_DEFINITIONS))
+    if stamp != now:
+        table = tuple((k, _norm_simple(k), tuple(_phase_tokens(k))) for k in DELIVERABLE_DEFINITIONS)
+        _DELIVERABLE_TABLE = (now, table)
+    return table
+
+
 def _determine_phase_question_type(text: str) -> Optional[str]:
     """Clasifica una pregunta sobre una fase en un tipo simple para devolver
     una respuesta corta y dirigida.
@@ -4070,7 +4050,157 @@ def _short_phase_response(method: str, phase_name: str, qtype: str, proposal: Op
         return f"{phase_name} — fase del proyecto (detalle breve no disponible)."
 
 
+# ===================== cascada de intención =====================
+# Etapa 0: diccionario exacto para turnos cortos (saludo, gracias, despedida) que
+# no dependen del estado. Etapa 1 (confirm): sí/no corto con un cambio pendiente, que
+# va directo a _resolve_pending_change. Si nada de eso, el pipeline completo de abajo
+# (intents ML, detección de nueva propuesta, glosario, regex _asks_*...). Las dos primeras
+# etapas comparten las puertas de longitud de _fast_key.
+
+_GREETING_REPLY = "¡Hola! ¿Quieres generar una propuesta de proyecto o aprender un poco sobre consultoría? Si prefieres aprender, di: quiero formarme."
+_FAREWELL_REPLY = "¡Hasta luego! Si quieres, deja aquí los requisitos y seguiré trabajando en la propuesta."
+_THANKS_REPLY = "¡A ti! Si necesitas presupuesto o plan de equipo, dime los requisitos."
+
+# Sólo entradas cuya respuesta en el pipeline completo es la misma con o sin propuesta
+_FAST_REPLIES: Dict[str, Tuple[str, str]] = {
+    **{k: (_GREETING_REPLY, "Saludo.") for k in (
+        "hola", "buenas", "hey", "hello", "que tal", "hola que tal", "buenas tardes", "buenas noches")},
+    **{k: (_THANKS_REPLY, "Agradecimiento.") for k in (
+        "gracias", "muchas gracias", "mil gracias", "thanks", "thank you")},
+    **{k: (_FAREWELL_REPLY, "Despedida.") for k in (
+        "adios", "hasta luego", "nos vemos", "chao")},
+}
+_FAST_MAX_CHARS = 24
+_FAST_MAX_WORDS = 3
+_FAST_STRIP = str.maketrans("", "", "¡!¿?.,;:")
+# Puerta de palabras clave de la etapa confirm: primera palabra de un sí/no (ver _is_yes/_is_no)
+_CONFIRM_WORDS = frozenset((
+    "si", "s", "ok", "vale", "claro", "adelante", "acepto", "confirmo", "confirmar", "proceder",
+    "aplica", "aplicar", "no", "n", "nop", "negativo", "mejor", "cancela", "cancelar", "anula", "nunca",
+))
+# Flags de contexto en los que un mensaje corto significa otra cosa
+_AWAIT_FLAGS = ("awaiting_employees_data", "awaiting_start_confirmation", "awaiting_employee_choice")
+
+_CASCADE_STAGES = ("stage0", "confirm", "full")
+_CASCADE_STATS: Dict[str, int] = {k: 0 for stage in _CASCADE_STAGES for k in (stage, f"{stage}_ns")}
+
+def _fast_key(text: str) -> Optional[str]:
+    # puertas de longitud antes de normalizar nada
+    if not text or len(text) > _FAST_MAX_CHARS:
+        return None
+    words = _norm(text.translate(_FAST_STRIP)).split()
+    if not words or len(words) > _FAST_MAX_WORDS:
+        return None
+    return " ".join(words)
+
+def _fast_reply(session_id: str, key: Optional[str]) -> Optional[Tuple[str, str]]:
+    if key is None:
+        return None
+    hit = _FAST_REPLIES.get(key)
+    if hit is None:
+        return None
+    # con un cambio pendiente o esperando datos, el turno lo resuelve el pipeline completo
+    if get_pending_change(session_id):
+        return None
+    for flag in _AWAIT_FLAGS:
+        if get_context_value(session_id, flag, False):
+            return None
+    return hit
+
+def _confirm_reply(session_id: str, key: Optional[str], text: str) -> Optional[Tuple[str, str]]:
+    if key is None or key.split()[0] not in _CONFIRM_WORDS:
+        return None
+    pending = get_pending_change(session_id)
+    if not pending:
+        return None
+    proposal, req_text = get_last_proposal(session_id)
+    return _resolve_pending_change(session_id, text, pending, proposal, req_text)
+
+def cascade_stats() -> Dict[str, Any]:
+    """Salidas por etapa de la cascada: nº de turnos, % sobre el total y µs medios."""
+    total = sum(_CASCADE_STATS[stage] for stage in _CASCADE_STAGES)
+    out: Dict[str, Any] = {"total": total}
+    for stage in _CASCADE_STAGES:
+        n = _CASCADE_STATS[stage]
+        out[stage] = {
+            "count": n,
+            "exit_rate": round(n / total, 4) if total else 0.0,
+            "avg_us": round(_CASCADE_STATS[f"{stage}_ns"] / n / 1000.0, 2) if n else 0.0,
+        }
+    return out
+
+def reset_cascade_stats() -> None:
+    for k in _CASCADE_STATS:
+        _CASCADE_STATS[k] = 0
+
+def _resolve_pending_change(session_id: str, text: str, pending: Dict[str, Any],
+                            proposal: Optional[Dict[str, Any]], req_text: Optional[str]) -> Tuple[str, str]:
+    """Turno con un cambio pendiente: sí lo aplica, no lo descarta y otra cosa lo vuelve a preguntar."""
+    pending_val = pending["target_method"]
+    # ¿es un parche general?
+    pending_patch = pending.get("patch")
+    if pending_patch:
+        if _is_yes(text):
+            if not proposal or not req_text:
+                clear_pending_change(session_id)
+                return "Necesito una propuesta base antes de cambiar. Usa '/propuesta: ...'.", "Cambio pendiente sin propuesta."
+            new_plan = _apply_patch(proposal, pending_patch, session_id)
+            set_last_proposal(session_id, new_plan, req_text,
+                              event={"kind": "patch", "patch": pending_patch, "accepts": pending.get("ref")})
+            clear_pending_change(session_id)
+            try:
+                save_proposal(session_id, req_text, new_plan)
+                log_message(session_id, "assistant", f"[CAMBIO CONFIRMADO → {pending_patch.get('type')}]")
+            except Exception:
+                pass
+            return _render_proposal(session_id, new_plan), f"Cambio confirmado ({pending_patch.get('type')})."
+        elif _is_no(text):
+            clear_pending_change(session_id)
+            _log_negotiation(session_id, "rejected", ref=pending.get("ref"))
+            return "Perfecto, mantengo la propuesta tal cual.", "Cambio cancelado por el usuario."
+        else:
+            return "Tengo un cambio pendiente con evaluación. ¿Lo aplico? sí/no", "Esperando confirmación de cambio."
+    else:
+        # flujo original de cambio de metodología
+        if _is_yes(text):
+            target = pending_val  # método objetivo
+            if not proposal or not req_text:
+                clear_pending_change(session_id)
+                return "Necesito una propuesta base antes de cambiar. Usa '/propuesta: ...'.", "Cambio pendiente sin propuesta."
+            new_plan = _retune_plan_for_method(proposal, target)
+            set_last_proposal(session_id, new_plan, req_text,
+                              event={"kind": "methodology", "method": target, "accepts": pending.get("ref")})
+            clear_pending_change(session_id)
+            try:
+                save_proposal(session_id, req_text, new_plan)
+                log_message(session_id, "assistant", f"[CAMBIO CONFIRMADO → {target}]")
+            except Exception:
+                pass
+            return _render_proposal(session_id, new_plan), f"Cambio confirmado a {target}."
+        elif _is_no(text):
+            clear_pending_change(session_id)
+            _log_negotiation(session_id, "rejected", ref=pending.get("ref"))
+            return "Perfecto, mantengo la metodología actual.", "Cambio cancelado por el usuario."
+        else:
+            return "Tengo un cambio de metodología pendiente. ¿Lo aplico? sí/no", "Esperando confirmación de cambio."
+
 def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
+    t0 = time.perf_counter_ns()
+    text = (message or "").strip()
+    key = _fast_key(text)
+    stage, hit = "stage0", _fast_reply(session_id, key)
+    try:
+        if hit is None:
+            stage, hit = "confirm", _confirm_reply(session_id, key, text)
+        if hit is not None:
+            return hit
+        stage = "full"
+        return _generate_reply_full(session_id, message)
+    finally:
+        _CASCADE_STATS[stage] += 1
+        _CASCADE_STATS[f"{stage}_ns"] += time.perf_counter_ns() - t0
+
+def _generate_reply_full(session_id: str, message: str) -> Tuple[str, str]:
     text = message.strip()
     try:
         logger = logging.getLogger(__name__)
@@ -4082,49 +4212,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
     # 0) Cambio pendiente → sí/no (metodología o parches de propuesta)
     pending = get_pending_change(session_id)
     if pending:
-        pending_val = pending["target_method"]
-        # ¿es un parche general?
-        pending_patch = _parse_pending_patch(pending_val)
-        if pending_patch:
-            if _is_yes(text):
-                if not proposal or not req_text:
-                    clear_pending_change(session_id)
-                    return "Necesito una propuesta base antes de cambiar. Usa '/propuesta: ...'.", "Cambio pendiente sin propuesta."
-                new_plan = _apply_patch(proposal, pending_patch)
-                set_last_proposal(session_id, new_plan, req_text)
-                clear_pending_change(session_id)
-                try:
-                    save_proposal(session_id, req_text, new_plan)
-                    log_message(session_id, "assistant", f"[CAMBIO CONFIRMADO → {pending_patch.get('type')}]")
-                except Exception:
-                    pass
-                return _pretty_proposal(new_plan), f"Cambio confirmado ({pending_patch.get('type')})."
-            elif _is_no(text):
-                clear_pending_change(session_id)
-                return "Perfecto, mantengo la propuesta tal cual.", "Cambio cancelado por el usuario."
-            else:
-                return "Tengo un cambio pendiente con evaluación. ¿Lo aplico? sí/no", "Esperando confirmación de cambio."
-        else:
-            # flujo original de cambio de metodología
-            if _is_yes(text):
-                target = pending_val  # método objetivo
-                if not proposal or not req_text:
-                    clear_pending_change(session_id)
-                    return "Necesito una propuesta base antes de cambiar. Usa '/propuesta: ...'.", "Cambio pendiente sin propuesta."
-                new_plan = _retune_plan_for_method(proposal, target)
-                set_last_proposal(session_id, new_plan, req_text)
-                clear_pending_change(session_id)
-                try:
-                    save_proposal(session_id, req_text, new_plan)
-                    log_message(session_id, "assistant", f"[CAMBIO CONFIRMADO → {target}]")
-                except Exception:
-                    pass
-                return _pretty_proposal(new_plan), f"Cambio confirmado a {target}."
-            elif _is_no(text):
-                clear_pending_change(session_id)
-                return "Perfecto, mantengo la metodología actual.", "Cambio cancelado por el usuario."
-            else:
-                return "Tengo un cambio de metodología pendiente. ¿Lo aplico? sí/no", "Esperando confirmación de cambio."
+        return _resolve_pending_change(session_id, text, pending, proposal, req_text)
 
     # Comando explícito: /cambiar: (procesar ANTES de intents para evitar conflictos)
     if text.lower().startswith("/cambiar:"):
@@ -4134,27 +4222,30 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             if not proposal or not req_text:
                 return "Primero necesito una propuesta en esta sesión. Usa '/propuesta: ...' y luego confirma el cambio.", "Cambiar sin propuesta."
             new_plan = _retune_plan_for_method(proposal, target)
-            set_last_proposal(session_id, new_plan, req_text)
+            set_last_proposal(session_id, new_plan, req_text, event={"kind": "methodology", "method": target})
             try:
                 save_proposal(session_id, req_text, new_plan)
                 log_message(session_id, "assistant", f"[CAMBIO METODOLOGIA → {target}]")
             except Exception:
                 pass
-            return _pretty_proposal(new_plan), f"Plan reajustado a {target}."
+            return _render_proposal(session_id, new_plan), f"Plan reajustado a {target}."
         # si no, intentar parsear como parche general (equipo, fases, presupuesto, riesgos, …)
-        patch = _parse_any_patch(arg)
-        if patch:
+        patches = _parse_all_patches(arg)
+        if patches:
             if not proposal:
                 return "Primero necesito una propuesta en esta sesión. Usa '/propuesta: ...' y después propón cambios.", "Cambiar: sin propuesta."
-            # Aplicar cambio directamente sin pedir confirmación
-            new_plan = _apply_patch(proposal, patch)
-            set_last_proposal(session_id, new_plan, req_text)
+            # Aplicar todos los cambios del mensaje directamente sin pedir confirmación (un evento por parche)
+            new_plan = proposal
+            for patch in patches:
+                new_plan = _apply_patch(new_plan, patch, session_id)
+                set_last_proposal(session_id, new_plan, req_text, event={"kind": "patch", "patch": patch})
+            types = ", ".join(pt.get("type") for pt in patches)
             try:
                 save_proposal(session_id, req_text, new_plan)
-                log_message(session_id, "assistant", f"[CAMBIO APLICADO → {patch.get('type')}]")
+                log_message(session_id, "assistant", f"[CAMBIO APLICADO → {types}]")
             except Exception:
                 pass
-            return _pretty_proposal(new_plan), f"Cambio aplicado ({patch.get('type')})."
+            return _render_proposal(session_id, new_plan), f"Cambio aplicado ({types})."
         return "No entendí qué cambiar. Puedes usar ejemplos: '/cambiar: añade 0.5 QA', '/cambiar: contingencia a 15%'", "Cambiar: sin parseo."
 
     # === MODO FORMACIÓN DESHABILITADO: redirigir a sección Aprender ===
@@ -4178,25 +4269,25 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
         if intent == "greet":
             return "¡Hola! ¿Quieres generar una propuesta de proyecto o aprender un poco sobre consultoría? Si prefieres aprender, di: quiero formarme.", "Saludo (intent)."
         if intent == "goodbye":
-            return _training_define_card(tr["level"], method_in_text), f"Formación: qué es {method_in_text}"
+            return get_card("define", tr["level"], method_in_text), f"Formación: qué es {method_in_text}"
         if topic == "ventajas" and method_in_text:
-            return _training_benefits_card(tr["level"], method_in_text), f"Formación: ventajas {method_in_text}"
+            return get_card("benefits", tr["level"], method_in_text), f"Formación: ventajas {method_in_text}"
         if topic == "desventajas" and method_in_text:
-            return _training_disadvantages_card(tr["level"], method_in_text), f"Formación: desventajas {method_in_text}"
+            return get_card("disadvantages", tr["level"], method_in_text), f"Formación: desventajas {method_in_text}"
 
         # Preguntas generales sin método
         if topic == "metodologias":
-            return _training_catalog(tr["level"]), "Formación: catálogo"
+            return get_card("training_catalog", tr["level"]), "Formación: catálogo"
         if topic == "fases":
-            return _training_phases_card(tr["level"]), "Formación: fases"
+            return get_card("phases", tr["level"]), "Formación: fases"
         if topic == "roles":
-            return _training_roles_card(tr["level"]), "Formación: roles"
+            return get_card("roles", tr["level"]), "Formación: roles"
         if topic == "metricas":
-            return _training_metrics_card(tr["level"]), "Formación: métricas"
+            return get_card("metrics", tr["level"]), "Formación: métricas"
 
         # “Quiero aprender sobre <método>”
         if method_in_text:
-            return _training_method_card(method_in_text, tr["level"]), f"Formación: {method_in_text}"
+            return get_card("method", tr["level"], method_in_text), f"Formación: {method_in_text}"
 
         # Ayuda contextual
         return (
@@ -4224,12 +4315,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
     # PERO solo si NO es una intención de nueva propuesta
     try:
         # Verificar primero si es intención de nueva propuesta para no interceptar
-        llm_client_quick = None
-        try:
-            from backend.engine.intent_llm import get_llm_client
-            llm_client_quick = get_llm_client()
-        except Exception:
-            pass
+        llm_client_quick = _get_llm_client()
         wants_new_now, _ = _detect_new_proposal_intent(session_id, text, llm_client_quick)
         
         if not wants_new_now:  # Solo buscar definiciones si NO es nueva propuesta
@@ -4255,6 +4341,11 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
                     matches = search_glossary(term)
                     if matches:
                         return f"{matches[0]}: {get_definition(matches[0])}", "Definición (glosario, parcial)"
+                    # ni exacta ni difusa segura: ofrecer los términos más parecidos
+                    sugg = suggest_glossary_terms(term, limit=3)
+                    if sugg:
+                        opts = ", ".join(f"'{x['term']}'" for x in sugg)
+                        return f"No tengo '{term}' en el glosario. ¿Te refieres a {opts}?", "Definición (glosario, sugerencias)"
                 except Exception:
                     pass
     except Exception:
@@ -4399,12 +4490,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
     try:
         # Evitar colisión con comando explícito ya soportado más abajo
         if not text.lower().startswith("/propuesta:"):
-            llm_client = None
-            try:
-                from backend.engine.intent_llm import get_llm_client  # opcional
-                llm_client = get_llm_client()
-            except Exception:
-                llm_client = None
+            llm_client = _get_llm_client()
 
             wants_new, _flags = _detect_new_proposal_intent(session_id, text, llm_client)
             print(f"[BRAIN DEBUG] _detect_new_proposal_intent: wants_new={wants_new}, text='{text[:80]}'", flush=True)
@@ -4421,7 +4507,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
                 # Añadir fuentes de metodología si están disponibles
                 try:
                     info = METHODOLOGIES.get(p.get("methodology", ""), {})
-                    p["methodology_sources"] = info.get("sources", [])
+                    p["methodology_sources"] = source_refs(info.get("sources", []))
                 except Exception:
                     pass
 
@@ -4448,7 +4534,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
                     pass
 
                 try:
-                    pretty = _pretty_proposal(p)
+                    pretty = _render_proposal(session_id, p)
                 except Exception:
                     team = ", ".join(f"{r.get('role')} x{r.get('count')}" for r in (p.get("team") or []))
                     phases = " → ".join(f"{ph.get('name','')} ({ph.get('weeks',0)}s)" for ph in (p.get("phases") or []))
@@ -4616,7 +4702,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             pass
         p = generate_proposal(req)
         info = METHODOLOGIES.get(p.get("methodology", ""), {})
-        p["methodology_sources"] = info.get("sources", [])
+        p["methodology_sources"] = source_refs(info.get("sources", []))
         set_last_proposal(session_id, p, req)
         try:
             save_proposal(session_id, req, p)
@@ -4625,7 +4711,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             log_message(session_id, "assistant", f"[PROPUESTA {p['methodology']}] {p['budget']['total_eur']} €")
         except Exception:
             pass
-        return _pretty_proposal(p), "Propuesta generada."
+        return _render_proposal(session_id, p), "Propuesta generada."
 
     # Cambio natural de metodología: consejo + confirmación
     change_req = _parse_change_request(text)
@@ -4669,8 +4755,10 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             if evitar_target:
                 msg.append(f"Riesgos si cambiamos a {target}: " + "; ".join(evitar_target))
 
-        set_pending_change(session_id, target)
         msg.append(f"¿Quieres que cambie el plan a {target} ahora? sí/no")
+        ref = _log_negotiation(session_id, "proposed", method=target, not_recommended=not advisable,
+                               raw="\n".join(msg), impact=msg[1:-1])
+        set_pending_change(session_id, target, ref=ref)
         return "\n".join(msg), "Consejo de cambio con confirmación."
 
     # Cambios naturales a otras áreas → confirmación con parche + evaluación
@@ -4679,15 +4767,15 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
         if patch:
             # Si el parche es solo de contingencia, aplicarlo directamente sin confirmación
             if patch.get("type") == "budget" and "contingency_pct" in patch and "role_rates" not in patch:
-                new_plan = _apply_patch(proposal, patch)
-                set_last_proposal(session_id, new_plan, req_text)
+                new_plan = _apply_patch(proposal, patch, session_id)
+                set_last_proposal(session_id, new_plan, req_text, event={"kind": "patch", "patch": patch})
                 try:
                     save_proposal(session_id, req_text, new_plan)
                     log_message(session_id, "assistant", f"[CONTINGENCIA ACTUALIZADA → {patch['contingency_pct']}%]")
                 except Exception:
                     pass
                 # Mostrar solo la propuesta actualizada sin el desglose detallado
-                return _pretty_proposal(new_plan), f"Contingencia actualizada a {patch['contingency_pct']}%."
+                return _render_proposal(session_id, new_plan), f"Contingencia actualizada a {patch['contingency_pct']}%."
             else:
                 return _make_pending_patch(session_id, patch, proposal, req_text)
 
@@ -4695,7 +4783,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
     if _asks_sources(text):
         sour = []
         if proposal:
-            sour.extend(proposal.get("methodology_sources", []) or METHODOLOGIES.get(proposal.get("methodology",""),{}).get("sources", []))
+            sour.extend(expand_sources(proposal.get("methodology_sources")) or METHODOLOGIES.get(proposal.get("methodology",""),{}).get("sources", []))
             for s in AGILE_TEAM_SOURCES:
                 sour.append(s)
             text_out = "Fuentes generales de la propuesta — referencias:\n" + _format_sources(sour)
@@ -4703,10 +4791,24 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
         else:
             return ("Aún no tengo una propuesta guardada en esta sesión. Genera una con '/propuesta: ...' y te cito autores y documentación."), "Citas: sin propuesta."
 
+    # Riesgo cuantitativo: Monte Carlo de coste y plazo (P50/P80/P95)
+    if _asks_risk_simulation(text):
+        if not proposal:
+            return ("Para simular coste y plazo necesito una propuesta. Genera una con '/propuesta: ...'."), "Monte Carlo sin propuesta."
+        try:
+            from backend.engine.risk_sim import simulate, summary_lines
+            mc = simulate(proposal, req_text or "")
+            set_last_area(session_id, "riesgos")
+            return ("📊 Simulación Monte Carlo (" + f"{mc['samples']:,}".replace(",", ".") + " escenarios):\n- "
+                    + "\n- ".join(summary_lines(mc))), "Monte Carlo coste/plazo."
+        except Exception:
+            logging.getLogger(__name__).exception("Error en la simulación Monte Carlo")
+
     # Casos similares
-    if _SIM is not None and _asks_similar(text):
+    sim = _similar_retriever() if _asks_similar(text) else None
+    if sim is not None:
         query = req_text or text
-        sims = _SIM.retrieve(query, top_k=3)
+        sims = sim.retrieve(query, top_k=3)
         if not sims:
             return "Aún no tengo casos guardados suficientes para comparar. Genera una propuesta con '/propuesta: ...' y lo intento de nuevo.", "Similares: sin datos."
         lines = []
@@ -4714,7 +4816,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             team = ", ".join(f"{r['role']} x{r['count']}" for r in s.get("team", []))
             total = s.get("budget", {}).get("total_eur")
             lines.append(f"• Caso #{s['id']} — Metodología {s['methodology']}, Equipo: {team}, Total: {total} €, similitud {s['similarity']:.2f}")
-        return "Casos similares en mi memoria:\n" + "\n".join(lines), "Similares (k-NN TF-IDF)."
+        return "Casos similares en mi memoria:\n" + "\n".join(lines), "Similares (BM25 + TF-IDF)."
 
     # CALENDARIO / PLAZOS: pide fecha, calcula y prepara confirmación
     if _looks_like_timeline_intent(text) or _parse_start_date_es(text) is not None:
@@ -4810,7 +4912,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             try:
                 tmp = generate_proposal(seed)
                 info = METHODOLOGIES.get(tmp.get("methodology", ""), {})
-                tmp["methodology_sources"] = info.get("sources", [])
+                tmp["methodology_sources"] = source_refs(info.get("sources", []))
                 set_last_proposal(session_id, tmp, seed)
                 proposal = tmp
             except Exception:
@@ -4838,7 +4940,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             set_last_area(session_id, "metodologia")
         except Exception:
             pass
-        return _catalog_text(), "Catálogo de metodologías."
+        return get_card("catalog"), "Catálogo de metodologías."
 
     methods_in_text = _mentioned_methods(text)
     if _asks_method_definition(text) and len(methods_in_text) == 1:
@@ -4847,15 +4949,15 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
         except Exception:
             pass
         m = methods_in_text[0]
-        return _method_overview_text(m), f"Definición de {m}."
+        return get_card("overview", method=m), f"Definición de {m}."
 
     # Intenciones básicas
     if _is_greeting(text):
-        return "¡Hola! ¿Quieres generar una propuesta de proyecto o aprender un poco sobre consultoría? Si prefieres aprender, di: quiero formarme.", "Saludo."
+        return _GREETING_REPLY, "Saludo."
     if _is_farewell(text):
-        return "¡Hasta luego! Si quieres, deja aquí los requisitos y seguiré trabajando en la propuesta.", "Despedida."
+        return _FAREWELL_REPLY, "Despedida."
     if _is_thanks(text):
-        return "¡A ti! Si necesitas presupuesto o plan de equipo, dime los requisitos.", "Agradecimiento."
+        return _THANKS_REPLY, "Agradecimiento."
     if _is_help(text):
         return (
             "Puedo ayudarte exclusivamente con la fase Incepción / Discovery. Puedes preguntarme específicamente:\n\n"
@@ -4902,7 +5004,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             try:
                 tmp = generate_proposal(seed)
                 info = METHODOLOGIES.get(tmp.get("methodology", ""), {})
-                tmp["methodology_sources"] = info.get("sources", [])
+                tmp["methodology_sources"] = source_refs(info.get("sources", []))
                 set_last_proposal(session_id, tmp, seed)
                 proposal = tmp
             except Exception:
@@ -4989,26 +5091,19 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
         method = (proposal or {}).get('methodology', 'Scrum')
         try:
             # Normalizar el nombre de la metodología para buscar las fases
-            method_normalized = normalize_method_name(method)
-            phases = get_method_phases(method_normalized) or []
+            phase_idx = _phase_index_for(proposal, normalize_method_name(method))
         except Exception:
-            phases = []
-        
-        # Buscar la fase específica
-        phase_info = None
-        if phases:
-            n = _norm_simple(phase_mentioned)
-            for ph in phases:
-                pn = _norm_simple(ph.get('name', '') or '')
-                if pn and (pn in n or n in pn):
-                    phase_info = ph
-                    break
+            phase_idx = _phase_index_for(proposal, '')
+
+        # Buscar la fase específica en el catálogo (resuelto en el índice de la propuesta)
+        phase_ci = phase_idx.catalog_by_name(phase_mentioned)
+        phase_info = phase_idx.catalog[phase_ci] if phase_ci is not None else None
         
         # Construir respuesta contextual basada en el conocimiento de la fase
         if phase_info:
             try:
                 # Intent match: si el usuario pregunta algo concreto sobre KPIs/entregables/prácticas/riesgos/owners
-                intent_match = _match_phase_user_intent(ntext, phase_info)
+                intent_match = _match_phase_user_intent(ntext, phase_info, phase_idx.items(phase_ci))
                 if intent_match:
                     intent, detail = intent_match
                     pieces: List[str] = [f">> Sobre la fase {phase_info.get('name', phase_mentioned)} (metodología: {method}):\n"]
@@ -5254,7 +5349,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
         if not phases:
             # Fallback a la ficha de la metodología si no hay fases estructuradas
             try:
-                return _method_overview_text(method), f"Fases (metodología: {method})"
+                return get_card("overview", method=method), f"Fases (metodología: {method})"
             except Exception:
                 return (f"No tengo definidas las fases para {method}."), f"Fases: sin datos {method}"
 
@@ -5319,7 +5414,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             set_last_area(session_id, "metodologia")
         except Exception:
             pass
-        return _catalog_text(), "Metodologías (catálogo)."
+        return get_card("catalog"), "Metodologías (catálogo)."
 
     # Presupuesto (detalle visible) - incluye desglose y detalle
     if ((_asks_budget(text) or "presupuesto" in _norm(text) or "mostrar presupuesto detallado" in _norm(text)) and not _asks_why(text)) or _asks_budget_breakdown(text) or "desglose" in _norm(text) or "detalle" in _norm(text):
@@ -5455,7 +5550,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
     if _looks_like_requirements(text):
         p = generate_proposal(text)
         info = METHODOLOGIES.get(p.get("methodology", ""), {})
-        p["methodology_sources"] = info.get("sources", [])
+        p["methodology_sources"] = source_refs(info.get("sources", []))
         set_last_proposal(session_id, p, text)
         try:
             log_message(session_id, "user", f"[REQ] {text}")
@@ -5465,7 +5560,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             log_message(session_id, "assistant", f"[PROPUESTA {p['methodology']}] {p['budget']['total_eur']} €")
         except Exception:
             pass
-        return _pretty_proposal(p), "Propuesta a partir de requisitos."
+        return _render_proposal(session_id, p), "Propuesta a partir de requisitos."
 
     # === MANEJO DE ACCIONES GUIADAS ===
     # Primero verificar si es una solicitud de acción específica
@@ -5490,7 +5585,7 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
                 try:
                     tmp = generate_proposal(seed)
                     info = METHODOLOGIES.get(tmp.get("methodology", ""), {})
-                    tmp["methodology_sources"] = info.get("sources", [])
+                    tmp["methodology_sources"] = source_refs(info.get("sources", []))
                     # Guardamos la propuesta en la sesión para que siguientes acciones
                     # la reutilicen sin regenerarla.
                     set_last_proposal(session_id, tmp, seed)
@@ -5506,12 +5601,13 @@ def generate_reply(session_id: str, message: str) -> Tuple[str, str]:
             if methods_in_text:
                 try:
                     forced = methods_in_text[0]
-                    proposal["methodology"] = forced
-                    info = METHODOLOGIES.get(forced, {})
-                    proposal["methodology_sources"] = info.get("sources", [])
+                    # propuesta nueva (la de la sesión está en el log de negociación: no se muta),
+                    # con el mismo reajuste que re-aplica el log para un evento "methodology"
+                    proposal = _retune_plan_for_method(proposal, forced)
                     # Persistir el cambio para próximas interacciones en la sesión
                     try:
-                        set_last_proposal(session_id, proposal, req_text)
+                        set_last_proposal(session_id, proposal, req_text,
+                                          event={"kind": "methodology", "method": forced})
                     except Exception:
                         pass
                 except Exception:
@@ -0,0 +1,390 @@
+# backend/engine/capacity.py
+"""
+Planificador de capacidad multi-proyecto sobre la plantilla del usuario.
+
+Cada propuesta se staffea por separado (_suggest_staffing / solve_staffing), así que la
+misma Senior Backend sale al 100% en cinco proyectos que se solapan. Aquí se mira la
+cartera entera:
+
+  1) demanda: por proyecto y rol, FTE (team de la propuesta) × semanas en las que el rol
+     trabaja (timeline CPM de scheduler.schedule_many y roles por tipo de fase de _PHASE_ROLES)
+  2) matriz de puntuación rol × persona UNA vez para todos los roles de la cartera
+     (staffing.score_matrix, con el índice de skills del usuario si se pasa)
+  3) baseline "cada proyecto por su cuenta": asignación greedy por proyecto, como hoy
+  4) carga semana × persona en NumPy (np.add.at sobre la máscara de semanas activas)
+     → sobreasignación = semanas con carga > disponibilidad
+  5) nivelación con PuLP (LP): x[p,k] = FTE de la persona p en el hueco k=(proyecto, rol)
+        max  Σ (COVER_WEIGHT + score) · semanas_k · x[p,k]
+        s.a. Σ_p x[p,k] ≤ FTE_k
+             Σ_{k activos en w} x[p,k] ≤ disponibilidad_p   ∀ persona, ∀ conjunto distinto
+                                                            de huecos activos a la vez
+     Las restricciones por semana se deduplican por conjunto de huecos activos (en la
+     práctica unas pocas por persona) y sólo se crean variables para los mejores
+     candidatos de cada hueco. Sin PuLP → greedy por fecha de inicio respetando la carga.
+
+Los proyectos no se mueven en el tiempo: lo que no cabe sale como demanda sin cubrir.
+"""
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import time
+
+import numpy as np
+
+from backend.engine.staffing import COVER_WEIGHT, MIN_SCORE, _availability, score_matrix
+from backend.engine.skill_index import SkillIndex
+
+try:
+    import pulp  # type: ignore
+except Exception:  # pragma: no cover
+    pulp = None
+
+DEFAULT_CANDIDATES = 16
+ILP_TIME_LIMIT_S = 20
+EPS = 1e-6
+
+
+def _brain():
+    from backend.engine import brain
+    return brain
+
+
+def _monday(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def _as_date(v: Any) -> Optional[date]:
+    if isinstance(v, date):
+        return v
+    try:
+        return datetime.fromisoformat(str(v)[:10]).date()
+    except Exception:
+        return None
+
+
+def phase_role_fte(proposal: Dict[str, Any]) -> List[Tuple[str, str, float]]:
+    """
+    (fase, rol, FTE) de una propuesta. Un rol trabaja en las fases cuyo tipo lo espera
+    (_PHASE_ROLES); los roles que no aparecen en ningún tipo (ML, Seguridad...) en todas.
+    """
+    b = _brain()
+    team: Dict[str, float] = {}
+    for r in proposal.get("team", []) or []:
+        if r.get("role"):
+            team[r["role"]] = team.get(r["role"], 0.0) + b._safe_float(r.get("count", 0))
+    known = {role for roles in b._PHASE_ROLES.values() for role in roles}
+    out = []
+    for ph in proposal.get("phases", []) or []:
+        expected = set(b._PHASE_ROLES.get(b._phase_key(ph.get("name", "")), []))
+        for role, fte in team.items():
+            if fte > 0 and (role in expected or role not in known):
+                out.append((ph.get("name", "Fase"), role, fte))
+    return out
+
+
+def _events_many(items: List[Tuple[Dict[str, Any], Optional[date]]]) -> List[List[Dict[str, Any]]]:
+    """Eventos de cada propuesta: su timeline si coincide el inicio; el resto, CPM en un solo lote."""
+    out: List[Optional[List[Dict[str, Any]]]] = []
+    pending: List[int] = []
+    for i, (p, start) in enumerate(items):
+        tl = p.get("timeline") or {}
+        if tl.get("events") and (start is None or _as_date(tl.get("start_date")) == start):
+            out.append(tl["events"])
+        else:
+            out.append(None)
+            pending.append(i)
+    if pending:
+        from backend.engine.scheduler import schedule_many
+        res = schedule_many([items[i][0] for i in pending],
+                            [items[i][1] or _monday(date.today()) for i in pending], include_tasks=False)
+        for i, r in zip(pending, res):
+            out[i] = r["events"]
+    return out  # type: ignore[return-value]
+
+
+def build_demand(projects: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    projects: [{"id", "proposal", "start"?}] → huecos k=(proyecto, rol) con FTE y máscara
+    de semanas activas (K × W) sobre una rejilla semanal común.
+    """
+    spans = []   # (proyecto, rol, fte, inicio, fin)
+    items = []
+    for pr in projects:
+        p = pr.get("proposal") or {}
+        items.append((p, _as_date(pr.get("start")) or _as_date((p.get("timeline") or {}).get("start_date"))))
+    for pr, (p, _), events in zip(projects, items, _events_many(items)):
+        ev = {e["phase"]: e for e in events}
+        for phase, role, fte in phase_role_fte(p):
+            e = ev.get(phase)
+            if e:
+                spans.append((pr["id"], role, fte, _as_date(e["start"]), _as_date(e["end"])))
+    if not spans:
+        return {"weeks": [], "slots": [], "mask": np.zeros((0, 0), dtype=bool)}
+
+    grid0 = _monday(min(s[3] for s in spans))
+    n_weeks = (max(s[4] for s in spans) - grid0).days // 7 + 1
+    slot_of: Dict[Tuple[Any, str], int] = {}
+    slots: List[Dict[str, Any]] = []
+    rows: List[Tuple[int, int, int]] = []
+    for pid, role, fte, s, e in spans:
+        k = slot_of.get((pid, role))
+        if k is None:
+            k = slot_of[(pid, role)] = len(slots)
+            slots.append({"project": pid, "role": role, "fte": fte})
+        rows.append((k, (s - grid0).days // 7, (e - grid0).days // 7))
+    mask = np.zeros((len(slots), n_weeks), dtype=bool)
+    for k, w0, w1 in rows:
+        mask[k, w0:w1 + 1] = True
+    weeks = [(grid0 + timedelta(weeks=i)).isoformat() for i in range(n_weeks)]
+    return {"weeks": weeks, "slots": slots, "mask": mask}
+
+
+def load_matrix(assign: List[Tuple[int, int, float]], mask: np.ndarray, n_people: int) -> np.ndarray:
+    """Carga persona × semana (FTE) a partir de asignaciones (persona, hueco, FTE)."""
+    load = np.zeros((n_people, mask.shape[1]))
+    if assign:
+        p = np.fromiter((a[0] for a in assign), dtype=np.int64, count=len(assign))
+        k = np.fromiter((a[1] for a in assign), dtype=np.int64, count=len(assign))
+        f = np.fromiter((a[2] for a in assign), dtype=float, count=len(assign))
+        np.add.at(load, p, f[:, None] * mask[k])
+    return load
+
+
+def _candidates(scores: np.ndarray, avail: np.ndarray, n: int) -> np.ndarray:
+    row = np.where((avail > 0) & (scores >= MIN_SCORE), scores, -np.inf)
+    kk = min(n, row.size)
+    idx = np.argpartition(-row, kk - 1)[:kk] if kk < row.size else np.arange(row.size)
+    idx = idx[np.isfinite(row[idx])]
+    return idx[np.argsort(-row[idx], kind="stable")]
+
+
+def _windows(slots, mask, pools: Dict[str, np.ndarray], size: int) -> List[np.ndarray]:
+    """
+    Candidatos del LP por hueco: los mejores del rol + una ventana de la bolsa que va
+    rotando entre los huecos del mismo rol (ordenados por inicio). Así el LP tiene
+    huecos × size variables y no huecos × bolsa, y los huecos que se solapan en el tiempo
+    miran a gente distinta.
+    """
+    out: List[np.ndarray] = [np.array([], dtype=int)] * len(slots)
+    by_role: Dict[str, List[int]] = {}
+    for k, s in enumerate(slots):
+        by_role.setdefault(s["role"], []).append(k)
+    for r, ks in by_role.items():
+        pool = pools[r]
+        if len(pool) <= size:
+            for k in ks:
+                out[k] = pool
+            continue
+        head = max(1, size // 4)
+        rest = pool[head:]
+        width = size - head
+        ks.sort(key=lambda k: int(np.argmax(mask[k])))
+        for j, k in enumerate(ks):
+            n = min(len(rest), max(width, int(math.ceil(slots[k]["fte"])) * 3))
+            win = np.take(rest, np.arange(j * width, j * width + n), mode="wrap")
+            out[k] = np.array(list(dict.fromkeys(pool[:head].tolist() + win.tolist())), dtype=int)
+    return out
+
+
+def _isolated(slots, cands, avail) -> List[Tuple[int, int, float]]:
+    # baseline: cada proyecto se staffea solo (la disponibilidad se "resetea" por proyecto)
+    out = []
+    by_project: Dict[Any, List[int]] = {}
+    for k, s in enumerate(slots):
+        by_project.setdefault(s["project"], []).append(k)
+    for ks in by_project.values():
+        left = {}
+        for k in ks:
+            need = slots[k]["fte"]
+            for p in cands[k].tolist():
+                if need <= EPS:
+                    break
+                cap = left.get(p, avail[p])
+                take = min(cap, need)
+                if take > EPS:
+                    out.append((p, k, round(float(take), 3)))
+                    left[p] = cap - take
+                    need -= take
+    return out
+
+
+def _level_greedy(slots, cands, avail, mask) -> List[Tuple[int, int, float]]:
+    load = np.zeros((len(avail), mask.shape[1]))
+    order = sorted(range(len(slots)), key=lambda k: (int(np.argmax(mask[k])), -slots[k]["fte"]))
+    out = []
+    for k in order:
+        need = slots[k]["fte"]
+        act = mask[k]
+        if not act.any():
+            continue
+        for p in cands[k].tolist():
+            if need <= EPS:
+                break
+            free = float(avail[p] - load[p, act].max())
+            take = min(free, need)
+            if take > EPS:
+                load[p, act] += take
+                out.append((p, k, round(take, 3)))
+                need -= take
+    return out
+
+
+def _level_lp(slots, cands, scores_k, avail, mask) -> Optional[List[Tuple[int, int, float]]]:
+    if pulp is None:
+        return None
+    prob = pulp.LpProblem("leveling", pulp.LpMaximize)
+    x: Dict[Tuple[int, int], Any] = {}
+    by_person: Dict[int, List[int]] = {}
+    weeks_k = mask.sum(axis=1)
+    obj = []
+    for k, idx in enumerate(cands):
+        if not weeks_k[k]:
+            continue
+        for j, p in enumerate(idx.tolist()):
+            v = pulp.LpVariable(f"x_{p}_{k}", lowBound=0, upBound=min(avail[p], slots[k]["fte"]))
+            x[p, k] = v
+            by_person.setdefault(p, []).append(k)
+            obj.append((COVER_WEIGHT + scores_k[k][j]) * float(weeks_k[k]) * v)
+    if not x:
+        return []
+    prob += pulp.lpSum(obj)
+    for k in range(len(slots)):
+        vs = [x[p, k] for p in cands[k].tolist() if (p, k) in x]
+        if len(vs) > 1:
+            prob += pulp.lpSum(vs) <= slots[k]["fte"]
+    # capacidad: una restricción por conjunto distinto de huecos activos a la vez
+    for p, ks in by_person.items():
+        if len(ks) < 2:
+            continue
+        # semanas con el mismo conjunto de huecos activos → una sola restricción, y sólo
+        # los conjuntos maximales (un subconjunto nunca es más restrictivo)
+        sets = {frozenset(ks[i] for i in np.flatnonzero(col)) for col in np.unique(mask[ks].T, axis=0)}
+        keep: List[frozenset] = []
+        for st in sorted((st for st in sets if len(st) > 1), key=len, reverse=True):
+            if not any(st <= t for t in keep):
+                keep.append(st)
+        for st in keep:
+            prob += pulp.lpSum(x[p, k] for k in st) <= avail[p]
+    try:
+        prob.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=ILP_TIME_LIMIT_S))
+    except Exception:
+        return None
+    if prob.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        return None
+    out = []
+    for (p, k), v in x.items():
+        val = math.floor(1000 * (v.value() or 0.0) + 1e-6) / 1000   # redondeo hacia abajo: nunca pasarse de capacidad
+        if val > EPS:
+            out.append((p, k, val))
+    # con límite de tiempo CBC puede devolver algo no factible: entonces mejor el greedy
+    if (load_matrix(out, mask, len(avail)) > avail[:, None] + 1e-3).any():
+        return None
+    return out
+
+
+def _report(load: np.ndarray, avail: np.ndarray, people, weeks, limit: int) -> Dict[str, Any]:
+    over = load > avail[:, None] + 1e-3
+    rows = np.flatnonzero(over.any(axis=1))
+    items = []
+    for i in rows.tolist():
+        w = np.flatnonzero(over[i])
+        items.append({
+            "name": people[i].get("name"),
+            "id": people[i].get("id", i),
+            "availability_pct": round(100 * float(avail[i])),
+            "peak_load_pct": round(100 * float(load[i].max())),
+            "overloaded_weeks": int(w.size),
+            "first_week": weeks[int(w[0])],
+        })
+    items.sort(key=lambda it: (-it["peak_load_pct"], -it["overloaded_weeks"]))
+    cap = float(avail.sum()) * load.shape[1]
+    return {
+        "overallocated_people": len(items),
+        "overallocated_person_weeks": int(over.sum()),
+        "max_load_pct": round(100 * float(load.max())) if load.size else 0,
+        "avg_utilization_pct": round(100 * float(load.sum()) / cap, 1) if cap else 0.0,
+        "overallocated": items[:limit],
+    }
+
+
+def _shortfall(assign, slots, mask, limit: int) -> Tuple[float, List[Dict[str, Any]]]:
+    got = np.zeros(len(slots))
+    for _, k, f in assign:
+        got[k] += f
+    need = np.array([s["fte"] for s in slots])
+    weeks = mask.sum(axis=1)
+    total = float((need * weeks).sum()) or 1.0
+    coverage = 100.0 * float((np.minimum(got, need) * weeks).sum()) / total
+    miss = [{"project": slots[k]["project"], "role": slots[k]["role"], "fte": slots[k]["fte"],
+             "missing_fte": round(float(need[k] - got[k]), 3), "weeks": int(weeks[k])}
+            for k in np.flatnonzero(need - got > 1e-3).tolist()]
+    miss.sort(key=lambda m: -m["missing_fte"] * m["weeks"])
+    return round(coverage, 1), miss[:limit]
+
+
+def plan_capacity(projects: List[Dict[str, Any]], people: List[Dict[str, Any]], index: Optional[SkillIndex] = None,
+                  solver: str = "auto", candidates_per_slot: int = DEFAULT_CANDIDATES, include_matrix: bool = False,
+                  include_assignments: bool = True, limit: int = 50) -> Dict[str, Any]:
+    """
+    Capacidad de la cartera: baseline (proyectos por separado) vs. asignación nivelada.
+    projects: [{"id", "proposal", "start"?: "YYYY-MM-DD"}]; people: dicts de staff (con "id").
+    """
+    t0 = time.perf_counter()
+    dem = build_demand(projects)
+    slots, mask, weeks = dem["slots"], dem["mask"], dem["weeks"]
+    avail = np.array([_availability(p) for p in people], dtype=float)
+
+    roles = sorted({s["role"] for s in slots})
+    scores = score_matrix(roles, people, index=index) if roles and people else np.zeros((len(roles), len(people)))
+    row_of = {r: i for i, r in enumerate(roles)}
+    # bolsa de candidatos por rol dimensionada por el pico de demanda semanal de ese rol en
+    # toda la cartera (si no, todos los proyectos se pelearían por los mismos 12)
+    fte = np.array([s["fte"] for s in slots])
+    peak: Dict[str, float] = {}
+    for r in roles:
+        sel = np.array([s["role"] == r for s in slots])
+        peak[r] = float((fte[sel, None] * mask[sel]).sum(axis=0).max()) if mask.size else 0.0
+    mean_avail = float(avail[avail > 0].mean()) if (avail > 0).any() else 1.0
+    pools: Dict[str, np.ndarray] = {}
+    for r in roles:
+        n = candidates_per_slot + int(math.ceil(1.5 * peak[r] / mean_avail))
+        pools[r] = _candidates(scores[row_of[r]], avail, n) if people else np.array([], dtype=int)
+    cands = [pools[s["role"]] for s in slots]
+    lp_cands = _windows(slots, mask, pools, candidates_per_slot)
+    lp_scores = [scores[row_of[s["role"]], lp_cands[k]].tolist() if people else [] for k, s in enumerate(slots)]
+
+    base = _isolated(slots, cands, avail)
+    used = None
+    level = None
+    if solver in ("auto", "lp"):
+        level = _level_lp(slots, lp_cands, lp_scores, avail, mask)
+        used = "lp" if level is not None else None
+    if level is None and solver in ("auto", "greedy"):
+        level = _level_greedy(slots, cands, avail, mask)
+        used = "greedy"
+    if level is None:
+        raise ValueError(f"Solver de capacidad no disponible: {solver}")
+
+    base_load = load_matrix(base, mask, len(people))
+    level_load = load_matrix(level, mask, len(people))
+    base_cov, _ = _shortfall(base, slots, mask, limit)
+    level_cov, level_miss = _shortfall(level, slots, mask, limit)
+    out: Dict[str, Any] = {
+        "solver": used,
+        "projects": len(projects),
+        "people": len(people),
+        "weeks": weeks,
+        "slots": len(slots),
+        "baseline": {**_report(base_load, avail, people, weeks, limit), "coverage_pct": base_cov},
+        "leveled": {**_report(level_load, avail, people, weeks, limit), "coverage_pct": level_cov,
+                    "shortfall": level_miss},
+    }
+    if include_assignments:
+        out["assignments"] = [{"project": slots[k]["project"], "role": slots[k]["role"],
+                               "person": people[p].get("name"), "person_id": people[p].get("id", p), "fte": f}
+                              for p, k, f in sorted(level, key=lambda a: (str(slots[a[1]]["project"]), a[1], -a[2]))]
+    if include_matrix:
+        out["load"] = {"baseline": base_load.round(3).tolist(), "leveled": level_load.round(3).tolist()}
+    out["elapsed_ms"] = round(1000 * (time.perf_counter() - t0), 1)
+    return out
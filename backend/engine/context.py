@@ -8,17 +8,31 @@ def get_last_proposal(session_id: str) -> Tuple[Optional[Dict[str, Any]], Option
     s = _SESS.get(session_id, {})
     return s.get("proposal"), s.get("requirements")
 
-def set_last_proposal(session_id: str, proposal: Dict[str, Any], requirements: str) -> None:
+def set_last_proposal(session_id: str, proposal: Dict[str, Any], requirements: str,
+                      event: Optional[Dict[str, Any]] = None) -> None:
+    """Guarda la propuesta y la apunta en el log de negociación. `event` describe el cambio
+    ({'kind': 'patch', 'patch': ...} / {'kind': 'methodology', 'method': ...}); sin él se
+    registra como propuesta completa nueva."""
     s = _SESS.setdefault(session_id, {})
     s["proposal"] = proposal
     s["requirements"] = requirements
+    ev = dict(event or {"kind": "proposal", "requirements": requirements})
+    get_negotiation_log(session_id).record(ev.pop("kind"), proposal, **ev)
 
 # ---- Petición de cambio de metodología (confirmación sí/no)
 def get_pending_change(session_id: str) -> Optional[Dict[str, Any]]:
     return _SESS.get(session_id, {}).get("pending_change")
 
-def set_pending_change(session_id: str, target_method: str) -> None:
-    _SESS.setdefault(session_id, {})["pending_change"] = {"target_method": target_method}
+def set_pending_change(session_id: str, target_method: Optional[str] = None,
+                       patch: Optional[Dict[str, Any]] = None, ref: Optional[int] = None) -> None:
+    """Cambio pendiente de sí/no: metodología (target_method) o parche; `ref` es el seq del
+    evento "proposed" en el log de negociación."""
+    pc: Dict[str, Any] = {"target_method": target_method}
+    if patch is not None:
+        pc["patch"] = patch
+    if ref is not None:
+        pc["ref"] = ref
+    _SESS.setdefault(session_id, {})["pending_change"] = pc
 
 def clear_pending_change(session_id: str) -> None:
     _SESS.setdefault(session_id, {}).pop("pending_change", None)
@@ -39,3 +53,23 @@ def get_context_value(session_id: str, key: str, default: Any = None) -> Any:
 
 def clear_context_value(session_id: str, key: str) -> None:
     _SESS.setdefault(session_id, {}).pop(key, None)
+
+# ---- Grafo de campos derivados de la propuesta (render memoizado por versión)
+def get_proposal_graph(session_id: str):
+    from backend.engine.proposal_graph import ProposalGraph
+    s = _SESS.setdefault(session_id, {})
+    g = s.get("proposal_graph")
+    if g is None:
+        g = s["proposal_graph"] = ProposalGraph()
+    return g
+
+# ---- Log de negociación (event sourcing de los cambios de la propuesta)
+def get_negotiation_log(session_id: str, create: bool = True):
+    from backend.engine.negotiation_log import NegotiationLog
+    s = _SESS.get(session_id) if not create else _SESS.setdefault(session_id, {})
+    if s is None:
+        return None
+    log = s.get("negotiation_log")
+    if log is None and create:
+        log = s["negotiation_log"] = NegotiationLog()
+    return log
@@ -0,0 +1,542 @@
+# backend/engine/export_jobs.py
+"""
+Exportación del informe PDF como trabajos en segundo plano.
+
+POST /export/chat.pdf hacía render_chat_report_inline dentro de la petición (regex, DAFO,
+gráficos de matplotlib a 300 dpi, maquetado de reportlab): con chats largos son segundos de
+CPU en un hilo del worker web. Ahora:
+
+  - submit():   calcula la clave del informe y lo encola en un pool de procesos acotado;
+                devuelve el trabajo (estado queued → running → done | error)
+  - caché:      por contenido, clave = hash(mensajes, título, report_meta (con la propuesta
+                de la sesión), report_options, decisiones del log de negociación). El mismo informe pedido otra vez (o dos
+                veces a la vez) no se vuelve a renderizar: el id del trabajo ES la clave
+  - límites:    como mucho EXPORT_MAX_PENDING informes en cola + en curso (entre todos los
+                workers web; el resto → ExportBusy, 429) y los procesos del pool con nice,
+                para que una ráfaga de exportaciones no le quite CPU al chat
+  - varios workers: con el lanzador de precarga (o uvicorn --workers) las peticiones de un
+                mismo trabajo caen en procesos distintos. El estado de cada trabajo
+                (<id>.json) y el PDF (<id>.pdf, por contenido) se guardan en EXPORT_DIR, que
+                ven todos los workers; en memoria sólo queda el future del proceso que lo
+                encoló y una LRU de PDFs recientes. Un trabajo en cola/en curso cuyo proceso
+                ya no existe, o que pasa de EXPORT_TIMEOUT, se da por fallido.
+
+Las decisiones del log de negociación y la última propuesta de la sesión (con sus requisitos,
+para el bloque Monte Carlo) se sacan aquí, en el proceso web (viven en su memoria), y viajan
+con el trabajo y en su clave; el pool no tiene sesiones.
+
+Config por entorno:
+  EXPORT_WORKERS       procesos del pool (por defecto min(2, CPUs - 1), mínimo 1;
+                       0 = un hilo del propio proceso)
+  EXPORT_MAX_PENDING   informes en cola + en curso (por defecto 8)
+  EXPORT_CACHE_MB      tamaño máximo de la caché de PDFs, en memoria y en disco (por defecto 64)
+  EXPORT_JOB_TTL       segundos que se recuerda un trabajo terminado (por defecto 900)
+  EXPORT_TIMEOUT       segundos máximos de espera de un informe (wait, SSE; por defecto 300)
+  EXPORT_DIR           directorio compartido de estados y PDFs (por defecto data/exports;
+                       con workers en varias máquinas, un volumen común)
+  EXPORT_NICE          prioridad de los procesos del pool (por defecto 5)
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import socket
+import threading
+import time
+
+DEFAULT_MAX_PENDING = 8
+DEFAULT_CACHE_MB = 64
+DEFAULT_JOB_TTL = 900.0
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_DIR = Path("data") / "exports"
+DEFAULT_NICE = 5
+# matplotlib/reportlab acumulan cachés: cada proceso del pool se recicla tras estos informes
+TASKS_PER_CHILD = 50
+
+QUEUED, RUNNING, DONE, ERROR = "queued", "running", "done", "error"
+
+
+class ExportBusy(Exception):
+    """Demasiados informes en cola o en curso (el endpoint responde 429)."""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def _workers() -> int:
+    raw = os.getenv("EXPORT_WORKERS", "")
+    if raw.strip():
+        try:
+            return max(0, int(raw))
+        except ValueError:
+            pass
+    return max(1, min(2, (os.cpu_count() or 1) - 1))
+
+
+def _max_pending() -> int:
+    return max(1, _env_int("EXPORT_MAX_PENDING", DEFAULT_MAX_PENDING))
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def _job_ttl() -> float:
+    return _env_float("EXPORT_JOB_TTL", DEFAULT_JOB_TTL)
+
+
+def wait_timeout() -> float:
+    """Segundos máximos de espera de un informe (endpoint síncrono y SSE)."""
+    return max(1.0, _env_float("EXPORT_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+def _cache_bytes() -> int:
+    return _env_int("EXPORT_CACHE_MB", DEFAULT_CACHE_MB) * 1024 * 1024
+
+
+# ---------- estado compartido entre workers (EXPORT_DIR) ----------
+
+_KEY_RE = re.compile(r"^[0-9a-f]{32}$")
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _export_dir() -> Path:
+    d = Path(os.getenv("EXPORT_DIR", "") or DEFAULT_DIR)
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def _path(key: str, suffix: str) -> Path:
+    return _export_dir() / f"{key}{suffix}"
+
+
+def _write_atomic(path: Path, data: bytes, exclusive: bool = False) -> bool:
+    # se escribe aparte y se publica de una vez: nadie lee un fichero a medias.
+    # exclusive=True sólo publica si no existe (reclamar un trabajo); devuelve si lo ha hecho
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    if not exclusive:
+        os.replace(tmp, path)
+        return True
+    try:
+        os.link(tmp, path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _read_record(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(_path(key, ".json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _read_pdf(key: str) -> Optional[bytes]:
+    try:
+        return _path(key, ".pdf").read_bytes()
+    except OSError:
+        return None
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    host, _, pid = (owner or "").rpartition(":")
+    if host != _OWNER.rpartition(":")[0] or not pid.isdigit():
+        return True         # otra máquina: sólo lo decide el timeout
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+# ---------- lo que corre en el pool ----------
+
+def _init_worker() -> None:
+    # los informes ceden CPU al chat; y la app se importa una vez al arrancar, no en el 1er informe
+    try:
+        os.nice(_env_int("EXPORT_NICE", DEFAULT_NICE))
+    except (AttributeError, OSError):
+        pass
+    import backend.app  # noqa: F401
+
+
+def render_report(messages: List[Dict[str, Any]], title: str, report_meta: Optional[Dict[str, Any]],
+                  report_options: Optional[Dict[str, Any]], decision_events: List[Dict[str, Any]]) -> bytes:
+    # función de módulo (picklable): es lo que ejecuta el pool
+    from backend.app import render_chat_report_inline
+    return render_chat_report_inline(messages, title=title, report_meta=report_meta,
+                                     report_options=report_options, decision_events=decision_events)
+
+
+def _run_job(key: str, messages: List[Dict[str, Any]], title: str, report_meta: Optional[Dict[str, Any]],
+             report_options: Optional[Dict[str, Any]], decision_events: List[Dict[str, Any]]) -> bytes:
+    # el pool no avisa cuando empieza un trabajo: lo apunta él mismo para los demás workers
+    rec = _read_record(key)
+    if rec is not None and rec.get("status") == QUEUED:
+        _write_atomic(_path(key, ".json"), json.dumps({**rec, "status": RUNNING, "started": time.time()}).encode())
+    return render_report(messages, title, report_meta, report_options, decision_events)
+
+
+# ---------- caché por contenido ----------
+
+def job_key(messages: List[Dict[str, Any]], title: str, report_meta: Optional[Dict[str, Any]],
+            report_options: Optional[Dict[str, Any]], decision_events: Optional[List[Dict[str, Any]]] = None) -> str:
+    raw = json.dumps([messages, title, report_meta or {}, report_options or {}, decision_events or []],
+                     sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _ResultCache:
+    """PDFs por clave, LRU acotada por bytes (delante de los ficheros de EXPORT_DIR)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        pdf = self._data.get(key)
+        if pdf is not None:
+            self._data.move_to_end(key)
+        return pdf
+
+    def put(self, key: str, pdf: bytes) -> None:
+        if len(pdf) > self.max_bytes:
+            return
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._data[key] = pdf
+        self.size += len(pdf)
+        while self.size > self.max_bytes:
+            _, dropped = self._data.popitem(last=False)
+            self.size -= len(dropped)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
+
+
+# ---------- trabajos ----------
+
+class ExportJob:
+    __slots__ = ("id", "title", "status", "cached", "created", "started", "finished", "size", "error",
+                 "owner", "future")
+
+    def __init__(self, key: str, title: str, status: str = QUEUED, cached: bool = False):
+        self.id = key
+        self.title = title
+        self.status = status
+        self.cached = cached
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = self.created if status == DONE else None
+        self.size: Optional[int] = None
+        self.error: Optional[str] = None
+        self.owner = _OWNER
+        self.future: Optional[Future] = None     # sólo en el proceso que lo encoló
+
+    @classmethod
+    def from_record(cls, rec: Dict[str, Any]) -> "ExportJob":
+        job = cls(rec["job_id"], rec.get("title", ""))
+        job._load(rec)
+        return job
+
+    def _load(self, rec: Dict[str, Any]) -> None:
+        for k in ("status", "cached", "created", "started", "finished", "size", "error", "owner"):
+            if k in rec:
+                setattr(self, k, rec[k])
+
+    def record(self) -> Dict[str, Any]:
+        return {"job_id": self.id, "title": self.title, "status": self.status, "cached": self.cached,
+                "created": self.created, "started": self.started, "finished": self.finished,
+                "size": self.size, "error": self.error, "owner": self.owner}
+
+    def save(self, exclusive: bool = False) -> bool:
+        return _write_atomic(_path(self.id, ".json"), json.dumps(self.record()).encode(), exclusive)
+
+    def refresh(self) -> str:
+        if self.status in (DONE, ERROR):
+            return self.status
+        if self.future is not None:
+            if self.status == QUEUED and self.future.running():
+                self.status, self.started = RUNNING, time.time()
+            return self.status
+        # trabajo de otro worker: su estado está en EXPORT_DIR
+        rec = _read_record(self.id)
+        if rec is not None:
+            self._load(rec)
+        if self.status in (QUEUED, RUNNING) and (not _owner_alive(self.owner) or time.time() - self.created > wait_timeout()):
+            self.status, self.error, self.finished = ERROR, "el proceso que preparaba el informe terminó o no respondió", time.time()
+        return self.status
+
+    def to_dict(self) -> Dict[str, Any]:
+        with _LOCK:
+            status = self.refresh()
+        out: Dict[str, Any] = {"job_id": self.id, "status": status, "cached": self.cached,
+                               "title": self.title, "created_at": self.created}
+        if status == QUEUED:
+            out["position"] = _position(self)
+        if self.finished is not None:
+            out["elapsed_ms"] = round(1000 * (self.finished - self.created), 1)     # cola incluida
+        if status == DONE:
+            out["size"] = self.size
+            out["download"] = f"/export/jobs/{self.id}/pdf"
+        if status == ERROR:
+            out["error"] = self.error
+        return out
+
+
+# RLock: cancelar futures (shutdown del pool) llama a _finish en el mismo hilo
+_LOCK = threading.RLock()
+_JOBS: Dict[str, ExportJob] = {}
+_CACHE = _ResultCache(_cache_bytes())
+_POOL: Optional[Any] = None
+
+
+def _get_pool():
+    # Pool perezoso y compartido; "spawn" como en engine/batch.py (nada de heredar hilos ni
+    # conexiones del servidor). Con EXPORT_WORKERS=0, un hilo del propio proceso.
+    global _POOL
+    if _POOL is None:
+        n = _workers()
+        if n <= 0:
+            _POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        else:
+            _POOL = ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker, max_tasks_per_child=TASKS_PER_CHILD)
+    return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    with _LOCK:
+        pool, _POOL = _POOL, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _shared_jobs() -> List[ExportJob]:
+    # trabajos de todos los workers (los de este proceso, con su future, desde _JOBS)
+    out = []
+    for f in _export_dir().glob("*.json"):
+        key = f.stem
+        job = _JOBS.get(key)
+        if job is None:
+            rec = _read_record(key)
+            if rec is None:
+                continue
+            job = ExportJob.from_record(rec)
+        out.append(job)
+    return out
+
+
+def _position(job: ExportJob) -> int:
+    return sum(1 for j in _shared_jobs() if j.refresh() == QUEUED and j.created < job.created) + 1
+
+
+def _pending() -> int:
+    return sum(1 for j in _shared_jobs() if j.refresh() in (QUEUED, RUNNING))
+
+
+def _prune(now: float) -> None:
+    ttl = _job_ttl()
+    for key in [k for k, j in _JOBS.items() if j.finished is not None and now - j.finished > ttl]:
+        del _JOBS[key]
+    d = _export_dir()
+    for job in _shared_jobs():
+        if job.refresh() in (DONE, ERROR) and job.finished is not None and now - job.finished > ttl:
+            (d / f"{job.id}.json").unlink(missing_ok=True)
+    # PDFs en disco: los más antiguos fuera hasta quedar en EXPORT_CACHE_MB
+    pdfs = []
+    for f in d.glob("*.pdf"):
+        try:
+            st = f.stat()
+        except OSError:
+            continue
+        pdfs.append((st.st_mtime, st.st_size, f))
+    total, limit = sum(p[1] for p in pdfs), _cache_bytes()
+    for _, size, f in sorted(pdfs):
+        if total <= limit:
+            break
+        f.unlink(missing_ok=True)
+        total -= size
+
+
+def _finish(job: ExportJob, fut: Future) -> None:
+    # callback del future (hilo del pool)
+    broken = False
+    with _LOCK:
+        job.finished = time.time()
+        if fut.cancelled():
+            job.status, job.error = ERROR, "cancelado"
+            job.save()
+            return
+        exc = fut.exception()
+        if exc is not None:
+            job.status, job.error = ERROR, f"{type(exc).__name__}: {exc}"
+            broken = isinstance(exc, BrokenProcessPool)
+        else:
+            pdf = fut.result()
+            _write_atomic(_path(job.id, ".pdf"), pdf)
+            _CACHE.put(job.id, pdf)
+            job.status, job.size = DONE, len(pdf)
+        job.save()
+    if broken:
+        shutdown_pool()
+
+
+def _cached_job(key: str, title: str) -> Optional[ExportJob]:
+    pdf = _CACHE.get(key)
+    size = len(pdf) if pdf is not None else None
+    if size is None:
+        try:
+            size = _path(key, ".pdf").stat().st_size
+        except OSError:
+            return None
+    job = _JOBS[key] = ExportJob(key, title, status=DONE, cached=True)
+    job.size = size
+    job.save()
+    return job
+
+
+def _with_session_proposal(report_meta: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # report_meta['proposal'] / ['requirements'] desde la sesión, si no vienen ya en la petición
+    meta = report_meta or {}
+    if isinstance(meta.get("proposal"), dict) or not meta.get("session_id"):
+        return report_meta
+    from backend.engine.context import get_last_proposal
+    proposal, req = get_last_proposal(str(meta["session_id"]))
+    if not isinstance(proposal, dict):
+        return report_meta
+    return {**meta, "proposal": proposal, "requirements": meta.get("requirements") or req}
+
+
+def submit(messages: List[Dict[str, Any]], title: str = "Informe de la conversación",
+           report_meta: Optional[Dict[str, Any]] = None,
+           report_options: Optional[Dict[str, Any]] = None) -> ExportJob:
+    """Encola el informe (o devuelve el trabajo ya hecho / en curso con la misma clave, lo
+    haya encolado este worker u otro)."""
+    from backend.engine.negotiation_log import decision_events_for
+    events = decision_events_for((report_meta or {}).get("session_id"))
+    report_meta = _with_session_proposal(report_meta)
+    key = job_key(messages, title, report_meta, report_options, events)
+    with _LOCK:
+        _prune(time.time())
+        job = get_job(key)
+        if job is not None and (job.refresh() in (QUEUED, RUNNING) or (job.status == DONE and result(key) is not None)):
+            return job
+        cached = _cached_job(key, title)
+        if cached is not None:
+            return cached
+        if _pending() >= _max_pending():
+            raise ExportBusy(f"Hay {_max_pending()} informes en preparación; inténtalo en unos segundos.")
+        job = ExportJob(key, title)
+        if not job.save(exclusive=True):
+            # fichero de un trabajo terminado/caído (se rehace) o de otro worker que acaba de
+            # reclamar la misma clave (se devuelve el suyo)
+            other = get_job(key)
+            if other is not None and other.refresh() in (QUEUED, RUNNING):
+                return other
+            job.save()
+        _JOBS[key] = job
+        try:
+            fut = _get_pool().submit(_run_job, key, messages, title, report_meta, report_options, events)
+        except BrokenProcessPool:
+            # un proceso del pool murió (OOM...): pool nuevo y un reintento
+            shutdown_pool()
+            fut = _get_pool().submit(_run_job, key, messages, title, report_meta, report_options, events)
+        job.future = fut
+    fut.add_done_callback(lambda f, j=job: _finish(j, f))
+    return job
+
+
+def get_job(job_id: str) -> Optional[ExportJob]:
+    """Trabajo de este worker o de cualquier otro (por su fichero de estado en EXPORT_DIR)."""
+    if not _KEY_RE.match(job_id or ""):
+        return None
+    with _LOCK:
+        job = _JOBS.get(job_id)
+    if job is not None:
+        return job
+    rec = _read_record(job_id)
+    if rec is not None:
+        return ExportJob.from_record(rec)
+    if _path(job_id, ".pdf").exists():
+        job = ExportJob(job_id, "", status=DONE, cached=True)
+        job.size = _path(job_id, ".pdf").stat().st_size
+        return job
+    return None
+
+
+def result(job_id: str) -> Optional[bytes]:
+    """PDF de un trabajo terminado (None si no está: nunca se hizo o se expulsó de la caché)."""
+    with _LOCK:
+        pdf = _CACHE.get(job_id)
+    if pdf is None and _KEY_RE.match(job_id or ""):
+        pdf = _read_pdf(job_id)
+        if pdf is not None:
+            with _LOCK:
+                _CACHE.put(job_id, pdf)
+    return pdf
+
+
+def wait(job: ExportJob, timeout: Optional[float] = None) -> bytes:
+    """Espera al trabajo y devuelve el PDF (lo usa el endpoint síncrono de siempre).
+    TimeoutError si tarda más de `timeout` segundos (por defecto EXPORT_TIMEOUT)."""
+    limit = wait_timeout() if timeout is None else timeout
+    if job.future is not None:
+        return job.future.result(limit)
+    deadline = time.time() + limit
+    while job.refresh() in (QUEUED, RUNNING):
+        if time.time() >= deadline:
+            raise TimeoutError(f"el informe {job.id} no terminó en {limit:g}s")
+        time.sleep(0.1)
+    if job.status == ERROR:
+        raise RuntimeError(job.error or "la exportación falló")
+    pdf = result(job.id)
+    if pdf is None:
+        raise KeyError(job.id)
+    return pdf
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        by_status: Dict[str, int] = {}
+        for j in _shared_jobs():
+            by_status[j.refresh()] = by_status.get(j.status, 0) + 1
+        return {"workers": _workers(), "max_pending": _max_pending(), "jobs": by_status,
+                "cache_entries": len(_CACHE._data), "cache_bytes": _CACHE.size,
+                "dir": str(_export_dir())}
+
+
+def clear() -> None:
+    """Olvida trabajos y caché, también los ficheros de EXPORT_DIR (tests)."""
+    with _LOCK:
+        _JOBS.clear()
+        _CACHE.clear()
+        for f in _export_dir().iterdir():
+            if _KEY_RE.match(f.stem) and f.suffix in (".json", ".pdf"):
+                f.unlink(missing_ok=True)
@@ -0,0 +1,151 @@
+# backend/engine/knowledge_cards.py
+"""
+Tarjetas de formación (Aprender) y fichas de metodología precalculadas.
+
+Las respuestas de formación (_training_method_card, _training_phases_card, ...) y las fichas
+(_method_overview_text, _catalog_text) son funciones puras de (nivel, metodología), pero se
+montaban a base de strings desde _TRAIN_METHOD y METHODOLOGIES en cada petición. Aquí se
+renderizan todas una vez (nivel × metodología × tipo) en una tabla de solo lectura:
+
+  - get_card(kind, level, method): lo que usa brain; si la combinación no está en la tabla
+    (nivel desconocido, metodología que no es del catálogo) se renderiza al vuelo como antes
+  - cards_payload(): la tabla entera serializada una vez + ETag, para GET /projects/cards
+  - card_payload(key): una tarjeta + su ETag, para GET /projects/cards/{key}
+
+Claves: "<kind>:<level>:<method>" con partes vacías cuando no aplican
+("catalog::", "phases:beginner:", "overview::Scrum").
+
+La tabla (y sus serializaciones) se rehace si se recarga el conocimiento (kb.generation()).
+"""
+from __future__ import annotations
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+import hashlib
+import json
+import threading
+
+from backend.knowledge import kb
+
+LEVELS = ("beginner", "intermediate", "expert")
+
+# kind → (usa nivel, metodología: "" no aplica / "opt" opcional / "req" obligatoria,
+#         normaliza el nombre como hace el builder, builder(brain, level, method))
+_KINDS: Dict[str, Tuple[bool, str, bool, Callable[[Any, Optional[str], Optional[str]], str]]] = {
+    "intro": (True, "", False, lambda b, lv, m: b._training_intro(lv)),
+    "training_catalog": (True, "", False, lambda b, lv, m: b._training_catalog(lv)),
+    "catalog": (False, "", False, lambda b, lv, m: b._catalog_text()),
+    "overview": (False, "req", False, lambda b, lv, m: b._method_overview_text(m)),
+    "method": (True, "req", True, lambda b, lv, m: b._training_method_card(m, lv)),
+    "phases": (True, "opt", True, lambda b, lv, m: b._training_phases_card(lv, m)),
+    "roles": (True, "opt", True, lambda b, lv, m: b._training_roles_card(lv, m)),
+    "metrics": (True, "opt", True, lambda b, lv, m: b._training_metrics_card(lv, m)),
+    "define": (True, "req", True, lambda b, lv, m: b._training_define_card(lv, m)),
+    "benefits": (True, "req", True, lambda b, lv, m: b._training_benefits_card(lv, m)),
+    "disadvantages": (True, "req", True, lambda b, lv, m: b._training_disadvantages_card(lv, m)),
+}
+
+_LOCK = threading.Lock()
+_TABLE: Optional[Mapping[str, Mapping[str, str]]] = None
+_GENERATION = -1
+_PAYLOAD: Optional[Tuple[bytes, str]] = None
+_CARD_BYTES: Dict[str, Tuple[bytes, str]] = {}
+
+
+def _brain():
+    from backend.engine import brain
+    return brain
+
+
+def _etag(raw: bytes) -> str:
+    return '"' + hashlib.blake2b(raw, digest_size=12).hexdigest() + '"'
+
+
+def card_key(kind: str, level: Optional[str] = None, method: Optional[str] = None) -> str:
+    return f"{kind}:{level or ''}:{method or ''}"
+
+
+def _methods(b) -> List[str]:
+    return sorted(set(b.METHODOLOGIES) | set(b._TRAIN_METHOD))
+
+
+def _build() -> Mapping[str, Mapping[str, str]]:
+    b = _brain()
+    table: Dict[str, Mapping[str, str]] = {}
+    for kind, (uses_level, method_mode, _normalize, fn) in _KINDS.items():
+        levels = LEVELS if uses_level else (None,)
+        methods: List[Optional[str]] = [None] if not method_mode else list(_methods(b))
+        if method_mode == "opt":
+            methods = [None] + methods
+        for lv in levels:
+            for m in methods:
+                text = fn(b, lv, m)
+                key = card_key(kind, lv, m)
+                table[key] = MappingProxyType({
+                    "key": key, "kind": kind, "level": lv or "", "method": m or "",
+                    "text": text, "etag": _etag(text.encode("utf-8")),
+                })
+    return MappingProxyType(table)
+
+
+def cards() -> Mapping[str, Mapping[str, str]]:
+    """La tabla (se construye la primera vez; el startup de la app la calienta)."""
+    global _TABLE, _GENERATION, _PAYLOAD
+    gen = kb.generation()
+    if _TABLE is None or _GENERATION != gen:
+        with _LOCK:
+            if _TABLE is None or _GENERATION != gen:
+                table = _build()
+                _PAYLOAD = None
+                _CARD_BYTES.clear()
+                _TABLE, _GENERATION = table, gen
+    return _TABLE
+
+
+def warm() -> int:
+    return len(cards())
+
+
+def get_card(kind: str, level: Optional[str] = None, method: Optional[str] = None) -> str:
+    """Texto de la tarjeta; lo no precalculado (nivel o metodología fuera de la tabla) se
+    renderiza con el builder de brain, igual que antes."""
+    spec = _KINDS[kind]
+    uses_level, method_mode, normalize, fn = spec
+    b = _brain()
+    m = method
+    if method_mode and method and normalize:
+        m = b.normalize_method_name(method)
+    hit = cards().get(card_key(kind, level if uses_level else None, m if method_mode else None))
+    if hit is not None:
+        return hit["text"]
+    return fn(b, level, method)
+
+
+def cards_payload() -> Tuple[bytes, str]:
+    """Tabla entera en JSON (bytes) + ETag; se serializa una vez."""
+    global _PAYLOAD
+    table = cards()
+    if _PAYLOAD is None:
+        body = {"levels": list(LEVELS), "kinds": list(_KINDS), "cards": {k: dict(v) for k, v in table.items()}}
+        raw = json.dumps(body, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        _PAYLOAD = (raw, _etag(raw))
+    return _PAYLOAD
+
+
+def card_payload(key: str) -> Optional[Tuple[bytes, str]]:
+    """Una tarjeta en JSON + su ETag (None si la clave no existe)."""
+    table = cards()
+    hit = _CARD_BYTES.get(key)
+    if hit is None:
+        card = table.get(key)
+        if card is None:
+            return None
+        hit = _CARD_BYTES[key] = (json.dumps(dict(card), ensure_ascii=False).encode("utf-8"), card["etag"])
+    return hit
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match (lista separada por comas, W/ o *) contra nuestro ETag."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or ("W/" + etag) in tags
@@ -0,0 +1,203 @@
+# backend/engine/negotiation_log.py
+"""
+Log de negociación de la propuesta (event sourcing).
+
+Cada cambio de la propuesta de una sesión queda como un evento inmutable y append-only:
+  - "proposal"     propuesta completa nueva (/propuesta, conversión desde chat...)
+  - "patch"        parche de _apply_patch (team/phases/budget/risks/timeline/...)
+  - "methodology"  reajuste del plan con _retune_plan_for_method
+  - "proposed"     cambio propuesto pendiente de sí/no (no muta el estado)
+  - "rejected"     el usuario dijo que no a un "proposed"
+Los eventos que aplican un "proposed" lo referencian con `accepts`.
+
+Materialización: el estado más reciente se guarda tal cual (O(1), sin copiar: las propuestas
+de _apply_patch son copy-on-write y se tratan como inmutables); además cada SNAPSHOT_EVERY
+eventos que mutan (y en cada "proposal") se guarda un snapshot, que sí es una copia
+independiente. Para leer la propuesta tal y como estaba en un evento cualquiera (time travel)
+se parte del snapshot anterior más cercano y se re-aplican los eventos que faltan.
+Lo que devuelven current()/state_at() se comparte con el log y es de sólo lectura.
+
+El log está acotado a MAX_EVENTS: al pasarse se descartan los eventos anteriores al snapshot
+más antiguo que deja al menos MAX_EVENTS // 2 (el time travel a esos eventos devuelve None).
+
+decision_events() da las decisiones con el estado antes/después para el análisis del PDF,
+sin tener que re-parsear el texto del asistente con regex.
+"""
+from __future__ import annotations
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import json
+
+SNAPSHOT_EVERY = 16
+MAX_EVENTS = 512
+
+MUTATING = ("proposal", "patch", "methodology")
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _frozen(obj: Any) -> Any:
+    # copia independiente (payloads: _apply_patch normaliza roles sobre el propio parche; snapshots)
+    return json.loads(json.dumps(obj, ensure_ascii=False, default=str))
+
+
+def _reduce(state: Optional[Dict[str, Any]], ev: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    kind = ev["kind"]
+    if kind == "proposal":
+        return ev["proposal"]
+    if state is None:
+        return None
+    from backend.engine import brain
+    if kind == "patch":
+        return brain._apply_patch(state, _frozen(ev["patch"]))
+    if kind == "methodology":
+        return brain._retune_plan_for_method(state, ev["method"])
+    return state
+
+
+class NegotiationLog:
+    def __init__(self, snapshot_every: int = SNAPSHOT_EVERY, max_events: int = MAX_EVENTS):
+        self.snapshot_every = max(1, int(snapshot_every))
+        self.max_events = max(2 * self.snapshot_every, int(max_events))
+        self.events: List[Dict[str, Any]] = []
+        self._offset = 0                 # seq del primer evento que queda en self.events
+        self._snap_seqs: List[int] = []
+        self._snap_states: List[Dict[str, Any]] = []
+        self._head: Optional[Dict[str, Any]] = None
+        self._since_snapshot = 0
+        self.replays = 0
+
+    # ----- escritura -----
+    def record(self, kind: str, state: Optional[Dict[str, Any]] = None, **payload: Any) -> Dict[str, Any]:
+        """
+        Añade un evento. Para los que mutan, `state` es la propuesta resultante (ya calculada
+        por quien aplica el cambio): se guarda como cabeza sin re-aplicar nada.
+        """
+        ev: Dict[str, Any] = {"seq": self._offset + len(self.events), "kind": kind, "ts": payload.pop("ts", None) or _now()}
+        for k, v in payload.items():
+            if v is not None:
+                ev[k] = _frozen(v) if k in ("patch", "impact") else v
+        if kind in MUTATING:
+            self._since_snapshot += 1
+            snapshot = kind == "proposal" or self._since_snapshot >= self.snapshot_every
+            if state is not None and snapshot:
+                state = _frozen(state)
+            if kind == "proposal":
+                ev["proposal"] = state
+            if state is None:
+                state = _reduce(self._head, ev)
+            self._head = state
+            if snapshot:
+                self._snap_seqs.append(ev["seq"])
+                self._snap_states.append(state)
+                self._since_snapshot = 0
+        self.events.append(ev)
+        if len(self.events) > self.max_events:
+            self._trim()
+        return ev
+
+    def _trim(self) -> None:
+        # se conserva desde el snapshot más antiguo que deja al menos max_events // 2 eventos
+        last = self._offset + len(self.events) - 1
+        i = bisect_right(self._snap_seqs, last + 1 - self.max_events // 2) - 1
+        if i <= 0:
+            return
+        keep = self._snap_seqs[i]
+        del self.events[:keep - self._offset]
+        del self._snap_seqs[:i], self._snap_states[:i]
+        self._offset = keep
+
+    # ----- lectura -----
+    def current(self) -> Optional[Dict[str, Any]]:
+        return self._head
+
+    def pending(self) -> Optional[Dict[str, Any]]:
+        """Último "proposed" todavía sin aceptar ni rechazar."""
+        closed = set()
+        for ev in reversed(self.events):
+            ref = ev.get("accepts", ev.get("ref"))
+            if ref is not None:
+                closed.add(ref)
+            if ev["kind"] == "proposed":
+                return None if ev["seq"] in closed else ev
+        return None
+
+    def state_at(self, seq: int) -> Optional[Dict[str, Any]]:
+        """Propuesta justo después del evento `seq` (-1 → antes de todo)."""
+        if seq < self._offset or not self.events:
+            return None
+        seq = min(seq, self._offset + len(self.events) - 1)
+        i = bisect_right(self._snap_seqs, seq) - 1
+        if i < 0:
+            state, start = None, self._offset
+        else:
+            state, start = self._snap_states[i], self._snap_seqs[i] + 1
+        for ev in self.events[start - self._offset:seq + 1 - self._offset]:
+            if ev["kind"] in MUTATING:
+                state = _reduce(state, ev)
+                self.replays += 1
+        return state
+
+    def decision_events(self) -> List[Dict[str, Any]]:
+        """
+        Decisiones en el mismo formato que app.extract_decision_events (kind, summary,
+        proposed_at, accepted, accepted_at, impact, details, raw) más `before`/`after`
+        con la propuesta materializada.
+        """
+        out: List[Dict[str, Any]] = []
+        resolved: Dict[int, Dict[str, Any]] = {}
+        for ev in self.events:
+            ref = ev.get("accepts", ev.get("ref"))
+            if ref is not None:
+                resolved[ref] = ev
+        for ev in self.events:
+            kind = ev["kind"]
+            if kind == "proposed":
+                res = resolved.get(ev["seq"])
+                accepted = bool(res is not None and res["kind"] in MUTATING)
+                out.append(self._decision(ev, res, accepted))
+            elif kind in ("patch", "methodology") and ev.get("accepts") is None:
+                # cambio aplicado directamente (p.ej. /cambiar:) — propuesto y aceptado a la vez
+                out.append(self._decision(ev, ev, True))
+        return out
+
+    def _decision(self, ev: Dict[str, Any], res: Optional[Dict[str, Any]], accepted: bool) -> Dict[str, Any]:
+        before = self.state_at(ev["seq"] - 1)
+        after = self.state_at(res["seq"]) if accepted and res is not None else None
+        if ev.get("method"):
+            kind, summary = "methodology", ev["method"]
+            details: Dict[str, Any] = {"to": ev["method"], "not_recommended": bool(ev.get("not_recommended"))}
+        else:
+            kind = summary = (ev.get("patch") or {}).get("type") or "other"
+            details = {"patch": ev.get("patch")}
+        if before is not None and after is not None:
+            bb, ab = before.get("budget") or {}, after.get("budget") or {}
+            details["metrics"] = {"labor_before": bb.get("labor_estimate_eur"), "labor_after": ab.get("labor_estimate_eur"),
+                                  "total_before": bb.get("total_eur"), "total_after": ab.get("total_eur")}
+            pct = (ab.get("assumptions") or {}).get("contingency_pct")
+            if kind == "budget" and pct is not None:
+                details["contingencia_pct"] = pct
+            if kind == "team":
+                tb = {r.get("role"): r.get("count") for r in before.get("team") or []}
+                details["team_changes"] = {r.get("role"): r.get("count") for r in after.get("team") or []
+                                           if tb.get(r.get("role")) != r.get("count")}
+        if kind == "risks":
+            details["items"] = list((ev.get("patch") or {}).get("add") or [])
+        return {
+            "seq": ev["seq"], "kind": kind, "summary": summary,
+            "proposed_at": ev["ts"], "accepted": accepted,
+            "accepted_at": res["ts"] if res is not None else None,
+            "impact": list(ev.get("impact") or [])[:50], "details": details,
+            "raw": ev.get("raw", ""), "before": before, "after": after,
+        }
+
+
+def decision_events_for(session_id: Optional[str]) -> List[Dict[str, Any]]:
+    if not session_id:
+        return []
+    from backend.engine.context import get_negotiation_log
+    log = get_negotiation_log(str(session_id), create=False)
+    return log.decision_events() if log is not None else []
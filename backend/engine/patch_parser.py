@@ -0,0 +1,357 @@
+# backend/engine/patch_parser.py
+"""
+Parser de órdenes de cambio (/cambiar: y cambios en lenguaje natural) en una sola pasada.
+
+Antes cada área tenía su parser de regex (_parse_team_patch, _parse_phases_patch,
+_parse_budget_patch, _parse_risks_patch, más _CHANGE_PAT para metodología) y se probaban
+en secuencia sobre el mensaje entero. Aquí el texto normalizado se tokeniza una vez
+(palabras, números, '%', ':', 'nombres entre comillas', separadores) y una gramática pequeña
+recorre los tokens:
+
+  equipo       VERBO [N] ROL | VERBO ROL (a|en) N | ROL x N          (añade/pon/sube/quita...)
+  fases        [fase] 'NOMBRE' a N sem | VERBO N sem a 'NOMBRE'
+               añade fase 'NOMBRE' N sem | quita fase 'NOMBRE'
+  presupuesto  [VERBO] contingencia [a|al] N % | tarifa [de] ROL a N
+  riesgos      añade|quita riesgo[:] TEXTO-hasta-fin-de-línea
+  metodología  (cambia[r] a|pasar a|usar|quiero|prefiero) [la metodologia a] MÉTODO
+               [(en vez|en lugar) de MÉTODO] | MÉTODO (en vez|en lugar) de MÉTODO
+
+Los roles acaban en separador, número, conjunción ('y'/'e'), verbo o "a N": así
+"pon 2 backend y quita ux" son dos operaciones y no un rol "backend y quita ux".
+El resultado usa el formato de parche de siempre ({"type": "team", "ops": [...]}, ...).
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import re
+import unicodedata
+
+ADD_VERBS = {"anade", "agrega", "suma", "incluye", "mete", "anadir", "agregar"}
+SET_VERBS = {"deja", "ajusta", "pon", "pone", "establece", "setea", "sube", "baja", "pasa", "cambia", "poner"}
+REM_VERBS = {"quita", "elimina", "borra", "saca", "quitar", "eliminar"}
+VERBS = ADD_VERBS | SET_VERBS | REM_VERBS
+
+METHODS = {"scrum", "kanban", "scrumban", "xp", "lean", "crystal", "fdd", "dsdm", "safe", "devops"}
+# verbo de cambio de metodología → ¿necesita "a" delante del método?
+METHOD_VERBS = {"cambia": True, "cambiar": True, "pasar": True, "usar": False, "quiero": False, "prefiero": False}
+
+NUMBER_WORDS = {"medio": 0.5, "media": 0.5, "un": 1.0, "una": 1.0, "uno": 1.0,
+                "dos": 2.0, "tres": 3.0, "cuatro": 4.0}
+ARTICLES = {"la", "el", "los", "las", "al", "del", "de"}
+CONJ = {"y", "e"}
+
+_TOKEN = re.compile(r"'(?P<quoted>[^']*)'|(?P<num>\d+(?:[.,]\d+)?)|(?P<pct>%)|(?P<colon>:)"
+                    r"|(?P<sep>[,;.!?¿¡\n])|(?P<word>[a-z/]+)")
+
+# tipos de token
+QUOTED, NUM, PCT, COLON, SEP, WORD = "quoted", "num", "pct", "colon", "sep", "word"
+
+Token = Tuple[str, Any, int, int]   # (tipo, valor, inicio, fin)
+
+
+def _norm(s: str) -> str:
+    nk = unicodedata.normalize("NFKD", (s or "").lower())
+    return "".join(c for c in nk if not unicodedata.combining(c)).strip()
+
+
+def tokenize(text: str) -> Tuple[str, List[Token]]:
+    t = _norm(text)
+    toks: List[Token] = []
+    for m in _TOKEN.finditer(t):
+        kind = m.lastgroup
+        val: Any = m.group(kind)
+        if kind == NUM:
+            val = float(val.replace(",", "."))
+        toks.append((kind, val, m.start(), m.end()))
+    return t, toks
+
+
+class _Parser:
+    def __init__(self, text: str, canonical_role: Callable[[str], str]):
+        self.text, self.toks = tokenize(text)
+        self.n = len(self.toks)
+        self.canonical_role = canonical_role
+        self.team: List[Dict[str, Any]] = []
+        self.phases: List[Dict[str, Any]] = []
+        self.rates: Dict[str, float] = {}
+        self.contingency: Optional[float] = None
+        self.risks_add: List[str] = []
+        self.risks_remove: List[str] = []
+        self.methodology: Optional[Tuple[str, Optional[str]]] = None
+        self.order: List[str] = []
+        self.last_verb: Optional[str] = None
+
+    # ----- helpers de tokens -----
+    def kind(self, i: int) -> Optional[str]:
+        return self.toks[i][0] if i < self.n else None
+
+    def word(self, i: int) -> Optional[str]:
+        return self.toks[i][1] if i < self.n and self.toks[i][0] == WORD else None
+
+    def number(self, i: int) -> Optional[float]:
+        if i >= self.n:
+            return None
+        k, v = self.toks[i][0], self.toks[i][1]
+        if k == NUM:
+            return v
+        if k == WORD and v in NUMBER_WORDS:
+            return NUMBER_WORDS[v]
+        return None
+
+    def is_weeks(self, i: int) -> bool:
+        w = self.word(i)
+        return bool(w and w.startswith("sem"))
+
+    def skip_articles(self, i: int) -> int:
+        while self.word(i) in ARTICLES:
+            i += 1
+        return i
+
+    def _mark(self, area: str) -> None:
+        if area not in self.order:
+            self.order.append(area)
+
+    # ----- gramática -----
+    def parse(self) -> "_Parser":
+        i = 0
+        while i < self.n:
+            i = self.clause(i)
+        return self
+
+    def clause(self, i: int) -> int:
+        k, v = self.toks[i][0], self.toks[i][1]
+        if k == QUOTED:
+            return self.phase_set_weeks(i) or i + 1
+        # "pon 2 backend, 1 qa y 0.5 ux": el número sin verbo hereda el verbo anterior
+        if self.last_verb and self.number(i) is not None and self.kind(i + 1) == WORD:
+            return self.team_op(self.last_verb, i)
+        if k != WORD:
+            return i + 1
+        if v in METHOD_VERBS or v in METHODS:
+            j = self.methodology_change(i)
+            if j:
+                return j
+        if v in VERBS:
+            return self.verb_clause(i)
+        if v == "contingencia":
+            return self.contingency_clause(i + 1) or i + 1
+        if v in ("tarifa", "rate"):
+            return self.rate_clause(i + 1) or i + 1
+        if v == "fase" and self.kind(i + 1) == QUOTED:
+            return self.phase_set_weeks(i + 1) or i + 2
+        # "Backend Dev x2"
+        j = self.role_times(i)
+        return j or i + 1
+
+    def verb_clause(self, i: int) -> int:
+        verb = self.toks[i][1]
+        self.last_verb = None
+        j = self.skip_articles(i + 1)
+        if self.word(j) in ("un", "una") and self.word(j + 1) in ("fase", "riesgo"):
+            j += 1
+        w = self.word(j)
+        if self.kind(j) == QUOTED:
+            return self.phase_op(verb, j) or j + 1
+        if w in ("fase", "fases"):
+            return self.phase_op(verb, j + 1) or j + 1
+        if w and (w.startswith("riesgo") or w.startswith("risk")):
+            return self.risk_op(verb, j + 1)
+        if w == "contingencia":
+            return self.contingency_clause(j + 1) or j + 1
+        if w in ("tarifa", "rate"):
+            return self.rate_clause(j + 1) or j + 1
+        if w in ("metodologia", "metodo"):
+            return self.methodology_target(self.skip_to_a(j + 1)) or j + 1
+        if verb in SET_VERBS:
+            num = self.number(i + 1)
+            if num is not None and self.is_weeks(i + 2) and self.word(i + 3) == "a" and self.kind(i + 4) == QUOTED:
+                # cambia 8 semanas a 'Fase'
+                self.phases.append({"op": "set_weeks", "name": self.toks[i + 4][1].strip(), "weeks": int(num)})
+                self._mark("phases")
+                return i + 5
+        return self.team_op(verb, i + 1)
+
+    def skip_to_a(self, i: int) -> int:
+        return i + 1 if self.word(i) == "a" else i
+
+    def read_role(self, i: int) -> Tuple[str, int]:
+        """Palabras de rol hasta un límite; devuelve (rol, índice siguiente)."""
+        words: List[str] = []
+        while i < self.n and self.toks[i][0] == WORD:
+            w = self.toks[i][1]
+            if w in VERBS or w in CONJ:
+                break
+            if w in ("a", "en") and self.number(i + 1) is not None and words:
+                break
+            if w == "x" and self.kind(i + 1) == NUM and words:
+                break
+            if w in NUMBER_WORDS and not words:
+                break
+            words.append(w)
+            i += 1
+        return " ".join(words), i
+
+    def team_op(self, verb: str, i: int) -> int:
+        num = self.number(i)
+        if num is not None:
+            i += 1
+        role, j = self.read_role(i)
+        if not role:
+            return max(j, i)
+        if verb in REM_VERBS:
+            self.team.append({"op": "remove", "role": role})
+        else:
+            if num is None and self.word(j) in ("a", "en") and self.number(j + 1) is not None:
+                num = self.number(j + 1)
+                j += 2
+            elif num is None and self.word(j) == "x" and self.kind(j + 1) == NUM:
+                num = self.toks[j + 1][1]
+                j += 2
+            op = "add" if verb in ADD_VERBS else "set"
+            self.team.append({"op": op, "role": role, "count": float(1.0 if num is None else num)})
+        self._mark("team")
+        self.last_verb = verb
+        return j
+
+    def role_times(self, i: int) -> Optional[int]:
+        role, j = self.read_role(i)
+        if role and self.word(j) == "x" and self.kind(j + 1) == NUM:
+            self.team.append({"op": "set", "role": role, "count": float(self.toks[j + 1][1])})
+            self._mark("team")
+            return j + 2
+        return None
+
+    def phase_set_weeks(self, i: int) -> Optional[int]:
+        # 'Nombre' a N sem
+        if self.word(i + 1) == "a" and self.kind(i + 2) == NUM and self.is_weeks(i + 3):
+            self.phases.append({"op": "set_weeks", "name": self.toks[i][1].strip(), "weeks": int(self.toks[i + 2][1])})
+            self._mark("phases")
+            return i + 4
+        return None
+
+    def phase_op(self, verb: str, i: int) -> Optional[int]:
+        if self.kind(i) != QUOTED:
+            return None
+        name = self.toks[i][1].strip()
+        if verb in REM_VERBS:
+            self.phases.append({"op": "remove", "name": name})
+            self._mark("phases")
+            return i + 1
+        if verb in ADD_VERBS and self.kind(i + 1) == NUM and self.is_weeks(i + 2):
+            self.phases.append({"op": "add", "name": name, "weeks": int(self.toks[i + 1][1])})
+            self._mark("phases")
+            return i + 3
+        return self.phase_set_weeks(i)
+
+    def contingency_clause(self, i: int) -> Optional[int]:
+        i = self.skip_articles(i)
+        if self.word(i) in ("a", "en"):
+            i += 1
+        if self.kind(i) == NUM and self.kind(i + 1) == PCT:
+            self.contingency = float(self.toks[i][1])
+            self._mark("budget")
+            return i + 2
+        return None
+
+    def rate_clause(self, i: int) -> Optional[int]:
+        i = self.skip_articles(i)
+        words: List[str] = []
+        while i < self.n and self.toks[i][0] == WORD and not (self.toks[i][1] == "a" and self.kind(i + 1) == NUM):
+            words.append(self.toks[i][1])
+            i += 1
+        if words and self.word(i) == "a" and self.kind(i + 1) == NUM:
+            self.rates[self.canonical_role(" ".join(words))] = float(self.toks[i + 1][1])
+            self._mark("budget")
+            return i + 2
+        return None
+
+    def risk_op(self, verb: str, i: int) -> int:
+        if self.kind(i) == COLON:
+            i += 1
+        if i >= self.n:
+            return i
+        start = self.toks[i][2]
+        end = self.text.find("\n", start)
+        end = len(self.text) if end < 0 else end
+        item = self.text[start:end].strip()
+        if item and verb in ADD_VERBS:
+            self.risks_add.append(item)
+        elif item and verb in REM_VERBS:
+            self.risks_remove.append(item)
+        else:
+            return i
+        self._mark("risks")
+        # el texto del riesgo llega hasta fin de línea
+        while i < self.n and self.toks[i][2] < end:
+            i += 1
+        return i
+
+    def methodology_change(self, i: int) -> Optional[int]:
+        v = self.toks[i][1]
+        if v in METHOD_VERBS:
+            j = i + 1
+            if METHOD_VERBS[v]:
+                if self.word(j) != "a":
+                    return None
+                j += 1
+            return self.methodology_target(j)
+        # MÉTODO en vez de MÉTODO
+        alt, j = self.instead_of(i + 1)
+        if alt and self.methodology is None:
+            self.methodology = (v, alt)
+            return j
+        return None
+
+    def methodology_target(self, i: int) -> Optional[int]:
+        w = self.word(i)
+        if w not in METHODS:
+            return None
+        alt, j = self.instead_of(i + 1)
+        if self.methodology is None:
+            self.methodology = (w, alt)
+        return j
+
+    def instead_of(self, i: int) -> Tuple[Optional[str], int]:
+        if self.word(i) == "en" and self.word(i + 1) in ("vez", "lugar") and self.word(i + 2) == "de" \
+                and self.word(i + 3) in METHODS:
+            return self.word(i + 3), i + 4
+        return None, i
+
+    # ----- salida -----
+    def patches(self) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for area in self.order:
+            if area == "team":
+                out.append({"type": "team", "ops": self.team})
+            elif area == "phases":
+                out.append({"type": "phases", "ops": self.phases})
+            elif area == "budget":
+                patch: Dict[str, Any] = {"type": "budget"}
+                if self.rates:
+                    patch["role_rates"] = self.rates
+                if self.contingency is not None:
+                    patch["contingency_pct"] = self.contingency
+                out.append(patch)
+            elif area == "risks":
+                out.append({"type": "risks", "add": self.risks_add, "remove": self.risks_remove})
+        return out
+
+
+# prioridad cuando sólo se quiere UN parche (como hacía _parse_any_patch)
+AREA_PRIORITY = ("team", "phases", "budget", "risks")
+
+
+def parse_command(text: str, canonical_role: Callable[[str], str] = lambda r: r.strip().title()) -> Dict[str, Any]:
+    """
+    Una pasada sobre el texto → {"patches": [parche por área, en orden de aparición],
+    "methodology": (método, alternativa) o None}.
+    """
+    p = _Parser(text, canonical_role).parse()
+    return {"patches": p.patches(), "methodology": p.methodology}
+
+
+def first_patch(patches: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    by_type = {pt["type"]: pt for pt in patches}
+    for area in AREA_PRIORITY:
+        if area in by_type:
+            return by_type[area]
+    return None
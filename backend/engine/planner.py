@@ -1,5 +1,5 @@
 # backend/engine/planner.py
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import math
 
 from backend.knowledge.methodologies import (
@@ -7,24 +7,100 @@ from backend.knowledge.methodologies import (
     explain_methodology_choice,
     METHODOLOGIES,
     detect_signals,
+    score_methodologies,
+    score_methodologies_batch,
 )
+from backend.knowledge.citations import register_source, register_table, source_refs
+
+# Tarifas base por rol (EUR/semana) y multiplicadores por industria.
+# Ojo: forman parte de la versión de la caché de propuestas (proposal_cache), si se tocan
+# las propuestas cacheadas dejan de servirse solas.
+BASE_ROLE_RATES: Dict[str, float] = {
+    "PM": 1200.0, "Tech Lead": 1400.0,
+    "Backend Dev": 1100.0, "Frontend Dev": 1000.0,
+    "QA": 900.0, "UX/UI": 1000.0, "ML Engineer": 1400.0,
+    "Security Engineer": 1500.0, "Compliance": 1300.0,
+    "HIPAA Compliance": 1400.0, "DevOps": 1200.0,
+    "IoT Engineer": 1300.0, "Game Designer": 1100.0,
+    "Architect": 1500.0,
+}
+
+INDUSTRY_RATE_MULTIPLIERS: Dict[str, float] = {
+    "fintech": 1.30,
+    "insurtech": 1.25,
+    "healthtech": 1.30,
+    "legal_tech": 1.20,
+    "gaming": 1.15,
+    "media": 1.10,
+    "enterprise": 1.12,
+    "competitive": 0.95,   # logistics/retail/travel
+    "startup": 0.90,
+}
+
+# Fuentes fijas por área del decision_log. En la propuesta van como IDs del registro de
+# citas (backend.knowledge.citations) y se expanden al renderizar.
+TEAM_SOURCES: List[Dict[str, Any]] = [
+    {"autor": "Forsgren, Humble, Kim", "titulo": "Accelerate", "anio": 2018,
+     "url": "https://itrevolution.com/accelerate/"},
+    {"autor": "Skelton, Pais", "titulo": "Team Topologies", "anio": 2019,
+     "url": "https://teamtopologies.com/"},
+    {"autor": "DeMarco, Lister", "titulo": "Peopleware", "anio": 1999,
+     "url": "https://www.oreilly.com/library/view/peopleware-productive-projects/9780133440707/"},
+]
+PHASE_SOURCES: List[Dict[str, Any]] = [
+    {"autor": "Jeff Patton", "titulo": "User Story Mapping", "anio": 2014,
+     "url": "http://jpattonassociates.com/user-story-mapping/"},
+    {"autor": "Jez Humble, David Farley", "titulo": "Continuous Delivery", "anio": 2010,
+     "url": "https://continuousdelivery.com/"},
+    {"autor": "Schwaber, Sutherland", "titulo": "The Scrum Guide", "anio": 2020,
+     "url": "https://scrumguides.org/"},
+]
+BUDGET_SOURCES: List[Dict[str, Any]] = [
+    {"autor": "Steve McConnell", "titulo": "Software Estimation", "anio": 2006,
+     "url": "https://www.construx.com/resources/software-estimation/"},
+    {"autor": "Boehm", "titulo": "Cone of Uncertainty", "anio": 1981,
+     "url": "https://en.wikipedia.org/wiki/Cone_of_Uncertainty"},
+]
+RISK_SOURCES: List[Dict[str, Any]] = [
+    {"autor": "OWASP", "titulo": "Web Security Testing Guide", "anio": 2021,
+     "url": "https://owasp.org/www-project-wstg/"},
+    {"autor": "PCI Council", "titulo": "PCI DSS", "anio": 2024,
+     "url": "https://www.pcisecuritystandards.org/"},
+]
+
+TEAM_SOURCES_REFS = [register_source(x) for x in TEAM_SOURCES]
+PHASE_SOURCES_REFS = [register_source(x) for x in PHASE_SOURCES]
+BUDGET_SOURCES_REFS = [register_source(x) for x in BUDGET_SOURCES]
+RISK_SOURCES_REFS = [register_source(x) for x in RISK_SOURCES]
+BASE_ROLE_RATES_REF = register_table("base-role-rates", BASE_ROLE_RATES)
+
+# Súbelo si cambias la lógica de generate_proposal (las tablas ya se versionan solas)
+PLANNER_VERSION = "2"
 
 def _round_money(x: float) -> float:
     return round(x, 2)
 
-def generate_proposal(requirements_text: str) -> Dict[str, Any]:
+def generate_proposal(requirements_text: str,
+                      signals: Optional[Dict[str, float]] = None,
+                      scored: Optional[List[Tuple[str, float, List[str]]]] = None) -> Dict[str, Any]:
     """
     Genera una propuesta simple pero completa y, ahora, con
     - decision_log por área (team, phases, budget, risks, methodology)
     - methodology_sources para poder citar siempre.
+    `signals`/`scored` permiten reutilizar detect_signals y el scoring ya hechos
+    (p. ej. en lote con generate_proposals_batch); si no llegan se calculan aquí.
     """
-    # 1) Elegir metodología
-    chosen, score, scored = recommend_methodology(requirements_text)
-    method_info = METHODOLOGIES.get(chosen, {})
-    methodology_sources = method_info.get("sources", [])
+    # 1) Detectar señales de industria y necesidades técnicas (una sola vez por texto)
+    if signals is None:
+        signals = detect_signals(requirements_text)
 
-    # 2) Detectar señales de industria y necesidades técnicas
-    signals = detect_signals(requirements_text)
+    # 2) Elegir metodología
+    if scored is None:
+        scored = score_methodologies(requirements_text, signals)
+    chosen = scored[0][0]
+    score = explain_methodology_choice(requirements_text, chosen, signals)
+    method_info = METHODOLOGIES.get(chosen, {})
+    methodology_sources = source_refs(method_info.get("sources", []))
     req = requirements_text.lower()
     
     # Necesidades técnicas específicas
@@ -163,47 +239,39 @@ def generate_proposal(requirements_text: str) -> Dict[str, Any]:
         phase["weeks"] = max(1, round(phase["weeks"] * duration_multiplier))
 
     # 4) Presupuesto dinámico por tarifa/rol ajustado por industria
-    # Tarifas base por rol (EUR/semana)
-    base_role_rates = {
-        "PM": 1200.0, "Tech Lead": 1400.0,
-        "Backend Dev": 1100.0, "Frontend Dev": 1000.0,
-        "QA": 900.0, "UX/UI": 1000.0, "ML Engineer": 1400.0,
-        "Security Engineer": 1500.0, "Compliance": 1300.0,
-        "HIPAA Compliance": 1400.0, "DevOps": 1200.0,
-        "IoT Engineer": 1300.0, "Game Designer": 1100.0,
-        "Architect": 1500.0,
-    }
+    # Tarifas base por rol (EUR/semana); copia para que la propuesta no comparta el dict del módulo
+    base_role_rates = dict(BASE_ROLE_RATES)
     
     # Multiplicador de tarifas por industria
     rate_multiplier = 1.0
     industry_note = ""
     
     if is_fintech:
-        rate_multiplier = 1.30  # +30% fintech (regulación, seguridad crítica)
+        rate_multiplier = INDUSTRY_RATE_MULTIPLIERS["fintech"]  # +30% fintech (regulación, seguridad crítica)
         industry_note = "Fintech (regulación PCI-DSS, fraude, seguridad crítica)"
     elif is_insurtech:
-        rate_multiplier = 1.25  # +25% insurtech (cálculos críticos, compliance)
+        rate_multiplier = INDUSTRY_RATE_MULTIPLIERS["insurtech"]  # +25% insurtech (cálculos críticos, compliance)
         industry_note = "InsurTech (compliance, cálculos actuariales)"
     elif is_healthtech:
-        rate_multiplier = 1.30  # +30% healthtech (HIPAA, datos sensibles)
+        rate_multiplier = INDUSTRY_RATE_MULTIPLIERS["healthtech"]  # +30% healthtech (HIPAA, datos sensibles)
         industry_note = "HealthTech (HIPAA, datos médicos sensibles)"
     elif is_legal:
-        rate_multiplier = 1.20  # +20% legal (precisión crítica)
+        rate_multiplier = INDUSTRY_RATE_MULTIPLIERS["legal_tech"]  # +20% legal (precisión crítica)
         industry_note = "LegalTech (precisión crítica en contratos)"
     elif is_gaming:
-        rate_multiplier = 1.15  # +15% gaming (talento especializado)
+        rate_multiplier = INDUSTRY_RATE_MULTIPLIERS["gaming"]  # +15% gaming (talento especializado)
         industry_note = "Gaming (talento especializado, game design)"
     elif is_media:
-        rate_multiplier = 1.10  # +10% media (streaming, CDN)
+        rate_multiplier = INDUSTRY_RATE_MULTIPLIERS["media"]  # +10% media (streaming, CDN)
         industry_note = "Media/Streaming (infraestructura CDN)"
     elif is_erp or is_enterprise:
-        rate_multiplier = 1.12  # +12% enterprise (experiencia en sistemas complejos)
+        rate_multiplier = INDUSTRY_RATE_MULTIPLIERS["enterprise"]  # +12% enterprise (experiencia en sistemas complejos)
         industry_note = "Enterprise/ERP (sistemas complejos multi-módulo)"
     elif is_logistics or is_retail or is_travel:
-        rate_multiplier = 0.95  # -5% (mercado competitivo)
+        rate_multiplier = INDUSTRY_RATE_MULTIPLIERS["competitive"]  # -5% (mercado competitivo)
         industry_note = "Logistics/Retail/Travel (mercado competitivo)"
     elif is_startup and not (is_fintech or is_healthtech):
-        rate_multiplier = 0.90  # -10% startup (equity compensation)
+        rate_multiplier = INDUSTRY_RATE_MULTIPLIERS["startup"]  # -10% startup (equity compensation)
         industry_note = "Startup (equity compensation, riesgo compartido)"
     
     # Aplicar multiplicador a tarifas
@@ -239,7 +307,7 @@ def generate_proposal(requirements_text: str) -> Dict[str, Any]:
         "by_role": by_role,
         "assumptions": {
             "project_weeks": project_weeks,
-            "base_role_rates_eur_pw": base_role_rates,
+            "base_role_rates_eur_pw": BASE_ROLE_RATES_REF,
             "industry_rate_multiplier": rate_multiplier,
             "industry_note": industry_note if industry_note else "Industria estándar",
             "contingency_pct": contingency_pct,
@@ -267,7 +335,7 @@ def generate_proposal(requirements_text: str) -> Dict[str, Any]:
     # Metodología
     decision_log.append({
         "area": "methodology",
-        "why": explain_methodology_choice(requirements_text, chosen),
+        "why": list(score),
         "sources": methodology_sources,
     })
 
@@ -275,52 +343,28 @@ def generate_proposal(requirements_text: str) -> Dict[str, Any]:
     decision_log.append({
         "area": "team",
         "why": ["Cobertura completa de funciones", "Dimensionado por módulos y riesgos"],
-        "sources": [
-            {"autor": "Forsgren, Humble, Kim", "titulo": "Accelerate", "anio": 2018,
-             "url": "https://itrevolution.com/accelerate/"},
-            {"autor": "Skelton, Pais", "titulo": "Team Topologies", "anio": 2019,
-             "url": "https://teamtopologies.com/"},
-            {"autor": "DeMarco, Lister", "titulo": "Peopleware", "anio": 1999,
-             "url": "https://www.oreilly.com/library/view/peopleware-productive-projects/9780133440707/"},
-        ],
+        "sources": list(TEAM_SOURCES_REFS),
     })
 
     # Fases
     decision_log.append({
         "area": "phases",
         "why": ["Descubrimiento→Entrega para reducir incertidumbre", "Inspección/adaptación continua"],
-        "sources": [
-            {"autor": "Jeff Patton", "titulo": "User Story Mapping", "anio": 2014,
-             "url": "http://jpattonassociates.com/user-story-mapping/"},
-            {"autor": "Jez Humble, David Farley", "titulo": "Continuous Delivery", "anio": 2010,
-             "url": "https://continuousdelivery.com/"},
-            {"autor": "Schwaber, Sutherland", "titulo": "The Scrum Guide", "anio": 2020,
-             "url": "https://scrumguides.org/"},
-        ],
+        "sources": list(PHASE_SOURCES_REFS),
     })
 
     # Presupuesto
     decision_log.append({
         "area": "budget",
         "why": ["Estimación proporcional a personas×semanas×tarifa + contingencia"],
-        "sources": [
-            {"autor": "Steve McConnell", "titulo": "Software Estimation", "anio": 2006,
-             "url": "https://www.construx.com/resources/software-estimation/"},
-            {"autor": "Boehm", "titulo": "Cone of Uncertainty", "anio": 1981,
-             "url": "https://en.wikipedia.org/wiki/Cone_of_Uncertainty"},
-        ],
+        "sources": list(BUDGET_SOURCES_REFS),
     })
 
     # Riesgos
     decision_log.append({
         "area": "risks",
         "why": ["Riesgos típicos de pagos/realtime/mobile/ML"],
-        "sources": [
-            {"autor": "OWASP", "titulo": "Web Security Testing Guide", "anio": 2021,
-             "url": "https://owasp.org/www-project-wstg/"},
-            {"autor": "PCI Council", "titulo": "PCI DSS", "anio": 2024,
-             "url": "https://www.pcisecuritystandards.org/"},
-        ],
+        "sources": list(RISK_SOURCES_REFS),
     })
 
     return {
@@ -330,7 +374,18 @@ def generate_proposal(requirements_text: str) -> Dict[str, Any]:
         "phases": phases,
         "budget": budget,
         "risks": risks,
-        "explanation": explain_methodology_choice(requirements_text, chosen),
+        "explanation": list(score),
         "decision_log": decision_log,
         "methodology_sources": methodology_sources,  # <-- clave para citar siempre
     }
+
+
+def generate_proposals_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Varias propuestas de golpe: detect_signals una vez por texto y el scoring de
+    metodologías en una sola multiplicación de matrices para todo el lote.
+    Cada propuesta es idéntica a la de generate_proposal(texto).
+    """
+    signals = [detect_signals(t) for t in texts]
+    scored = score_methodologies_batch(texts, signals)
+    return [generate_proposal(t, sig, sc) for t, sig, sc in zip(texts, signals, scored)]
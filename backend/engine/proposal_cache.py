@@ -0,0 +1,189 @@
+# backend/engine/proposal_cache.py
+"""
+Caché de propuestas: generate_proposal es función pura del texto de requisitos, así que
+guardamos el resultado por (hash del texto normalizado, versión del planner/conocimiento).
+
+- Nivel 1: LRU en proceso (bytes JSON → cada hit devuelve un dict nuevo, el que llama
+  puede mutarlo sin romper la caché).
+- Nivel 2: tabla proposal_memo en la BD (sobrevive reinicios y se comparte entre workers).
+
+La versión es un hash de PLANNER_VERSION + versión del conocimiento (kb) + METHODOLOGIES + reglas de scoring + tablas de
+tarifas. Se recalcula como mucho cada VERSION_CHECK_SECONDS, así que si cambian esas tablas
+las entradas viejas dejan de servirse solas (su clave ya no coincide); las filas de versiones
+anteriores se borran de la BD al arrancar (purge_stale).
+
+Config por entorno: PROPOSAL_CACHE_SIZE (entradas LRU, 512), PROPOSAL_CACHE_DB (0 = sin BD).
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import orjson as _orjson  # opcional: bastante más rápido para (de)serializar
+except Exception:
+    _orjson = None
+
+from backend.engine import planner
+from backend.knowledge import kb, methodologies
+
+VERSION_CHECK_SECONDS = 30.0
+
+_LOCK = threading.Lock()
+_LRU: "OrderedDict[str, bytes]" = OrderedDict()
+_STATS: Dict[str, int] = {"hits_memory": 0, "hits_db": 0, "misses": 0, "invalidations": 0}
+_VERSION: Dict[str, Any] = {"value": None, "checked_at": 0.0}
+
+
+def _max_entries() -> int:
+    try:
+        return max(0, int(os.getenv("PROPOSAL_CACHE_SIZE", "512")))
+    except ValueError:
+        return 512
+
+
+def _use_db() -> bool:
+    return os.getenv("PROPOSAL_CACHE_DB", "1") not in ("0", "false", "no")
+
+
+def _dumps(obj: Any) -> bytes:
+    if _orjson is not None:
+        return _orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _loads(raw: bytes) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(raw)
+    return json.loads(raw)
+
+
+def normalize_requirements(text: str) -> str:
+    # Sólo normalizamos lo que el planner ya ignora (mayúsculas y espacios de los extremos):
+    # así un hit es exactamente lo que daría recalcular.
+    return (text or "").strip().lower()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_requirements(text).encode("utf-8")).hexdigest()
+
+
+def compute_version() -> str:
+    """Huella de todo lo que determina la salida del planner."""
+    payload = {
+        "planner": planner.PLANNER_VERSION,
+        "knowledge": kb.version(),
+        "methodologies": dict(methodologies.METHODOLOGIES),   # LazyMapping → dict para json
+        "rules": dict(methodologies.METHOD_RULES),
+        "rates": planner.BASE_ROLE_RATES,
+        "multipliers": planner.INDUSTRY_RATE_MULTIPLIERS,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def current_version(force: bool = False) -> str:
+    now = time.monotonic()
+    if force or _VERSION["value"] is None or now - _VERSION["checked_at"] > VERSION_CHECK_SECONDS:
+        v = compute_version()
+        with _LOCK:
+            if _VERSION["value"] is not None and v != _VERSION["value"]:
+                # cambió el conocimiento: lo de memoria ya no vale (la BD se filtra por versión)
+                _LRU.clear()
+                _STATS["invalidations"] += 1
+            _VERSION["value"] = v
+            _VERSION["checked_at"] = now
+    return _VERSION["value"]
+
+
+def _lru_get(key: str) -> Optional[bytes]:
+    with _LOCK:
+        raw = _LRU.get(key)
+        if raw is not None:
+            _LRU.move_to_end(key)
+        return raw
+
+
+def _lru_put(key: str, raw: bytes) -> None:
+    cap = _max_entries()
+    if cap <= 0:
+        return
+    with _LOCK:
+        _LRU[key] = raw
+        _LRU.move_to_end(key)
+        while len(_LRU) > cap:
+            _LRU.popitem(last=False)
+
+
+def cached_generate_proposal(requirements_text: str) -> Dict[str, Any]:
+    """Igual que planner.generate_proposal pero pasando por la caché (LRU → BD → calcular)."""
+    version = current_version()
+    h = text_hash(requirements_text)
+    key = f"{version}:{h}"
+
+    raw = _lru_get(key)
+    if raw is not None:
+        _STATS["hits_memory"] += 1
+        return _loads(raw)
+
+    if _use_db():
+        try:
+            from backend.memory import state_store
+            stored = state_store.get_proposal_memo(h, version)
+        except Exception:
+            stored = None   # sin tabla / BD caída → seguimos sin caché persistente
+        if stored is not None:
+            _STATS["hits_db"] += 1
+            _lru_put(key, _dumps(stored))
+            return stored
+
+    _STATS["misses"] += 1
+    p = planner.generate_proposal(normalize_requirements(requirements_text))
+    raw = _dumps(p)
+    _lru_put(key, raw)
+    if _use_db():
+        try:
+            from backend.memory import state_store
+            state_store.save_proposal_memo(h, version, p)
+        except Exception:
+            pass
+    # devolvemos una copia independiente de lo guardado
+    return _loads(raw)
+
+
+def purge_stale() -> int:
+    """Borra de proposal_memo lo de otras versiones (se llama al arrancar: sin esto la tabla
+    crece con cada cambio de conocimiento). Devuelve cuántas filas se han eliminado."""
+    if not _use_db():
+        return 0
+    from backend.memory import state_store
+    return state_store.purge_proposal_memo(current_version(force=True))
+
+
+def invalidate() -> None:
+    """Vacía la LRU y fuerza a recalcular la versión (p. ej. tras recargar conocimiento)."""
+    with _LOCK:
+        _LRU.clear()
+        _STATS["invalidations"] += 1
+    current_version(force=True)
+
+
+def cache_stats() -> Dict[str, Any]:
+    hits = _STATS["hits_memory"] + _STATS["hits_db"]
+    total = hits + _STATS["misses"]
+    return {
+        **_STATS,
+        "requests": total,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+        "memory_entries": len(_LRU),
+        "version": _VERSION["value"],
+    }
+
+
+def reset_cache_stats() -> None:
+    for k in _STATS:
+        _STATS[k] = 0
@@ -0,0 +1,262 @@
+# backend/engine/proposal_graph.py
+"""
+Grafo reactivo de campos derivados de una propuesta.
+
+Presupuesto (by_role, labor, contingencia, total), project_weeks y el calendario dependen
+sólo de unas pocas entradas: equipo, fases, metodología, tarifas, % de contingencia y fecha
+de inicio / festivos / país del calendario. Cada nodo derivado declara sus entradas y sólo se recalcula cuando alguna
+ha cambiado de versión; si el valor recalculado es igual al anterior, su versión no sube y
+los nodos que dependen de él tampoco se recalculan (corte temprano).
+
+Detección de cambios en update(): desde los parches copy-on-write (_apply_patch) las ramas que
+no toca un parche se comparten por identidad, así que se compara primero con `is` y sólo si
+difiere se cae a `==`. Las propuestas se tratan como inmutables: nada debe mutarlas in situ.
+
+Los renderers (texto de _pretty_proposal, etc.) se memoizan con memo(), indexados por la
+versión global de la propuesta (o por la versión de las entradas que lean, si se indican).
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Tarifas por defecto si la propuesta no trae role_rates_eur_pw (las mismas que usaba _recompute_budget)
+DEFAULT_ROLE_RATES: Dict[str, float] = {
+    "PM": 1200.0, "Tech Lead": 1400.0,
+    "Backend Dev": 1100.0, "Frontend Dev": 1000.0,
+    "QA": 900.0, "UX/UI": 1000.0, "ML Engineer": 1400.0,
+}
+DEFAULT_RATE = 1000.0
+
+_MISSING = object()
+
+
+# ---------- extracción de entradas ----------
+
+def _team(p: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return p.get("team", []) or []
+
+
+def _phases(p: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return p.get("phases", []) or []
+
+
+def _rates(p: Dict[str, Any]) -> Dict[str, float]:
+    ass = (p.get("budget", {}) or {}).get("assumptions", {}) or {}
+    return ass.get("role_rates_eur_pw", {}) or DEFAULT_ROLE_RATES
+
+
+def _contingency_pct(p: Dict[str, Any]) -> float:
+    budget = p.get("budget", {}) or {}
+    ass = budget.get("assumptions", {}) or {}
+    # override explícito en assumptions; si no, se deduce del presupuesto anterior
+    if isinstance(ass.get("contingency_pct"), (int, float)):
+        return ass["contingency_pct"]
+    if budget.get("labor_estimate_eur"):
+        return round(100 * (budget.get("contingency_10pct", 0.0) / budget.get("labor_estimate_eur", 1.0)))
+    return 10
+
+
+def _methodology(p: Dict[str, Any]) -> str:
+    return p.get("methodology", "") or ""
+
+
+def _start_date(p: Dict[str, Any]) -> Optional[str]:
+    return (p.get("timeline") or {}).get("start_date")
+
+
+def _calendar(p: Dict[str, Any]) -> Tuple[Tuple[str, ...], Optional[str]]:
+    # festivos y país con los que se generó el calendario (_build_timeline los guarda)
+    tl = p.get("timeline") or {}
+    return tuple(str(h) for h in (tl.get("holidays") or ())), tl.get("country")
+
+
+# entrada → extractor, y qué clave de primer nivel de la propuesta la contiene
+INPUTS: Dict[str, Tuple[str, Callable[[Dict[str, Any]], Any]]] = {
+    "team": ("team", _team),
+    "phases": ("phases", _phases),
+    "methodology": ("methodology", _methodology),
+    "rates": ("budget", _rates),
+    "contingency_pct": ("budget", _contingency_pct),
+    "start_date": ("timeline", _start_date),
+    "calendar": ("timeline", _calendar),
+}
+
+
+# ---------- funciones de los nodos derivados ----------
+
+def _project_weeks(phases):
+    return sum(ph.get("weeks", 0) for ph in phases)
+
+
+def _by_role(team, project_weeks, rates):
+    by_role: Dict[str, float] = {}
+    for r in team:
+        role = r["role"]; cnt = float(r["count"])
+        rate = float(rates.get(role, DEFAULT_RATE))
+        by_role.setdefault(role, 0.0)
+        by_role[role] += cnt * project_weeks * rate
+    return by_role
+
+
+def _labor(by_role):
+    return round(sum(by_role.values()), 2)
+
+
+def _contingency(labor, contingency_pct):
+    return round((contingency_pct / 100.0) * labor, 2)
+
+
+def _total(labor, contingency):
+    return round(labor + contingency, 2)
+
+
+def _budget(labor, contingency, total, by_role, project_weeks, rates, contingency_pct):
+    return {
+        "labor_estimate_eur": labor,
+        "contingency_10pct": contingency,  # mantenemos el nombre original aunque cambie el pct
+        "total_eur": total,
+        "by_role": by_role,
+        "assumptions": {
+            "project_weeks": project_weeks,
+            "role_rates_eur_pw": rates,
+            "contingency_pct": contingency_pct
+        }
+    }
+
+
+def _timeline(phases, methodology, start_date, calendar):
+    """Resultado completo de scheduler.schedule (end_date, events, critical_path...) desde
+    start_date, con la misma metodología y calendario que la propuesta (None si no hay fecha)."""
+    if not start_date:
+        return None
+    try:
+        start = datetime.fromisoformat(str(start_date)).date()
+    except Exception:
+        return None
+    from backend.engine.scheduler import schedule
+    holidays, country = calendar
+    return schedule({"phases": phases, "methodology": methodology}, start,
+                    holidays=list(holidays), country=country, include_tasks=False)
+
+
+# nombre → (entradas, función). El orden de las entradas es el de los argumentos.
+DERIVED: Dict[str, Tuple[Tuple[str, ...], Callable[..., Any]]] = {
+    "project_weeks": (("phases",), _project_weeks),
+    "by_role": (("team", "project_weeks", "rates"), _by_role),
+    "labor": (("by_role",), _labor),
+    "contingency": (("labor", "contingency_pct"), _contingency),
+    "total": (("labor", "contingency"), _total),
+    "budget": (("labor", "contingency", "total", "by_role", "project_weeks", "rates", "contingency_pct"), _budget),
+    "timeline": (("phases", "methodology", "start_date", "calendar"), _timeline),
+}
+
+
+class ProposalGraph:
+    """
+    Estado incremental de UNA propuesta (una por sesión). Uso:
+        g = ProposalGraph(p)
+        g.update(p2)          # marca sucias sólo las entradas que han cambiado
+        g.get("total")        # recalcula lo mínimo
+        g.memo("pretty", _pretty_proposal)
+    """
+
+    def __init__(self, proposal: Optional[Dict[str, Any]] = None):
+        self.proposal: Dict[str, Any] = {}
+        self.version = 0
+        self._inputs: Dict[str, Any] = {}
+        self._input_version: Dict[str, int] = {k: 0 for k in INPUTS}
+        self._nodes: Dict[str, Tuple[Tuple[str, ...], Callable[..., Any]]] = dict(DERIVED)
+        # nodo → [valor, versión, sello con las versiones de sus entradas]
+        self._state: Dict[str, List[Any]] = {}
+        self._memo: Dict[str, Tuple[Any, Any]] = {}
+        self.recomputes: Dict[str, int] = {}
+        if proposal is not None:
+            self.update(proposal)
+
+    # ----- definición -----
+    def define(self, name: str, deps: Iterable[str], fn: Callable[..., Any]) -> None:
+        """Añade (o sustituye) un nodo derivado."""
+        deps = tuple(deps)
+        for d in deps:
+            if d not in INPUTS and d not in self._nodes:
+                raise KeyError(f"Entrada desconocida: {d}")
+        self._nodes[name] = (deps, fn)
+        self._state.pop(name, None)
+
+    # ----- entradas -----
+    def update(self, proposal: Dict[str, Any]) -> List[str]:
+        """Sustituye la propuesta y devuelve las entradas que han cambiado."""
+        old = self.proposal
+        if proposal is old and self.version:
+            return []
+        keys = set(old) | set(proposal)
+        touched = set()
+        for k in keys:
+            a, b = old.get(k, _MISSING), proposal.get(k, _MISSING)
+            if a is not b and a != b:
+                touched.add(k)
+        self.proposal = proposal
+        if touched or not self.version:
+            self.version += 1
+        changed: List[str] = []
+        for name, (key, extract) in INPUTS.items():
+            if name in self._inputs and key not in touched:
+                continue
+            val = extract(proposal)
+            prev = self._inputs.get(name, _MISSING)
+            if prev is val or prev == val:
+                continue
+            self._inputs[name] = val
+            self._input_version[name] += 1
+            changed.append(name)
+        return changed
+
+    # ----- nodos -----
+    def _version_of(self, name: str) -> int:
+        if name in INPUTS:
+            return self._input_version[name]
+        self.get(name)
+        return self._state[name][1]
+
+    def get(self, name: str) -> Any:
+        if name in INPUTS:
+            return self._inputs.get(name)
+        deps, fn = self._nodes[name]
+        stamp = tuple(self._version_of(d) for d in deps)
+        st = self._state.get(name)
+        if st is not None and st[2] == stamp:
+            return st[0]
+        value = fn(*(self.get(d) for d in deps))
+        self.recomputes[name] = self.recomputes.get(name, 0) + 1
+        if st is None:
+            self._state[name] = [value, 1, stamp]
+        elif st[0] == value:
+            st[2] = stamp        # corte temprano: mismo valor, misma versión
+        else:
+            self._state[name] = [value, st[1] + 1, stamp]
+        return self._state[name][0]
+
+    def budget(self) -> Dict[str, Any]:
+        """Presupuesto derivado (copia: quien lo reciba puede guardarlo en su propuesta)."""
+        b = self.get("budget")
+        return {**b, "by_role": dict(b["by_role"]),
+                "assumptions": {**b["assumptions"], "role_rates_eur_pw": dict(b["assumptions"]["role_rates_eur_pw"])}}
+
+    # ----- renderers -----
+    def memo(self, key: str, fn: Callable[[Dict[str, Any]], Any], deps: Optional[Iterable[str]] = None) -> Any:
+        """
+        fn(propuesta) memoizado. Sin `deps` se indexa por la versión global (cualquier cambio
+        invalida); con `deps` sólo por las versiones de esas entradas/nodos.
+        """
+        stamp = self.version if deps is None else tuple(self._version_of(d) for d in deps)
+        hit = self._memo.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        value = fn(self.proposal)
+        self._memo[key] = (stamp, value)
+        return value
+
+
+def recompute_budget(p: Dict[str, Any]) -> Dict[str, Any]:
+    """Presupuesto de `p` calculado desde cero (sin estado de sesión)."""
+    return ProposalGraph(p).budget()
@@ -0,0 +1,183 @@
+# backend/engine/risk_sim.py
+"""
+Simulación Monte Carlo de coste y plazo sobre una propuesta de generate_proposal.
+
+El planner da un total puntual y semanas fijas por fase (con la contingencia como % plano).
+Aquí muestreamos, vectorizado con NumPy (100k muestras por defecto):
+  - duración de cada fase: triangular (optimista, más probable, pesimista) o lognormal
+  - tarifa de cada rol: triangular alrededor de la tarifa de la propuesta (o lognormal, con la
+    misma `dist` que las fases)
+  - factores de riesgo de industria/técnicos (detect_signals): cada uno ocurre con cierta
+    probabilidad y, si ocurre, alarga el plazo y encarece. Están correlacionados con un
+    factor común (cópula gaussiana de un factor): cuando algo va mal suele ir mal junto.
+
+Resultado: P50/P80/P95 de coste y de semanas (+ fechas de fin) y probabilidad de no
+pasarse del presupuesto, listos para citar en el chat y en el informe PDF.
+"""
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+import time
+
+import numpy as np
+
+from backend.engine.whatif import baseline_from_proposal
+from backend.knowledge.methodologies import detect_signals
+
+DEFAULT_SAMPLES = 100_000
+PERCENTILES = (50, 80, 95)
+
+# Triangular de duración de fase como fracción de las semanas planificadas (optimista, pesimista).
+# Las fases suelen desviarse más hacia arriba que hacia abajo.
+PHASE_LOW, PHASE_HIGH = 0.85, 1.40
+# Lognormal alternativa: mediana = semanas planificadas, sigma en escala log
+PHASE_LOG_SIGMA = 0.20
+# Triangular de tarifas (mercado/negociación)
+RATE_LOW, RATE_HIGH = 0.95, 1.15
+# Lognormal alternativa: mediana = tarifa de la propuesta
+RATE_LOG_SIGMA = 0.06
+
+# señal → (probabilidad de que el riesgo se materialice, impacto en plazo, impacto en coste)
+RISK_FACTORS: Dict[str, Tuple[float, float, float]] = {
+    "uncertainty":       (0.45, 0.20, 0.10),
+    "regulated":         (0.35, 0.15, 0.10),
+    "payments":          (0.30, 0.10, 0.08),
+    "integrations":      (0.40, 0.12, 0.06),
+    "realtime":          (0.25, 0.10, 0.08),
+    "ml_ai":             (0.40, 0.20, 0.12),
+    "iot":               (0.35, 0.15, 0.10),
+    "large_org":         (0.35, 0.15, 0.08),
+    "high_availability": (0.25, 0.08, 0.10),
+    "quality_critical":  (0.25, 0.10, 0.06),
+    "fixed_deadline":    (0.30, 0.05, 0.10),   # más horas extra que retraso
+    "distributed_team":  (0.30, 0.08, 0.04),
+}
+# peso del factor común en la correlación entre riesgos (0 = independientes)
+RISK_CORRELATION = 0.35
+
+
+def _start_date(p: Dict[str, Any], start: Optional[date]) -> date:
+    if start is not None:
+        return start
+    try:
+        return datetime.fromisoformat(str((p.get("timeline") or {}).get("start_date"))).date()
+    except Exception:
+        return date.today()
+
+
+def active_risks(signals: Dict[str, float]) -> List[str]:
+    return [k for k in RISK_FACTORS if signals.get(k, 0.0) == 1.0]
+
+
+def simulate(p: Dict[str, Any], requirements: Optional[str] = None, signals: Optional[Dict[str, float]] = None,
+             n: int = DEFAULT_SAMPLES, dist: str = "triangular", seed: Optional[int] = 0,
+             start: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Simula `n` escenarios de la propuesta `p`. Las señales salen de `signals` o de detect_signals
+    sobre `requirements` (si no hay ninguna de las dos, sin factores de riesgo).
+    Con seed fija el resultado es reproducible (lo que se cita en el chat y en el PDF coincide).
+    """
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    if signals is None:
+        signals = detect_signals(requirements) if requirements else {}
+
+    # FTE, tarifas, fases y contingencia con las mismas reglas que el presupuesto (y el what-if)
+    base = baseline_from_proposal(p)
+    planned = np.array([w for _, w in base["phases"]], dtype=float)
+    fte = np.array(list(base["fte"].values()), dtype=float)
+    rates = np.array([base["rates"][r] for r in base["fte"]], dtype=float)
+
+    # 1) duración por fase (n × fases)
+    if len(planned):
+        if dist == "lognormal":
+            weeks = planned * np.exp(rng.normal(0.0, PHASE_LOG_SIGMA, size=(n, len(planned))))
+        else:
+            weeks = rng.triangular(PHASE_LOW, 1.0, PHASE_HIGH, size=(n, len(planned))) * planned
+        total_weeks = weeks.sum(axis=1)
+    else:
+        total_weeks = np.zeros(n)
+
+    # 2) coste semanal del equipo con tarifas inciertas (n × roles)
+    if len(fte):
+        if dist == "lognormal":
+            rate_mult = np.exp(rng.normal(0.0, RATE_LOG_SIGMA, size=(n, len(fte))))
+        else:
+            rate_mult = rng.triangular(RATE_LOW, 1.0, RATE_HIGH, size=(n, len(fte)))
+        weekly = (rate_mult * (fte * rates)).sum(axis=1)
+    else:
+        weekly = np.zeros(n)
+
+    # 3) riesgos correlacionados: Z_k = sqrt(ρ)·M + sqrt(1-ρ)·e_k, ocurre si Z_k supera su umbral
+    risks = active_risks(signals)
+    sched = np.ones(n)
+    cost_mult = np.ones(n)
+    hits: Dict[str, float] = {}
+    if risks:
+        common = rng.standard_normal(n)[:, None]
+        z = np.sqrt(RISK_CORRELATION) * common + np.sqrt(1.0 - RISK_CORRELATION) * rng.standard_normal((n, len(risks)))
+        prob = np.array([RISK_FACTORS[k][0] for k in risks])
+        thresholds = np.array([NormalDist().inv_cdf(1.0 - q) for q in prob])
+        occurs = z > thresholds
+        sched = 1.0 + occurs @ np.array([RISK_FACTORS[k][1] for k in risks])
+        cost_mult = 1.0 + occurs @ np.array([RISK_FACTORS[k][2] for k in risks])
+        hits = {k: round(float(v), 4) for k, v in zip(risks, occurs.mean(axis=0))}
+
+    total_weeks = total_weeks * sched
+    cost = total_weeks * weekly * cost_mult
+
+    budget = (p.get("budget") or {})
+    planned_total = float(budget.get("total_eur") or 0.0)
+    planned_labor = float(budget.get("labor_estimate_eur") or 0.0)
+    start_d = _start_date(p, start)
+    cost_p = np.percentile(cost, PERCENTILES)
+    weeks_p = np.percentile(total_weeks, PERCENTILES)
+    out = {
+        "samples": int(n),
+        "distribution": dist,
+        "seed": seed,
+        "start_date": start_d.isoformat(),
+        "cost_eur": {f"p{q}": round(float(v), 2) for q, v in zip(PERCENTILES, cost_p)},
+        "weeks": {f"p{q}": round(float(v), 1) for q, v in zip(PERCENTILES, weeks_p)},
+        "finish_date": {f"p{q}": (start_d + timedelta(weeks=float(v))).isoformat() for q, v in zip(PERCENTILES, weeks_p)},
+        "planned": {
+            "total_eur": planned_total,
+            "labor_eur": planned_labor,
+            "weeks": float(planned.sum()),
+            "contingency_pct": base["contingency_pct"],
+        },
+        "prob_within_budget": round(float((cost <= planned_total).mean()), 4) if planned_total else None,
+        "prob_within_weeks": round(float((total_weeks <= planned.sum()).mean()), 4) if len(planned) else None,
+        "risk_factors": hits,
+    }
+    # contingencia que haría falta sobre la mano de obra para cubrir el P80
+    if planned_labor:
+        out["contingency_for_p80_pct"] = round(100.0 * (out["cost_eur"]["p80"] / planned_labor - 1.0), 1)
+    out["elapsed_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+    return out
+
+
+def _eur(x: float) -> str:
+    return f"{float(x):,.0f} €".replace(",", ".")
+
+
+def summary_lines(sim: Dict[str, Any]) -> List[str]:
+    """Texto corto para citar en el chat / informe."""
+    c, w, f = sim["cost_eur"], sim["weeks"], sim["finish_date"]
+    lines = [
+        f"Coste: P50 {_eur(c['p50'])} · P80 {_eur(c['p80'])} · P95 {_eur(c['p95'])}",
+        f"Plazo: P50 {w['p50']:g} sem ({f['p50']}) · P80 {w['p80']:g} sem ({f['p80']}) · P95 {w['p95']:g} sem ({f['p95']})",
+    ]
+    pl = sim.get("planned") or {}
+    if sim.get("prob_within_budget") is not None:
+        lines.append(f"Probabilidad de no pasarse del presupuesto ({_eur(pl.get('total_eur', 0))}): "
+                     f"{sim['prob_within_budget'] * 100:.0f}%")
+    if sim.get("prob_within_weeks") is not None:
+        lines.append(f"Probabilidad de acabar en las {pl.get('weeks', 0):g} semanas planificadas: {sim['prob_within_weeks'] * 100:.0f}%")
+    if sim.get("contingency_for_p80_pct") is not None:
+        lines.append(f"Contingencia necesaria para cubrir el P80: {sim['contingency_for_p80_pct']:g}% "
+                     f"(la propuesta lleva {pl.get('contingency_pct', 0):g}%)")
+    if sim.get("risk_factors"):
+        lines.append("Riesgos modelados: " + ", ".join(f"{k} ({v * 100:.0f}%)" for k, v in sim["risk_factors"].items()))
+    return lines
@@ -0,0 +1,429 @@
+# backend/engine/scheduler.py
+"""
+Planificador de calendario por camino crítico (CPM) con días laborables y nivelación.
+
+_build_timeline ponía las fases una detrás de otra en semanas naturales: no sabía de
+solapes, dependencias, festivos ni de que un solo QA no puede hacer dos cosas a la vez.
+Aquí:
+
+  - DAG de tareas: cada fase se expande con _phase_tasks_for_archetype (arquetipo por
+    nombre de fase). Dentro de la fase, plantilla de dependencias (la primera tarea abre
+    la fase; en desarrollo la integración espera a backend y frontend; en release el
+    despliegue espera al checklist...) repartiendo los días de la fase de modo que el
+    camino crítico interno dure exactamente lo que la fase.
+  - Entre fases: fin→inicio con la anterior (por defecto), o con las fases de
+    `depends_on`; `lag_days` (negativo = solape) u `overlap_pct` en la fase.
+  - CPM: pasadas hacia delante/atrás vectorizadas por niveles topológicos
+    (np.maximum.at / np.minimum.at sobre arrays de aristas) → ES/EF/LS/LF, holgura total
+    y libre, camino crítico.
+  - Fechas: offsets en días laborables → np.busday_offset en una sola llamada (también en
+    bloque para muchos proyectos a la vez: schedule_many), con festivos opcionales
+    (lista propia o calendario nacional "es").
+  - Nivelación (opcional): SGS serie por prioridad de holgura; cada tarea ocupa 1 FTE
+    (o la capacidad del rol si es menor) del primer rol de la tarea que haya en el equipo,
+    con capacidad = FTE del rol en la propuesta.
+
+Las duraciones son de 5 días laborables por semana de fase (mínimo 1 si la fase tiene semanas).
+"""
+from __future__ import annotations
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from functools import lru_cache
+import heapq
+import math
+
+import numpy as np
+
+DAYS_PER_WEEK = 5
+EPS = 1e-9
+
+# festivos nacionales de fecha fija (España); los móviles/autonómicos van en `holidays`
+NATIONAL_HOLIDAYS = {
+    "es": ["01-01", "01-06", "05-01", "08-15", "10-12", "11-01", "12-06", "12-08", "12-25"],
+}
+
+# plantillas de dependencias dentro de la fase: nombre de tarea → (predecesoras, reparto)
+# reparto: fracción de los días de la fase ("rest" = lo que quede hasta el final de la fase)
+_INTRA: Dict[str, Dict[str, Tuple[Tuple[str, ...], Any]]] = {
+    "development": {
+        "Planificación de trabajo": ((), 0.1),
+        "Implementación backend": (("Planificación de trabajo",), 0.6),
+        "Implementación frontend": (("Planificación de trabajo",), 0.6),
+        "Integración y contratos API": (("Implementación backend", "Implementación frontend"), "rest"),
+        "Pipelines CI/CD": (("Planificación de trabajo",), 0.3),
+        "Pruebas unitarias": (("Planificación de trabajo",), "rest"),
+    },
+    "release": {
+        "Checklist de publicación": ((), 0.3),
+        "Despliegue y migraciones": (("Checklist de publicación",), 0.4),
+        "Observabilidad post-release": (("Despliegue y migraciones",), "rest"),
+    },
+}
+# resto de arquetipos: la primera tarea abre la fase (20%) y las demás van en paralelo
+_OPEN_SHARE = 0.2
+
+
+def _brain():
+    from backend.engine import brain
+    return brain
+
+
+def _as_date(v: Any) -> date:
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    return datetime.fromisoformat(str(v)[:10]).date()
+
+
+def holiday_calendar(holidays: Optional[Iterable[Any]] = None, country: Optional[str] = None,
+                     years: Iterable[int] = ()) -> np.busdaycalendar:
+    """Calendario laborable L-V con festivos propios y/o nacionales para los años dados."""
+    days = {np.datetime64(_as_date(h).isoformat()) for h in (holidays or [])}
+    for mmdd in NATIONAL_HOLIDAYS.get((country or "").lower(), []):
+        for y in years:
+            days.add(np.datetime64(f"{y}-{mmdd}"))
+    return np.busdaycalendar(weekmask="1111100", holidays=sorted(days))
+
+
+def _split(D: int, share: Any, used: int) -> int:
+    if share == "rest":
+        return max(0, D - used)
+    return min(D, int(round(D * share)))
+
+
+def phase_tasks(archetype: str, D: int, methodology: str = "") -> List[Dict[str, Any]]:
+    """Tareas de una fase con duración (días) y predecesoras internas (índices)."""
+    tasks = _brain()._phase_tasks_for_archetype(archetype, methodology) or [
+        {"name": "Trabajo de la fase", "roles": [], "explain": ""}]
+    names = [t["name"] for t in tasks]
+    tmpl = _INTRA.get(archetype)
+    out: List[Dict[str, Any]] = []
+    if tmpl and all(n in tmpl for n in names):
+        ends: Dict[str, int] = {}
+        for t in tasks:
+            preds, share = tmpl[t["name"]]
+            start = max((ends[p] for p in preds), default=0)
+            d = _split(D, share, start)
+            d = min(d, D - start)
+            ends[t["name"]] = start + d
+            out.append({**t, "duration": d, "preds": [names.index(p) for p in preds]})
+        return out
+    d0 = _split(D, _OPEN_SHARE, 0) if len(tasks) > 1 else D
+    for i, t in enumerate(tasks):
+        out.append({**t, "duration": d0 if i == 0 else D - d0, "preds": [] if i == 0 else [0]})
+    return out
+
+
+def build_network(proposal: Dict[str, Any]) -> Dict[str, Any]:
+    """DAG de tareas de la propuesta: arrays de duraciones y aristas (src, dst, lag)."""
+    b = _brain()
+    meth = proposal.get("methodology", "") or ""
+    phases = proposal.get("phases", []) or []
+    tasks: List[Dict[str, Any]] = []
+    src: List[int] = []
+    dst: List[int] = []
+    lag: List[int] = []
+    entry: List[List[int]] = []
+    exits: List[List[int]] = []
+    by_name: Dict[str, int] = {}
+    phase_days: List[int] = []
+    for i, ph in enumerate(phases):
+        D = int(math.ceil(b._safe_float(ph.get("weeks", 0)) * DAYS_PER_WEEK - EPS))
+        D = max(D, 0)
+        arche = b._match_phase_archetype(ph.get("name", ""))
+        local = phase_tasks(arche, D, meth)
+        phase_days.append(D)
+        base = len(tasks)
+        has_succ = set()
+        for j, t in enumerate(local):
+            tasks.append({"phase_idx": i, "phase": ph.get("name", "Fase"), "name": t["name"],
+                          "roles": list(t.get("roles") or []), "duration": int(t["duration"])})
+            for pj in t["preds"]:
+                src.append(base + pj); dst.append(base + j); lag.append(0)
+                has_succ.add(pj)
+        entry.append([base + j for j, t in enumerate(local) if not t["preds"]])
+        exits.append([base + j for j in range(len(local)) if j not in has_succ])
+        by_name[b._norm(ph.get("name", ""))] = i
+
+        # dependencias entre fases
+        if "depends_on" in ph:
+            pred_phases = [by_name[b._norm(n)] for n in (ph.get("depends_on") or []) if b._norm(n) in by_name]
+        else:
+            pred_phases = [i - 1] if i > 0 else []
+        for pp in pred_phases:
+            if "lag_days" in ph:
+                lg = int(ph.get("lag_days") or 0)
+            else:
+                # solape en % de la fase anterior → desfase negativo en días
+                lg = -int(round(phase_days[pp] * b._safe_float(ph.get("overlap_pct", 0)) / 100.0))
+            for s in exits[pp]:
+                for e in entry[i]:
+                    src.append(s); dst.append(e); lag.append(lg)
+    return {
+        "tasks": tasks,
+        "dur": np.array([t["duration"] for t in tasks], dtype=np.int64),
+        "src": np.array(src, dtype=np.int64),
+        "dst": np.array(dst, dtype=np.int64),
+        "lag": np.array(lag, dtype=np.int64),
+    }
+
+
+def _levels(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Nivel topológico de cada nodo (Kahn). Lanza ValueError si hay ciclos."""
+    indeg = np.bincount(dst, minlength=n) if n else np.zeros(0, dtype=np.int64)
+    out_edges: List[List[int]] = [[] for _ in range(n)]
+    for s, d in zip(src.tolist(), dst.tolist()):
+        out_edges[s].append(d)
+    level = np.zeros(n, dtype=np.int64)
+    frontier = [i for i in range(n) if indeg[i] == 0]
+    indeg = indeg.copy()
+    seen = 0
+    while frontier:
+        nxt = []
+        for u in frontier:
+            seen += 1
+            for v in out_edges[u]:
+                level[v] = max(level[v], level[u] + 1)
+                indeg[v] -= 1
+                if indeg[v] == 0:
+                    nxt.append(v)
+        frontier = nxt
+    if seen != n:
+        raise ValueError("Las dependencias entre fases forman un ciclo")
+    return level
+
+
+def cpm(dur: np.ndarray, src: np.ndarray, dst: np.ndarray, lag: np.ndarray) -> Dict[str, np.ndarray]:
+    """Pasadas hacia delante y hacia atrás (días laborables desde el inicio)."""
+    n = dur.size
+    level = _levels(n, src, dst)
+    es = np.zeros(n, dtype=np.int64)
+    ef = dur.copy()
+    if src.size:
+        elev = level[dst]
+        order = np.argsort(elev, kind="stable")
+        bounds = np.searchsorted(elev[order], np.arange(1, level.max() + 2))
+        for lv in range(1, int(level.max()) + 1):
+            e = order[bounds[lv - 1]:bounds[lv]]
+            np.maximum.at(es, dst[e], ef[src[e]] + lag[e])
+            nodes = np.flatnonzero(level == lv)
+            ef[nodes] = es[nodes] + dur[nodes]
+    T = int(ef.max()) if n else 0
+    lf = np.full(n, T, dtype=np.int64)
+    ls = lf - dur
+    if src.size:
+        slev = level[src]
+        order = np.argsort(slev, kind="stable")
+        bounds = np.searchsorted(slev[order], np.arange(0, level.max() + 1))
+        for lv in range(int(level.max()) - 1, -1, -1):
+            e = order[bounds[lv]:bounds[lv + 1]]
+            np.minimum.at(lf, src[e], ls[dst[e]] - lag[e])
+            nodes = np.flatnonzero(level == lv)
+            ls[nodes] = lf[nodes] - dur[nodes]
+    total_float = ls - es
+    free = np.full(n, T, dtype=np.int64) - ef
+    if src.size:
+        np.minimum.at(free, src, es[dst] - lag - ef[src])
+    return {"es": es, "ef": ef, "ls": ls, "lf": lf, "total_float": total_float,
+            "free_float": np.maximum(free, 0), "makespan": np.int64(T), "level": level}
+
+
+def _capacities(proposal: Dict[str, Any]) -> Dict[str, float]:
+    b = _brain()
+    cap: Dict[str, float] = {}
+    for r in proposal.get("team", []) or []:
+        if r.get("role"):
+            role = b._canonical_role(r["role"])
+            cap[role] = cap.get(role, 0.0) + b._safe_float(r.get("count", 0))
+    return cap
+
+
+def level_resources(net: Dict[str, Any], res: Dict[str, np.ndarray], capacity: Dict[str, float]) -> np.ndarray:
+    """SGS serie: devuelve ES nivelado (días). Prioridad: menor LS, luego menor ES."""
+    b = _brain()
+    tasks, dur, src, dst, lag = net["tasks"], net["dur"], net["src"], net["dst"], net["lag"]
+    n = dur.size
+    role_of: List[Optional[str]] = []
+    demand = np.zeros(n)
+    for i, t in enumerate(tasks):
+        r = next((b._canonical_role(x) for x in t["roles"] if capacity.get(b._canonical_role(x), 0) > 0), None)
+        role_of.append(r)
+        demand[i] = min(1.0, capacity[r]) if r else 0.0
+    preds: List[List[Tuple[int, int]]] = [[] for _ in range(n)]
+    succs: List[List[int]] = [[] for _ in range(n)]
+    indeg = np.zeros(n, dtype=np.int64)
+    for s, d, lg in zip(src.tolist(), dst.tolist(), lag.tolist()):
+        preds[d].append((s, lg)); succs[s].append(d); indeg[d] += 1
+
+    horizon = int(dur.sum() + res["makespan"] + 1)
+    usage = {r: np.zeros(horizon) for r in set(filter(None, role_of))}
+    start = np.zeros(n, dtype=np.int64)
+    ready = [(int(res["ls"][i]), int(res["es"][i]), i) for i in range(n) if indeg[i] == 0]
+    heapq.heapify(ready)
+    while ready:
+        _, _, i = heapq.heappop(ready)
+        est = max([int(start[s] + dur[s] + lg) for s, lg in preds[i]] + [0])
+        d = int(dur[i])
+        r = role_of[i]
+        t0 = est
+        if r and d > 0:
+            u = usage[r]
+            limit = capacity[r] - demand[i] + EPS
+            while True:
+                if t0 + d > u.size:
+                    u = usage[r] = np.concatenate([u, np.zeros(max(u.size, d))])
+                win = np.lib.stride_tricks.sliding_window_view(u[t0:], d).max(axis=1)
+                ok = np.flatnonzero(win <= limit)
+                if ok.size:
+                    t0 += int(ok[0])
+                    break
+                t0 = u.size - d + 1
+            u[t0:t0 + d] += demand[i]
+        start[i] = t0
+        for v in succs[i]:
+            indeg[v] -= 1
+            if indeg[v] == 0:
+                heapq.heappush(ready, (int(res["ls"][v]), int(res["es"][v]), v))
+    return start
+
+
+@lru_cache(maxsize=64)
+def _calendar(holidays: Tuple[str, ...], country: Optional[str], y0: int, y1: int) -> np.busdaycalendar:
+    return holiday_calendar(holidays, country, range(y0, y1 + 1))
+
+
+def _structure_key(proposal: Dict[str, Any]) -> Tuple[Any, ...]:
+    # lo único de la propuesta que afecta a la red: metodología y fases (nombre, semanas, dependencias)
+    b = _brain()
+    phases = []
+    for ph in proposal.get("phases", []) or []:
+        phases.append((
+            str(ph.get("name", "Fase")), b._safe_float(ph.get("weeks", 0)),
+            tuple(ph.get("depends_on") or ()) if "depends_on" in ph else None,
+            ph.get("lag_days"), ph.get("overlap_pct"),
+        ))
+    return (proposal.get("methodology", "") or "", tuple(phases))
+
+
+@lru_cache(maxsize=4096)
+def _compiled(key: Tuple[Any, ...]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Red + CPM por estructura: un parche de equipo/presupuesto o 300 proyectos con las
+    mismas fases no vuelven a construir ni a recorrer el grafo. Los arrays son de sólo lectura."""
+    meth, phases = key
+    prop = {"methodology": meth, "phases": []}
+    for name, weeks, deps, lag, overlap in phases:
+        ph: Dict[str, Any] = {"name": name, "weeks": weeks}
+        if deps is not None:
+            ph["depends_on"] = list(deps)
+        if lag is not None:
+            ph["lag_days"] = lag
+        if overlap is not None:
+            ph["overlap_pct"] = overlap
+        prop["phases"].append(ph)
+    net = build_network(prop)
+    res = cpm(net["dur"], net["src"], net["dst"], net["lag"])
+    # tareas contiguas por fase → límites para reduceat
+    phase_of = np.array([t["phase_idx"] for t in net["tasks"]], dtype=np.int64)
+    net["bounds"] = np.searchsorted(phase_of, np.arange(len(phases)))
+    net["critical"] = (res["total_float"] == 0) & (net["dur"] > 0)
+    # parte fija de cada tarea en la salida (sin fechas), ya en tipos de Python
+    net["rows"] = [
+        {"id": j, "phase": t["phase"], "name": t["name"], "roles": t["roles"], "duration_days": d,
+         "es": a, "ef": b_, "ls": c, "lf": e, "total_float": tf, "free_float": ff, "critical": cr}
+        for j, (t, d, a, b_, c, e, tf, ff, cr) in enumerate(zip(
+            net["tasks"], net["dur"].tolist(), res["es"].tolist(), res["ef"].tolist(), res["ls"].tolist(),
+            res["lf"].tolist(), res["total_float"].tolist(), res["free_float"].tolist(), net["critical"].tolist()))
+    ]
+    net["phase_critical"] = np.logical_or.reduceat(net["critical"], net["bounds"]).tolist() if len(phases) else []
+    net["critical_path"] = [t["name"] for t, cr in zip(net["tasks"], net["critical"].tolist()) if cr]
+    for arr in list(net.values()) + list(res.values()):
+        if isinstance(arr, np.ndarray):
+            arr.setflags(write=False)
+    return net, res
+
+
+def schedule(proposal: Dict[str, Any], start: Any, holidays: Optional[Iterable[Any]] = None,
+             country: Optional[str] = None, level: bool = False, include_tasks: bool = True) -> Dict[str, Any]:
+    """Calendario CPM de una propuesta (ver schedule_many para lotes)."""
+    return schedule_many([proposal], [start], holidays=holidays, country=country,
+                         level=level, include_tasks=include_tasks)[0]
+
+
+def schedule_many(proposals: Sequence[Dict[str, Any]], starts: Sequence[Any],
+                  holidays: Optional[Iterable[Any]] = None, country: Optional[str] = None,
+                  level: bool = False, include_tasks: bool = True) -> List[Dict[str, Any]]:
+    """
+    CPM para muchos proyectos: las redes se comparten por estructura (_compiled) y TODAS las
+    fechas (tareas, fases y fin de proyecto) se convierten con una única llamada a
+    np.busday_offset. include_tasks=False devuelve sólo fases (vista de cartera).
+    """
+    b = _brain()
+    starts_d = [_as_date(s) for s in starts]
+    if not proposals:
+        return []
+    hol = tuple(sorted(_as_date(h).isoformat() for h in (holidays or [])))
+    cal = _calendar(hol, (country or "").lower() or None,
+                    min(d.year for d in starts_d), max(d.year for d in starts_d) + 5)
+    base = np.busday_offset(np.array([d.isoformat() for d in starts_d], dtype="datetime64[D]"),
+                            0, roll="forward", busdaycal=cal)
+
+    items = []
+    off_base: List[np.ndarray] = []
+    off_days: List[np.ndarray] = []
+    for i, p in enumerate(proposals):
+        net, res = _compiled(_structure_key(p))
+        es, ef = res["es"], res["ef"]
+        if level:
+            es = level_resources(net, res, _capacities(p))
+            ef = es + net["dur"]
+        bounds = net["bounds"]
+        n_ph = bounds.size
+        if n_ph:
+            pes = np.minimum.reduceat(es, bounds)
+            pef = np.maximum.reduceat(ef, bounds)
+        else:
+            pes = pef = np.zeros(0, dtype=np.int64)
+        makespan = int(ef.max()) if ef.size else 0
+        # [inicio tareas | fin tareas | inicio fases | fin fases | fin proyecto]
+        parts = [pes, np.maximum(pef - 1, pes), np.array([max(makespan - 1, 0)])]
+        if include_tasks:
+            parts = [es, np.maximum(ef - 1, es)] + parts
+        days = np.concatenate(parts)
+        items.append((p, net, res, es, makespan, days.size))
+        off_days.append(days)
+        off_base.append(np.full(days.size, i))
+    dates = np.busday_offset(base[np.concatenate(off_base)], np.concatenate(off_days),
+                             roll="forward", busdaycal=cal).astype(str).tolist()
+
+    out = []
+    pos = 0
+    for i, (p, net, res, es, makespan, size) in enumerate(items):
+        chunk = dates[pos:pos + size]
+        pos += size
+        n, n_ph = net["dur"].size, net["bounds"].size
+        tasks = []
+        if include_tasks:
+            t_start, t_end, chunk = chunk[:n], chunk[n:2 * n], chunk[2 * n:]
+            tasks = [{**row, "start": a, "end": e} for row, a, e in zip(net["rows"], t_start, t_end)]
+            if level:
+                for row, d in zip(tasks, (es - res["es"]).tolist()):
+                    row["delay_days"] = d
+        ph_crit = net["phase_critical"]
+        events = [{
+            "phase": ph.get("name", "Fase"),
+            "weeks": b._safe_float(ph.get("weeks", 0)),
+            "start": chunk[k], "end": chunk[n_ph + k],
+            "critical": ph_crit[k],
+        } for k, ph in enumerate(p.get("phases", []) or [])]
+        out.append({
+            "start_date": str(base[i]),
+            "end_date": chunk[2 * n_ph] if makespan else str(base[i]),
+            "working_days": makespan,
+            "cpm_working_days": int(res["makespan"]),
+            "leveled": bool(level),
+            "events": events,
+            "tasks": tasks,
+            "critical_path": list(net["critical_path"]),
+        })
+    return out
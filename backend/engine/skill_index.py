@@ -0,0 +1,265 @@
+# backend/engine/skill_index.py
+"""
+Índice de skills de la plantilla: índice invertido + matriz dispersa empleado × término.
+
+El análisis de staffing y de gaps (_score_staff_for_role, _matched_keywords,
+_person_has_topic, _closest_upskilling_candidates) normalizaba y recorría el texto libre
+de skills de cada empleado para cada keyword en cada petición. Aquí cada empleado se
+normaliza una vez al entrar en el índice y se guardan:
+
+  - tokens:  token normalizado → ids          (búsqueda exacta: "react", "k8s"...)
+  - terms:   término → ids que lo contienen   (misma semántica de substring que las
+             heurísticas: "automat" casa con "automatizacion"); se calcula la primera vez
+             que se pide un término y después se mantiene incrementalmente en upsert/remove
+  - matrix(terms): CSR empleados × términos → las puntuaciones por rol son un producto
+             disperso con la incidencia rol-keyword
+
+Hay un índice por usuario para los empleados guardados (lo mantienen create_employee,
+update_employee y delete_employee de state_store) y se puede construir uno efímero para
+una plantilla pegada en el chat (SkillIndex.from_staff).
+
+Concurrencia: las consultas también escriben (un término nuevo se añade a `terms`), así que
+todo lo que toca los diccionarios va bajo el lock del índice, y las consultas devuelven
+copias. Con varios workers el CRUD sólo avisa al índice del proceso que atendió la petición:
+cada índice de usuario guarda una marca de la tabla employees (nº de filas, suma de ids,
+último updated_at) y get_user_skill_index lo reconstruye si la marca de la BD es otra.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Set
+import json
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+try:
+    from scipy import sparse  # type: ignore
+except Exception:  # pragma: no cover
+    sparse = None
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#/.]+")
+
+
+def _norm(s: str) -> str:
+    # igual que brain._norm (minúsculas, sin tildes) para conservar la semántica de las heurísticas
+    nk = unicodedata.normalize("NFKD", str(s or "").lower())
+    return "".join(c for c in nk if not unicodedata.combining(c)).strip()
+
+
+def parse_skills(raw: Any) -> List[str]:
+    """Skills tal y como llegan (lista, JSON o CSV en la columna Employee.skills) → lista."""
+    if isinstance(raw, (list, tuple)):
+        return [str(s).strip() for s in raw if str(s).strip()]
+    raw = str(raw or "").strip()
+    if raw.startswith("["):
+        try:
+            return [str(s).strip() for s in json.loads(raw) if str(s).strip()]
+        except Exception:
+            pass
+    return [s.strip() for s in raw.split(",") if s.strip()]
+
+
+def person_from_row(row: Any) -> Dict[str, Any]:
+    """Employee (ORM) → dict de staff como el que usa brain."""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "role": row.role,
+        "skills": parse_skills(row.skills),
+        "seniority": row.seniority,
+        "availability_pct": row.availability_pct,
+    }
+
+
+class SkillIndex:
+    def __init__(self):
+        self.docs: Dict[Any, Dict[str, Any]] = {}
+        self.tokens: Dict[str, Set[Any]] = {}
+        self.terms: Dict[str, Set[Any]] = {}         # sobre skills + seniority
+        self.topic_terms: Dict[str, Set[Any]] = {}   # sobre skills + seniority + rol
+        self.version = 0
+        self.term_scans = 0   # nº de veces que un término se resolvió recorriendo docs (no por índice)
+        self.db_stamp: Optional[tuple] = None   # marca de employees con la que se construyó (índices de usuario)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_staff(cls, staff: Iterable[Dict[str, Any]]) -> "SkillIndex":
+        """Índice efímero de una plantilla (clave = posición en la lista)."""
+        idx = cls()
+        for i, person in enumerate(staff):
+            idx.upsert(i, person)
+        return idx
+
+    # ---------- mantenimiento incremental ----------
+
+    def upsert(self, key: Any, person: Dict[str, Any]) -> None:
+        skills = parse_skills(person.get("skills", []))
+        sen = person.get("seniority") or ""
+        skills_hay = _norm(" ".join(skills) + " " + sen)
+        topic_hay = _norm(" ".join(skills) + " " + sen + " " + (person.get("role") or ""))
+        toks = set(_TOKEN_RE.findall(skills_hay))
+        with self._lock:
+            if key in self.docs:
+                self.remove(key)
+            self.docs[key] = {"person": {**person, "skills": skills}, "skills_hay": skills_hay,
+                              "topic_hay": topic_hay, "tokens": toks}
+            for t in toks:
+                self.tokens.setdefault(t, set()).add(key)
+            # términos ya conocidos: sólo se comprueba el doc nuevo
+            for term, ids in self.terms.items():
+                if term in skills_hay:
+                    ids.add(key)
+            for term, ids in self.topic_terms.items():
+                if term in topic_hay:
+                    ids.add(key)
+            self.version += 1
+
+    def remove(self, key: Any) -> bool:
+        with self._lock:
+            doc = self.docs.pop(key, None)
+            if doc is None:
+                return False
+            for t in doc["tokens"]:
+                ids = self.tokens.get(t)
+                if ids is not None:
+                    ids.discard(key)
+                    if not ids:
+                        del self.tokens[t]
+            for ids in self.terms.values():
+                ids.discard(key)
+            for ids in self.topic_terms.values():
+                ids.discard(key)
+            self.version += 1
+            return True
+
+    # ---------- consultas ----------
+
+    def _term_ids(self, table: Dict[str, Set[Any]], field: str, term: str) -> Set[Any]:
+        # llamar con el lock cogido: devuelve el conjunto vivo del índice
+        t = _norm(term)
+        ids = table.get(t)
+        if ids is None:
+            self.term_scans += 1
+            ids = {k for k, d in self.docs.items() if t in d[field]}
+            table[t] = ids
+        return ids
+
+    def ids_with(self, term: str) -> Set[Any]:
+        """Empleados cuyo texto de skills/seniority contiene el término (como `kw in hay`)."""
+        with self._lock:
+            return set(self._term_ids(self.terms, "skills_hay", term))
+
+    def ids_with_topic(self, term: str) -> Set[Any]:
+        """Como ids_with pero incluyendo el rol (semántica de _person_has_topic)."""
+        with self._lock:
+            return set(self._term_ids(self.topic_terms, "topic_hay", term))
+
+    def ids_with_token(self, token: str) -> Set[Any]:
+        with self._lock:
+            return set(self.tokens.get(_norm(token), ()))
+
+    def keys(self) -> List[Any]:
+        with self._lock:
+            return list(self.docs)
+
+    def search(self, *terms: str) -> List[Any]:
+        """Intersección: empleados que tienen todos los términos."""
+        with self._lock:
+            if not terms:
+                return list(self.docs)
+            sets = sorted((self._term_ids(self.terms, "skills_hay", t) for t in terms), key=len)
+            out = set(sets[0])
+            for s in sets[1:]:
+                out &= s
+            return [k for k in self.docs if k in out]
+
+    def person(self, key: Any) -> Dict[str, Any]:
+        with self._lock:
+            return self.docs[key]["person"]
+
+    def people(self, keys: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+        """Personas de `keys` (todas si no se indican) que sigan en el índice."""
+        with self._lock:
+            keys = list(self.docs) if keys is None else keys
+            return [self.docs[k]["person"] for k in keys if k in self.docs]
+
+    def matrix(self, terms: List[str], keys: Optional[List[Any]] = None):
+        """Matriz dispersa (CSR) empleados × términos (1 si el empleado contiene el término)."""
+        rows: List[int] = []
+        cols: List[int] = []
+        with self._lock:
+            keys = list(self.docs) if keys is None else keys
+            row_of = {k: i for i, k in enumerate(keys)}
+            for j, term in enumerate(terms):
+                for k in self._term_ids(self.terms, "skills_hay", term):
+                    i = row_of.get(k)
+                    if i is not None:
+                        rows.append(i)
+                        cols.append(j)
+        shape = (len(keys), len(terms))
+        data = np.ones(len(rows))
+        if sparse is not None:
+            return sparse.csr_matrix((data, (rows, cols)), shape=shape)
+        dense = np.zeros(shape)
+        dense[rows, cols] = 1.0
+        return dense
+
+
+# ---------- índices por usuario (empleados guardados) ----------
+
+_USER_INDEXES: Dict[int, SkillIndex] = {}
+_LOCK = threading.Lock()
+
+
+def _db_stamp(user_id: int) -> tuple:
+    # cambia con cualquier alta, baja o edición (update_employee toca updated_at), la haga
+    # este worker u otro
+    from sqlalchemy import func
+    from backend.memory.state_store import SessionLocal, Employee
+    with SessionLocal() as db:
+        n, ids, last = db.query(func.count(Employee.id), func.sum(Employee.id), func.max(Employee.updated_at))\
+                         .filter(Employee.user_id == user_id).one()
+    return int(n or 0), int(ids or 0), str(last or "")
+
+
+def get_user_skill_index(user_id: int) -> SkillIndex:
+    """Índice del usuario; se (re)construye desde la BD si no existe o si la tabla employees
+    ha cambiado desde entonces (p.ej. por el CRUD atendido en otro worker)."""
+    stamp = _db_stamp(user_id)
+    idx = _USER_INDEXES.get(user_id)
+    if idx is not None and idx.db_stamp == stamp:
+        return idx
+    from backend.memory.state_store import SessionLocal, Employee
+    with SessionLocal() as db:
+        rows = db.query(Employee).filter(Employee.user_id == user_id).all()
+        people = [person_from_row(r) for r in rows]
+    fresh = SkillIndex()
+    for p in people:
+        fresh.upsert(p["id"], p)
+    fresh.db_stamp = stamp
+    with _LOCK:
+        # se publica entero: quien tenga el índice anterior termina su consulta con él
+        _USER_INDEXES[user_id] = fresh
+    return fresh
+
+
+def on_employee_saved(user_id: int, row: Any) -> None:
+    idx = _USER_INDEXES.get(user_id)
+    if idx is not None:   # si aún no se ha construido, se hará entero al pedirlo
+        with _LOCK:
+            idx.upsert(row.id, person_from_row(row))
+            # marca nueva tras el commit: la petición siguiente no reconstruye por un cambio propio
+            idx.db_stamp = _db_stamp(user_id)
+
+
+def on_employee_deleted(user_id: int, employee_id: int) -> None:
+    idx = _USER_INDEXES.get(user_id)
+    if idx is not None:
+        with _LOCK:
+            idx.remove(employee_id)
+            idx.db_stamp = _db_stamp(user_id)
+
+
+def reset_user_indexes() -> None:
+    _USER_INDEXES.clear()
@@ -0,0 +1,284 @@
+# backend/engine/staffing.py
+"""
+Asignación de plantilla a roles de una propuesta respetando disponibilidad y FTE.
+
+Antes _suggest_staffing reordenaba toda la plantilla con _score_staff_for_role para cada
+rol (y otra vez para cada rol de cada fase) y se quedaba con el primero: la misma persona
+salía como "mejor" para varios roles aunque tuviera un 50% de disponibilidad.
+
+Aquí:
+  1) matriz de puntuación rol × persona de una vez (misma heurística que
+     _score_staff_for_role, vectorizada: CSR persona × keyword del SkillIndex, y
+     puntuación = coincidencias @ incidencia rol-keyword)
+  2) poda: por rol sólo los `candidates_per_role` mejores (el ILP no necesita 5.000 columnas)
+  3) ILP con PuLP/CBC (transporte con FTE fraccional + binaria por par para no trocear
+     a la gente entre muchos roles):
+        max  Σ (COVER_WEIGHT + score) · x[r,s] − SPLIT_PENALTY · Σ y[r,s]
+        s.a. Σ_r x[r,s] ≤ disponibilidad_s      Σ_s x[r,s] ≤ demanda_r
+             x[r,s] ≤ min(disp_s, dem_r) · y[r,s]
+     Si PuLP no está o el solver falla → Húngaro (scipy linear_sum_assignment) sobre
+     "huecos" de FTE (un hueco por persona necesaria en cada rol).
+
+Resultado: qué persona cubre cuánto FTE de cada rol, qué queda sin cubrir y alternativas.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import time
+
+import numpy as np
+
+from backend.engine.skill_index import SkillIndex
+
+try:
+    import pulp  # type: ignore
+except Exception:  # pragma: no cover
+    pulp = None
+
+try:
+    from scipy.optimize import linear_sum_assignment  # type: ignore
+except Exception:  # pragma: no cover
+    linear_sum_assignment = None
+
+# Cubrir demanda pesa mucho más que la calidad del encaje (puntuaciones 0-~15)
+COVER_WEIGHT = 100.0
+# Penalización por cada par (rol, persona) usado: evita repartir a alguien en 4 roles
+SPLIT_PENALTY = 1.0
+# Por debajo de esta puntuación no se asigna (mejor dejar el hueco visible)
+MIN_SCORE = 0.5
+DEFAULT_CANDIDATES = 40
+ILP_TIME_LIMIT_S = 20
+
+
+def _brain():
+    # import perezoso: brain importa este módulo
+    from backend.engine import brain
+    return brain
+
+
+def _availability(person: Dict[str, Any]) -> float:
+    try:
+        return max(0.0, min(1.0, float(person.get("availability_pct", 100)) / 100.0))
+    except Exception:
+        return 1.0
+
+
+def _seniority_bonus(s: str) -> float:
+    if "lead" in s or "principal" in s:
+        return 1.5
+    if "senior" in s or "sr" in s:
+        return 0.8
+    if "junior" in s or "jr" in s:
+        return 0.1
+    return 0.0
+
+
+def score_matrix(roles: List[str], staff: List[Dict[str, Any]], index: Optional[SkillIndex] = None) -> np.ndarray:
+    """
+    Matriz roles × personas con la misma puntuación que _score_staff_for_role.
+    Con `index` (p. ej. el de los empleados guardados del usuario) las coincidencias de
+    keywords salen del índice; si no, se construye uno efímero para esta plantilla.
+    """
+    b = _brain()
+    n_roles, n_staff = len(roles), len(staff)
+    if not n_roles or not n_staff:
+        return np.zeros((n_roles, n_staff))
+
+    # keywords (las 6 primeras de cada rol, como la heurística original)
+    kw_index: Dict[str, int] = {}
+    role_kws: List[List[int]] = []
+    for role in roles:
+        idx = []
+        for kw in (b._ROLE_KEYWORDS.get(role, []) or [])[:6]:
+            idx.append(kw_index.setdefault(b._norm(kw), len(kw_index)))
+        role_kws.append(idx)
+    incidence = np.zeros((n_roles, max(1, len(kw_index))))
+    for r, idx in enumerate(role_kws):
+        for k in idx:
+            incidence[r, k] += 1.0
+    kws = list(kw_index)
+
+    if index is None:
+        index, keys = SkillIndex.from_staff(staff), list(range(n_staff))
+    else:
+        keys = [p.get("id", i) for i, p in enumerate(staff)]   # id en la BD o posición (índice efímero)
+    hits = index.matrix(kws, keys=keys)   # CSR personas × keywords
+
+    role_of = np.empty(n_staff, dtype=object)
+    bonus = np.zeros(n_staff)
+    low_avail = np.zeros(n_staff, dtype=bool)
+    canon_cache: Dict[str, str] = {}
+    for s, person in enumerate(staff):
+        sen = person.get("seniority") or ""
+        raw_role = person.get("role", "") or ""
+        if raw_role not in canon_cache:
+            canon_cache[raw_role] = b._canonical_role(raw_role)
+        role_of[s] = canon_cache[raw_role]
+        bonus[s] = _seniority_bonus(b._norm(sen))
+        low_avail[s] = _availability(person) < 0.5
+
+    scores = np.asarray((hits @ incidence[:, :len(kws)].T).T) if kws else np.zeros((n_roles, n_staff))
+    scores = scores + bonus[None, :]
+    scores += 5.0 * (np.asarray(roles, dtype=object)[:, None] == role_of[None, :])
+    scores[:, low_avail] *= 0.7
+    return scores
+
+
+def role_demand(proposal: Dict[str, Any]) -> Dict[str, float]:
+    """FTE por rol según el equipo de la propuesta (roles repetidos se suman)."""
+    out: Dict[str, float] = {}
+    for r in proposal.get("team", []) or []:
+        role = r.get("role")
+        if not role:
+            continue
+        try:
+            cnt = float(r.get("count", 1))
+        except Exception:
+            cnt = 1.0
+        if cnt > 0:
+            out[role] = out.get(role, 0.0) + cnt
+    return out
+
+
+def _candidates(scores: np.ndarray, avail: np.ndarray, k: int) -> List[np.ndarray]:
+    out = []
+    for r in range(scores.shape[0]):
+        row = np.where((avail > 0) & (scores[r] >= MIN_SCORE), scores[r], -np.inf)
+        kk = min(k, row.size)
+        idx = np.argpartition(-row, kk - 1)[:kk] if kk < row.size else np.arange(row.size)
+        idx = idx[np.isfinite(row[idx])]
+        out.append(idx[np.argsort(-row[idx], kind="stable")])
+    return out
+
+
+def _solve_ilp(scores, avail, demand, cands) -> Optional[Dict[Tuple[int, int], float]]:
+    if pulp is None:
+        return None
+    prob = pulp.LpProblem("staffing", pulp.LpMaximize)
+    x, y = {}, {}
+    for r, idx in enumerate(cands):
+        for s in idx.tolist():
+            ub = min(avail[s], demand[r])
+            x[r, s] = pulp.LpVariable(f"x_{r}_{s}", lowBound=0, upBound=ub)
+            y[r, s] = pulp.LpVariable(f"y_{r}_{s}", cat="Binary")
+    if not x:
+        return {}
+    prob += pulp.lpSum((COVER_WEIGHT + scores[r, s]) * v for (r, s), v in x.items()) \
+        - SPLIT_PENALTY * pulp.lpSum(y.values())
+    by_person: Dict[int, list] = {}
+    by_role: Dict[int, list] = {}
+    for (r, s), v in x.items():
+        by_person.setdefault(s, []).append(v)
+        by_role.setdefault(r, []).append(v)
+        prob += v <= min(avail[s], demand[r]) * y[r, s]
+    for s, vs in by_person.items():
+        if len(vs) > 1:
+            prob += pulp.lpSum(vs) <= avail[s]
+    for r, vs in by_role.items():
+        prob += pulp.lpSum(vs) <= demand[r]
+    try:
+        prob.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=ILP_TIME_LIMIT_S))
+    except Exception:
+        return None
+    if prob.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        return None
+    out = {}
+    for key, v in x.items():
+        val = v.value() or 0.0
+        if val > 1e-6:
+            out[key] = round(float(val), 3)
+    return out
+
+
+def _solve_hungarian(scores, avail, demand, cands) -> Optional[Dict[Tuple[int, int], float]]:
+    """Un hueco por persona necesaria en cada rol (2.5 FTE → 1 + 1 + 0.5); cada persona, un hueco."""
+    if linear_sum_assignment is None:
+        return None
+    slots: List[Tuple[int, float]] = []
+    for r, d in enumerate(demand):
+        full = int(math.floor(d))
+        slots += [(r, 1.0)] * full
+        if d - full > 1e-6:
+            slots.append((r, round(float(d - full), 3)))
+    people = sorted({s for idx in cands for s in idx.tolist()})
+    if not slots or not people:
+        return {}
+    col = {s: j for j, s in enumerate(people)}
+    # coste: -(cobertura + encaje); pares no candidatos → prohibidos
+    big = 1e9
+    cost = np.full((len(slots), len(people)), big)
+    for i, (r, size) in enumerate(slots):
+        for s in cands[r].tolist():
+            cost[i, col[s]] = -((COVER_WEIGHT + scores[r, s]) * min(size, avail[s]))
+    rows, cols = linear_sum_assignment(cost)
+    out: Dict[Tuple[int, int], float] = {}
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        if cost[i, j] >= big:
+            continue
+        r, size = slots[i]
+        s = people[j]
+        out[r, s] = round(float(out.get((r, s), 0.0) + min(size, avail[s])), 3)
+    return out
+
+
+def solve_staffing(proposal: Dict[str, Any], staff: List[Dict[str, Any]], solver: str = "auto",
+                   candidates_per_role: int = DEFAULT_CANDIDATES, alternatives: int = 2,
+                   index: Optional[SkillIndex] = None) -> Dict[str, Any]:
+    """
+    Asigna personas a los roles del equipo de la propuesta.
+
+    solver: "auto" (ILP y, si falla, Húngaro), "ilp" o "hungarian".
+    Devuelve {"solver", "roles": [{role, demand, assigned_fte, unfilled_fte, people, alternatives}],
+    "unassigned": [nombres], "coverage_pct", "elapsed_ms"}.
+    """
+    t0 = time.perf_counter()
+    dem = role_demand(proposal)
+    roles = list(dem)
+    demand = np.array([dem[r] for r in roles], dtype=float)
+    avail = np.array([_availability(p) for p in staff], dtype=float)
+    scores = score_matrix(roles, staff, index=index)
+    k = max(candidates_per_role, int(math.ceil(demand.max())) * 4) if roles else candidates_per_role
+    cands = _candidates(scores, avail, k) if staff else [np.array([], dtype=int) for _ in roles]
+
+    used = None
+    assign: Optional[Dict[Tuple[int, int], float]] = None
+    if solver in ("auto", "ilp"):
+        assign = _solve_ilp(scores, avail, demand, cands)
+        used = "ilp" if assign is not None else None
+    if assign is None and solver in ("auto", "hungarian"):
+        assign = _solve_hungarian(scores, avail, demand, cands)
+        used = "hungarian" if assign is not None else None
+    if assign is None:
+        raise ValueError(f"Solver de staffing no disponible: {solver}")
+
+    b = _brain()
+    taken = {s for (_, s) in assign}
+    out_roles = []
+    for r, role in enumerate(roles):
+        people = sorted(((s, fte) for (rr, s), fte in assign.items() if rr == r),
+                        key=lambda t: (-t[1], -scores[r, t[0]]))
+        got = sum(fte for _, fte in people)
+        alts = [staff[s]["name"] for s in cands[r].tolist() if s not in taken][:alternatives]
+        out_roles.append({
+            "role": role,
+            "demand": dem[role],
+            "assigned_fte": round(got, 3),
+            "unfilled_fte": round(max(0.0, dem[role] - got), 3),
+            "people": [{
+                "name": staff[s].get("name"),
+                "fte": fte,
+                "score": round(float(scores[r, s]), 2),
+                "availability_pct": staff[s].get("availability_pct", 100),
+                "seniority": staff[s].get("seniority"),
+                "why": b._why_person_for_role(role, staff[s]),
+            } for s, fte in people],
+            "alternatives": alts,
+        })
+    total = float(demand.sum()) or 1.0
+    return {
+        "solver": used,
+        "roles": out_roles,
+        "unassigned": [staff[s].get("name") for s in range(len(staff)) if s not in taken and avail[s] > 0][:50],
+        "coverage_pct": round(100.0 * sum(r["assigned_fte"] for r in out_roles) / total, 1),
+        "elapsed_ms": round(1000 * (time.perf_counter() - t0), 1),
+    }
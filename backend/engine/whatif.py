@@ -0,0 +1,216 @@
+# backend/engine/whatif.py
+"""
+Barrido what-if sobre una propuesta: en vez de mandar un /cambiar: detrás de otro,
+se evalúa de golpe la rejilla completa de escenarios (FTE por rol × contingencia ×
+multiplicadores de semanas por fase × multiplicadores de tarifa) con NumPy y se devuelve
+la frontera de Pareto coste vs. duración.
+
+Modelo (el mismo que _recompute_budget en brain, más la relación equipo → duración):
+    semanas   = Σ_fase max(1, round(semanas_fase × mult_fase))
+    duración  = semanas × (FTE_base / FTE_escenario) ** elasticidad
+    labor     = duración × mult_tarifa × Σ_rol FTE_rol × tarifa_rol
+    total     = labor × (1 + contingencia% / 100)
+Con elasticidad 0 la duración la fijan sólo las fases (como hoy). Con 0 < e < 1 meter gente
+acorta el plazo pero no en proporción (Brooks), así que hay un trade-off real coste/plazo.
+
+Cada eje es un vector y el resultado se construye por broadcasting (shape = nº de valores
+por eje), así que 100k+ escenarios son unos pocos arrays float64 de ese tamaño.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import time
+
+import numpy as np
+
+from backend.knowledge.citations import resolve_table
+
+DEFAULT_ELASTICITY = 0.7
+MAX_SCENARIOS = 2_000_000
+DEFAULT_RATE = 1000.0
+
+
+def baseline_from_proposal(p: Dict[str, Any]) -> Dict[str, Any]:
+    """Saca de la propuesta lo que necesita el barrido: FTE y tarifa por rol, fases y contingencia."""
+    budget = p.get("budget") or {}
+    ass = budget.get("assumptions") or {}
+    mult = float(ass.get("industry_rate_multiplier") or 1.0)
+    if ass.get("role_rates_eur_pw"):
+        # propuesta ya parcheada (_recompute_budget): tarifas finales
+        rates = {k: float(v) for k, v in ass["role_rates_eur_pw"].items()}
+        default_rate = DEFAULT_RATE
+    else:
+        # propuesta del planner: tarifa base × multiplicador de industria
+        rates = {k: float(v) * mult for k, v in resolve_table(ass.get("base_role_rates_eur_pw")).items()}
+        default_rate = DEFAULT_RATE * mult
+
+    fte: Dict[str, float] = {}
+    for r in p.get("team") or []:
+        try:
+            fte[r["role"]] = fte.get(r["role"], 0.0) + float(r.get("count", 0) or 0)
+        except Exception:
+            pass
+
+    phases: List[Tuple[str, float]] = []
+    for ph in p.get("phases") or []:
+        try:
+            phases.append((str(ph.get("name") or f"Fase {len(phases) + 1}"), float(ph.get("weeks") or 0)))
+        except Exception:
+            pass
+
+    pct = ass.get("contingency_pct")
+    if isinstance(pct, (int, float)):
+        # la unidad va por esquema, no por valor: el presupuesto del planner (base_role_rates)
+        # lo guarda como fracción (0.15) y el de _recompute_budget (role_rates) ya en % (15)
+        pct = float(pct) if ass.get("role_rates_eur_pw") else float(pct) * 100.0
+    else:
+        pct = 10.0
+
+    return {
+        "fte": fte,
+        "rates": {role: rates.get(role, default_rate) for role in fte},
+        "default_rate": default_rate,
+        "phases": phases,
+        "contingency_pct": pct,
+    }
+
+
+def _vec(values: Optional[Sequence[float]], default: float) -> np.ndarray:
+    if values is None or len(values) == 0:
+        return np.array([default], dtype=float)
+    return np.asarray(values, dtype=float)
+
+
+def sweep(base: Dict[str, Any],
+          fte: Optional[Dict[str, Sequence[float]]] = None,
+          contingency_pct: Optional[Sequence[float]] = None,
+          phase_week_multipliers: Optional[Sequence[float]] = None,
+          phase_multipliers: Optional[Dict[str, Sequence[float]]] = None,
+          rate_multipliers: Optional[Sequence[float]] = None,
+          elasticity: float = DEFAULT_ELASTICITY) -> Dict[str, Any]:
+    """
+    Evalúa la rejilla completa. Devuelve los ejes (nombre, valores) y los arrays planos
+    cost/labor/duration/weeks de tamaño nº de escenarios (orden C de los ejes).
+    Los ejes sin valores se quedan en el valor base (un solo punto).
+    """
+    fte = fte or {}
+    phase_multipliers = phase_multipliers or {}
+    base_fte: Dict[str, float] = dict(base["fte"])
+    rates: Dict[str, float] = dict(base["rates"])
+    for role in fte:
+        base_fte.setdefault(role, 0.0)
+        rates.setdefault(role, base["default_rate"])
+
+    # ejes: primero FTE por rol, luego fases, luego globales
+    axes: List[Tuple[str, np.ndarray]] = []
+    for role, vals in fte.items():
+        axes.append((f"fte:{role}", _vec(vals, base_fte[role])))
+    phase_names = [n for n, _ in base["phases"]]
+    lower = {n.lower(): n for n in phase_names}
+    per_phase: Dict[str, int] = {}
+    for name, vals in phase_multipliers.items():
+        real = lower.get(str(name).lower())
+        if real is None:
+            raise ValueError(f"Fase no encontrada: {name}")
+        per_phase[real] = len(axes)
+        axes.append((f"phase:{real}", _vec(vals, 1.0)))
+    i_global_weeks = len(axes); axes.append(("phase_week_multiplier", _vec(phase_week_multipliers, 1.0)))
+    i_rate = len(axes); axes.append(("rate_multiplier", _vec(rate_multipliers, 1.0)))
+    i_cont = len(axes); axes.append(("contingency_pct", _vec(contingency_pct, base["contingency_pct"])))
+
+    shape = tuple(len(v) for _, v in axes)
+    n = int(np.prod(shape))
+    if n > MAX_SCENARIOS:
+        raise ValueError(f"Demasiados escenarios ({n}); máximo {MAX_SCENARIOS}.")
+    ndim = len(axes)
+
+    def _along(i: int, v: np.ndarray) -> np.ndarray:
+        # vector del eje i colocado para hacer broadcasting sobre la rejilla
+        s = [1] * ndim
+        s[i] = len(v)
+        return v.reshape(s)
+
+    # coste semanal del equipo y FTE totales: suma de la parte fija + un término por eje de rol
+    swept = set(fte)
+    fixed_cost = sum(c * rates[r] for r, c in base_fte.items() if r not in swept)
+    fixed_heads = sum(c for r, c in base_fte.items() if r not in swept)
+    weekly = np.full((1,) * ndim, fixed_cost)
+    heads = np.full((1,) * ndim, fixed_heads)
+    for i, role in enumerate(fte):
+        v = axes[i][1]
+        weekly = weekly + _along(i, v * rates[role])
+        heads = heads + _along(i, v)
+
+    # semanas: cada fase redondeada como en el planner (mínimo 1). El mult. global se combina con el de la fase.
+    g = _along(i_global_weeks, axes[i_global_weeks][1])
+    weeks = np.zeros((1,) * ndim)
+    for name, w in base["phases"]:
+        m = g * _along(per_phase[name], axes[per_phase[name]][1]) if name in per_phase else g
+        weeks = weeks + np.maximum(1.0, np.rint(w * m))
+
+    base_heads = sum(base["fte"].values()) or 1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(heads > 0, (base_heads / np.where(heads > 0, heads, 1.0)) ** elasticity, np.inf)
+    duration = weeks * scale
+    labor = duration * weekly * _along(i_rate, axes[i_rate][1])
+    cost = labor * (1.0 + _along(i_cont, axes[i_cont][1]) / 100.0)
+
+    full = lambda a: np.broadcast_to(a, shape).ravel()
+    return {
+        "axes": axes,
+        "shape": shape,
+        "cost": full(cost),
+        "labor": full(labor),
+        "duration": full(duration),
+        "weeks": full(weeks),
+    }
+
+
+def pareto_frontier(cost: np.ndarray, duration: np.ndarray) -> np.ndarray:
+    """Índices de los escenarios no dominados (menos coste y menos duración), de más rápido a más lento."""
+    ok = np.flatnonzero(np.isfinite(cost) & np.isfinite(duration))
+    if not len(ok):
+        return ok
+    order = ok[np.lexsort((cost[ok], duration[ok]))]
+    c = cost[order]
+    # un punto entra si es más barato que todo lo que es igual o más rápido
+    prev_min = np.minimum.accumulate(np.concatenate(([np.inf], c[:-1])))
+    keep = c < prev_min
+    return order[keep]
+
+
+def _scenario(res: Dict[str, Any], idx: int) -> Dict[str, Any]:
+    pos = np.unravel_index(idx, res["shape"])
+    params = {name: float(vals[k]) for (name, vals), k in zip(res["axes"], pos)}
+    labor = float(res["labor"][idx]); cost = float(res["cost"][idx])
+    return {
+        "params": params,
+        "total_eur": round(cost, 2),
+        "labor_eur": round(labor, 2),
+        "contingency_eur": round(cost - labor, 2),
+        "duration_weeks": round(float(res["duration"][idx]), 2),
+        "phase_weeks": int(res["weeks"][idx]),
+    }
+
+
+def whatif(p: Dict[str, Any], max_points: int = 50, **ranges: Any) -> Dict[str, Any]:
+    """Barrido + frontera de Pareto listo para devolver por la API."""
+    t0 = time.perf_counter()
+    base = baseline_from_proposal(p)
+    res = sweep(base, **ranges)
+    front = pareto_frontier(res["cost"], res["duration"])
+    if max_points and len(front) > max_points:
+        # submuestreo uniforme conservando los extremos (el más rápido y el más barato)
+        pick = np.unique(np.linspace(0, len(front) - 1, max_points).round().astype(int))
+        front = front[pick]
+    elapsed = (time.perf_counter() - t0) * 1000.0
+
+    base_res = sweep(base, elasticity=ranges.get("elasticity", DEFAULT_ELASTICITY))
+    return {
+        "scenarios": int(len(res["cost"])),
+        "axes": {name: [float(x) for x in vals] for name, vals in res["axes"]},
+        "baseline": _scenario(base_res, 0),
+        "frontier": [_scenario(res, int(i)) for i in front],
+        "cheapest": _scenario(res, int(np.argmin(np.where(np.isfinite(res["cost"]), res["cost"], np.inf)))),
+        "fastest": _scenario(res, int(np.argmin(np.where(np.isfinite(res["duration"]), res["duration"], np.inf)))),
+        "elapsed_ms": round(elapsed, 2),
+    }
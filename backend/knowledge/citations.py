@@ -0,0 +1,172 @@
+# backend/knowledge/citations.py
+# Registro estático de citas y tablas de conocimiento con IDs estables.
+#
+# Las propuestas ya no incrustan las mismas listas de fuentes (Accelerate, Team Topologies,
+# Scrum Guide, PCI DSS...) ni la tabla completa de tarifas base: llevan referencias
+# ("src:accelerate-2018-1a2b3c", "table:base-role-rates-9f8e7d6c5b") y se expanden sólo al renderizar
+# o al responder con expand=true. El ID incluye un hash del contenido: si una fuente o la
+# tabla cambian, el ID cambia. El registro vive en memoria y sólo conoce las versiones del
+# código actual; por eso cada versión de tabla o fuente que acaba en una propuesta guardada se
+# persiste en BD (state_store.citation_tables) y resolve_table / expand_sources la buscan allí
+# si no la conocen. Una tabla que no está en ninguno de los dos sitios es un error
+# (UnknownTableError), no un {}; una fuente se deja como {"id": ..., "missing": True}.
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import re
+import unicodedata
+
+from backend.knowledge.methodologies import METHODOLOGIES
+
+SOURCE_PREFIX = "src:"
+TABLE_PREFIX = "table:"
+
+SOURCES: Dict[str, Dict[str, Any]] = {}
+TABLES: Dict[str, Dict[str, Any]] = {}
+_BY_CONTENT: Dict[str, str] = {}
+_TABLE_BY_CONTENT: Dict[str, str] = {}
+# versiones antiguas leídas de BD (no se mezclan con TABLES/SOURCES: /projects/refs sirve las actuales)
+_STORED_TABLES: Dict[str, Dict[str, Any]] = {}
+_STORED_SOURCES: Dict[str, Dict[str, Any]] = {}
+
+
+class UnknownTableError(KeyError):
+    """ID de tabla que no está en el registro ni en BD."""
+
+
+def _canon(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _digest(raw: str, n: int) -> str:
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:n]
+
+
+def _slug(s: str) -> str:
+    s = unicodedata.normalize("NFKD", str(s)).encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", "-", s).strip("-")[:40]
+
+
+def register_source(src: Dict[str, Any]) -> str:
+    raw = _canon(src)
+    sid = _BY_CONTENT.get(raw)
+    if sid is None:
+        sid = f"{SOURCE_PREFIX}{_slug(src.get('titulo', 'fuente'))}-{_slug(src.get('anio', ''))}-{_digest(raw, 6)}"
+        SOURCES[sid] = dict(src)
+        _BY_CONTENT[raw] = sid
+    return sid
+
+
+def register_table(name: str, table: Dict[str, Any]) -> str:
+    raw = _canon(table)
+    tid = f"{TABLE_PREFIX}{name}-{_digest(raw, 10)}"
+    TABLES.setdefault(tid, dict(table))
+    _TABLE_BY_CONTENT.setdefault(raw, tid)
+    return tid
+
+
+# ---------- referencias → contenido (lazy) ----------
+
+def source_refs(sources: Optional[List[Any]]) -> List[Any]:
+    """Fuentes → IDs. Lo que no está registrado (o ya es un ID) se deja tal cual."""
+    out: List[Any] = []
+    for s in sources or []:
+        if isinstance(s, dict):
+            out.append(_BY_CONTENT.get(_canon(s), s))
+        else:
+            out.append(s)
+    return out
+
+
+def _stored(cache: Dict[str, Dict[str, Any]], cid: str) -> Optional[Dict[str, Any]]:
+    content = cache.get(cid)
+    if content is None:
+        from backend.memory.state_store import load_citation_table
+        content = load_citation_table(cid)
+        if content is not None:
+            cache[cid] = content
+    return content
+
+
+def _stored_table(tid: str) -> Optional[Dict[str, Any]]:
+    return _stored(_STORED_TABLES, tid)
+
+
+def expand_sources(items: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    """IDs → fuentes. Acepta listas mixtas (propuestas antiguas guardadas con dicts).
+    Un ID de otra versión se busca en BD; si no está, queda {"id": ..., "missing": True}."""
+    out: List[Dict[str, Any]] = []
+    for s in items or []:
+        if isinstance(s, dict):
+            out.append(s)
+        elif isinstance(s, str) and s in SOURCES:
+            out.append(dict(SOURCES[s]))
+        elif isinstance(s, str) and s.startswith(SOURCE_PREFIX):
+            src = _stored(_STORED_SOURCES, s)
+            out.append(dict(src) if src is not None else {"id": s, "missing": True})
+    return out
+
+
+def resolve_table(value: Any) -> Dict[str, Any]:
+    """Tabla por referencia (o el propio dict si la propuesta es antigua).
+
+    Si el ID es de otra versión del código se busca en BD; si tampoco está, UnknownTableError.
+    """
+    if isinstance(value, str):
+        table = TABLES.get(value)
+        if table is None:
+            table = _stored_table(value)
+        if table is None:
+            raise UnknownTableError(value)
+        return dict(table)
+    return dict(value or {})
+
+
+# ---------- propuesta completa ----------
+
+def _map_decision_log(p: Dict[str, Any], fn) -> Dict[str, Any]:
+    # copy-on-write: sólo se copian la raíz, el decision_log y budget/assumptions
+    out = dict(p)
+    if isinstance(p.get("decision_log"), list):
+        out["decision_log"] = [({**d, "sources": fn(d["sources"])} if isinstance(d, dict) and "sources" in d else d)
+                               for d in p["decision_log"]]
+    if "methodology_sources" in p:
+        out["methodology_sources"] = fn(p["methodology_sources"])
+    return out
+
+
+def compact_proposal(p: Dict[str, Any]) -> Dict[str, Any]:
+    """Forma de almacenamiento/transporte: fuentes y tablas conocidas como IDs."""
+    if not isinstance(p, dict):
+        return p
+    out = _map_decision_log(p, source_refs)
+    ass = ((p.get("budget") or {}).get("assumptions") or {})
+    tid = _TABLE_BY_CONTENT.get(_canon(ass["base_role_rates_eur_pw"])) if isinstance(ass.get("base_role_rates_eur_pw"), dict) else None
+    if tid:
+        out["budget"] = {**p["budget"], "assumptions": {**ass, "base_role_rates_eur_pw": tid}}
+    return out
+
+
+def expand_proposal(p: Dict[str, Any]) -> Dict[str, Any]:
+    """Forma completa (para clientes que pidan expand=true o exportaciones)."""
+    if not isinstance(p, dict):
+        return p
+    out = _map_decision_log(p, expand_sources)
+    ass = ((p.get("budget") or {}).get("assumptions") or {})
+    if isinstance(ass.get("base_role_rates_eur_pw"), str):
+        out["budget"] = {**p["budget"], "assumptions": {**ass, "base_role_rates_eur_pw": resolve_table(ass["base_role_rates_eur_pw"])}}
+    return out
+
+
+def registry_snapshot() -> Dict[str, Any]:
+    """Todo el registro (para GET /projects/refs): el cliente lo cachea y resuelve IDs solo."""
+    return {"sources": SOURCES, "tables": TABLES}
+
+
+# Las fuentes del catálogo de metodologías se registran al importar (IDs disponibles siempre)
+for _info in METHODOLOGIES.values():
+    for _s in _info.get("fuentes", []) or []:
+        register_source(_s)
+    for _s in _info.get("sources", []) or []:
+        register_source(_s)
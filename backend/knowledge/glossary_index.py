@@ -0,0 +1,285 @@
+# backend/knowledge/glossary_index.py
+"""
+Índice del glosario para get_definition / search_glossary.
+
+get_definition probaba unas cuantas reescrituras (plurales, guiones) y después recorría
+TODAS las claves de GLOSSARY buscando `t in k or k in t`; search_glossary era otro recorrido
+lineal. Con unas decenas de términos da igual, con decenas de miles no. Aquí se indexa una
+vez:
+
+  - exact:   clave → clave (y variante sin tildes → clave)
+  - grams:   trigrama → ids de claves que lo contienen     → "t in k" = intersección + verificación
+  - first:   primer trigrama → longitud → clave → id        → "k in t" = un lookup por posición
+             de t y longitud de clave
+  - short:   claves de < 3 caracteres ("pm") y n-gramas de 1-2 caracteres para consultas cortas
+  - deletes: vocabulario de palabras con borrados a distancia ≤ 2 (estilo SymSpell) → palabras
+             corregidas → claves que las contienen → distancia de edición acotada sobre la clave
+
+El orden de inserción del glosario se conserva como rango: las coincidencias por subcadena
+devuelven lo mismo que el recorrido lineal (la primera clave en orden del dict).
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+import re
+import unicodedata
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+GRAM = 3
+MAX_DISTANCE = 2
+RARE_GRAMS = 3          # trigramas (los de posting más corto) que se intersecan
+FUZZY_CANDIDATES = 64   # máx. claves a las que se les calcula la distancia completa
+
+
+def fold(s: str) -> str:
+    """Minúsculas y sin tildes (para la parte difusa; el glosario tiene claves con tildes)."""
+    nk = unicodedata.normalize("NFKD", str(s or "").lower())
+    return "".join(c for c in nk if not unicodedata.combining(c)).strip()
+
+
+def _grams(s: str, n: int = GRAM) -> Set[str]:
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+
+def _word_distance(w: str) -> int:
+    # palabras cortas: sólo 1 error ("kpi" ≠ "api"); muy cortas: ninguno
+    n = len(w)
+    return 0 if n <= 2 else 1 if n <= 5 else MAX_DISTANCE
+
+
+def _deletes(w: str, d: int) -> Set[str]:
+    out = {w}
+    frontier = {w}
+    for _ in range(d):
+        nxt = set()
+        for x in frontier:
+            for i in range(len(x)):
+                nxt.add(x[:i] + x[i + 1:])
+        out |= nxt
+        frontier = nxt
+    return out
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """Levenshtein (con transposiciones adyacentes). Si se pasa `limit`, corta en limit + 1."""
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if limit is not None and abs(la - lb) > limit:
+        return limit + 1
+    # comparaciones en línea en vez de min(): es el bucle caliente de suggest()
+    prev2: List[int] = []
+    prev = list(range(lb + 1))
+    pa = ""
+    for i in range(1, la + 1):
+        ca = a[i - 1]
+        cur = [i] * (lb + 1)
+        best = i
+        left = i
+        for j in range(1, lb + 1):
+            cb = b[j - 1]
+            v = prev[j - 1] if ca == cb else prev[j - 1] + 1
+            if prev[j] + 1 < v:
+                v = prev[j] + 1
+            if left + 1 < v:
+                v = left + 1
+            if j > 1 and ca == b[j - 2] and pa == cb and prev2[j - 2] + 1 < v:
+                v = prev2[j - 2] + 1
+            cur[j] = left = v
+            if v < best:
+                best = v
+        if limit is not None and best > limit:
+            return limit + 1
+        prev2, prev, pa = prev, cur, ca
+    return prev[lb]
+
+
+class GlossaryIndex:
+    def __init__(self, entries: Mapping[str, Any]):
+        self.keys: List[str] = list(entries)
+        self.exact: Dict[str, int] = {}
+        self.folded: Dict[str, int] = {}
+        self.grams: Dict[str, Set[int]] = {}
+        self.first: Dict[str, Dict[int, Dict[str, int]]] = {}
+        self.short_keys: List[int] = []
+        self.small_grams: Dict[str, Set[int]] = {}
+        self.word_keys: Dict[str, Set[int]] = {}
+        self.deletes: Dict[str, Set[str]] = {}
+        self.folded_keys: List[str] = []
+        for i, k in enumerate(self.keys):
+            self._add(i, k)
+
+    def _add(self, i: int, k: str) -> None:
+        self.exact.setdefault(k, i)
+        fk = fold(k)
+        self.folded_keys.append(fk)
+        self.folded.setdefault(fk, i)
+        if len(k) < GRAM:
+            self.short_keys.append(i)
+        else:
+            self.first.setdefault(k[:GRAM], {}).setdefault(len(k), {}).setdefault(k, i)
+        for g in _grams(k):
+            self.grams.setdefault(g, set()).add(i)
+        for n in (1, 2):
+            for g in _grams(k, n):
+                self.small_grams.setdefault(g, set()).add(i)
+        for w in _WORD_RE.findall(fk):
+            if w not in self.word_keys:
+                for d in _deletes(w, _word_distance(w)):
+                    self.deletes.setdefault(d, set()).add(w)
+            self.word_keys.setdefault(w, set()).add(i)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # ---------- exacto / subcadena (misma semántica que el recorrido lineal) ----------
+
+    def lookup(self, t: str) -> Optional[str]:
+        i = self.exact.get(t)
+        return self.keys[i] if i is not None else None
+
+    def lookup_folded(self, t: str) -> Optional[str]:
+        i = self.folded.get(fold(t))
+        return self.keys[i] if i is not None else None
+
+    def _contained_in_key(self, t: str) -> Set[int]:
+        # claves k con t in k
+        if len(t) < GRAM:
+            return set(self.small_grams.get(t, ()))
+        sets = []
+        for g in _grams(t):
+            ids = self.grams.get(g)
+            if not ids:
+                return set()
+            sets.append(ids)
+        # con los trigramas más raros basta para acotar; el resto lo comprueba `in`
+        sets.sort(key=len)
+        cand = sets[0]
+        for s in sets[1:RARE_GRAMS]:
+            cand = cand & s
+            if not cand:
+                return set()
+        return {i for i in cand if t in self.keys[i]}
+
+    def _keys_in_text(self, t: str) -> Set[int]:
+        # claves k con k in t: en cada posición de t, las claves que empiezan por ese trigrama,
+        # agrupadas por longitud → un lookup por longitud en vez de comparar clave a clave
+        out = {i for i in self.short_keys if self.keys[i] in t}
+        n = len(t)
+        for pos in range(n - GRAM + 1):
+            by_len = self.first.get(t[pos:pos + GRAM])
+            if not by_len:
+                continue
+            for length, keys in by_len.items():
+                if pos + length <= n:
+                    i = keys.get(t[pos:pos + length])
+                    if i is not None:
+                        out.add(i)
+        return out
+
+    def substring_matches(self, t: str) -> List[str]:
+        """Claves con `t in k or k in t`, en orden del glosario."""
+        if not t:
+            return []
+        ids = self._contained_in_key(t) | self._keys_in_text(t)
+        return [self.keys[i] for i in sorted(ids)]
+
+    def first_substring_match(self, t: str) -> Optional[str]:
+        if not t:
+            return None
+        ids = self._contained_in_key(t) | self._keys_in_text(t)
+        return self.keys[min(ids)] if ids else None
+
+    # ---------- difuso ----------
+
+    def correct_word(self, w: str) -> Dict[str, int]:
+        """Palabras del vocabulario a distancia acotada de `w` → distancia."""
+        d = _word_distance(w)
+        out: Dict[str, int] = {}
+        for v in _deletes(w, d):
+            for cand in self.deletes.get(v, ()):
+                if cand not in out:
+                    dist = edit_distance(w, cand, d)
+                    if dist <= d:
+                        out[cand] = dist
+        return out
+
+    @staticmethod
+    def _query_words(fq: str) -> List[str]:
+        words = _WORD_RE.findall(fq)
+        return sorted(set(w for w in words if len(w) > 2) or set(words))   # "de", "la"... no discriminan
+
+    def _word_ids(self, words: List[str]) -> List[Set[int]]:
+        """Por cada palabra de la consulta, las claves que contienen alguna de sus correcciones."""
+        out = []
+        for w in words:
+            ids: Set[int] = set()
+            for cw in self.correct_word(w):
+                ids |= self.word_keys.get(cw, set())
+            out.append(ids)
+        return out
+
+    def _word_hits(self, word_ids: List[Set[int]], length: Optional[int] = None, bound: int = 0) -> Dict[int, int]:
+        """Clave → nº de palabras de la consulta que contiene (corregidas); con `length`, sólo
+        claves de longitud compatible (±bound)."""
+        hits: Dict[int, int] = {}
+        fk = self.folded_keys
+        for ids in word_ids:
+            for i in ids:
+                if length is None or abs(len(fk[i]) - length) <= bound:
+                    hits[i] = hits.get(i, 0) + 1
+        return hits
+
+    def fuzzy(self, query: str, limit: int = 5, word_ids: Optional[List[Set[int]]] = None) -> List[Tuple[str, int]]:
+        """Claves cercanas a la consulta completa: [(clave, distancia)] de menor a mayor."""
+        fq = fold(query)
+        if word_ids is None:
+            word_ids = self._word_ids(self._query_words(fq))
+        if not word_ids:
+            return []
+        bound = max(1, min(len(fq) // 4, 2 * MAX_DISTANCE))
+        # sólo se calcula la distancia completa de las que comparten más palabras
+        hits = self._word_hits(word_ids, len(fq), bound)
+        top = sorted(hits, key=lambda i: (-hits[i], i))[:FUZZY_CANDIDATES]
+        scored = []
+        for i in top:
+            dist = edit_distance(fq, self.folded_keys[i], bound)
+            if dist <= bound:
+                scored.append((dist, i))
+        scored.sort()
+        return [(self.keys[i], dist) for dist, i in scored[:limit]]
+
+    def suggest(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Sugerencias ordenadas: exacta (1.0) > subcadena (0.6-0.9, según cuánto cubre) >
+        difusa (≤ 0.8, según distancia) > palabras con errores contenidas en la clave (0.4-0.7).
+        Empates por orden del glosario.
+        """
+        t = (query or "").lower().strip()
+        if not t:
+            return []
+        best: Dict[int, Tuple[float, str]] = {}
+
+        def put(i: int, score: float, kind: str) -> None:
+            if i not in best or best[i][0] < score:
+                best[i] = (score, kind)
+
+        i = self.exact.get(t, self.folded.get(fold(t)))
+        if i is not None:
+            put(i, 1.0, "exact")
+        for k in self.substring_matches(t):
+            j = self.exact[k]
+            cover = min(len(t), len(k)) / max(len(t), len(k))
+            put(j, 0.6 + 0.3 * cover, "partial")
+        # correcciones por palabra una sola vez: las usan la parte difusa y la de palabras
+        word_ids = self._word_ids(self._query_words(fold(t)))
+        for k, dist in self.fuzzy(t, limit=max(limit * 2, 10), word_ids=word_ids):
+            j = self.exact[k]
+            put(j, 0.8 * (1.0 - dist / max(len(k), len(t))), "fuzzy")
+        # claves que contienen todas las palabras (con errores) de la consulta: "definiton of done"
+        full = list(set.intersection(*word_ids)) if word_ids else []
+        full.sort(key=lambda j: (len(self.keys[j]), j))
+        for j in full[:max(limit * 2, 10)]:
+            cover = min(len(t), len(self.keys[j])) / max(len(t), len(self.keys[j]))
+            put(j, 0.4 + 0.3 * cover, "fuzzy_partial")
+        ranked = sorted(best.items(), key=lambda kv: (-kv[1][0], kv[0]))[:limit]
+        return [{"term": self.keys[i], "score": round(s, 3), "match": kind} for i, (s, kind) in ranked]
@@ -0,0 +1,285 @@
+# backend/knowledge/kb.py
+"""
+Base de conocimiento como datos (no como literales de Python).
+
+Antes el catálogo de metodologías, las fases, el glosario y las tablas del asistente
+(_TRAIN_METHOD, _PHASE_CANON, _ROLE_KEYWORDS, DELIVERABLE_DEFINITIONS, _TRAINING_CATALOG)
+eran dicts literales en methodologies.py / brain.py: cada worker los construía al importar y
+cualquier cambio de contenido era un cambio de código. Ahora:
+
+  - fuentes:   backend/knowledge/data/*.json  →  {"version": "...", "sections": {nombre: datos}}
+               (KNOWLEDGE_DIR apunta a otro directorio con los mismos ficheros)
+  - compilado: <dir>/knowledge.kb (scripts/build_knowledge.py, paso del build de la imagen):
+               MAGIC + cabecera (versión, huella de las fuentes, sección → offset/longitud) +
+               cada sección serializada por separado (orjson si está)
+  - carga:     el .kb se abre con mmap y cada sección se deserializa la primera vez que se
+               pide. Si no hay .kb o no corresponde a las fuentes (se editó un JSON y no se
+               recompiló) se compila en memoria desde las fuentes: actualizar conocimiento es
+               cambiar datos, no código.
+  - lazy():    Mapping mutable que carga su sección en el primer acceso; es lo que exportan
+               methodologies.py y brain.py con los nombres de siempre.
+
+reload() vuelve a leer fuentes/compilado (los lazy() se refrescan solos; generation() sirve
+para invalidar lo derivado: el índice del glosario, la matriz de reglas de scoring, el canon
+de fases de brain, las tarjetas de formación...).
+"""
+from __future__ import annotations
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import orjson as _orjson  # opcional: deserializa las secciones bastante más rápido
+except Exception:
+    _orjson = None
+
+MAGIC = b"TFGKB1\n"
+COMPILED_NAME = "knowledge.kb"
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def _dumps(obj: Any) -> bytes:
+    if _orjson is not None:
+        return _orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(raw) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(raw)
+    return json.loads(bytes(raw))
+
+
+def data_dir() -> str:
+    return os.getenv("KNOWLEDGE_DIR") or DEFAULT_DIR
+
+
+def _source_files(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f for f in os.listdir(directory) if f.endswith(".json"))
+
+
+def fingerprint(directory: Optional[str] = None) -> Optional[str]:
+    """Huella de las fuentes (nombre + contenido de cada JSON); None si no hay fuentes."""
+    directory = directory or data_dir()
+    files = _source_files(directory)
+    if not files:
+        return None
+    h = hashlib.sha256()
+    for f in files:
+        with open(os.path.join(directory, f), "rb") as fh:
+            h.update(f.encode("utf-8") + b"\0" + fh.read() + b"\0")
+    return h.hexdigest()
+
+
+def compile_sources(directory: Optional[str] = None) -> bytes:
+    """Fuentes JSON → blob compilado (lo que escribe scripts/build_knowledge.py)."""
+    directory = directory or data_dir()
+    files = _source_files(directory)
+    if not files:
+        raise ValueError(f"No hay fuentes de conocimiento en {directory}")
+    sections: Dict[str, Tuple[str, Any]] = {}
+    versions: Dict[str, str] = {}
+    for f in files:
+        with open(os.path.join(directory, f), "rb") as fh:
+            doc = json.loads(fh.read())
+        versions[f] = str(doc.get("version", ""))
+        for name, data in (doc.get("sections") or {}).items():
+            if name in sections:
+                raise ValueError(f"Sección '{name}' repetida en {sections[name][0]} y {f}")
+            sections[name] = (f, data)
+    body = bytearray()
+    index: Dict[str, List[Any]] = {}
+    for name, (f, data) in sections.items():
+        raw = _dumps(data)
+        index[name] = [len(body), len(raw), f]
+        body += raw
+    header = _dumps({"versions": versions, "fingerprint": fingerprint(directory), "sections": index})
+    return MAGIC + struct.pack("<I", len(header)) + header + bytes(body)
+
+
+def write_compiled(directory: Optional[str] = None, path: Optional[str] = None) -> str:
+    directory = directory or data_dir()
+    path = path or os.path.join(directory, COMPILED_NAME)
+    blob = compile_sources(directory)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(blob)
+    os.replace(tmp, path)
+    return path
+
+
+class _Store:
+    """Blob abierto (mmap del .kb o bytes compilados en memoria) + secciones ya cargadas."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.origin = "compiled"
+        self._fh = None
+        buf = self._open_compiled()
+        if buf is None:
+            buf = compile_sources(directory)
+            self.origin = "sources"
+        self.buf = buf
+        (hlen,) = struct.unpack_from("<I", buf, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = _loads(buf[start:start + hlen])
+        self.base = start + hlen
+        self.cache: Dict[str, Any] = {}
+
+    def _open_compiled(self):
+        path = os.path.join(self.directory, COMPILED_NAME)
+        if not os.path.exists(path):
+            return None
+        fh = open(path, "rb")
+        try:
+            buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            fh.close()
+            return None
+        ok = buf[:len(MAGIC)] == MAGIC
+        if ok:
+            (hlen,) = struct.unpack_from("<I", buf, len(MAGIC))
+            start = len(MAGIC) + 4
+            fp = _loads(buf[start:start + hlen]).get("fingerprint")
+            src = fingerprint(self.directory)
+            ok = src is None or fp == src      # sin fuentes (imagen sólo con el .kb): se confía en él
+        if not ok:
+            buf.close()
+            fh.close()
+            return None
+        self._fh = fh
+        return buf
+
+    def section(self, name: str) -> Any:
+        if name not in self.cache:
+            try:
+                off, length, _src = self.header["sections"][name]
+            except KeyError:
+                raise KeyError(f"Sección de conocimiento desconocida: {name}") from None
+            start = self.base + off
+            self.cache[name] = _loads(self.buf[start:start + length])
+        return self.cache[name]
+
+    def close(self) -> None:
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+        if self._fh is not None:
+            self._fh.close()
+
+
+_LOCK = threading.RLock()
+_STORE: Dict[str, Any] = {"store": None, "generation": 0}
+
+
+def _store() -> _Store:
+    st = _STORE["store"]
+    if st is None:
+        with _LOCK:
+            st = _STORE["store"]
+            if st is None:
+                st = _STORE["store"] = _Store(data_dir())
+    return st
+
+
+def section(name: str) -> Any:
+    """Datos de una sección (compartidos: quien los muta, los muta para todos, como antes)."""
+    st = _store()
+    hit = st.cache.get(name)
+    if hit is not None:
+        return hit
+    with _LOCK:
+        return st.section(name)
+
+
+def generation() -> int:
+    return _STORE["generation"]
+
+
+def reload() -> None:
+    """Vuelve a abrir fuentes/compilado; los lazy() cargan la versión nueva en su siguiente acceso."""
+    with _LOCK:
+        old = _STORE["store"]
+        _STORE["store"] = None
+        _STORE["generation"] += 1
+    if old is not None:
+        old.cache.clear()
+
+
+def version() -> str:
+    """Versión del conocimiento cargado: versión declarada de cada fichero + huella."""
+    h = _store().header
+    declared = ",".join(f"{f}@{v}" for f, v in sorted((h.get("versions") or {}).items()))
+    return f"{declared}#{(h.get('fingerprint') or '')[:12]}"
+
+
+def info() -> Dict[str, Any]:
+    st = _store()
+    return {"version": version(), "origin": st.origin, "directory": st.directory,
+            "sections": sorted(st.header["sections"]), "loaded": sorted(st.cache)}
+
+
+class LazyMapping(MutableMapping):
+    """Dict de una sección que se carga en el primer acceso (y tras reload())."""
+    __slots__ = ("_name", "_convert", "_data", "_gen")
+
+    def __init__(self, name: str, convert: Optional[Callable[[Any], Any]] = None):
+        self._name = name
+        self._convert = convert
+        self._data = None
+        self._gen = -1
+
+    def _d(self) -> Dict[Any, Any]:
+        d = self._data
+        if d is None or self._gen != _STORE["generation"]:
+            raw = section(self._name)
+            d = self._convert(raw) if self._convert is not None else raw
+            self._data, self._gen = d, _STORE["generation"]
+        return d
+
+    def __getitem__(self, key):
+        return self._d()[key]
+
+    def __setitem__(self, key, value) -> None:
+        self._d()[key] = value
+
+    def __delitem__(self, key) -> None:
+        del self._d()[key]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._d())
+
+    def __len__(self) -> int:
+        return len(self._d())
+
+    def __contains__(self, key) -> bool:
+        return key in self._d()
+
+    def get(self, key, default=None):
+        return self._d().get(key, default)
+
+    def keys(self):
+        return self._d().keys()
+
+    def items(self):
+        return self._d().items()
+
+    def values(self):
+        return self._d().values()
+
+    def copy(self) -> Dict[Any, Any]:
+        return dict(self._d())
+
+    def __repr__(self) -> str:
+        state = "sin cargar" if self._data is None else f"{len(self._data)} entradas"
+        return f"<LazyMapping {self._name}: {state}>"
+
+
+def lazy(name: str, convert: Optional[Callable[[Any], Any]] = None) -> LazyMapping:
+    return LazyMapping(name, convert)
@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import List, Optional, Dict, Any
 
 from sqlalchemy import (
-    create_engine, Column, Integer, String, DateTime, Text, JSON, ForeignKey, Boolean
+    create_engine, Column, Integer, String, DateTime, Text, JSON, ForeignKey, Boolean, UniqueConstraint
 )
 from sqlalchemy.pool import StaticPool
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
@@ -79,6 +79,27 @@ class ProposalView(Base):
     proposal_id = Column(Integer, ForeignKey("proposal_logs.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+class ProposalMemo(Base):
+    # Caché persistente de generate_proposal: (hash del texto normalizado, versión planner/conocimiento)
+    __tablename__ = "proposal_memo"
+    __table_args__ = (UniqueConstraint("text_hash", "version", name="uq_proposal_memo_key"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    text_hash = Column(String(64), nullable=False)
+    version = Column(String(64), nullable=False, index=True)
+    proposal_json = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class CitationTable(Base):
+    # Versiones de las tablas y fuentes citadas por referencia ("table:base-role-rates-<hash>",
+    # "src:<titulo>-<anio>-<hash>"). Las propuestas guardadas llevan sólo el ID: si las tarifas
+    # o una fuente cambian en código, el ID viejo se sigue resolviendo desde aquí.
+    # `name`: nombre de la tabla, o "source".
+    __tablename__ = "citation_tables"
+    id = Column(String(96), primary_key=True)
+    name = Column(String(64), nullable=False)
+    content = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
 # --- Usuario / Auth (simple)
 class User(Base):
     __tablename__ = "users"
@@ -174,11 +195,61 @@ def list_messages(session_id: str, limit: int = 50) -> List[ConversationMessage]
         return list(reversed(q))  # cronológico
 
 # --- Propuestas ---
+def _compact(proposal: Dict[str, Any]) -> Dict[str, Any]:
+    # fuentes/tablas estáticas como IDs del registro de citas (se expanden al leer para mostrar)
+    try:
+        from backend.knowledge.citations import compact_proposal
+        return compact_proposal(proposal)
+    except Exception:
+        return proposal
+
+def save_citation_table(table_id: str, name: str, content: Dict[str, Any]) -> None:
+    with SessionLocal() as db:
+        if db.get(CitationTable, table_id) is not None:
+            return
+        db.add(CitationTable(id=table_id, name=name, content=content))
+        try:
+            db.commit()
+        except Exception:
+            # otro worker la guardó a la vez: el contenido es el mismo (el ID es su hash)
+            db.rollback()
+
+# IDs de tabla/fuente ya guardados en citation_tables por este proceso (evita un SELECT por propuesta)
+_PERSISTED_CITATIONS: set = set()
+
+def _cited_source_ids(proposal: Dict[str, Any]) -> List[str]:
+    refs = list((proposal or {}).get("methodology_sources") or [])
+    for d in (proposal or {}).get("decision_log") or []:
+        if isinstance(d, dict):
+            refs.extend(d.get("sources") or [])
+    return [r for r in refs if isinstance(r, str)]
+
+def _persist_citations(proposal: Dict[str, Any]) -> None:
+    # Guarda (una vez) la versión de la tabla y de las fuentes a las que apunta la propuesta.
+    # Sin esto, el ID guardado deja de resolverse en cuanto cambian las tarifas o una fuente
+    # en código. Los IDs de otra versión del código ya se guardaron cuando se citaron.
+    from backend.knowledge.citations import SOURCES, TABLES, TABLE_PREFIX
+    ref = (((proposal or {}).get("budget") or {}).get("assumptions") or {}).get("base_role_rates_eur_pw")
+    if isinstance(ref, str) and ref not in _PERSISTED_CITATIONS and ref in TABLES:
+        save_citation_table(ref, ref[len(TABLE_PREFIX):].rsplit("-", 1)[0], dict(TABLES[ref]))
+        _PERSISTED_CITATIONS.add(ref)
+    for sid in _cited_source_ids(proposal):
+        if sid not in _PERSISTED_CITATIONS and sid in SOURCES:
+            save_citation_table(sid, "source", dict(SOURCES[sid]))
+            _PERSISTED_CITATIONS.add(sid)
+
+def load_citation_table(table_id: str) -> Optional[Dict[str, Any]]:
+    with SessionLocal() as db:
+        row = db.get(CitationTable, table_id)
+        return dict(row.content) if row is not None else None
+
 def save_proposal(session_id: str, requirements: str, proposal: Dict[str, Any]) -> int:
-    # Guardamos la propuesta tal cual (JSON) y devolvemos la id de fila.
+    # Guardamos la propuesta (JSON, con las citas por referencia) y devolvemos la id de fila.
     try:
+        compact = _compact(proposal)
+        _persist_citations(compact)
         with SessionLocal() as db:
-            row = ProposalLog(session_id=session_id, requirements=requirements, proposal_json=proposal)
+            row = ProposalLog(session_id=session_id, requirements=requirements, proposal_json=compact)
             db.add(row)
             db.commit()
             db.refresh(row)
@@ -189,6 +260,47 @@ def save_proposal(session_id: str, requirements: str, proposal: Dict[str, Any])
         print(f"[save_proposal TRACEBACK] {traceback.format_exc()}", flush=True)
         raise
 
+def save_proposals_bulk(session_id: str, items: List[tuple]) -> List[int]:
+    """Inserta varias propuestas [(requirements, proposal), ...] en UNA transacción.
+    Devuelve las ids en el mismo orden que `items`."""
+    if not items:
+        return []
+    compact = [(req, _compact(prop)) for req, prop in items]
+    for _, prop in compact:
+        _persist_citations(prop)
+    with SessionLocal() as db:
+        rows = [ProposalLog(session_id=session_id, requirements=req, proposal_json=prop) for req, prop in compact]
+        db.add_all(rows)
+        db.flush()   # asigna ids sin cerrar la transacción
+        ids = [int(r.id) for r in rows]
+        db.commit()
+        return ids
+
+# --- Memo de propuestas (ver backend/engine/proposal_cache.py) ---
+def get_proposal_memo(text_hash: str, version: str) -> Optional[Dict[str, Any]]:
+    with SessionLocal() as db:
+        row = db.query(ProposalMemo.proposal_json).filter(
+            ProposalMemo.text_hash == text_hash, ProposalMemo.version == version
+        ).first()
+        return row[0] if row else None
+
+def save_proposal_memo(text_hash: str, version: str, proposal: Dict[str, Any]) -> None:
+    _persist_citations(proposal)
+    with SessionLocal() as db:
+        db.add(ProposalMemo(text_hash=text_hash, version=version, proposal_json=proposal))
+        try:
+            db.commit()
+        except Exception:
+            # otro worker la guardó a la vez (unique): nos vale la suya
+            db.rollback()
+
+def purge_proposal_memo(keep_version: str) -> int:
+    """Borra las entradas de versiones antiguas. Devuelve cuántas filas se han eliminado."""
+    with SessionLocal() as db:
+        n = db.query(ProposalMemo).filter(ProposalMemo.version != keep_version).delete(synchronize_session=False)
+        db.commit()
+        return int(n or 0)
+
 def get_last_proposal_row(session_id: str) -> Optional[ProposalLog]:
     # Devuelve la última propuesta asociada a la sesión (o None si no hay).
     with SessionLocal() as db:
@@ -227,6 +339,13 @@ def list_recent_views(user_id: int, limit: int = 10) -> List[ProposalView]:
     with SessionLocal() as db:
         return db.query(ProposalView).filter(ProposalView.user_id == user_id).order_by(ProposalView.created_at.desc()).limit(limit).all()
 
+def list_user_proposal_ids(user_id: int, limit: int = 500) -> List[int]:
+    """Propuestas con las que ha trabajado el usuario (vistas), la más reciente primero, sin repetir."""
+    with SessionLocal() as db:
+        rows = db.query(ProposalView.proposal_id).filter(ProposalView.user_id == user_id) \
+            .order_by(ProposalView.created_at.desc()).all()
+    return list(dict.fromkeys(int(r[0]) for r in rows))[:limit]
+
 # --- Users helpers
 def get_user_by_email(email: str) -> Optional[User]:
     # Busca un usuario por email; devuelve None si no existe.
@@ -283,6 +402,18 @@ def delete_saved_chat(user_id: int, chat_id: int) -> bool:
 
 
 # --- Employee helpers ---
+def _reindex_employee(user_id: int, row: Optional[Employee] = None, employee_id: Optional[int] = None) -> None:
+    # mantiene el índice de skills del usuario (backend/engine/skill_index.py) al día
+    try:
+        from backend.engine import skill_index
+        if row is not None:
+            skill_index.on_employee_saved(user_id, row)
+        elif employee_id is not None:
+            skill_index.on_employee_deleted(user_id, employee_id)
+    except Exception:
+        pass
+
+
 def create_employee(user_id: int, name: str, role: str, skills: str, seniority: Optional[str] = None, availability_pct: int = 100) -> Employee:
     """Crea un nuevo empleado para el usuario."""
     with SessionLocal() as db:
@@ -295,6 +426,7 @@ def create_employee(user_id: int, name: str, role: str, skills: str, seniority:
             availability_pct=availability_pct
         )
         db.add(emp); db.commit(); db.refresh(emp)
+        _reindex_employee(user_id, emp)
         return emp
 
 
@@ -324,6 +456,7 @@ def update_employee(user_id: int, employee_id: int, name: Optional[str] = None,
         if availability_pct is not None: row.availability_pct = availability_pct
         row.updated_at = datetime.utcnow()
         db.add(row); db.commit(); db.refresh(row)
+        _reindex_employee(user_id, row)
         return row
 
 
@@ -334,6 +467,7 @@ def delete_employee(user_id: int, employee_id: int) -> bool:
         if not row:
             return False
         db.delete(row); db.commit()
+        _reindex_employee(user_id, employee_id=employee_id)
         return True
 
 
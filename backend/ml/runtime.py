@@ -19,6 +19,10 @@ def _norm(s: str) -> str:
 def _rx(t: str, pat: str) -> bool:
     return re.search(pat, t, re.I) is not None
 
+# versión de extract_features: las features cacheadas en training/training_effort.py van
+# con ella en la clave. Súbela si cambian las features (nombres, regex o cálculo).
+FEATURES_VERSION = "1"
+
 def extract_features(requirements: str) -> Dict[str, float]:
     t = _norm(requirements)
     feats: Dict[str, float] = {
@@ -0,0 +1,261 @@
+# backend/preload.py
+"""
+Arranque con precarga: un master importa y calienta todo y hace fork de los workers.
+
+Con `uvicorn --workers N` cada worker es un proceso nuevo que vuelve a importar
+backend.app (brain, sklearn, reportlab, la base de conocimiento, el retriever...): la
+memoria crece lineal con N y por eso recomendábamos WEB_CONCURRENCY=1 en instancias
+pequeñas. Aquí:
+
+  1. el master importa backend.app y calienta lo que antes se hacía por worker
+     (init_db, tarjetas de conocimiento, secciones del .kb, índice del glosario,
+     retriever, una propuesta de ejemplo para llenar cachés y regex)
+  2. gc.collect() + gc.freeze(): los objetos que quedan vivos pasan a la generación
+     permanente y el GC de los hijos no los recorre (recorrerlos escribe en sus cabeceras
+     y rompe el copy-on-write de páginas que nadie más toca)
+  3. abre el socket y hace fork de N workers; cada uno sirve con uvicorn.Server sobre el
+     socket heredado. El heap del master queda compartido copy-on-write.
+  4. el master vigila: si un worker muere se relanza; SIGTERM/SIGINT se reenvían a los
+     workers (apagado ordenado de uvicorn) y pasado --graceful-timeout se matan.
+
+Uso:
+  python -m backend.preload --host 0.0.0.0 --port 8000 --workers 4 --proxy-headers
+
+memory_kb(pid) lee USS/PSS/RSS de /proc (lo usa scripts/bench_preload_memory.py para
+comparar workers de uvicorn con workers precargados).
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import argparse
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+# el startup de la app mira esto para no reconstruir en cada worker lo que ya calentó el master
+PRELOADED_ENV = "BACKEND_PRELOADED"
+
+# un worker que muere antes de esto cuenta como fallo de arranque; demasiados seguidos → abortar
+_MIN_UPTIME = 2.0
+_MAX_FAST_FAILURES = 5
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    """USS (Private_Clean + Private_Dirty), PSS y RSS de un proceso en KB (vacío si no hay /proc)."""
+    vals: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    vals[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return {}
+    return {"uss": vals.get("Private_Clean", 0) + vals.get("Private_Dirty", 0),
+            "pss": vals.get("Pss", 0), "rss": vals.get("Rss", 0)}
+
+
+def children(pid: int) -> List[int]:
+    """PIDs hijos directos (lo que lista /proc/<pid>/task/*/children)."""
+    out: List[int] = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as fh:
+                out.extend(int(x) for x in fh.read().split())
+    except OSError:
+        pass
+    return sorted(set(out))
+
+
+def warm() -> Dict[str, Any]:
+    """Importa la app y carga en este proceso todo lo que los workers usarían de forma perezosa."""
+    t0 = time.perf_counter()
+    app_mod = importlib.import_module("backend.app")
+    out: Dict[str, Any] = {}
+
+    store = importlib.import_module("backend.memory.state_store")
+    store.init_db()
+
+    from backend.knowledge import kb
+    from backend.knowledge import methodologies
+    for name in kb.info()["sections"]:
+        kb.section(name)
+    out["kb_sections"] = len(kb.info()["loaded"])
+    out["glossary_terms"] = len(methodologies.glossary_index())
+
+    brain = importlib.import_module("backend.engine.brain")
+    for lazy_map in (methodologies.METHODOLOGIES, methodologies.METHODOLOGY_PHASES, methodologies.GLOSSARY,
+                     brain._ROLE_KEYWORDS, brain._TRAINING_CATALOG, brain._TRAIN_METHOD,
+                     brain.DELIVERABLE_DEFINITIONS):
+        len(lazy_map)
+    brain._deliverable_table()
+    out["cards"] = importlib.import_module("backend.engine.knowledge_cards").warm()
+
+    # una propuesta de ejemplo: imports dentro de funciones, regex y lru_cache del planner
+    from backend.engine.planner import generate_proposal
+    generate_proposal("plataforma web con pagos, app móvil y panel de administración")
+
+    try:
+        sim_mod = importlib.import_module("backend.retrieval.similarity")
+        out["retriever_docs"] = len(sim_mod.get_retriever().docs)
+    except Exception as e:
+        print(f"[preload] Retriever no precargado: {e}")
+
+    # las conexiones abiertas del pool no pueden cruzar el fork: que cada worker abra las suyas
+    store.engine.dispose()
+    out["app"] = app_mod.app
+    out["warm_ms"] = round(1000 * (time.perf_counter() - t0), 1)
+    return out
+
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve(app, sock: socket.socket, args: argparse.Namespace) -> None:
+    import uvicorn
+    config = uvicorn.Config(app, proxy_headers=args.proxy_headers, forwarded_allow_ips=args.forwarded_allow_ips,
+                            log_level=args.log_level, timeout_keep_alive=args.timeout_keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _worker(app, sock: socket.socket, args: argparse.Namespace) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    # hijo: señales por defecto (uvicorn pone las suyas) y conexiones de BD propias
+    code = 0
+    try:
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        store = sys.modules.get("backend.memory.state_store")
+        if store is not None:
+            store.engine.dispose(close=False)
+        _serve(app, sock, args)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+class _Master:
+    def __init__(self, app, sock: socket.socket, args: argparse.Namespace):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, float] = {}     # pid → instante de arranque
+        self.stopping = False
+        self.fast_failures = 0
+
+    def _on_signal(self, signum, _frame) -> None:
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self) -> List[int]:
+        dead = []
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                dead.extend(self.workers)
+                self.workers.clear()
+                break
+            if pid == 0:
+                break
+            started = self.workers.pop(pid, None)
+            if started is None:
+                continue
+            dead.append(pid)
+            if not self.stopping:
+                code = os.waitstatus_to_exitcode(status)
+                print(f"[preload] Worker {pid} terminó (código {code}); se relanza")
+                self.fast_failures = self.fast_failures + 1 if time.monotonic() - started < _MIN_UPTIME else 0
+        return dead
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        for _ in range(self.args.workers):
+            self.workers[_worker(self.app, self.sock, self.args)] = time.monotonic()
+        print(f"[preload] Master {os.getpid()} sirviendo con workers {sorted(self.workers)}")
+        while not self.stopping:
+            time.sleep(0.2)
+            self._reap()
+            if self.stopping:
+                break
+            if self.fast_failures >= _MAX_FAST_FAILURES:
+                print("[preload] Los workers mueren al arrancar; se aborta")
+                self._on_signal(signal.SIGTERM, None)
+                self._wait()
+                return 1
+            while len(self.workers) < self.args.workers:
+                self.workers[_worker(self.app, self.sock, self.args)] = time.monotonic()
+        return self._wait()
+
+    def _wait(self) -> int:
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while self.workers:
+            self._reap()
+            time.sleep(0.05)
+        self.sock.close()
+        return 0
+
+
+def _parse(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Servidor con precarga en el master y workers por fork")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1") or 1))
+    ap.add_argument("--proxy-headers", action="store_true")
+    ap.add_argument("--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    ap.add_argument("--log-level", default="info")
+    ap.add_argument("--timeout-keep-alive", type=int, default=5)
+    ap.add_argument("--graceful-timeout", type=float, default=30.0)
+    ap.add_argument("--no-freeze", action="store_true", help="no llamar a gc.freeze() (para comparar)")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse(argv)
+    os.environ[PRELOADED_ENV] = "1"
+    info = warm()
+    app = info.pop("app")
+    print(f"[preload] Precargado en {info['warm_ms']} ms: {info}")
+    gc.collect()
+    if not args.no_freeze:
+        gc.freeze()
+    sock = _bind(args.host, args.port)
+    if args.workers <= 1:
+        # un solo worker: sin fork, el master sirve (no hay nada que compartir)
+        _serve(app, sock, args)
+        return 0
+    return _Master(app, sock, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+from __future__ import annotations
+from typing import List, Dict, Tuple, Optional
+import math
+import re
+import unicodedata
+
+import numpy as np
+
+
+# Stopwords mínimas en castellano (las que más ruido meten en requisitos)
+_STOP = {
+    "de", "la", "el", "en", "y", "a", "los", "las", "del", "un", "una", "con", "para", "por",
+    "que", "se", "al", "lo", "su", "sus", "o", "e", "es", "como", "mas", "más", "sin", "sobre",
+    "queremos", "quiero", "necesito", "necesitamos",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sin tildes, tokens alfanuméricos de 2+ caracteres y sin stopwords."""
+    t = unicodedata.normalize("NFKD", (text or "").lower())
+    t = "".join(c for c in t if not unicodedata.combining(c))
+    return [tok for tok in _TOKEN_RE.findall(t) if len(tok) > 1 and tok not in _STOP]
+
+
+class InvertedIndex:
+    """
+    Índice invertido en memoria con scoring BM25.
+    postings[term] = (doc_ids ordenados, frecuencias) como arrays NumPy, así
+    la intersección y la acumulación de scores se hacen vectorizadas.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: Dict[str, float] = {}
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.avgdl = 0.0
+        self.n_docs = 0
+
+    def build(self, docs: List[str]) -> None:
+        tmp: Dict[str, Dict[int, int]] = {}
+        lens = np.zeros(len(docs), dtype=np.float32)
+        for i, doc in enumerate(docs):
+            toks = tokenize(doc)
+            lens[i] = len(toks)
+            for tok in toks:
+                d = tmp.setdefault(tok, {})
+                d[i] = d.get(i, 0) + 1
+        self.n_docs = len(docs)
+        self.doc_len = lens
+        self.avgdl = float(lens.mean()) if len(docs) else 0.0
+        self.postings = {}
+        self.idf = {}
+        for term, d in tmp.items():
+            ids = np.fromiter(d.keys(), dtype=np.int32, count=len(d))
+            tfs = np.fromiter(d.values(), dtype=np.float32, count=len(d))
+            order = np.argsort(ids)
+            self.postings[term] = (ids[order], tfs[order])
+            df = len(d)
+            # idf BM25 "+1" (nunca negativo)
+            self.idf[term] = math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def _query_terms(self, query: str) -> List[str]:
+        # términos únicos presentes en el índice, de menos a más frecuente
+        terms = {t for t in tokenize(query) if t in self.postings}
+        return sorted(terms, key=lambda t: len(self.postings[t][0]))
+
+    def conjunctive(self, terms: List[str]) -> np.ndarray:
+        """Docs que contienen todos los términos (intersección de postings, empezando por la más corta)."""
+        if not terms:
+            return np.zeros(0, dtype=np.int32)
+        acc = self.postings[terms[0]][0]
+        for t in terms[1:]:
+            acc = np.intersect1d(acc, self.postings[t][0], assume_unique=True)
+            if not len(acc):
+                break
+        return acc
+
+    def search(self, query: str, top_k: int = 10, min_hits: Optional[int] = None,
+               mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        BM25 term-at-a-time sobre las postings. Si la intersección de todos los
+        términos da al menos `min_hits` docs (por defecto top_k) sólo se puntúan
+        esos; si no, se puntúa la unión (OR) para no quedarnos cortos.
+        `mask` (bool por doc) es un pre-filtro: lo que quede fuera nunca puntúa.
+        """
+        terms = self._query_terms(query)
+        if not terms or not self.n_docs:
+            return []
+        min_hits = top_k if min_hits is None else min_hits
+        allowed = self.conjunctive(terms) if len(terms) > 1 else None
+        if allowed is not None and mask is not None:
+            allowed = allowed[mask[allowed]]
+        if allowed is not None and len(allowed) < min_hits:
+            allowed = None
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_len / (self.avgdl or 1.0))
+        for t in terms:
+            ids, tfs = self.postings[t]
+            scores[ids] += self.idf[t] * tfs * (self.k1 + 1.0) / (tfs + norm[ids])
+        if allowed is not None:
+            keep = np.zeros(self.n_docs, dtype=bool)
+            keep[allowed] = True
+            scores[~keep] = 0.0
+        elif mask is not None:
+            scores[~mask] = 0.0
+
+        hits = np.flatnonzero(scores > 0)
+        if not len(hits):
+            return []
+        k = min(top_k, len(hits))
+        top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+def rrf_fuse(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Reciprocal Rank Fusion: score(d) = Σ 1 / (k + rank_d) sobre cada ranking."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda kv: (-kv[1], kv[0]))
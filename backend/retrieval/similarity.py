@@ -1,69 +1,369 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
-from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple, Union
+from collections.abc import Mapping
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import NearestNeighbors
+from sklearn.decomposition import TruncatedSVD
+import numpy as np
 import threading
+import unicodedata
 
 from backend.memory.state_store import SessionLocal, ProposalLog
+from backend.retrieval.bm25 import InvertedIndex, rrf_fuse
+
+
+# Metadatos por fila en columnas NumPy (una fila por documento del índice).
+# methodology/industry son códigos sobre las listas de categorías del retriever.
+META_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("methodology", np.int16),
+    ("industry", np.int16),
+    ("total_eur", np.float64),
+])
+
+# Campos que no viven en columnas: se cargan al acceder (hidratación perezosa)
+_HEAVY_FIELDS = ("budget", "team", "phases")
+
+
+def _fold(s: Optional[str]) -> str:
+    t = unicodedata.normalize("NFKD", (s or "").lower())
+    return "".join(c for c in t if not unicodedata.combining(c)).strip()
+
+
+def _industry_of(pj: Dict[str, Any]) -> str:
+    # el planner deja la industria en assumptions.industry_note: "Fintech (regulación ...)"
+    note = (((pj or {}).get("budget") or {}).get("assumptions") or {}).get("industry_note") or ""
+    label = _fold(note.split("(")[0])
+    return "estandar" if (not label or label == "industria estandar") else label
+
+
+def _total_of(pj: Dict[str, Any]) -> float:
+    try:
+        return float(((pj or {}).get("budget") or {}).get("total_eur"))
+    except Exception:
+        return float("nan")
+
+
+def _load_payloads_from_db(ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    with SessionLocal() as db:
+        rows = db.query(ProposalLog.id, ProposalLog.proposal_json).filter(ProposalLog.id.in_(ids)).all()
+    return {int(rid): (pj or {}) for rid, pj in rows}
+
+
+class _Hydrator:
+    """Carga los campos pesados de todos los hits de una consulta de una vez, al primer acceso."""
+    def __init__(self, ids: List[int], loader: Callable[[List[int]], Dict[int, Dict[str, Any]]]):
+        self.ids = ids
+        self.loader = loader
+        self._data: Optional[Dict[int, Dict[str, Any]]] = None
+
+    def get(self, pid: int) -> Dict[str, Any]:
+        if self._data is None:
+            try:
+                self._data = self.loader(self.ids)
+            except Exception:
+                self._data = {}
+        return self._data.get(pid, {})
+
+
+class RetrievalHit(Mapping):
+    """
+    Resultado de retrieve(): se comporta como un dict de sólo lectura.
+    id, requirements, methodology, industry, total_eur y scores salen de las columnas;
+    budget/team/phases se hidratan al pedirlos.
+    """
+    __slots__ = ("_base", "_hydrator")
+
+    def __init__(self, base: Dict[str, Any], hydrator: _Hydrator):
+        self._base = base
+        self._hydrator = hydrator
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._base:
+            return self._base[key]
+        if key in _HEAVY_FIELDS:
+            default: Any = {} if key == "budget" else []
+            return self._hydrator.get(self._base["id"]).get(key) or default
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self._base
+        yield from _HEAVY_FIELDS
+
+    def __len__(self) -> int:
+        return len(self._base) + len(_HEAVY_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: self[k] for k in self}
+
+
+class _IndexState:
+    """Todo lo que se construye en refresh()/load(): se publica de una vez (una asignación),
+    así una consulta en curso nunca mezcla docs de un índice con columnas o matriz de otro."""
+    __slots__ = ("docs", "cols", "methodologies", "industries", "loader", "vectorizer", "index",
+                 "X", "fitted", "svd", "dense")
+
+    def __init__(self, docs: List[str], cols: np.ndarray, methodologies: List[str], industries: List[str],
+                 loader: Callable[[List[int]], Dict[int, Dict[str, Any]]], vectorizer: TfidfVectorizer,
+                 index: InvertedIndex, X: Any, fitted: bool):
+        self.docs = docs
+        self.cols = cols
+        self.methodologies = methodologies
+        self.industries = industries
+        self.loader = loader
+        self.vectorizer = vectorizer
+        self.index = index
+        self.X = X
+        self.fitted = fitted
+        # LSA perezosa (ver _dense_vectors): se calcula sobre ESTE X y se queda en este estado
+        self.svd: Optional[TruncatedSVD] = None
+        self.dense: Optional[np.ndarray] = None
+
+
+def _columns(rows: List[Tuple[int, Dict[str, Any]]]) -> Tuple[np.ndarray, List[str], List[str]]:
+    methods: Dict[str, int] = {}
+    industries: Dict[str, int] = {}
+    cols = np.zeros(len(rows), dtype=META_DTYPE)
+    for i, (rid, pj) in enumerate(rows):
+        m = pj.get("methodology") or ""
+        ind = _industry_of(pj)
+        cols[i] = (rid, methods.setdefault(m, len(methods)), industries.setdefault(ind, len(industries)), _total_of(pj))
+    return cols, list(methods), list(industries)
+
+
+def columns_footprint(cols: np.ndarray, methodologies: List[str], industries: List[str]) -> int:
+    """Bytes de los metadatos en columnas (arrays + listas de categorías)."""
+    cats = sum(len(s.encode("utf-8")) for s in methodologies + industries)
+    return int(cols.nbytes + cats)
 
 
 class SimilarityRetriever:
     """
-    k-NN sobre requisitos guardados en la BD para encontrar casos similares.
+    Búsqueda de casos similares sobre los requisitos guardados en la BD.
+    Híbrido: BM25 sobre un índice invertido + k-NN coseno TF-IDF, fusionados
+    con Reciprocal Rank Fusion y (opcional) re-rank denso (LSA) del top-k.
+    Los metadatos van en columnas NumPy y los filtros (metodología, rango de
+    presupuesto, industria) se aplican como máscara antes de puntuar.
     No requiere entrenamiento offline: aprende de lo que haya en app.db.
+
+    refresh()/load() construyen el índice nuevo aparte (_IndexState) y lo publican con una
+    sola asignación; retrieve() toma el estado una vez al empezar.
     """
+    # cuántos candidatos aporta cada ranking antes de fusionar
+    CANDIDATES = 20
+    RRF_K = 60
+
     def __init__(self, max_items: int = 500):
         self.max_items = max_items
-        self.vectorizer = TfidfVectorizer(ngram_range=(1,2), max_features=5000)
-        self.nn = NearestNeighbors(n_neighbors=3, metric="cosine")
-        self.docs: List[str] = []
-        self.meta: List[Dict[str, Any]] = []
-        self._fitted = False
+        self._dense_lock = threading.Lock()
+        # dos refresh a la vez: sin esto el que leyó la BD antes podría publicar el último
+        self._refresh_lock = threading.Lock()
+        self._state = self._build([], [], _load_payloads_from_db)
         self.refresh()
 
+    # lectura del estado publicado (compatibilidad con quien miraba los atributos sueltos)
+    @property
+    def docs(self) -> List[str]:
+        return self._state.docs
+
+    @property
+    def cols(self) -> np.ndarray:
+        return self._state.cols
+
+    @property
+    def methodologies(self) -> List[str]:
+        return self._state.methodologies
+
+    @property
+    def industries(self) -> List[str]:
+        return self._state.industries
+
+    @property
+    def vectorizer(self) -> TfidfVectorizer:
+        return self._state.vectorizer
+
+    @property
+    def _loader(self) -> Callable[[List[int]], Dict[int, Dict[str, Any]]]:
+        return self._state.loader
+
+    @_loader.setter
+    def _loader(self, loader: Callable[[List[int]], Dict[int, Dict[str, Any]]]) -> None:
+        st = self._state
+        new = _IndexState(st.docs, st.cols, st.methodologies, st.industries, loader, st.vectorizer,
+                          st.index, st.X, st.fitted)
+        new.svd, new.dense = st.svd, st.dense
+        self._state = new
+
     def refresh(self) -> None:
         # Intentar leer la BD; si falla, dejar el índice vacío
+        docs: List[str] = []
+        rows: List[Tuple[int, Dict[str, Any]]] = []
+        with self._refresh_lock:
+            try:
+                with SessionLocal() as db:
+                    q = (db.query(ProposalLog.id, ProposalLog.requirements, ProposalLog.proposal_json)
+                         .order_by(ProposalLog.created_at.desc()).limit(self.max_items))
+                    for rid, req, pj in q:
+                        docs.append(req or "")
+                        rows.append((rid, pj or {}))
+            except Exception:
+                # si hay problema con la BD, no romper la app; dejar vacío
+                docs, rows = [], []
+            self._state = self._build(docs, rows, _load_payloads_from_db)
+
+    def load(self, docs: List[str], meta: List[Dict[str, Any]]) -> None:
+        """Indexa documentos ya cargados (scripts de evaluación/tests, sin pasar por la BD).
+        `meta` son dicts con id y, opcionalmente, methodology/budget/team/phases."""
+        payloads = {int(m["id"]): m for m in meta}
+        loader = lambda ids: {i: payloads[i] for i in ids if i in payloads}
+        self._state = self._build(list(docs), [(int(m["id"]), m) for m in meta], loader)
+
+    @staticmethod
+    def _build(docs: List[str], rows: List[Tuple[int, Dict[str, Any]]],
+               loader: Callable[[List[int]], Dict[int, Dict[str, Any]]]) -> _IndexState:
+        # todo en objetos nuevos: el estado publicado no se toca hasta la asignación final
+        cols, methodologies, industries = _columns(rows)
+        index = InvertedIndex()
+        index.build(docs)
+        vectorizer = TfidfVectorizer(ngram_range=(1,2), max_features=5000)
+        X, fitted = None, False
         try:
-            with SessionLocal() as db:
-                rows = db.query(ProposalLog).order_by(ProposalLog.created_at.desc()).limit(self.max_items).all()
-                self.docs = []
-                self.meta = []
-                for r in rows:
-                    req = r.requirements or ""
-                    pj = r.proposal_json or {}
-                    meta = {
-                        "id": r.id,
-                        "requirements": req,
-                        "methodology": pj.get("methodology"),
-                        "budget": pj.get("budget", {}),
-                        "team": pj.get("team", []),
-                        "phases": pj.get("phases", []),
-                    }
-                    self.docs.append(req)
-                    self.meta.append(meta)
-        except Exception:
-            # si hay problema con la BD, no romper la app; dejar vacío
-            self.docs = []
-            self.meta = []
-
-        if self.docs:
-            X = self.vectorizer.fit_transform(self.docs)
-            self.nn.fit(X)
-            self._fitted = True
-        else:
-            self._fitted = False
+            if docs:
+                X, fitted = vectorizer.fit_transform(docs), True
+        except ValueError:
+            # vocabulario vacío (sólo stopwords/números): no hay TF-IDF pero sí BM25
+            pass
+        return _IndexState(docs, cols, methodologies, industries, loader, vectorizer, index, X, fitted)
+
+    def memory_footprint(self) -> int:
+        """Bytes de los metadatos en columnas (arrays + listas de categorías)."""
+        st = self._state
+        return columns_footprint(st.cols, st.methodologies, st.industries)
+
+    # --- filtros ---
+
+    def _filter_mask(self, st: _IndexState, methodology: Union[str, Iterable[str], None] = None,
+                     budget_between: Optional[Tuple[Optional[float], Optional[float]]] = None,
+                     industry: Optional[str] = None) -> Optional[np.ndarray]:
+        if methodology is None and budget_between is None and industry is None:
+            return None
+        mask = np.ones(len(st.cols), dtype=bool)
+        if methodology is not None:
+            wanted = {_fold(methodology)} if isinstance(methodology, str) else {_fold(m) for m in methodology}
+            codes = [c for c, name in enumerate(st.methodologies) if _fold(name) in wanted]
+            mask &= np.isin(st.cols["methodology"], codes)
+        if budget_between is not None:
+            lo, hi = budget_between
+            total = st.cols["total_eur"]
+            if lo is not None:
+                mask &= total >= float(lo)
+            if hi is not None:
+                mask &= total <= float(hi)
+        if industry is not None:
+            # "retail" casa con "logistics/retail/travel", "erp" con "enterprise/erp"
+            ind = _fold(industry)
+            codes = [c for c, name in enumerate(st.industries) if ind and ind in name]
+            mask &= np.isin(st.cols["industry"], codes)
+        return mask
 
-    def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        if not self._fitted:
+    # --- rankings individuales ---
+
+    def _knn(self, st: _IndexState, q, n: int, mask: Optional[np.ndarray] = None) -> List[int]:
+        # k-NN coseno por fuerza bruta: las filas TF-IDF ya están normalizadas (L2),
+        # así que el coseno es el producto escalar y el pre-filtro es elegir filas
+        if not st.fitted or q.nnz == 0:
+            return []
+        rows = np.arange(len(st.docs)) if mask is None else np.flatnonzero(mask)
+        if not len(rows):
+            return []
+        sims = np.asarray((st.X[rows] @ q.T).todense()).ravel()
+        k = min(n, len(rows))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return [int(rows[j]) for j in top]
+
+    def _bm25(self, st: _IndexState, query: str, n: int, mask: Optional[np.ndarray] = None) -> Dict[int, float]:
+        # dict ordenado por score BM25 descendente
+        return dict(st.index.search(query, top_k=n, mask=mask))
+
+    def _dense_vectors(self, st: _IndexState) -> Optional[np.ndarray]:
+        # LSA (SVD truncada sobre TF-IDF) como representación densa; se calcula al primer uso.
+        # svd y dense se publican juntos: quien vea dense tiene también el svd que lo generó
+        if st.dense is None and st.fitted and st.X.shape[1] > 2 and len(st.docs) > 2:
+            with self._dense_lock:
+                if st.dense is None:
+                    n_comp = max(2, min(100, st.X.shape[1] - 1, len(st.docs) - 1))
+                    svd = TruncatedSVD(n_components=n_comp, random_state=42)
+                    dense = svd.fit_transform(st.X)
+                    norms = np.linalg.norm(dense, axis=1, keepdims=True)
+                    st.svd = svd
+                    st.dense = dense / np.where(norms == 0, 1.0, norms)
+        return st.dense
+
+    def retrieve(self, query: str, top_k: int = 3, mode: str = "hybrid", rerank: bool = False,
+                 methodology: Union[str, Iterable[str], None] = None,
+                 budget_between: Optional[Tuple[Optional[float], Optional[float]]] = None,
+                 industry: Optional[str] = None) -> List[RetrievalHit]:
+        """
+        mode: "hybrid" (BM25 + TF-IDF con RRF), "bm25" o "tfidf".
+        rerank: reordena el top-k fusionado por coseno en el espacio denso (LSA).
+        methodology / budget_between=(min, max) / industry: pre-filtros sobre las columnas.
+        Cada resultado lleva `similarity` (coseno TF-IDF), `bm25` y `score` (el del ranking final).
+        """
+        st = self._state
+        if not st.docs:
+            return []
+        mask = self._filter_mask(st, methodology, budget_between, industry)
+        if mask is not None and not mask.any():
             return []
-        q = self.vectorizer.transform([query])
-        dist, idx = self.nn.kneighbors(q, n_neighbors=min(top_k, len(self.docs)))
+        n = max(self.CANDIDATES, top_k)
+        q = st.vectorizer.transform([query]) if st.fitted else None
+
+        bm25 = self._bm25(st, query, n, mask) if mode in ("hybrid", "bm25") else {}
+        bm25_rank = list(bm25)
+        knn_rank = self._knn(st, q, n, mask) if (mode in ("hybrid", "tfidf") and q is not None) else []
+        if mode == "bm25":
+            fused = [(i, 1.0 / (self.RRF_K + r)) for r, i in enumerate(bm25_rank, start=1)]
+        elif mode == "tfidf":
+            fused = [(i, 1.0 / (self.RRF_K + r)) for r, i in enumerate(knn_rank, start=1)]
+        else:
+            fused = rrf_fuse([bm25_rank, knn_rank], k=self.RRF_K)
+        fused = fused[:top_k]
+        if not fused:
+            return []
+
+        ids = [i for i, _ in fused]
+        score = {i: s for i, s in fused}
+        cos = np.zeros(len(ids))
+        if q is not None:
+            # filas TF-IDF normalizadas L2 → el producto escalar es el coseno
+            cos = np.asarray((st.X[ids] @ q.T).todense()).ravel()
+        if rerank:
+            dense = self._dense_vectors(st)
+            if dense is not None and q is not None:
+                qd = st.svd.transform(q)[0]
+                qn = np.linalg.norm(qd)
+                if qn > 0:
+                    dsim = dense[ids] @ (qd / qn)
+                    order = np.argsort(-dsim, kind="stable")
+                    score = {ids[j]: float(dsim[j]) for j in order}
+                    ids = [ids[j] for j in order]
+                    cos = cos[order]
+
+        rows = st.cols[ids]
+        hydrator = _Hydrator([int(r["id"]) for r in rows], st.loader)
         res = []
-        for d, i in zip(dist[0], idx[0]):
-            meta = dict(self.meta[int(i)])
-            meta["similarity"] = float(1.0 - d)
-            res.append(meta)
+        for i, row, c in zip(ids, rows, cos):
+            total = float(row["total_eur"])
+            res.append(RetrievalHit({
+                "id": int(row["id"]),
+                "requirements": st.docs[i],
+                "methodology": st.methodologies[row["methodology"]] or None,
+                "industry": st.industries[row["industry"]],
+                "total_eur": None if np.isnan(total) else total,
+                "similarity": float(c),
+                "bm25": float(bm25.get(i, 0.0)),
+                "score": float(score[i]),
+            }, hydrator))
         return res
 
 # Singleton global para que planner/brain compartan el mismo índice
@@ -79,3 +379,10 @@ def get_retriever() -> SimilarityRetriever:
             if _GLOBAL is None:
                 _GLOBAL = SimilarityRetriever()
     return _GLOBAL
+
+
+def refresh_retriever() -> None:
+    """Reindexa el singleton tras guardar propuestas nuevas (si aún no existe, ya las leerá)."""
+    r = _GLOBAL
+    if r is not None:
+        r.refresh()
@@ -37,18 +37,24 @@ def proposal(req: ProposalRequest):
     # Generar propuesta
     p = generate_proposal(req.requirements)
 # backend/routers/projects.py
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+import json
 import re
-from typing import List, Dict, Any, Optional
+from datetime import date
+from typing import List, Dict, Any, Optional, Union
 
 from backend.memory.conversation import save_message
-from backend.engine.planner import generate_proposal
+from backend.engine.proposal_cache import cached_generate_proposal, cache_stats
 from backend.engine.context import set_last_proposal
+from backend.knowledge.citations import expand_proposal, registry_snapshot
+from backend.engine import knowledge_cards
 from backend.core.config import settings
 import jwt
 from typing import Tuple
 from backend.engine.brain import _pretty_proposal
+from backend.memory import state_store
 
 router = APIRouter()
 
@@ -65,12 +71,12 @@ class ProposalResponse(BaseModel):
     explanation: List[str]           # <- lo generamos a partir de p['explanations']
 
 @router.post("/proposal", response_model=ProposalResponse)
-def proposal(req: ProposalRequest):
+def proposal(req: ProposalRequest, expand: bool = False):
     # Log del mensaje del usuario
     save_message(req.session_id, "user", f"[REQ] {req.requirements}")
 
-    # Generar propuesta
-    p = generate_proposal(req.requirements)
+    # Generar propuesta (memoizada por texto normalizado + versión del conocimiento)
+    p = cached_generate_proposal(req.requirements)
 
     # Guardar para explicaciones posteriores desde brain.py
     set_last_proposal(req.session_id, p, req.requirements)
@@ -94,6 +100,9 @@ def proposal(req: ProposalRequest):
             expl_list.append(str(ex["notes"]))
 
     # Construimos la respuesta ajustada al modelo
+    # (tarifas base como referencia del registro salvo ?expand=true; ver GET /projects/refs)
+    if expand:
+        p = expand_proposal(p)
     return {
         "methodology": p["methodology"],
         "team": p["team"],
@@ -104,6 +113,144 @@ def proposal(req: ProposalRequest):
     }
 
 
+# ---------------- Propuestas en lote (importación de portfolio / RFPs) ----------------
+BATCH_MAX_ITEMS = 10000
+
+
+def _parse_batch_body(raw: bytes, content_type: str) -> List[Any]:
+    """Acepta un array JSON o NDJSON (una línea por item). Cada item es un string
+    con los requisitos o un objeto {"requirements": ...}."""
+    text = raw.decode("utf-8", errors="replace").strip()
+    if not text:
+        return []
+    if "ndjson" not in content_type and text.startswith("["):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON no válido.")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Se esperaba un array JSON.")
+        return data
+    items: List[Any] = []
+    for n, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Línea {n} del NDJSON no es JSON válido.")
+    return items
+
+
+def _batch_requirements(item: Any) -> Optional[str]:
+    req = item.get("requirements") if isinstance(item, dict) else item
+    if not isinstance(req, str) or len(req.strip()) < 3:
+        return None
+    return req.strip()
+
+
+def _ndjson(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def _stream_batch(session_id: str, items: List[Any], expand: bool = False):
+    from backend.engine.batch import iter_proposal_chunks
+
+    texts: List[str] = []
+    positions: List[int] = []
+    for i, item in enumerate(items):
+        req = _batch_requirements(item)
+        if req is None:
+            yield _ndjson({"index": i, "error": "requirements debe ser un texto de al menos 3 caracteres"})
+        else:
+            texts.append(req)
+            positions.append(i)
+
+    for start, chunk, props, err in iter_proposal_chunks(texts):
+        idx = positions[start:start + len(chunk)]
+        if err is not None:
+            for i in idx:
+                yield _ndjson({"index": i, "error": err})
+            continue
+        # una transacción por chunk (no un commit por propuesta)
+        try:
+            ids = state_store.save_proposals_bulk(session_id, list(zip(chunk, props)))
+        except Exception as e:
+            for i in idx:
+                yield _ndjson({"index": i, "error": f"No se pudo guardar: {e}"})
+            continue
+        for i, pid, req, p in zip(idx, ids, chunk, props):
+            yield _ndjson({
+                "index": i,
+                "id": pid,
+                "requirements": req,
+                "methodology": p["methodology"],
+                "total_eur": p["budget"]["total_eur"],
+                "proposal": expand_proposal(p) if expand else p,
+            })
+    # lo guardado en el lote también entra en casos similares
+    from backend.retrieval.similarity import refresh_retriever
+    refresh_retriever()
+
+
+@router.post("/proposal/batch")
+async def proposal_batch(request: Request, session_id: str = "batch", expand: bool = False):
+    """
+    Genera propuestas para muchos requisitos de golpe. Cuerpo: array JSON o NDJSON
+    (Content-Type: application/x-ndjson). Devuelve NDJSON en streaming, una línea por
+    item según van terminando los chunks ("index" = posición en la entrada).
+    A diferencia de /proposal no se guardan mensajes de conversación, sólo los ProposalLog.
+    Las fuentes y tarifas base van como IDs del registro (GET /projects/refs) salvo ?expand=true.
+    """
+    items = _parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    if not items:
+        raise HTTPException(status_code=400, detail="No hay requisitos que procesar.")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {BATCH_MAX_ITEMS} requisitos por lote.")
+    return StreamingResponse(_stream_batch(session_id, items, expand), media_type="application/x-ndjson")
+
+
+@router.get("/proposal/cache/stats")
+def proposal_cache_stats():
+    """Hit-rate de la caché de propuestas (memoria + BD)."""
+    return cache_stats()
+
+
+@router.get("/refs")
+def knowledge_refs():
+    """Registro de citas y tablas (IDs estables → contenido) para resolver las referencias
+    de las propuestas en el cliente. Es estático: se puede cachear."""
+    return registry_snapshot()
+
+
+_CARDS_CACHE_CONTROL = "public, max-age=3600, must-revalidate"
+
+
+def _cached_json(request: Request, raw: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": _CARDS_CACHE_CONTROL}
+    if knowledge_cards.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=raw, media_type="application/json", headers=headers)
+
+
+@router.get("/cards")
+def knowledge_cards_table(request: Request):
+    """Tarjetas de Aprender y fichas de metodología (nivel × metodología), precalculadas al
+    arrancar. Con ETag: el cliente la guarda y revalida con If-None-Match (304)."""
+    raw, etag = knowledge_cards.cards_payload()
+    return _cached_json(request, raw, etag)
+
+
+@router.get("/cards/{key}")
+def knowledge_card(key: str, request: Request):
+    """Una tarjeta por clave "<kind>:<level>:<method>" (p.ej. "phases:beginner:Scrum")."""
+    hit = knowledge_cards.card_payload(key)
+    if hit is None:
+        raise HTTPException(status_code=404, detail="Tarjeta no encontrada")
+    return _cached_json(request, *hit)
+
+
 # ---------------- Recomendaciones de características del proyecto ----------------
 class RecommendIn(BaseModel):
     query: str = Field(..., min_length=3, description="Descripción del proyecto que quieres hacer")
@@ -114,6 +261,7 @@ class RecommendationResponse(BaseModel):
     typical_phases: List[Dict[str, Any]]
     key_practices: List[str]
     important_considerations: List[str]
+    similar_projects: List[Dict[str, Any]] = []
 
 @router.post("/recommend", response_model=RecommendationResponse)
 def recommend_project_info(req: RecommendIn):
@@ -156,15 +304,35 @@ def recommend_project_info(req: RecommendIn):
     
     # Consideraciones importantes
     important_considerations = _get_important_considerations(signals, methodology_name)
+
+    # Proyectos parecidos ya guardados (mismo motor que el "casos similares" del chat)
+    similar_projects = _similar_projects(req.query)
     
     return {
         "methodology": methodology_response,
         "typical_roles": typical_roles,
         "typical_phases": typical_phases,
         "key_practices": key_practices,
-        "important_considerations": important_considerations
+        "important_considerations": important_considerations,
+        "similar_projects": similar_projects
     }
 
+def _similar_projects(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+    """Resumen ligero de los casos más parecidos (BM25 + TF-IDF con RRF)."""
+    try:
+        from backend.retrieval.similarity import get_retriever
+        hits = get_retriever().retrieve(query, top_k=top_k)
+    except Exception:
+        return []
+    return [{
+        "id": h.get("id"),
+        "requirements": h.get("requirements"),
+        "methodology": h.get("methodology"),
+        "total_eur": h.get("total_eur"),
+        "similarity": round(h.get("similarity", 0.0), 3),
+        "score": round(h.get("score", 0.0), 4),
+    } for h in hits]
+
 def _get_typical_roles(signals: Dict[str, float], query: str) -> List[Dict[str, str]]:
     """Determina roles típicos según las señales del proyecto"""
     roles = [
@@ -312,33 +480,6 @@ def _fallback_recommendations():
         "important_considerations": ["Definir Definition of Done", "Mantener backlog priorizado"]
     }
 
-def _keyword_recommend(query: str, top_k: int = 5):
-    from sqlalchemy import or_
-    from backend.memory.state_store import SessionLocal, ProposalLog
-    toks = [t.strip() for t in query.lower().split() if len(t.strip()) >= 3][:6]
-    if not toks:
-        return []
-    with SessionLocal() as db:
-        conds = [ProposalLog.requirements.ilike(f"%{t}%") for t in toks]
-        rows = db.query(ProposalLog).filter(or_(*conds)).order_by(ProposalLog.created_at.desc()).limit(20).all()
-        res = []
-        for r in rows:
-            text = (r.requirements or '').lower()
-            hit = sum(1 for t in toks if t in text)
-            score = float(hit) / max(1, len(toks))
-            res.append({
-                "id": r.id,
-                "requirements": r.requirements,
-                "methodology": (r.proposal_json or {}).get("methodology"),
-                "budget": (r.proposal_json or {}).get("budget"),
-                "team": (r.proposal_json or {}).get("team"),
-                "phases": (r.proposal_json or {}).get("phases"),
-                "similarity": score,
-            })
-        # ordenar por score y cortar
-        res.sort(key=lambda x: x.get("similarity", 0.0), reverse=True)
-        return res[:top_k]
-
 
 # ----------------- Endpoints para proyectos (lista, detalle y checklist por fase) -----------------
 def _phase_checklist_from_method(method: Optional[str], phase_name: str) -> List[str]:
@@ -705,6 +846,139 @@ def get_proposal_phases(proposal_id: int):
         return phases
 
 
+class RangeSpec(BaseModel):
+    min: float
+    max: float
+    steps: int = Field(5, ge=1, le=1000)
+
+
+AxisSpec = Union[List[float], RangeSpec]
+
+
+class WhatIfIn(BaseModel):
+    fte: Dict[str, AxisSpec] = Field(default_factory=dict, description="FTE por rol, p. ej. {'QA': [1, 1.5, 2]}")
+    contingency_pct: Optional[AxisSpec] = None
+    phase_week_multipliers: Optional[AxisSpec] = None
+    phase_multipliers: Dict[str, AxisSpec] = Field(default_factory=dict, description="Multiplicador de semanas por fase (nombre)")
+    rate_multipliers: Optional[AxisSpec] = None
+    elasticity: float = Field(0.7, ge=0.0, le=1.0, description="0 = la duración no depende del tamaño del equipo")
+    max_points: int = Field(50, ge=1, le=1000)
+
+
+def _axis_values(spec: Optional[AxisSpec]) -> Optional[List[float]]:
+    if spec is None:
+        return None
+    if isinstance(spec, RangeSpec):
+        import numpy as np
+        return np.linspace(spec.min, spec.max, spec.steps).tolist()
+    return [float(x) for x in spec]
+
+
+@router.post("/{proposal_id}/whatif")
+def proposal_whatif(proposal_id: int, req: WhatIfIn):
+    """
+    Barrido what-if sobre una propuesta guardada: evalúa toda la rejilla de escenarios
+    (FTE por rol × contingencia × semanas por fase × tarifas) en NumPy y devuelve la
+    frontera de Pareto coste vs. duración (más el más barato y el más rápido).
+    """
+    from backend.memory.state_store import SessionLocal, ProposalLog
+    from backend.engine.whatif import whatif
+    from backend.knowledge.citations import UnknownTableError
+
+    with SessionLocal() as db:
+        row = db.query(ProposalLog).filter(ProposalLog.id == proposal_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Propuesta no encontrada")
+        pj = row.proposal_json or {}
+
+    try:
+        return whatif(
+            pj,
+            max_points=req.max_points,
+            fte={role: _axis_values(v) for role, v in req.fte.items()},
+            contingency_pct=_axis_values(req.contingency_pct),
+            phase_week_multipliers=_axis_values(req.phase_week_multipliers),
+            phase_multipliers={name: _axis_values(v) for name, v in req.phase_multipliers.items()},
+            rate_multipliers=_axis_values(req.rate_multipliers),
+            elasticity=req.elasticity,
+        )
+    except UnknownTableError as e:
+        raise HTTPException(status_code=400, detail=f"Tabla de tarifas desconocida: {e.args[0]}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+class StaffMemberIn(BaseModel):
+    name: str
+    role: str = ""
+    skills: Union[List[str], str] = Field(default_factory=list)
+    seniority: Optional[str] = None
+    availability_pct: int = Field(default=100, ge=0, le=100)
+
+
+class StaffingIn(BaseModel):
+    staff: List[StaffMemberIn]
+    solver: str = Field("auto", pattern="^(auto|ilp|hungarian)$")
+    candidates_per_role: int = Field(40, ge=1, le=5000)
+
+
+@router.post("/{proposal_id}/staffing")
+def proposal_staffing(proposal_id: int, req: StaffingIn):
+    """
+    Asignación óptima de la plantilla a los roles de una propuesta guardada: matriz de
+    puntuación rol × persona + ILP (PuLP/CBC) con disponibilidad y FTE como restricciones
+    (Húngaro como alternativa). Devuelve quién cubre cuánto FTE de cada rol y los huecos.
+    """
+    from backend.memory.state_store import SessionLocal, ProposalLog
+    from backend.engine.staffing import solve_staffing
+
+    with SessionLocal() as db:
+        row = db.query(ProposalLog).filter(ProposalLog.id == proposal_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Propuesta no encontrada")
+        pj = row.proposal_json or {}
+
+    staff = []
+    for m in req.staff:
+        skills = m.skills if isinstance(m.skills, list) else [x.strip() for x in m.skills.split(",") if x.strip()]
+        staff.append({"name": m.name, "role": m.role, "skills": skills,
+                      "seniority": m.seniority, "availability_pct": m.availability_pct})
+    try:
+        return solve_staffing(pj, staff, solver=req.solver, candidates_per_role=req.candidates_per_role)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+class ScheduleIn(BaseModel):
+    start_date: Optional[date] = None
+    holidays: List[date] = Field(default_factory=list)
+    calendar: Optional[str] = Field(None, pattern="^(es)$", description="Festivos nacionales de fecha fija")
+    level: bool = False
+
+
+@router.post("/{proposal_id}/schedule")
+def proposal_schedule(proposal_id: int, req: ScheduleIn):
+    """
+    Calendario por camino crítico de una propuesta guardada: tareas de cada fase con
+    ES/EF/LS/LF, holgura y camino crítico, en días laborables (festivos opcionales) y,
+    si se pide, nivelado por la capacidad de cada rol del equipo.
+    """
+    from backend.memory.state_store import SessionLocal, ProposalLog
+    from backend.engine.scheduler import schedule
+
+    with SessionLocal() as db:
+        row = db.query(ProposalLog).filter(ProposalLog.id == proposal_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Propuesta no encontrada")
+        pj = row.proposal_json or {}
+
+    start = req.start_date or (pj.get("timeline") or {}).get("start_date") or date.today()
+    try:
+        return schedule(pj, start, holidays=req.holidays, country=req.calendar, level=req.level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/{proposal_id}/open_session")
 def open_session_for_proposal(proposal_id: int):
     """Crea una session_id temporal para abrir un chat contextual sobre la propuesta
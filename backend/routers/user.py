@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 import jwt
 
 from backend.core.config import settings
@@ -185,6 +185,61 @@ def create_employee(payload: EmployeeIn, current_user = Depends(get_current_user
     }
 
 
+@router.get('/employees/search')
+def search_employees(skill: List[str] = Query(default=[]), role: Optional[str] = None,
+                     limit: int = Query(default=20, ge=1, le=500), current_user = Depends(get_current_user)):
+    """
+    Empleados que tienen todas las skills pedidas (intersección en el índice de skills del
+    usuario). Con `role`, ordenados por encaje con el rol (producto disperso con sus keywords).
+    """
+    from backend.engine.skill_index import get_user_skill_index
+    from backend.engine.staffing import score_matrix
+    from backend.engine.brain import _canonical_role
+
+    idx = get_user_skill_index(current_user.id)
+    people = idx.people(idx.search(*skill))
+    if role and people:
+        canon = _canonical_role(role)
+        scores = score_matrix([canon], people, index=idx)[0]
+        ranked = sorted(zip(people, scores.tolist()), key=lambda t: -t[1])
+        return [{**p, 'score': round(sc, 2)} for p, sc in ranked[:limit]]
+    return people[:limit]
+
+
+class CapacityIn(BaseModel):
+    proposal_ids: Optional[List[int]] = Field(default=None, description="Por defecto, las propuestas vistas por el usuario")
+    start_dates: Dict[int, str] = Field(default_factory=dict, description="Inicio por propuesta (YYYY-MM-DD)")
+    solver: str = Field(default='auto', pattern='^(auto|lp|greedy)$')
+    include_matrix: bool = False
+    include_assignments: bool = True
+
+
+@router.post('/capacity')
+def portfolio_capacity(payload: CapacityIn, current_user = Depends(get_current_user)):
+    """
+    Capacidad de la cartera del usuario: carga semana × persona de sus empleados si cada
+    propuesta se staffea por separado (sobreasignaciones) y asignación nivelada (PuLP).
+    """
+    from backend.engine.capacity import plan_capacity
+    from backend.engine.skill_index import get_user_skill_index
+    from backend.memory.state_store import SessionLocal, ProposalLog
+
+    ids = payload.proposal_ids if payload.proposal_ids is not None else state_store.list_user_proposal_ids(current_user.id)
+    with SessionLocal() as db:
+        rows = db.query(ProposalLog).filter(ProposalLog.id.in_(ids)).all() if ids else []
+        projects = [{'id': int(r.id), 'proposal': r.proposal_json or {}, 'start': payload.start_dates.get(int(r.id))}
+                    for r in rows]
+    if payload.proposal_ids and len(projects) != len(set(payload.proposal_ids)):
+        raise HTTPException(status_code=404, detail='Propuesta no encontrada')
+    idx = get_user_skill_index(current_user.id)
+    people = idx.people()
+    try:
+        return plan_capacity(projects, people, index=idx, solver=payload.solver,
+                             include_matrix=payload.include_matrix, include_assignments=payload.include_assignments)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get('/employees/{employee_id}', response_model=EmployeeOut)
 def get_employee(employee_id: int, current_user = Depends(get_current_user)):
     """Recupera un empleado específico."""
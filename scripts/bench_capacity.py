@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Capacidad multi-proyecto: baseline (cada proyecto por su cuenta) vs. nivelación LP.
+
+Cartera sintética: --projects propuestas de generate_proposal con inicios repartidos en
+--spread semanas y una plantilla de --people personas.
+
+Usage:
+  PYTHONPATH=. python scripts/bench_capacity.py --projects 300 --people 3000
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from backend.engine.brain import _ROLE_KEYWORDS
+from backend.engine.capacity import plan_capacity
+from backend.engine.planner import generate_proposal
+
+SAMPLES = [
+    "app de reservas con pagos y chat en tiempo real",
+    "plataforma fintech con pagos, app móvil e integraciones con bancos",
+    "intranet corporativa para una gran empresa con SSO",
+    "marketplace con recomendaciones por machine learning",
+    "sistema IoT de sensores industriales con panel de control",
+]
+ROLES = ["Backend", "Frontend", "QA", "PM", "DevOps", "Tech Lead", "UX/UI", "ML Engineer", "Mobile Dev"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--projects", type=int, default=300)
+    ap.add_argument("--people", type=int, default=3000)
+    ap.add_argument("--spread", type=int, default=52)
+    ap.add_argument("--solver", default="auto")
+    args = ap.parse_args()
+    rnd = random.Random(42)
+
+    base = [generate_proposal(s) for s in SAMPLES]
+    t0 = date(2026, 1, 5)
+    projects = [{"id": i, "proposal": base[i % len(base)],
+                 "start": (t0 + timedelta(weeks=rnd.randrange(args.spread))).isoformat()}
+                for i in range(args.projects)]
+    people = []
+    for i in range(args.people):
+        role = rnd.choice(ROLES)
+        kws = _ROLE_KEYWORDS.get(role, _ROLE_KEYWORDS["Backend Dev"])
+        people.append({"id": i, "name": f"Persona {i}", "role": role, "skills": rnd.sample(kws, k=min(3, len(kws))),
+                       "seniority": rnd.choice(["Junior", "Mid", "Senior"]),
+                       "availability_pct": rnd.choice([50, 80, 100, 100])})
+
+    t = time.perf_counter()
+    res = plan_capacity(projects, people, solver=args.solver, include_assignments=False)
+    out = {
+        "projects": args.projects, "people": args.people, "weeks": len(res["weeks"]), "slots": res["slots"],
+        "solver": res["solver"], "seconds": round(time.perf_counter() - t, 2),
+        "baseline": {k: res["baseline"][k] for k in ("overallocated_people", "overallocated_person_weeks", "max_load_pct", "coverage_pct")},
+        "leveled": {k: res["leveled"][k] for k in ("overallocated_people", "overallocated_person_weeks", "max_load_pct", "coverage_pct")},
+    }
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
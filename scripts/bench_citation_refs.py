@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Bytes per proposal with citations/rate tables by reference vs embedded.
+
+`embedded` is the previous format (expand_proposal: literal source lists in the
+decision_log and the full base rate table in budget.assumptions); `refs` is what
+generate_proposal produces now and what gets stored in proposal_json.
+
+Usage:
+  python scripts/bench_citation_refs.py --n 200
+"""
+from __future__ import annotations
+import argparse
+import json
+
+from backend.engine.planner import generate_proposal
+from backend.knowledge.citations import expand_proposal, registry_snapshot
+
+SAMPLES = [
+    "app de reservas con pagos y chat en tiempo real",
+    "plataforma fintech con pagos, app móvil e integraciones con bancos",
+    "intranet corporativa para una gran empresa con SSO",
+    "marketplace con recomendaciones por machine learning",
+    "sistema IoT de sensores industriales con panel de control",
+]
+
+
+def _size(obj) -> int:
+    return len(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+def _response(p):
+    # lo que devuelve POST /projects/proposal (sin decision_log)
+    return {k: p[k] for k in ("methodology", "team", "phases", "budget", "risks")}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200)
+    args = ap.parse_args()
+
+    stored = {"embedded": 0, "refs": 0}
+    resp = {"embedded": 0, "refs": 0}
+    for i in range(args.n):
+        p = generate_proposal(f"{SAMPLES[i % len(SAMPLES)]} #{i}")
+        full = expand_proposal(p)
+        stored["embedded"] += _size(full)
+        stored["refs"] += _size(p)
+        resp["embedded"] += _size(_response(full))
+        resp["refs"] += _size(_response(p))
+    out = {
+        "proposals": args.n,
+        "stored_bytes_per_proposal": {k: v // args.n for k, v in stored.items()},
+        "stored_reduction_pct": round(100 * (1 - stored["refs"] / stored["embedded"]), 1),
+        "proposal_response_bytes": {k: v // args.n for k, v in resp.items()},
+        "response_reduction_pct": round(100 * (1 - resp["refs"] / resp["embedded"]), 1),
+        "registry_bytes_once": _size(registry_snapshot()),
+    }
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
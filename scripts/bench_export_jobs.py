@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Exportaciones de PDF vs latencia del chat, y caché de informes (backend/engine/export_jobs.py).
+
+Un hilo hace turnos de chat (brain.generate_reply) sin parar mientras se lanza una ráfaga de
+exportaciones de un chat largo:
+  - en_proceso:  EXPORT_WORKERS=0 → el render corre en un hilo del proceso web (como el
+                 endpoint síncrono de antes: compite por el GIL con el chat)
+  - pool:        EXPORT_WORKERS=N → procesos aparte con nice
+Se mide p50/p95 del turno de chat sin exportaciones y durante la ráfaga, y el tiempo de la
+ráfaga. Después, render en frío vs el mismo informe servido desde la caché.
+
+Usage (con BD y directorio de usar y tirar: los turnos guardan propuestas y los informes PDFs):
+  DATABASE_URL=sqlite:////tmp/bench_export.db EXPORT_DIR=/tmp/bench_exports PYTHONPATH=. python scripts/bench_export_jobs.py --exports 6 --workers 2
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+
+from backend.engine import brain, export_jobs
+from backend.memory.state_store import init_db
+
+# textos distintos en cada turno: las preguntas repetidas salen de cachés y no miden nada
+TOPICS = ["reservas para gimnasio", "marketplace de segunda mano", "telemedicina", "logística con tracking"]
+
+
+def _chat_messages(n: int):
+    msgs = []
+    for i in range(n):
+        msgs.append({"role": "user", "content": f"Quiero una plataforma de pagos con app móvil, iteración {i}"})
+        msgs.append({"role": "assistant", "content": (
+            "📌 Metodología: Scrum\nEquipo: PM x 1, Backend Dev x 2, Frontend Dev x 1, QA x 1\n"
+            f"Presupuesto: {40000 + 500 * i}.000,00 € (contingencia 10%)\nFases: Discovery, Sprints, Hardening\n"
+            "Riesgos: dependencias de terceros, alcance\nSemanas totales: 14")})
+    return msgs
+
+
+def _pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2)
+
+
+def _chat_latencies(stop: threading.Event, out: list) -> None:
+    i = 0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        brain.generate_reply(f"bench-export-{i % 5}", f"Quiero una app de {TOPICS[i % len(TOPICS)]} con pagos, versión {i}")
+        out.append(1000 * (time.perf_counter() - t0))
+        i += 1
+
+
+def _measure(workers: int, n_exports: int, msgs) -> dict:
+    os.environ["EXPORT_WORKERS"] = str(workers)
+    os.environ["EXPORT_MAX_PENDING"] = str(n_exports)
+    export_jobs.shutdown_pool()
+    export_jobs.clear()
+    if workers:
+        # arranque del pool fuera de la medida (en producción lo paga el primer informe, una vez)
+        export_jobs.wait(export_jobs.submit(msgs[:2], title="calentar"))
+
+    base: list = []
+    stop = threading.Event()
+    th = threading.Thread(target=_chat_latencies, args=(stop, base))
+    th.start()
+    time.sleep(2.0)
+    stop.set()
+    th.join()
+
+    busy: list = []
+    stop = threading.Event()
+    th = threading.Thread(target=_chat_latencies, args=(stop, busy))
+    th.start()
+    t0 = time.perf_counter()
+    jobs = [export_jobs.submit(msgs, title=f"Informe {i}") for i in range(n_exports)]
+    for j in jobs:
+        export_jobs.wait(j)
+    burst = time.perf_counter() - t0
+    stop.set()
+    th.join()
+    export_jobs.shutdown_pool()
+    return {"chat_p50_ms_sin_export": _pct(base, 0.5), "chat_p95_ms_sin_export": _pct(base, 0.95),
+            "chat_p50_ms_durante": _pct(busy, 0.5), "chat_p95_ms_durante": _pct(busy, 0.95),
+            "turnos_durante": len(busy), "rafaga_s": round(burst, 2)}
+
+
+def _cache(msgs) -> dict:
+    os.environ["EXPORT_WORKERS"] = "0"
+    export_jobs.shutdown_pool()
+    export_jobs.clear()
+    t0 = time.perf_counter()
+    export_jobs.wait(export_jobs.submit(msgs, title="Informe caché"))
+    cold = time.perf_counter() - t0
+    hits = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        export_jobs.wait(export_jobs.submit(msgs, title="Informe caché"))
+        hits.append(time.perf_counter() - t0)
+    export_jobs.shutdown_pool()
+    return {"render_ms": round(1000 * cold, 1), "cache_hit_ms": round(1000 * statistics.median(hits), 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--exports", type=int, default=6)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--messages", type=int, default=60, help="pares usuario/asistente del chat exportado")
+    args = ap.parse_args()
+    init_db()
+    msgs = _chat_messages(args.messages)
+    out = {"en_proceso": _measure(0, args.exports, msgs),
+           "pool": _measure(args.workers, args.exports, msgs),
+           "cache": _cache(msgs)}
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
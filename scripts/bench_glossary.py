@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Glosario: recorrido lineal anterior vs GlossaryIndex (backend/knowledge/glossary_index.py).
+
+Glosario sintético de --terms términos (palabras inventadas de 2-4 sílabas, 1-3 palabras
+por término, vocabulario de n/4 palabras). Se mide la búsqueda por subcadena (lo que hacía get_definition al final y
+search_glossary) y las sugerencias con errores de tecleo.
+
+Usage:
+  PYTHONPATH=. python scripts/bench_glossary.py --terms 1000 10000 50000
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+
+from backend.knowledge.glossary_index import GlossaryIndex
+
+# ~100 sílabas consonante+vocal(+coda): diversidad de trigramas parecida a un glosario real
+SYLL = [c + v + t for c in "bcdfglmnprstv" for v in "aeiou" for t in ("", "n", "r")][:100]
+
+
+def _glossary(n: int, seed: int = 45):
+    rnd = random.Random(seed)
+    words = list({"".join(rnd.choice(SYLL) for _ in range(rnd.randint(2, 4))) for _ in range(max(500, n // 4))})
+    out = {}
+    while len(out) < n:
+        out[" ".join(rnd.sample(words, rnd.randint(1, 3)))] = "definición"
+    return out
+
+
+def _linear_first(glossary, t):
+    for k in glossary:
+        if t in k or k in t:
+            return k
+    return None
+
+
+def _us(fn, queries):
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return round(1e6 * (time.perf_counter() - t0) / len(queries), 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--terms", type=int, nargs="+", default=[1000, 10000, 50000])
+    ap.add_argument("--queries", type=int, default=300)
+    args = ap.parse_args()
+    out = {}
+    for n in args.terms:
+        g = _glossary(n)
+        rnd = random.Random(n)
+        keys = list(g)
+        partial = [k[1:-1] for k in rnd.sample(keys, args.queries)]
+        misses = ["qx " + k for k in rnd.sample(keys, args.queries)]
+        typo_src = rnd.sample(keys, args.queries)
+        typos = [k[:2] + k[3:] if len(k) > 6 else k + "a" for k in typo_src]
+        t0 = time.perf_counter()
+        idx = GlossaryIndex(g)
+        row = {"build_ms": round(1000 * (time.perf_counter() - t0), 1)}
+        row["linear_partial_us"] = _us(lambda q: _linear_first(g, q), partial)
+        row["index_partial_us"] = _us(idx.first_substring_match, partial)
+        row["linear_miss_us"] = _us(lambda q: _linear_first(g, q), misses)
+        row["index_miss_us"] = _us(idx.first_substring_match, misses)
+        row["index_suggest_typo_us"] = _us(lambda q: idx.suggest(q, limit=5), typos)
+        hits = sum(any(x["term"] == k for x in idx.suggest(t, limit=5)) for k, t in zip(typo_src, typos))
+        row["typo_in_top5_pct"] = round(100.0 * hits / len(typos), 1)
+        out[f"terms_{n}"] = row
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Tarjetas de Aprender / fichas de metodología: render en cada petición vs tabla precalculada.
+
+Se mide el coste de construir la tabla (una vez, en el startup), cada tarjeta renderizada al
+vuelo (lo que hacía brain antes) frente a get_card, y el tamaño del payload de GET /projects/cards.
+
+Usage:
+  PYTHONPATH=. python scripts/bench_knowledge_cards.py --reps 200
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+
+from backend.engine import brain, knowledge_cards as kc
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reps", type=int, default=200)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    table = kc.cards()
+    build_ms = 1000 * (time.perf_counter() - t0)
+    specs = [(c["kind"], c["level"] or None, c["method"] or None) for c in table.values()]
+
+    t0 = time.perf_counter()
+    for _ in range(args.reps):
+        for kind, lv, m in specs:
+            kc._KINDS[kind][3](brain, lv, m)
+    live = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(args.reps):
+        for kind, lv, m in specs:
+            kc.get_card(kind, lv, m)
+    served = time.perf_counter() - t0
+    raw, etag = kc.cards_payload()
+    n = args.reps * len(specs)
+    print(json.dumps({
+        "cards": len(table), "build_ms": round(build_ms, 1),
+        "render_us": round(1e6 * live / n, 2), "get_card_us": round(1e6 * served / n, 2),
+        "payload_kb": round(len(raw) / 1024, 1), "etag": etag,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Conocimiento como literales de Python vs blob compilado (backend/knowledge/kb.py).
+
+Cada medida va en un proceso nuevo (tiempo de carga + RSS añadido, de /proc/self/statm; con
+orjson/json/hashlib ya importados, como en un worker):
+  - literales:  un módulo generado con los mismos dicts escritos como literales (lo que eran
+                methodologies.py / brain.py), importado desde su .pyc ya compilado
+  - kb_abrir:   abrir el .kb (mmap + cabecera), sin deserializar nada
+  - kb_import:  lo que se carga al importar hoy (sinónimos, reglas, canon de fases, catálogo)
+  - kb_todo:    todas las secciones deserializadas
+  - brain:      import completo de backend.engine.brain (para contexto)
+
+Usage:
+  PYTHONPATH=. python scripts/bench_knowledge_load.py --runs 5
+"""
+from __future__ import annotations
+import argparse
+import compileall
+import json
+import os
+import pprint
+import py_compile
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from backend.knowledge import kb
+
+_PROBE = r"""
+import os, sys, time, json
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+# lo que un worker ya tiene importado de todas formas (orjson, json, hashlib...) no cuenta
+import importlib, json, hashlib, mmap, struct, threading, typing, collections.abc
+try:
+    import orjson
+except Exception:
+    pass
+r0 = rss(); t0 = time.perf_counter()
+{body}
+dt = time.perf_counter() - t0; r1 = rss()
+print(json.dumps({{"ms": 1000 * dt, "rss_kb": (r1 - r0) / 1024}}))
+"""
+
+_CASES = {
+    "literales": "import kb_literals",
+    "kb_abrir": "from backend.knowledge import kb; kb.info()",
+    "kb_import": "from backend.knowledge import kb\nfor s in ('synonyms', 'method_rules', 'phase_canon', 'methodologies'): kb.section(s)",
+    "kb_todo": "from backend.knowledge import kb\nfor s in kb.info()['sections']: kb.section(s)",
+    "brain": "import backend.engine.brain",
+}
+
+
+def _literal_module(directory: str) -> None:
+    lines = ["# generado por bench_knowledge_load: el conocimiento como literales"]
+    for f in sorted(os.listdir(kb.DEFAULT_DIR)):
+        if f.endswith(".json"):
+            with open(os.path.join(kb.DEFAULT_DIR, f), encoding="utf-8") as fh:
+                for name, data in json.load(fh)["sections"].items():
+                    lines.append(f"{name.upper()} = {pprint.pformat(data, width=120, sort_dicts=False)}")
+    path = os.path.join(directory, "kb_literals.py")
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("\n".join(lines) + "\n")
+    py_compile.compile(path, cfile=None, doraise=True)   # como en un worker: se importa el .pyc
+
+
+def _run(case: str, env: dict) -> dict:
+    code = _PROBE.format(body=_CASES[case])
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    if kb.info()["origin"] != "compiled":
+        kb.write_compiled()
+    compileall.compile_dir(os.path.dirname(kb.__file__), quiet=1)   # misma condición que el literal
+    with tempfile.TemporaryDirectory() as tmp:
+        _literal_module(tmp)
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([tmp, os.getcwd()]))
+        out = {}
+        for case in _CASES:
+            runs = [_run(case, env) for _ in range(args.runs)]
+            out[case] = {"ms": round(statistics.median(r["ms"] for r in runs), 2),
+                         "rss_kb": round(statistics.median(r["rss_kb"] for r in runs))}
+    out["kb_bytes"] = os.path.getsize(os.path.join(kb.data_dir(), kb.COMPILED_NAME))
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Throughput of methodology scoring: one call per text vs score_methodologies_batch.
+
+Usage:
+  python scripts/bench_methodology_scoring.py --n 5000
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+
+from backend.knowledge.methodologies import (
+    detect_signals, score_methodologies, score_methodologies_batch, _feature_matrix, _rules,
+)
+
+PHRASES = [
+    "app móvil de reservas", "con pagos", "soporte 24/7", "mvp para validar", "plazo fijo",
+    "tiempo real", "marketplace de segunda mano", "banco digital", "telemedicina", "streaming",
+    "erp multinacional", "integraciones api", "alta disponibilidad", "equipo remoto", "tienda online",
+]
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=5000)
+    args = p.parse_args()
+    rnd = random.Random(0)
+    texts = [" ".join(rnd.sample(PHRASES, rnd.randint(1, 6))) for _ in range(args.n)]
+
+    t0 = time.perf_counter()
+    for t in texts:
+        score_methodologies(t)
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    score_methodologies_batch(texts)
+    t_batch = time.perf_counter() - t0
+
+    # detect_signals (búsqueda de keywords) es el coste dominante en ambos caminos
+    t0 = time.perf_counter()
+    signals = [detect_signals(t) for t in texts]
+    t_signals = time.perf_counter() - t0
+
+    # sólo la parte matricial (sin detect_signals ni armar los why)
+    t0 = time.perf_counter()
+    _feature_matrix(signals) @ _rules().W.T
+    t_matmul = time.perf_counter() - t0
+
+    print(json.dumps({
+        "texts": args.n,
+        "per_text_calls_per_s": round(args.n / t_loop),
+        "batch_per_s": round(args.n / t_batch),
+        "detect_signals_per_s": round(args.n / t_signals),
+        "matrix_only_per_s": round(args.n / max(t_matmul, 1e-9)),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Latency and allocations of applying /cambiar: patches: copy-on-write vs deepcopy.
+
+`deepcopy` mode reproduces the previous behaviour (a copy.deepcopy of the whole
+proposal in _apply_patch plus another one in _recompute_budget) on top of the current
+functions, so both modes produce the same proposal and only the copying differs.
+
+Usage:
+  python scripts/bench_patch_apply.py --n 2000
+"""
+from __future__ import annotations
+import argparse
+import copy
+import json
+import time
+import tracemalloc
+
+from backend.engine.brain import _apply_patch
+from backend.engine.planner import generate_proposal
+
+PATCHES = [
+    {"type": "team", "ops": [{"op": "set", "role": "QA", "count": 2}]},
+    {"type": "phases", "ops": [{"op": "set_weeks", "name": "Sprints de Desarrollo (2w)", "weeks": 8}]},
+    {"type": "contingency", "pct": 15},
+    {"type": "risks", "add": ["Rotación de personal clave"]},
+    {"type": "budget", "role_rates": {"Backend Dev": 1200}},
+]
+
+
+def _deepcopy_apply(p, patch):
+    # lo que hacía antes: deepcopy en _apply_patch + otro en _recompute_budget
+    return _apply_patch(copy.deepcopy(copy.deepcopy(p)), patch)
+
+
+def _run(apply, p, n):
+    cur = p
+    t0 = time.perf_counter()
+    for i in range(n):
+        cur = apply(cur, PATCHES[i % len(PATCHES)])
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def _allocs(apply, p, n):
+    cur = p
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    history = []          # se guardan todas las versiones, como el historial de la negociación
+    for i in range(n):
+        cur = apply(cur, PATCHES[i % len(PATCHES)])
+        history.append(cur)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (current - before) / n, peak - before
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    args = ap.parse_args()
+
+    p = generate_proposal("plataforma fintech con pagos, app móvil, integraciones con bancos y chat en tiempo real")
+    size = len(json.dumps(p, ensure_ascii=False))
+    out = {"proposal_json_bytes": size, "patches": args.n}
+    for name, fn in (("deepcopy", _deepcopy_apply), ("cow", _apply_patch)):
+        _run(fn, p, 50)  # calentar
+        us = _run(fn, p, args.n)
+        per_patch, peak = _allocs(fn, p, min(args.n, 500))
+        out[name] = {"us_per_patch": round(us, 1),
+                     "retained_bytes_per_version": int(per_patch),
+                     "peak_bytes_500_versions": int(peak)}
+    out["speedup_x"] = round(out["deepcopy"]["us_per_patch"] / out["cow"]["us_per_patch"], 1)
+    out["memory_reduction_x"] = round(out["deepcopy"]["retained_bytes_per_version"]
+                                      / max(1, out["cow"]["retained_bytes_per_version"]), 1)
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Parser de cambios: parsers por área (regex, uno tras otro) vs patch_parser (una pasada).
+
+`regex` es lo que hacía _parse_any_patch antes (team → phases → budget → risks sobre el
+mensaje entero, quedándose con el primero) más _CHANGE_PAT; `single_pass` es parse_command,
+que además devuelve TODOS los cambios del mensaje. Los parsers viejos están ahora en
+TDD/backend_tests/legacy_patch_parsers.py.
+
+Usage:
+  PYTHONPATH=. python scripts/bench_patch_parser.py --n 2000 --clauses 12
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+
+from backend.engine.brain import _canonical_role
+from backend.engine.patch_parser import parse_command
+from TDD.backend_tests.legacy_patch_parsers import (_parse_budget_patch, _parse_change_request_regex,
+                                                    _parse_phases_patch, _parse_risks_patch, _parse_team_patch)
+
+CLAUSES = [
+    "añade 1 qa", "pon 2 backend", "sube frontend a 1.5", "quita ux", "contingencia al 15%",
+    "tarifa de pm a 1300", "'Discovery' a 3 semanas", "agrega fase 'Piloto' 2 semanas",
+    "pon devops a 0,5", "baja tech lead a 1", "quita fase 'QA'",
+]
+
+
+def _old(text):
+    for parser in (_parse_team_patch, _parse_phases_patch, _parse_budget_patch, _parse_risks_patch):
+        patch = parser(text)
+        if patch:
+            break
+    return patch, _parse_change_request_regex(text)
+
+
+def _new(text):
+    return parse_command(text, _canonical_role)
+
+
+def _time(fn, msgs):
+    t0 = time.perf_counter()
+    for m in msgs:
+        fn(m)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--clauses", type=int, default=12)
+    args = ap.parse_args()
+
+    msgs = []
+    for i in range(args.n):
+        parts = [CLAUSES[(i + j) % len(CLAUSES)] for j in range(args.clauses)]
+        msgs.append(", ".join(parts) + "\nagrega riesgo: dependencia de proveedor externo")
+    old_s = _time(_old, msgs)
+    new_s = _time(_new, msgs)
+    sample = _new(msgs[0])["patches"]
+    out = {
+        "messages": args.n,
+        "clauses_per_message": args.clauses + 1,
+        "avg_chars": sum(map(len, msgs)) // len(msgs),
+        "regex_us_per_msg": round(1e6 * old_s / args.n, 1),
+        "single_pass_us_per_msg": round(1e6 * new_s / args.n, 1),
+        "speedup": round(old_s / new_s, 2) if new_s else None,
+        "patches_found_regex": 1,
+        "patches_found_single_pass": len(sample),
+    }
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
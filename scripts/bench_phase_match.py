@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Turnos de seguimiento de fase: índice de fases frío (reconstruido) vs reutilizado.
+
+Cada mensaje con "Fase seleccionada: …" pasa por _match_phase_name, la entrada del
+catálogo, _match_phase_user_intent y _merge_proposal_and_catalog_phase. El índice
+(_PhaseIndex) se construye una vez por versión de la propuesta (nombres + metodología);
+en frío se vacía antes de cada turno, que es lo que costaba antes re-tokenizar todo.
+
+Usage:
+  PYTHONPATH=. python scripts/bench_phase_match.py --turns 2000
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+
+from backend.engine import brain
+from backend.engine.planner import generate_proposal
+
+QUESTIONS = ["¿qué kpis tiene?", "entregables", "quién es el owner", "riesgos de la fase",
+             "qué es el backlog priorizado", "duración en semanas", "checklist inmediato"]
+
+
+def _turn(p, text):
+    method = p.get("methodology") or "Scrum"
+    name = brain._match_phase_name(text, p)
+    if not name:
+        return None
+    idx = brain._phase_index_for(p, brain.normalize_method_name(method))
+    ci = idx.catalog_by_name(name)
+    if ci is not None:
+        brain._match_phase_user_intent(brain._norm(text), idx.catalog[ci], idx.items(ci))
+    brain._determine_phase_question_type(text)
+    return brain._merge_proposal_and_catalog_phase(p, name, method)
+
+
+def _us(texts, p, cold):
+    t0 = time.perf_counter()
+    for t in texts:
+        if cold:
+            brain._phase_index.cache_clear()
+        _turn(p, t)
+    return round(1e6 * (time.perf_counter() - t0) / len(texts), 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=2000)
+    args = ap.parse_args()
+    rnd = random.Random(46)
+    out = {}
+    for req in ("plataforma fintech con pagos en aws y app react", "soporte 24/7 con tickets e incidencias"):
+        p = generate_proposal(req)
+        names = [ph["name"] for ph in p["phases"]]
+        texts = [f"Fase seleccionada: {rnd.choice(names)}. {rnd.choice(QUESTIONS)}" for _ in range(args.turns)]
+        out[p["methodology"]] = {"fases": len(names),
+                                 "turno_frio_us": _us(texts, p, cold=True),
+                                 "turno_indice_us": _us(texts, p, cold=False)}
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
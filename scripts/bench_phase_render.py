@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Desglose de tareas por fase y plan de formación: sin caché (frío) vs cacheado.
+
+Las tareas por arquetipo × metodología ya están precalculadas al importar brain; lo que
+depende de la plantilla (reparto round-robin, gaps y candidatos de upskilling) se cachea
+por huella de la plantilla. Se mide cada render en frío (caché vaciada antes de cada
+llamada) y en caliente, y el turno de "pegar plantilla" de generate_reply (asignación
++ formación + desglose; la asignación por rol no se cachea).
+
+Usage:
+  PYTHONPATH=. python scripts/bench_phase_render.py --staff 10 200
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+
+from backend.engine import brain
+from backend.engine.planner import generate_proposal
+
+ROLES = ["Backend", "Frontend", "QA", "PM", "Tech Lead", "DevOps", "UX"]
+SKILLS = ["Python", "Django", "React", "TypeScript", "Cypress", "Kubernetes", "Terraform", "AWS", "TDD", "Stripe"]
+
+
+def _staff(n: int, seed: int = 44):
+    rnd = random.Random(seed)
+    return [{"name": f"Persona {i}", "role": rnd.choice(ROLES), "skills": rnd.sample(SKILLS, 3),
+             "seniority": rnd.choice(["Junior", "Senior", "Lead"]), "availability_pct": rnd.choice([50, 80, 100])}
+            for i in range(n)]
+
+
+def _us(fn, reps, cold):
+    total = 0.0
+    for _ in range(reps):
+        if cold:
+            brain._clear_render_cache()
+        t0 = time.perf_counter()
+        fn()
+        total += time.perf_counter() - t0
+    return round(1e6 * total / reps, 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--staff", type=int, nargs="+", default=[10, 200])
+    ap.add_argument("--reps", type=int, default=200)
+    args = ap.parse_args()
+    p = generate_proposal("plataforma fintech con pagos en aws, app react y backend django")
+    out = {}
+    for n in args.staff:
+        staff = _staff(n)
+        row = {}
+        for name, fn in (("desglose_tareas", lambda: brain._render_phase_task_breakdown(p, staff)),
+                         ("plan_formacion", lambda: brain._render_training_plan(p, staff))):
+            row[f"{name}_cold_us"] = _us(fn, args.reps, cold=True)
+            row[f"{name}_warm_us"] = _us(fn, args.reps, cold=False)
+        # turno de plantilla (lo que hace generate_reply tras parsearla): asignación + formación + desglose
+        def turn():
+            return (brain._suggest_staffing(p, staff) + brain._render_training_plan(p, staff)
+                    + brain._render_phase_task_breakdown(p, staff))
+        reps = max(1, args.reps // 20)
+        row["turno_plantilla_cold_ms"] = round(_us(turn, reps, cold=True) / 1000, 2)
+        row["turno_plantilla_warm_ms"] = round(_us(turn, reps, cold=False) / 1000, 2)
+        out[f"staff_{n}"] = row
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
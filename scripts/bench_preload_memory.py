@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Memoria por worker: `uvicorn --workers N` vs backend/preload.py (fork desde un master caliente).
+
+Para cada modo se arranca el servidor en un puerto libre (BD SQLite temporal), se espera a
+/health, se lanzan unas cuantas peticiones de chat/tarjetas (para que los workers toquen
+brain, planner, tarjetas y retriever) y se lee /proc/<pid>/smaps_rollup de cada worker:
+
+  - uss:  memoria privada (Private_Clean + Private_Dirty): lo que cuesta cada worker más
+  - pss:  memoria proporcional (las páginas compartidas se reparten entre quienes las mapean)
+  - total_pss: master + workers, lo más parecido a "lo que ocupa el servicio"
+
+Modos:
+  - uvicorn:          uvicorn backend.app:app --workers N (cada worker importa la app)
+  - preload_nofreeze: python -m backend.preload --no-freeze (fork sin gc.freeze)
+  - preload:          python -m backend.preload (fork + gc.freeze)
+
+Usage:
+  PYTHONPATH=. python scripts/bench_preload_memory.py --workers 4 --requests 200
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from backend.preload import children, memory_kb
+
+MESSAGES = [
+    "Quiero una plataforma fintech con pagos en aws y app react",
+    "¿qué es scrum?",
+    "quiero un equipo para una app de reservas",
+    "define definition of done",
+    "soporte 24/7 con tickets e incidencias",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _cmd(mode: str, port: int, workers: int):
+    if mode == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "backend.app:app", "--host", "127.0.0.1",
+                "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    cmd = [sys.executable, "-m", "backend.preload", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    return cmd + (["--no-freeze"] if mode == "preload_nofreeze" else [])
+
+
+def _get(url: str, data=None, timeout=30.0):
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"} if data else {})
+    with urllib.request.urlopen(req, timeout=timeout) as r:
+        return r.read()
+
+
+def _wait_ready(base: str, proc, timeout: float = 120.0) -> float:
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"el servidor terminó con código {proc.returncode}")
+        try:
+            _get(base + "/health", timeout=1.0)
+            return time.perf_counter() - t0
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError("el servidor no respondió a /health")
+
+
+def _load(base: str, n: int) -> int:
+    # conexión nueva por petición: el kernel reparte los accept() entre los workers
+    errors = 0
+    for i in range(n):
+        try:
+            if i % 5 == 4:
+                _get(base + "/projects/cards")
+                continue
+            body = json.dumps({"message": MESSAGES[i % len(MESSAGES)], "session_id": f"bench-{i % 7}"}).encode("utf-8")
+            _get(base + "/chat/message", data=body)
+        except urllib.error.HTTPError:
+            errors += 1     # lo que mide el bench es la memoria, no las respuestas
+    return errors
+
+
+def _workers_of(master: int, expected: int, timeout: float = 30.0):
+    # uvicorn --workers arranca los workers con multiprocessing (spawn): descartar el resource_tracker
+    t0 = time.perf_counter()
+    while True:
+        pids = []
+        for pid in children(master):
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as fh:
+                    cmdline = fh.read()
+            except OSError:
+                continue
+            if b"resource_tracker" not in cmdline:
+                pids.append(pid)
+        if len(pids) >= expected or time.perf_counter() - t0 > timeout:
+            return pids
+        time.sleep(0.2)
+
+
+def _run(mode: str, workers: int, n_requests: int):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", PYTHONPATH=os.getcwd())
+        proc = subprocess.Popen(_cmd(mode, port, workers), env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            ready_s = _wait_ready(base, proc)
+            pids = _workers_of(proc.pid, workers)
+            idle = [memory_kb(p) for p in pids]
+            errors = _load(base, n_requests)
+            time.sleep(0.5)
+            busy = [memory_kb(p) for p in pids]
+            master = memory_kb(proc.pid)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=40)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    mb = lambda kb: round(kb / 1024, 1)
+    return {
+        "arranque_s": round(ready_s, 2),
+        "workers": len(pids),
+        "uss_worker_mb_arrancado": mb(statistics.mean(m["uss"] for m in idle)),
+        "uss_worker_mb_tras_carga": mb(statistics.mean(m["uss"] for m in busy)),
+        "rss_worker_mb_tras_carga": mb(statistics.mean(m["rss"] for m in busy)),
+        "uss_master_mb": mb(master["uss"]),
+        "total_pss_mb": mb(master["pss"] + sum(m["pss"] for m in busy)),
+        "errores_http": errors,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--modes", default="uvicorn,preload_nofreeze,preload")
+    args = ap.parse_args()
+    if not memory_kb(os.getpid()):
+        sys.exit("Hace falta /proc/<pid>/smaps_rollup (Linux)")
+    out = {mode: _run(mode, args.workers, args.requests) for mode in args.modes.split(",")}
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Compare the memory used by the retriever metadata: list of dicts (old layout) vs NumPy columns.
+
+Builds N synthetic proposals with the planner (a few templates, repeated) and measures
+with tracemalloc how much memory each layout keeps alive.
+
+Usage:
+  python scripts/bench_retrieval_memory.py --n 5000
+"""
+from __future__ import annotations
+import argparse
+import copy
+import gc
+import json
+import tracemalloc
+
+from backend.engine.planner import generate_proposal
+from backend.retrieval.similarity import _columns, columns_footprint
+
+TEMPLATES = [
+    "app móvil de reservas para gimnasio con pagos",
+    "marketplace de segunda mano con pagos y chat en tiempo real",
+    "plataforma de telemedicina con citas y videollamada, datos sensibles",
+    "ecommerce de moda con carrito, pagos y recomendaciones",
+    "sistema ERP de inventario para almacén con integraciones",
+    "plataforma fintech de préstamos con scoring de crédito",
+    "app de streaming de podcasts con suscripción",
+    "startup de logística con tracking de flota",
+]
+
+
+def _dataset(n: int):
+    base = [(t, generate_proposal(t)) for t in TEMPLATES]
+    docs, rows = [], []
+    for i in range(n):
+        req, pj = base[i % len(base)]
+        docs.append(f"{req} #{i}")
+        # copia profunda: cada fila de la BD se decodifica a su propio dict
+        rows.append((i + 1, copy.deepcopy(pj)))
+    return docs, rows
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=5000)
+    args = p.parse_args()
+
+    docs, rows = _dataset(args.n)
+
+    def list_of_dicts():
+        # layout anterior de SimilarityRetriever.meta
+        return [{
+            "id": rid,
+            "requirements": req,
+            "methodology": pj.get("methodology"),
+            "budget": copy.deepcopy(pj.get("budget", {})),
+            "team": copy.deepcopy(pj.get("team", [])),
+            "phases": copy.deepcopy(pj.get("phases", [])),
+        } for req, (rid, pj) in zip(docs, rows)]
+
+    def columns():
+        return _columns(rows)
+
+    _, dict_bytes = _measure(list_of_dicts)
+    cols, col_bytes = _measure(columns)
+    footprint = columns_footprint(*cols)
+    # los requisitos (docs) ya existen antes de medir: no cuentan en ninguno de los dos layouts
+    summary = {
+        "rows": args.n,
+        "list_of_dicts_bytes": dict_bytes,
+        "columns_traced_bytes": col_bytes,
+        "columns_nbytes": footprint,
+        "reduction_x": round(dict_bytes / max(1, footprint), 1),
+    }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
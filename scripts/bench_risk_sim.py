@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Monte Carlo de coste/plazo (backend/engine/risk_sim.py): latencia por nº de muestras.
+
+Propuesta de un sector regulado con pagos e integraciones (4 factores de riesgo activos).
+Se mide la mediana de --reps simulaciones para cada --samples y distribución.
+
+Usage:
+  PYTHONPATH=. python scripts/bench_risk_sim.py --samples 10000 100000 1000000
+"""
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import time
+
+from backend.engine import risk_sim as rs
+from backend.engine.planner import generate_proposal
+
+REQ = "plataforma de un sector regulado con pagos, integraciones con bancos y mvp"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--samples", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--reps", type=int, default=10)
+    args = ap.parse_args()
+    p = generate_proposal(REQ)
+    rs.simulate(p, REQ, n=1000)  # calentar
+    out = []
+    for n in args.samples:
+        for dist in ("triangular", "lognormal"):
+            times = []
+            for _ in range(args.reps):
+                t0 = time.perf_counter()
+                rs.simulate(p, REQ, n=n, dist=dist)
+                times.append(time.perf_counter() - t0)
+            out.append({"samples": n, "dist": dist, "ms_p50": round(1000 * statistics.median(times), 1),
+                        "ms_max": round(1000 * max(times), 1)})
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
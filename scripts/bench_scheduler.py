@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Calendario: _build_timeline secuencial anterior vs CPM (backend/engine/scheduler.py).
+
+Mide la latencia por propuesta (lo que cuesta recalcular el calendario en cada parche),
+el lote de la cartera (schedule_many, una sola llamada a busday_offset) frente a un bucle
+de schedule(), y la nivelación de recursos.
+
+Usage:
+  PYTHONPATH=. python scripts/bench_scheduler.py --projects 1000
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+import time
+from datetime import date, timedelta
+
+from backend.engine.planner import generate_proposal
+from backend.engine.scheduler import schedule, schedule_many
+
+START = date(2026, 1, 5)
+REQS = ["app de reservas con pagos", "ecommerce con panel de administración", "plataforma IA de recomendaciones",
+        "app móvil de fidelización", "portal interno con SSO", "marketplace con chat en tiempo real"]
+
+
+def _old_timeline(proposal, start):
+    # lo que hacía brain._build_timeline (semanas naturales, fases en serie)
+    events, current = [], start
+    for ph in proposal.get("phases") or []:
+        w = float(ph.get("weeks", 0) or 0)
+        days = int(math.ceil(w * 7)) if w > 0 else 0
+        end = current + timedelta(days=days - 1) if days > 0 else current
+        events.append({"phase": ph.get("name"), "weeks": w, "start": current.isoformat(), "end": end.isoformat()})
+        current = end + timedelta(days=1)
+    return events
+
+
+def _per_call_us(fn, reps):
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return round(1e6 * (time.perf_counter() - t0) / reps, 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--projects", type=int, default=1000)
+    ap.add_argument("--reps", type=int, default=200)
+    args = ap.parse_args()
+    base = [generate_proposal(r) for r in REQS]
+    props = [base[i % len(base)] for i in range(args.projects)]
+    starts = [START + timedelta(weeks=i % 52) for i in range(args.projects)]
+    p = base[0]
+
+    out = {
+        "tasks_per_project": len(schedule(p, START)["tasks"]),
+        "old_sequential_us": _per_call_us(lambda: _old_timeline(p, START), args.reps),
+        "cpm_us": _per_call_us(lambda: schedule(p, START), args.reps),
+        "cpm_holidays_es_us": _per_call_us(lambda: schedule(p, START, country="es"), args.reps),
+        "cpm_leveled_us": _per_call_us(lambda: schedule(p, START, level=True), args.reps // 4 or 1),
+        "projects": args.projects,
+    }
+    t0 = time.perf_counter()
+    [schedule(pr, s) for pr, s in zip(props, starts)]
+    out["loop_s"] = round(time.perf_counter() - t0, 3)
+    t0 = time.perf_counter()
+    schedule_many(props, starts)
+    out["schedule_many_s"] = round(time.perf_counter() - t0, 3)
+    t0 = time.perf_counter()
+    schedule_many(props, starts, include_tasks=False)
+    out["schedule_many_phases_only_s"] = round(time.perf_counter() - t0, 3)
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
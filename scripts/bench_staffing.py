@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Staffing: greedy anterior (sort por rol) vs matriz + ILP/Húngaro (backend/engine/staffing.py).
+
+Plantilla sintética de --staff personas y --roles roles (los del catálogo + roles
+"Especialista Nxx" hasta completar), con disponibilidades 20-100%.
+
+Usage:
+  PYTHONPATH=. python scripts/bench_staffing.py --staff 5000 --roles 50
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+
+from backend.engine.brain import _ROLE_KEYWORDS, _score_staff_for_role
+from backend.engine.staffing import solve_staffing
+
+
+def _synthetic(n_staff: int, n_roles: int, seed: int = 40):
+    rnd = random.Random(seed)
+    roles = list(_ROLE_KEYWORDS)[:n_roles]
+    roles += [f"Especialista N{i:02d}" for i in range(n_roles - len(roles))]
+    team = [{"role": r, "count": rnd.choice([0.5, 1, 1, 2, 3])} for r in roles]
+    staff = []
+    for i in range(n_staff):
+        role = rnd.choice(roles)
+        kws = _ROLE_KEYWORDS.get(role, ["generalista"])
+        staff.append({
+            "name": f"Persona {i}",
+            "role": role,
+            "skills": rnd.sample(kws, k=min(len(kws), rnd.randint(1, 4))),
+            "seniority": rnd.choice(["Junior", "Mid", "Senior", "Lead"]),
+            "availability_pct": rnd.choice([20, 50, 50, 80, 100, 100]),
+        })
+    return {"team": team}, staff
+
+
+def _greedy(proposal, staff):
+    # lo que hacía _suggest_staffing (sólo la parte por rol)
+    out = {}
+    for r in proposal["team"]:
+        cands = sorted(staff, key=lambda p: _score_staff_for_role(r["role"], p), reverse=True)
+        out[r["role"]] = cands[0]["name"]
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--staff", type=int, default=5000)
+    ap.add_argument("--roles", type=int, default=50)
+    ap.add_argument("--skip-greedy", action="store_true")
+    args = ap.parse_args()
+    proposal, staff = _synthetic(args.staff, args.roles)
+
+    out = {"staff": args.staff, "roles": args.roles,
+           "demand_fte": sum(r["count"] for r in proposal["team"])}
+    if not args.skip_greedy:
+        t0 = time.perf_counter()
+        g = _greedy(proposal, staff)
+        out["greedy_s"] = round(time.perf_counter() - t0, 2)
+        out["greedy_people_reused"] = len(g) - len(set(g.values()))
+    for solver in ("ilp", "hungarian"):
+        t0 = time.perf_counter()
+        res = solve_staffing(proposal, staff, solver=solver)
+        out[f"{solver}_s"] = round(time.perf_counter() - t0, 2)
+        out[f"{solver}_coverage_pct"] = res["coverage_pct"]
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""What-if: barrido vectorizado de la rejilla de escenarios (backend/engine/whatif.py).
+
+Rejilla del test de la cartera grande (20 × 10 × 3 FTE × 5 contingencias × 13 multiplicadores
+de fase × 4 de tarifa = 156k escenarios) y, con --scale, ejes más largos. Se mide la mediana
+de --reps llamadas a whatif() (incluye la frontera de Pareto).
+
+Usage:
+  PYTHONPATH=. python scripts/bench_whatif.py --reps 10 --scale 1 2 4
+"""
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from backend.engine import whatif as wi
+from backend.engine.planner import generate_proposal
+
+
+def _grid(scale: int) -> dict:
+    return dict(fte={"Backend Dev": list(np.linspace(1, 6, 20 * scale)), "QA": list(np.linspace(0.5, 3, 10)),
+                     "PM": [0.5, 1, 1.5]},
+                contingency_pct=[5, 10, 15, 20, 25], phase_week_multipliers=list(np.linspace(0.7, 1.3, 13)),
+                rate_multipliers=[0.9, 1.0, 1.1, 1.2])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reps", type=int, default=10)
+    ap.add_argument("--scale", type=int, nargs="+", default=[1, 2, 4])
+    args = ap.parse_args()
+    p = generate_proposal("erp para gran empresa con integraciones")
+    out = []
+    for scale in args.scale:
+        grid = _grid(scale)
+        wi.whatif(p, **grid)  # calentar
+        times = []
+        for _ in range(args.reps):
+            t0 = time.perf_counter()
+            r = wi.whatif(p, **grid)
+            times.append(time.perf_counter() - t0)
+        out.append({"scenarios": r["scenarios"], "frontier": len(r["frontier"]),
+                    "ms_p50": round(1000 * statistics.median(times), 1), "ms_max": round(1000 * max(times), 1)})
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Compila backend/knowledge/data/*.json → backend/knowledge/data/knowledge.kb (ver backend/knowledge/kb.py).
+
+Se ejecuta en el build de la imagen; en local no hace falta (si no hay .kb o está desfasado
+respecto a los JSON, kb compila en memoria al arrancar).
+
+Usage:
+  PYTHONPATH=. python scripts/build_knowledge.py [--dir backend/knowledge/data] [--check]
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+
+from backend.knowledge import kb
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dir", default=None, help="directorio con las fuentes JSON (por defecto KNOWLEDGE_DIR o el del paquete)")
+    ap.add_argument("--check", action="store_true", help="sólo comprueba que el .kb corresponde a las fuentes")
+    args = ap.parse_args()
+    directory = args.dir or kb.data_dir()
+    path = os.path.join(directory, kb.COMPILED_NAME)
+    if args.check:
+        os.environ["KNOWLEDGE_DIR"] = directory
+        kb.reload()
+        origin = kb.info()["origin"]
+        print(f"{path}: {'al día' if origin == 'compiled' else 'desfasado o ausente'}")
+        sys.exit(0 if origin == "compiled" else 1)
+    out = kb.write_compiled(directory)
+    print(f"{out}: {os.path.getsize(out)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Evaluate retrieval module (Precision@K, MRR, nDCG@K) using a CSV of ground-truth.
+"""Evaluate retrieval module (Precision@K, MRR, nDCG@K, latency) using a CSV of ground-truth.
 
 CSV format: query,relevant_ids
 relevant_ids: semicolon-separated list of ProposalLog.id values (integers)
@@ -9,19 +9,18 @@ desarrollo de API en 3 meses,"12;34;78"
 
 Usage:
   python scripts/eval_retrieval.py --input tests/retrieval_eval.csv --k 5 --out reports/retrieval_eval.csv
+  python scripts/eval_retrieval.py --input tests/retrieval_eval.csv --mode all   # compara bm25 / tfidf / hybrid
 """
 from __future__ import annotations
 import argparse
 import csv
 import json
+import math
+import statistics
+import time
 from typing import List
 from pathlib import Path
 
-try:
-    from sklearn.metrics import ndcg_score
-except Exception:
-    ndcg_score = None
-
 from backend.retrieval.similarity import get_retriever
 
 
@@ -42,6 +41,54 @@ def reciprocal_rank(retrieved: List[int], relevant: List[int]) -> float:
     return 0.0
 
 
+def ndcg_at_k(retrieved: List[int], relevant: List[int], k: int) -> float:
+    """nDCG binario: DCG del ranking devuelto / DCG ideal (todos los relevantes arriba)."""
+    rel = set(relevant)
+    dcg = sum(1.0 / math.log2(i + 2) for i, doc in enumerate(retrieved[:k]) if doc in rel)
+    idcg = sum(1.0 / math.log2(i + 2) for i in range(min(len(rel), k)))
+    return dcg / idcg if idcg else 0.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    vals = sorted(values)
+    idx = min(len(vals) - 1, max(0, int(math.ceil(q / 100.0 * len(vals))) - 1))
+    return vals[idx]
+
+
+def evaluate(retr, rows, k: int, mode: str, rerank: bool = False):
+    results = []
+    for r in rows:
+        q = r['query']
+        relevant = r['relevant']
+        t0 = time.perf_counter()
+        hits = retr.retrieve(q, top_k=k, mode=mode, rerank=rerank)
+        latency_ms = (time.perf_counter() - t0) * 1000.0
+        retrieved_ids = [int(h.get('id')) for h in hits if h.get('id') is not None]
+        results.append({
+            'mode': mode + ('+rerank' if rerank else ''),
+            'query': q,
+            'relevant_ids': ';'.join(str(x) for x in relevant),
+            'retrieved_ids': ';'.join(str(x) for x in retrieved_ids),
+            'precision_at_k': precision_at_k(retrieved_ids, relevant, k),
+            'reciprocal_rank': reciprocal_rank(retrieved_ids, relevant),
+            'ndcg_at_k': ndcg_at_k(retrieved_ids, relevant, k),
+            'latency_ms': round(latency_ms, 3),
+        })
+    lat = [r['latency_ms'] for r in results]
+    summary = {
+        'mode': results[0]['mode'] if results else mode,
+        'queries': len(results),
+        'mean_precision_at_k': statistics.mean(r['precision_at_k'] for r in results) if results else 0.0,
+        'mean_mrr': statistics.mean(r['reciprocal_rank'] for r in results) if results else 0.0,
+        'mean_ndcg_at_k': statistics.mean(r['ndcg_at_k'] for r in results) if results else 0.0,
+        'latency_p50_ms': percentile(lat, 50),
+        'latency_p95_ms': percentile(lat, 95),
+    }
+    return results, summary
+
+
 def parse_relevant(cell: str) -> List[int]:
     if not cell:
         return []
@@ -60,6 +107,8 @@ def main():
     p.add_argument("--input", required=True)
     p.add_argument("--k", type=int, default=5)
     p.add_argument("--out", type=str, help="CSV output per-query metrics")
+    p.add_argument("--mode", choices=["hybrid", "bm25", "tfidf", "all"], default="hybrid")
+    p.add_argument("--rerank", action="store_true", help="re-rank denso (LSA) del top-k")
     args = p.parse_args()
 
     in_path = Path(args.input)
@@ -88,58 +137,13 @@ def main():
         print('No queries found in input file.')
         return
 
+    modes = ["bm25", "tfidf", "hybrid"] if args.mode == "all" else [args.mode]
     results = []
-    precisions = []
-    rr_list = []
-    ndcgs = []
-    for r in rows:
-        q = r['query']
-        relevant = r['relevant']
-        hits = retr.retrieve(q, top_k=args.k)
-        retrieved_ids = [int(h.get('id')) for h in hits if h.get('id') is not None]
-        p_at_k = precision_at_k(retrieved_ids, relevant, args.k)
-        rr = reciprocal_rank(retrieved_ids, relevant)
-        precisions.append(p_at_k)
-        rr_list.append(rr)
-        # ndcg: sklearn expects array-like of shape (n_samples, n_scores)
-        if ndcg_score is not None:
-            # Build relevance vector: for retrieved docs set 1 if in relevant, else 0
-            scores = [1 if did in relevant else 0 for did in retrieved_ids]
-            # if len(scores) < k, pad with zeros
-            if len(scores) < args.k:
-                scores = scores + [0] * (args.k - len(scores))
-            try:
-                nd = ndcg_score([ [1 if i in relevant else 0 for i in retrieved_ids] ], [scores], k=args.k)
-            except Exception:
-                try:
-                    # fallback: compute ndcg with simpler approach
-                    nd = ndcg_score([[1 if i in relevant else 0 for i in retrieved_ids]], [scores])
-                except Exception:
-                    nd = 0.0
-            ndcgs.append(float(nd))
-        else:
-            ndcgs.append(0.0)
-
-        results.append({
-            'query': q,
-            'relevant_ids': ';'.join(str(x) for x in relevant),
-            'retrieved_ids': ';'.join(str(x) for x in retrieved_ids),
-            'precision_at_k': p_at_k,
-            'reciprocal_rank': rr,
-            'ndcg_at_k': ndcgs[-1] if ndcgs else 0.0
-        })
-
-    # Summary
-    import statistics
-    summary = {
-        'queries': len(results),
-        'mean_precision_at_k': statistics.mean(precisions) if precisions else 0.0,
-        'mean_mrr': statistics.mean(rr_list) if rr_list else 0.0,
-        'mean_ndcg_at_k': statistics.mean(ndcgs) if ndcgs else 0.0
-    }
-
-    print('Retrieval evaluation summary:')
-    print(json.dumps(summary, indent=2))
+    for mode in modes:
+        per_query, summary = evaluate(retr, rows, args.k, mode, rerank=args.rerank)
+        results.extend(per_query)
+        print(f'Retrieval evaluation summary ({summary["mode"]}):')
+        print(json.dumps(summary, indent=2))
 
     if args.out:
         outp = Path(args.out)
@@ -1,20 +1,34 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterator, Optional, Set
 from pathlib import Path
+import hashlib
+import inspect
 import math
+import os
 import joblib
 import numpy as np
 
+from joblib import Parallel, delayed
+from sqlalchemy import select
 from sklearn.pipeline import Pipeline
+from sklearn.base import clone
 from sklearn.feature_extraction import DictVectorizer
-from sklearn.linear_model import LinearRegression
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.model_selection import KFold
 from sklearn.metrics import mean_squared_error
 
 from backend.memory.state_store import SessionLocal, ProposalLog, ProposalFeedback
-from backend.ml.runtime import extract_features
+from backend.ml.runtime import FEATURES_VERSION, extract_features
 
 OUT_PATH = Path("backend/models/effort.joblib")
 OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+# caché de features: hash(requirements) -> dict de features
+FEATURES_CACHE_PATH = Path("backend/models/effort_features_cache.joblib")
+
+# filas que se traen de la BD por lote (streaming, sin cargar todo en memoria)
+BATCH_SIZE = 2000
+CV_FOLDS = 5
 
 def _effort_from_proposal(p: Dict[str, Any]) -> float | None:
     b = (p or {}).get("budget", {})
@@ -49,39 +63,156 @@ def _weight_from_feedbacks(fbs: List[ProposalFeedback]) -> float:
     # evita pesos extremos
     return float(max(0.1, min(5.0, round(w, 2))))
 
-def load_training_data() -> Tuple[List[Dict[str, float]], List[float], List[float]]:
+# --- Caché de features ---
+
+def _features_version() -> str:
+    # versión declarada + hash del código de extract_features: si alguien cambia las features
+    # y se olvida de subir FEATURES_VERSION, la caché tampoco sirve valores viejos
+    try:
+        src = inspect.getsource(extract_features)
+    except (OSError, TypeError):
+        src = ""
+    return f"{FEATURES_VERSION}:{hashlib.sha1(src.encode('utf-8')).hexdigest()[:8]}"
+
+_FEATURES_VERSION = _features_version()
+
+def _requirements_key(text: str) -> str:
+    norm = " ".join((text or "").lower().split())
+    return hashlib.sha1(f"{_FEATURES_VERSION}\n{norm}".encode("utf-8")).hexdigest()
+
+def _load_features_cache(path: Path = FEATURES_CACHE_PATH) -> Dict[str, Dict[str, float]]:
+    try:
+        if path.exists():
+            data = joblib.load(path)
+            if isinstance(data, dict):
+                return data
+    except Exception:
+        pass
+    return {}
+
+def _save_features_cache(cache: Dict[str, Dict[str, float]], path: Path = FEATURES_CACHE_PATH) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(cache, path)
+    except Exception:
+        pass
+
+def _features_for(text: str, cache: Dict[str, Dict[str, float]], seen: Optional[Set[str]] = None) -> Dict[str, float]:
+    key = _requirements_key(text)
+    if seen is not None:
+        seen.add(key)
+    feats = cache.get(key)
+    if feats is None:
+        feats = extract_features(text or "")
+        cache[key] = feats
+    return feats
+
+# --- Lectura de datos ---
+
+def _iter_rows_with_feedback(db, batch_size: int = BATCH_SIZE) -> Iterator[Tuple[ProposalLog, List[ProposalFeedback]]]:
+    """Una sola query (outer join ordenada por id) leída en streaming.
+    Agrupa los feedbacks de cada propuesta sin lanzar una query por fila."""
+    stmt = (
+        select(ProposalLog, ProposalFeedback)
+        .outerjoin(ProposalFeedback, ProposalFeedback.proposal_id == ProposalLog.id)
+        .order_by(ProposalLog.id, ProposalFeedback.id)
+        .execution_options(yield_per=batch_size)
+    )
+    current: Optional[ProposalLog] = None
+    fbs: List[ProposalFeedback] = []
+    for row, fb in db.execute(stmt):
+        if current is not None and row.id != current.id:
+            yield current, fbs
+            fbs = []
+        current = row
+        if fb is not None:
+            fbs.append(fb)
+    if current is not None:
+        yield current, fbs
+
+def load_training_data(use_cache: bool = True) -> Tuple[List[Dict[str, float]], List[float], List[float]]:
     X_dicts: List[Dict[str, float]] = []
     y: List[float] = []
     w: List[float] = []
+    cache = _load_features_cache() if use_cache else {}
+    size_before = len(cache)
+    seen: Set[str] = set()
     with SessionLocal() as db:
-        rows = db.query(ProposalLog).all()
-        for r in rows:
+        for r, fbs in _iter_rows_with_feedback(db):
             eff = _effort_from_proposal(r.proposal_json)
             if eff is None:
                 continue
-            feats = extract_features(r.requirements or "")
-            fbs = db.query(ProposalFeedback).filter(ProposalFeedback.proposal_id == r.id).all()
-            weight = _weight_from_feedbacks(fbs)
-            X_dicts.append(feats)
+            X_dicts.append(_features_for(r.requirements or "", cache, seen))
             y.append(float(eff))
-            w.append(weight)
+            w.append(_weight_from_feedbacks(fbs))
+    # fuera lo que no se ha usado en esta pasada: claves de otra FEATURES_VERSION,
+    # requisitos editados o propuestas borradas (si no, la caché sólo crece)
+    stale = [k for k in cache if k not in seen]
+    for k in stale:
+        del cache[k]
+    if use_cache and (stale or len(cache) != size_before):
+        _save_features_cache(cache)
     return X_dicts, y, w
 
+# --- Selección de modelo ---
+
+def _candidates() -> Dict[str, Any]:
+    return {
+        "linear": LinearRegression(),
+        "ridge": Ridge(alpha=1.0),
+        "rf": RandomForestRegressor(n_estimators=200, min_samples_leaf=2, random_state=42, n_jobs=1),
+        "gbr": GradientBoostingRegressor(random_state=42),
+    }
+
+def _make_pipe(model) -> Pipeline:
+    return Pipeline([
+        ("dv", DictVectorizer(sparse=False)),
+        ("model", clone(model)),
+    ])
+
+def _fit_fold(name: str, model, X, y: np.ndarray, w: np.ndarray, train_idx, test_idx) -> Tuple[str, float]:
+    m = clone(model)
+    m.fit(X[train_idx], y[train_idx], sample_weight=w[train_idx])
+    preds = m.predict(X[test_idx])
+    return name, float(mean_squared_error(y[test_idx], preds, sample_weight=w[test_idx]))
+
+def select_model(X_dicts, y, w, n_splits: int = CV_FOLDS, n_jobs: int = -1) -> Tuple[str, Dict[str, float]]:
+    """CV de todos los candidatos; cada (modelo, fold) es una tarea del pool de procesos.
+    Devuelve el nombre del mejor y el RMSE medio (ponderado) de cada uno.
+    Se vectoriza una sola vez (CSR) y a cada tarea le llegan la matriz y los índices del fold,
+    no la lista de dicts: ni un DictVectorizer por tarea ni dicts que serializar."""
+    X = DictVectorizer(sparse=True).fit_transform(X_dicts).tocsr()
+    y = np.asarray(y, dtype=float)
+    w = np.asarray(w, dtype=float)
+    n_splits = max(2, min(n_splits, len(y)))
+    folds = list(KFold(n_splits=n_splits, shuffle=True, random_state=42).split(np.arange(len(y))))
+    cands = _candidates()
+    results = Parallel(n_jobs=n_jobs, backend="loky")(
+        delayed(_fit_fold)(name, model, X, y, w, tr, te)
+        for name, model in cands.items()
+        for tr, te in folds
+    )
+    mse: Dict[str, List[float]] = {}
+    for name, v in results:
+        mse.setdefault(name, []).append(v)
+    rmse = {name: math.sqrt(float(np.mean(vs))) for name, vs in mse.items()}
+    best = min(rmse, key=rmse.get)
+    return best, rmse
+
 def main():
     X_dicts, y, w = load_training_data()
     n = len(y)
     if n < 4:
         print(f"[train_effort] Muy pocos datos ({n}). Genera más propuestas y feedback.")
         return
-    pipe = Pipeline([
-        ("dv", DictVectorizer(sparse=False)),
-        ("lr", LinearRegression())
-    ])
-    pipe.fit(X_dicts, y, **({"lr__sample_weight": np.array(w)} if hasattr(LinearRegression, "fit") else {}))
-    preds = pipe.predict(X_dicts)
-    rmse = math.sqrt(mean_squared_error(y, preds, sample_weight=np.array(w)))
+    n_jobs = int(os.getenv("TRAIN_N_JOBS", "-1"))
+    best, scores = select_model(X_dicts, y, w, n_jobs=n_jobs)
+    for name, v in sorted(scores.items(), key=lambda kv: kv[1]):
+        print(f"[train_effort]   {name:<7} CV-RMSE≈{v:.2f}")
+    pipe = _make_pipe(_candidates()[best])
+    pipe.fit(X_dicts, y, model__sample_weight=np.array(w))
     joblib.dump(pipe, OUT_PATH)
-    print(f"[train_effort] Guardado {OUT_PATH}  N={n}  RMSE≈{rmse:.2f}")
+    print(f"[train_effort] Guardado {OUT_PATH}  N={n}  modelo={best}  CV-RMSE≈{scores[best]:.2f}")
 
 if __name__ == "__main__":
     main()